@@ -0,0 +1,105 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fundamental.turing_db.data import TuringDB
+from turing_models.market.curves.curve_cache import curve_cache
+from turing_models.market.data.market_data_cache import market_data_cache
+from turing_models.utilities.global_types import CouponType
+
+TENORS = [0.25, 0.5, 1, 2, 3, 5, 7, 10, 20, 30]
+VALUE_DATE = datetime.datetime(2021, 11, 1)
+
+
+def fake_bond_yield_curve(curve_code, date, forward_term=None):
+    """ 按曲线编码和日期生成确定的收益率曲线，曲线编码的最后一位和日期都会改变曲线 """
+    codes = [curve_code] if isinstance(curve_code, str) else list(curve_code)
+    frames = []
+    for code in codes:
+        level = 0.02 + 0.0005 * int(code[-1]) + 0.00003 * (date.toordinal() % 97)
+        rates = level + 0.0004 * np.sqrt(TENORS)
+        frames.append(pd.DataFrame({'tenor': TENORS, 'spot_rate': rates, 'ytm': rates},
+                                   index=[code] * len(TENORS)))
+    return pd.concat(frames)
+
+
+def fake_national_debt(date):
+    """ 国债收益率曲线取曲线编码CBD100的确定曲线 """
+    return fake_bond_yield_curve('CBD100', date).reset_index(drop=True)
+
+
+@pytest.fixture
+def market(monkeypatch):
+    """ 用确定的曲线替换TuringDB的取数接口，并清空行情和曲线缓存 """
+    monkeypatch.setattr(TuringDB, 'bond_yield_curve', fake_bond_yield_curve, raising=False)
+    monkeypatch.setattr(TuringDB, 'get_national_debt', fake_national_debt, raising=False)
+    market_data_cache.clear()
+    curve_cache.clear()
+    yield
+    market_data_cache.clear()
+    curve_cache.clear()
+
+
+STOCK_PRICE = 4.2
+VOLATILITY = 0.25
+
+
+def fake_stock_price(symbol, start, end):
+    """ 所有股票的收盘价为STOCK_PRICE """
+    symbols = [symbol] if isinstance(symbol, str) else list(symbol)
+    return pd.DataFrame({'close': [STOCK_PRICE] * len(symbols)},
+                        index=pd.MultiIndex.from_tuples([(s, 0) for s in symbols]))
+
+
+def fake_volatility(symbols, end):
+    """ 所有股票的历史波动率为VOLATILITY """
+    symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+    return pd.DataFrame({'volatility': [VOLATILITY] * len(symbols)}, index=symbols)
+
+
+@pytest.fixture
+def equity_market(market, monkeypatch):
+    """ 在确定的曲线之外，所有股票的收盘价为STOCK_PRICE，历史波动率为VOLATILITY """
+    monkeypatch.setattr(TuringDB, 'get_stock_price', fake_stock_price, raising=False)
+    monkeypatch.setattr(TuringDB, 'get_volatility', fake_volatility, raising=False)
+
+
+CYCLES = ['ANNUAL', 'SEMI_ANNUAL', 'QUARTERLY']
+RULES = ['ACT/365', 'ACT/ACT', 'ACT/360', '30/360', 'ACT/365F']
+MODES = ['COUPON_CARRYING', 'COUPON_CARRYING', 'ZERO_COUPON', 'DISCOUNT']
+
+
+def _make_bond(i, value_date=VALUE_DATE, **kwargs):
+    """ 由编号确定条款的固定利率债券，付息频率、计息规则、付息方式和曲线随编号轮换 """
+    from turing_models.instruments.rates.bond_fixed_rate import BondFixedRate
+
+    rng = np.random.default_rng(i)
+    issue_date = datetime.datetime(2015, 1, 1) + datetime.timedelta(days=int(rng.integers(0, 2300)))
+    due_date = issue_date + datetime.timedelta(days=int(rng.integers(400, 365 * 15)))
+    if due_date <= value_date + datetime.timedelta(days=10):
+        due_date = value_date + datetime.timedelta(days=400)
+    if MODES[i % 4] != 'COUPON_CARRYING':
+        # 零息和贴现债券取一年以内的剩余期限（单利公式）
+        due_date = value_date + datetime.timedelta(days=int(rng.integers(30, 360)))
+    terms = dict(asset_id='B%d' % i, issue_date=issue_date, due_date=due_date, par=100.0,
+                 coupon_rate=float(rng.uniform(0.01, 0.06)), pay_interest_cycle=CYCLES[i % 3],
+                 interest_rules=RULES[i % 5], pay_interest_mode=MODES[i % 4], value_date=value_date,
+                 settlement_terms=i % 2, curve_code='CBD10%d' % (i % 4))
+    terms.update(kwargs)
+    mode = terms['pay_interest_mode']
+    if mode == 'COUPON_CARRYING':
+        return BondFixedRate(**terms)
+    # 零息和贴现债券在构建时求YTM早于剩余期限的计算，先按付息债券构建，再改付息方式后重新计算
+    bond = BondFixedRate(**{**terms, 'pay_interest_mode': 'COUPON_CARRYING'})
+    bond.pay_interest_mode = CouponType[mode]
+    bond._calculate_cash_flow_amounts()
+    bond._ctx_resolve()
+    return bond
+
+
+@pytest.fixture
+def make_bond(market):
+    """ 在确定的曲线下构建债券的工厂函数 """
+    return _make_bond
@@ -0,0 +1,98 @@
+import datetime
+import functools
+
+import numpy as np
+import pytest
+
+from turing_models.instruments.common import RiskMeasure
+from turing_models.instruments.eq.american_option import AmericanOption
+from turing_models.instruments.eq.european_option import EuropeanOption
+
+RISK_MEASURES = [RiskMeasure.Price, RiskMeasure.EqDelta, RiskMeasure.EqGamma, RiskMeasure.EqVega,
+                 RiskMeasure.EqTheta, RiskMeasure.EqRho, RiskMeasure.EqRhoQ]
+
+
+def make_option(option_class, option_type):
+    return option_class(asset_id='OPTION_1', underlier_symbol='600000.SH', option_type=option_type,
+                        expiry=datetime.datetime(2022, 6, 1), strike_price=4.5, multiplier=1,
+                        number_of_options=100, value_date=datetime.datetime(2021, 11, 1))
+
+
+@pytest.fixture
+def price_calls(equity_market, monkeypatch):
+    """ 记录各期权类price的调用次数 """
+    calls = []
+    for option_class in (AmericanOption, EuropeanOption):
+        price = option_class.price
+
+        @functools.wraps(price)
+        def counted(self, price=price):
+            calls.append(type(self).__name__)
+            return price(self)
+
+        monkeypatch.setattr(option_class, 'price', counted)
+    return calls
+
+
+@pytest.mark.parametrize('option_class, option_type', [(AmericanOption, 'PUT'),
+                                                       (AmericanOption, 'CALL'),
+                                                       (EuropeanOption, 'CALL'),
+                                                       (EuropeanOption, 'PUT')])
+def test_batched_measures_match_single_measures(price_calls, option_class, option_type):
+    option = make_option(option_class, option_type)
+    single = [option.calc(risk) for risk in RISK_MEASURES]
+    single_calls = len(price_calls)
+    price_calls.clear()
+
+    batched = option.calc(RISK_MEASURES)
+    np.testing.assert_array_equal(batched, single)
+    # 欧式期权的希腊值为解析解，只有price调用定价
+    assert len(price_calls) <= single_calls
+    assert '_revaluation_memo' not in option.__dict__
+
+
+def test_american_batch_shares_revaluations(price_calls):
+    option = make_option(AmericanOption, 'PUT')
+    measures = RISK_MEASURES[:6]
+    for risk in measures:
+        option.calc(risk)
+    assert len(price_calls) == 12
+    price_calls.clear()
+    option.calc(measures)
+    # 基准价格1次，delta和gamma共享的现价上下bump 2次，theta的时间bump 1次，波动率和利率上下bump各2次
+    assert len(price_calls) == 8
+
+
+def test_api_calc_matches_single_measures(price_calls):
+    option = make_option(AmericanOption, 'PUT')
+    names = [risk.value for risk in RISK_MEASURES]
+    single = [option.calc(risk) for risk in RISK_MEASURES]
+    results = option.api_calc(names)
+    assert [r['risk_measure'] for r in results] == names
+    np.testing.assert_array_equal([r['value'] for r in results], single)
+    assert '_revaluation_memo' not in option.__dict__
+
+
+def test_single_shared_measure_is_not_batched(price_calls):
+    option = make_option(AmericanOption, 'PUT')
+    option._start_batch(['eq_delta', 'time_to_maturity'])
+    assert '_revaluation_memo' not in option.__dict__
+    option._start_batch(['price', 'eq_delta'])
+    assert option._revaluation_memo == {}
+    option._end_batch()
+    assert '_revaluation_memo' not in option.__dict__
+
+
+def test_failed_batch_releases_memo(price_calls, monkeypatch):
+    option = make_option(AmericanOption, 'PUT')
+
+    def failing(self):
+        raise ValueError('no vega')
+
+    monkeypatch.setattr(AmericanOption, 'eq_vega', failing)
+    assert option.calc(RISK_MEASURES) == ""
+    assert '_revaluation_memo' not in option.__dict__
+    # 之后单独计算的指标不受上一次批量计算的影响
+    price_calls.clear()
+    option.calc(RiskMeasure.Price)
+    assert len(price_calls) == 1
@@ -0,0 +1,149 @@
+import numpy as np
+import pytest
+
+from turing_models.instruments.rates.bond import dy
+from turing_models.instruments.rates.bond_book import BondBook
+from turing_models.utilities.global_types import CouponType, TuringYTMCalcType
+from turing_models.utilities.helper_functions import timesFromDates
+
+NUM_BONDS = 24
+
+
+@pytest.fixture
+def bonds(make_bond):
+    return [make_bond(i) for i in range(NUM_BONDS)]
+
+
+def test_curve_prices_match_bonds(bonds):
+    book = BondBook(bonds)
+    risk = book.risk()
+    np.testing.assert_allclose(risk['full_price'], [b.full_price_from_discount_curve() for b in bonds],
+                               rtol=1e-12)
+    np.testing.assert_allclose(risk['clean_price'], [b.clean_price() for b in bonds], rtol=1e-12)
+    np.testing.assert_allclose(risk['accrued_interest'], [b._accrued_interest for b in bonds], rtol=1e-12)
+    # 曲线DV01与BondFixedRate的曲线敏感度相同
+    np.testing.assert_allclose(risk['dv01'], [b.risk_report()['curve_dv01'] for b in bonds], rtol=1e-10)
+
+
+@pytest.mark.parametrize('convention', [TuringYTMCalcType.UK_DMO,
+                                        TuringYTMCalcType.US_TREASURY,
+                                        TuringYTMCalcType.US_STREET])
+def test_full_price_from_ytm_matches_bonds(bonds, convention):
+    ytms = np.linspace(-0.01, 0.08, NUM_BONDS)
+    expected = []
+    for bond, ytm in zip(bonds, ytms):
+        bond.convention = convention
+        bond._ytm = ytm
+        expected.append(bond.full_price_from_ytm())
+    np.testing.assert_allclose(BondBook(bonds).full_price_from_ytm(ytms), expected, rtol=1e-10)
+
+
+@pytest.mark.parametrize('convention', [TuringYTMCalcType.UK_DMO,
+                                        TuringYTMCalcType.US_TREASURY,
+                                        TuringYTMCalcType.US_STREET])
+def test_yield_to_maturity_matches_bonds(bonds, convention):
+    for bond in bonds:
+        bond.convention = convention
+    clean_prices = np.array([b.clean_price() for b in bonds])
+    result = BondBook(bonds).yield_to_maturity(np.vstack([clean_prices, clean_prices + 1.0]))
+    assert result.converged.all()
+
+    expected = []
+    for bond in bonds:
+        expected.append(bond.yield_to_maturity())
+        bond._clean_price += 1.0
+        expected.append(bond.yield_to_maturity())
+        bond._clean_price -= 1.0
+    np.testing.assert_allclose(result.root.T.ravel(), expected, atol=1e-8)
+
+
+def test_ytm_derivative_matches_bonds(bonds):
+    for bond in bonds:
+        bond.convention = TuringYTMCalcType.US_TREASURY
+    book = BondBook(bonds)
+    ytms = np.array([b._ytm for b in bonds])
+    price, deriv = book._price_from_ytm(ytms, np.arange(NUM_BONDS))
+    expected = np.array([b._full_price_from_ytm_with_derivatives()[:2] for b in bonds])
+    np.testing.assert_allclose(price, expected[:, 0], rtol=1e-12)
+    np.testing.assert_allclose(deriv, expected[:, 1], rtol=1e-10)
+
+
+def test_implied_spread_reprices_bonds(bonds):
+    book = BondBook(bonds)
+    clean_prices = np.array([b.clean_price() for b in bonds]) - 0.5
+    result = book.implied_spread(clean_prices)
+    assert result.converged.all()
+    for bond, spread, clean_price in zip(bonds, result.root, clean_prices):
+        bond._spread_adjustment = spread
+        assert bond.clean_price_from_discount_curve() == pytest.approx(clean_price, abs=1e-7)
+
+
+def test_zero_coupon_bonds_in_book(bonds):
+    modes = {b.pay_interest_mode for b in bonds}
+    assert CouponType.COUPON_CARRYING in modes and CouponType.ZERO_COUPON in modes
+
+
+
+def scalar_full_price(bond, curve):
+    """ 逐笔现金流调用curve.df的参考实现（与原full_price_from_discount_curve的循环相同） """
+    settle = bond.settlement_date
+    price, df = 0.0, 1.0
+    for dt in bond._flow_dates[1:]:
+        if dt >= settle:
+            df = curve.df(dt)
+            if bond.pay_interest_mode == CouponType.COUPON_CARRYING:
+                price += bond.coupon_rate / bond.frequency * df
+            else:
+                price += bond._flow_amounts[-1] * df
+    price += df * bond._redemption
+    return price / curve.df(settle) * bond.par
+
+
+def test_given_curves_match_scalar_pricing(bonds):
+    # 结算日不早于曲线起点的两条曲线
+    curves = [bonds[0].fitted_curve(), bonds[2].fitted_curve()]
+    book = BondBook(bonds)
+    expected = [[scalar_full_price(bond, curve) for bond in bonds] for curve in curves]
+    np.testing.assert_allclose(book.full_price(curves[1]), expected[1], rtol=1e-12)
+    np.testing.assert_allclose(book.full_price(curves), expected, rtol=1e-12)
+    np.testing.assert_allclose(book.full_price(), [scalar_full_price(b, b.fitted_curve()) for b in bonds],
+                               rtol=1e-12)
+    risk = book.risk(curves)
+    assert risk['dv01'].shape == (2, NUM_BONDS)
+    np.testing.assert_allclose(risk['clean_price'], np.array(expected) - book.accrued_interest(), rtol=1e-12)
+
+
+class ShiftedCurve:
+    """ 连续复利零息利率平行移动shift后的曲线 """
+
+    def __init__(self, curve, shift):
+        self.curve = curve
+        self.shift = shift
+
+    def df(self, dt):
+        t = timesFromDates(dt, self.curve._valuationDate, self.curve._dayCountType)
+        return self.curve.df(dt) * np.exp(-self.shift * t)
+
+
+def test_dv01_and_convexity_match_shifted_curves(bonds):
+    risk = BondBook(bonds).risk()
+    for i, bond in enumerate(bonds):
+        curve = bond.fitted_curve()
+        base = scalar_full_price(bond, curve)
+        up = scalar_full_price(bond, ShiftedCurve(curve, dy))
+        down = scalar_full_price(bond, ShiftedCurve(curve, -dy))
+        assert risk['dv01'][i] == pytest.approx((down - up) / 2.0, rel=1e-6)
+        assert risk['dollar_convexity'][i] == pytest.approx((up + down - 2.0 * base) / dy ** 2, rel=1e-4)
+
+
+def test_key_rates_add_up_to_parallel_shift(bonds):
+    book = BondBook(bonds)
+    key_tenors = [1.0, 3.0, 5.0, 10.0]
+    np.testing.assert_allclose(book.key_rate_full_price(key_tenors, [[2.0] * 4, [-3.0] * 4]),
+                               book.parallel_full_price([2.0, -3.0]), rtol=1e-12)
+    # 关键期限的一阶和二阶导数之和等于整体平移的中心差分
+    risk = book.key_rate_risk(key_tenors)
+    base, up, down = book.parallel_full_price([0.0, 1.0, -1.0])
+    np.testing.assert_allclose(risk['full_price'], base, rtol=1e-12)
+    np.testing.assert_allclose(risk['delta'].sum(axis=1), (up - down) / 2.0, rtol=1e-5)
+    np.testing.assert_allclose(risk['gamma'].sum(axis=(1, 2)), up + down - 2.0 * base, rtol=1e-3)
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from turing_models.instruments.rates.bond import dy
+from turing_models.utilities.day_count import TuringDayCount, DayCountType
+from turing_models.utilities.global_types import CouponType, TuringYTMCalcType
+
+NUM_BONDS = 16
+
+
+@pytest.fixture
+def bonds(make_bond):
+    return [make_bond(i) for i in range(NUM_BONDS)]
+
+
+def bumped_ytm_prices(bond):
+    """ YTM上下移动dy后的全价 """
+    ytm = bond._ytm
+    prices = []
+    for shift in (-dy, 0.0, dy):
+        bond._ytm = ytm + shift
+        prices.append(bond.full_price_from_ytm())
+    bond._ytm = ytm
+    return prices
+
+
+def scalar_macauley_duration(bond):
+    """ 原来逐笔现金流计算麦考利久期的实现 """
+    curve = bond.fitted_curve()
+    dc = TuringDayCount(DayCountType.ACT_ACT_ISDA)
+    px, df, t = 0.0, 1.0, 0.0
+    for dt in bond._flow_dates[1:]:
+        t = dc.yearFrac(bond.settlement_date, dt)[0]
+        if dt >= bond.settlement_date:
+            df = curve.df(dt)
+            if bond.pay_interest_mode == CouponType.COUPON_CARRYING:
+                flow = bond.coupon_rate / bond.frequency
+            else:
+                flow = bond._flow_amounts[-1]
+            px += flow * df * t * bond.par
+    px += df * bond._redemption * bond.par * t
+    return px / curve.df(bond.settlement_date) / bond.full_price_from_ytm()
+
+
+@pytest.mark.parametrize('convention', [TuringYTMCalcType.UK_DMO,
+                                        TuringYTMCalcType.US_TREASURY,
+                                        TuringYTMCalcType.US_STREET])
+def test_ytm_sensitivities_match_bumping(bonds, convention):
+    for bond in bonds:
+        bond.convention = convention
+        down, base, up = bumped_ytm_prices(bond)
+        assert bond.dv01() == pytest.approx((down - up) / 2.0, rel=1e-6)
+        assert bond.dollar_convexity() == pytest.approx((up - 2.0 * base + down) / dy ** 2, rel=1e-3)
+
+
+def test_durations_match_flow_loop(bonds):
+    for bond in bonds:
+        dmac = scalar_macauley_duration(bond)
+        assert bond.macauley_duration() == pytest.approx(dmac, rel=1e-12)
+        if bond.pay_interest_mode == CouponType.COUPON_CARRYING:
+            md = dmac / (1.0 + bond._ytm / bond.frequency)
+        else:
+            md = dmac / (1.0 + bond._ytm * bond.time_to_maturity_in_year)
+        assert bond.modified_duration() == pytest.approx(md, rel=1e-12)
+
+
+def test_risk_report_matches_measures(bonds):
+    for bond in bonds:
+        report = bond.risk_report()
+        assert report['dv01'] == pytest.approx(bond.dv01(), rel=1e-14)
+        assert report['dollar_convexity'] == pytest.approx(bond.dollar_convexity(), rel=1e-14)
+        assert report['macauley_duration'] == pytest.approx(bond.macauley_duration(), rel=1e-14)
+        assert report['modified_duration'] == pytest.approx(bond.modified_duration(), rel=1e-14)
+        assert report['curve_full_price'] == pytest.approx(bond.full_price_from_discount_curve(), rel=1e-14)
+    np.testing.assert_array_less(0.0, [bond.dv01() for bond in bonds])
@@ -0,0 +1,73 @@
+import datetime
+
+import pytest
+
+from turing_models.instruments.rates.bond import dy
+from turing_models.instruments.rates.bond_floating_rate import BondFloatingRate
+
+
+def make_frn(cycle='QUARTERLY', interest_rules='ACT/365', dm=0.002):
+    bond = BondFloatingRate(asset_id='F1', issue_date=datetime.datetime(2020, 3, 15),
+                            due_date=datetime.datetime(2025, 3, 15), par=100.0, coupon_rate=0.031,
+                            pay_interest_cycle=cycle, interest_rules=interest_rules,
+                            pay_interest_mode='COUPON_CARRYING', value_date=datetime.datetime(2021, 11, 1), dm=dm)
+    bond.floating_spread = 0.003
+    bond.base_interest_rate = 0.028
+    bond._next_base_interest_rate = 0.029
+    bond._ytm = bond.dm + bond._next_base_interest_rate
+    return bond
+
+
+def bumped_credit_duration(bond):
+    """ 原来按贴现边际上移dy重新定价的实现 """
+    dm = bond.dm
+    bond.dm = dm + dy
+    p0 = bond.full_price_from_dm()
+    bond.dm = dm
+    p2 = bond.full_price_from_dm()
+    return (p2 - p0) / dy
+
+
+FRNS = [('QUARTERLY', 'ACT/365', 0.002), ('SEMI_ANNUAL', 'ACT/360', 0.0), ('ANNUAL', 'ACT/ACT', 0.015)]
+
+
+@pytest.mark.parametrize('cycle, interest_rules, dm', FRNS)
+def test_credit_duration_matches_bumping(market, cycle, interest_rules, dm):
+    bond = make_frn(cycle, interest_rules, dm)
+    # 与原实现同号：贴现边际上升价格下降，久期为正
+    dd = bond.dollar_credit_duration()
+    assert dd > 0
+    assert dd == pytest.approx(bumped_credit_duration(bond), rel=1e-3)
+    assert dd == pytest.approx(-bond._full_price_from_dm_with_derivatives(bond.dm)[1], rel=1e-14)
+    assert bond.modified_credit_duration() == pytest.approx(
+        bumped_credit_duration(bond) / bond.full_price_from_dm(), rel=1e-3)
+
+
+def bumped_ytm_prices(bond):
+    """ YTM上下移动dy后的全价 """
+    ytm = bond._ytm
+    prices = []
+    for shift in (-dy, 0.0, dy):
+        bond._ytm = ytm + shift
+        prices.append(bond.full_price_from_ytm())
+    bond._ytm = ytm
+    return prices
+
+
+@pytest.mark.parametrize('cycle, interest_rules, dm', FRNS)
+def test_rate_sensitivities_match_bumping(market, cycle, interest_rules, dm):
+    bond = make_frn(cycle, interest_rules, dm)
+    down, base, up = bumped_ytm_prices(bond)
+    assert bond.dv01() == pytest.approx((down - up) / 2.0, rel=1e-6)
+    assert bond.dollar_convexity() == pytest.approx((up - 2.0 * base + down) / dy ** 2, rel=1e-3)
+
+
+def test_risk_report_matches_measures(market):
+    bond = make_frn()
+    bond._clean_price = bond.clean_price_from_dm()
+    report = bond.risk_report()
+    assert report['dollar_credit_duration'] == pytest.approx(bond.dollar_credit_duration(), rel=1e-14)
+    assert report['modified_credit_duration'] == pytest.approx(bond.modified_credit_duration(), rel=1e-14)
+    assert report['dv01'] == pytest.approx(bond.dv01(), rel=1e-14)
+    assert report['dollar_convexity'] == pytest.approx(bond.dollar_convexity(), rel=1e-14)
+    assert report['credit_convexity'] > 0
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from turing_models.utilities.business_days import BusinessDayCache
+from turing_models.utilities.calendar import TuringCalendarTypes, TuringBusDayAdjustTypes
+from turing_models.utilities.frequency import FrequencyType
+from turing_models.utilities.global_variables import gNumObsInYear
+from turing_models.utilities.schedule import TuringSchedule
+from turing_models.utilities.turing_date import TuringDate
+from turing_models.utilities.turing_date_array import TuringDateArray
+
+CONVENTIONS = [TuringBusDayAdjustTypes.FOLLOWING, TuringBusDayAdjustTypes.MODIFIED_FOLLOWING,
+               TuringBusDayAdjustTypes.PRECEDING, TuringBusDayAdjustTypes.MODIFIED_PRECEDING,
+               TuringBusDayAdjustTypes.NONE]
+rng = np.random.default_rng(11)
+START = TuringDate(2019, 12, 1)
+# 起止日期覆盖节假日前后（包括起止日本身为非交易日）
+SPANS = [(START.addDays(int(k)), int(n)) for k, n in zip(rng.integers(0, 800, 40), rng.integers(1, 400, 40))]
+SPANS += [(TuringDate(2021, 9, 30), 8), (TuringDate(2021, 10, 2), 5), (TuringDate(2021, 2, 10), 30)]
+
+
+def daily_schedule(start_date, end_date, calendar_type, convention):
+    return [dt._excelDate for dt in TuringSchedule(start_date, end_date, freqType=FrequencyType.DAILY,
+                                                   calendarType=calendar_type,
+                                                   busDayAdjustType=convention)._adjustedDates]
+
+
+@pytest.mark.parametrize('calendar_type', [TuringCalendarTypes.CHINA_SSE, TuringCalendarTypes.CHINA_IB,
+                                           TuringCalendarTypes.WEEKEND, TuringCalendarTypes.UNITED_STATES])
+@pytest.mark.parametrize('convention', CONVENTIONS)
+def test_bus_days_match_daily_schedule(calendar_type, convention):
+    cache = BusinessDayCache()
+    for start_date, num_days in SPANS:
+        end_date = start_date.addDays(num_days)
+        expected = daily_schedule(start_date, end_date, calendar_type, convention)
+        bus_days = cache.bus_days(start_date, end_date, calendar_type, convention)
+        assert isinstance(bus_days, TuringDateArray)
+        assert list(bus_days.excelDates()) == expected
+        assert cache.num_bus_days(start_date, end_date, calendar_type, convention) == len(expected) - 1
+
+        # 时间表中的位置与逐个比较的结果相同
+        dates = TuringDateArray.fromOrdinals(np.arange(start_date._ordinal - 5, end_date._ordinal + 6))
+        offsets, found = cache.bus_day_offsets(start_date, end_date, dates, calendar_type, convention)
+        for dt, offset, is_found in zip(dates, offsets, found):
+            assert offset == sum(1 for e in expected if e < dt._excelDate)
+            assert is_found == (dt._excelDate in expected)
+
+
+def test_trading_year_frac():
+    cache = BusinessDayCache()
+    start_date, end_date = TuringDate(2021, 8, 13), TuringDate(2022, 2, 13)
+    num_days = len(daily_schedule(start_date, end_date, TuringCalendarTypes.CHINA_SSE,
+                                  TuringBusDayAdjustTypes.FOLLOWING)) - 1
+    assert cache.trading_year_frac(start_date, end_date) == num_days / gNumObsInYear
+
+
+def test_cache_is_bounded_and_reused():
+    cache = BusinessDayCache(max_size=3)
+    start_date = TuringDate(2021, 8, 13)
+    for k in range(5):
+        cache.num_bus_days(start_date, start_date.addDays(100 + k))
+    assert len(cache) == 3 and cache.misses == 5
+    cache.num_bus_days(start_date, start_date.addDays(104))
+    cache.bus_days(start_date, start_date.addDays(104))
+    assert cache.hits == 2 and cache.misses == 5
+    # 最久未使用的一项已被淘汰
+    cache.num_bus_days(start_date, start_date.addDays(100))
+    assert cache.misses == 6
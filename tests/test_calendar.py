@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from turing_models.utilities.calendar import TuringCalendar, TuringCalendarTypes, TuringBusDayAdjustTypes, \
+    dateFromExcel
+from turing_models.utilities.turing_date import TuringDate
+
+CALENDARS = [TuringCalendarTypes.CHINA_SSE, TuringCalendarTypes.CHINA_IB]
+CONVENTIONS = [TuringBusDayAdjustTypes.FOLLOWING, TuringBusDayAdjustTypes.MODIFIED_FOLLOWING,
+               TuringBusDayAdjustTypes.PRECEDING, TuringBusDayAdjustTypes.MODIFIED_PRECEDING]
+START = TuringDate(2019, 12, 1)
+DATES = [START.addDays(i) for i in range(0, 800, 3)]
+
+
+def calendars(calendar_type):
+    """ 使用工作日位图的日历和逐日判断的日历 """
+    stepping = TuringCalendar(calendar_type)
+    stepping._index = None
+    return TuringCalendar(calendar_type), stepping
+
+
+@pytest.mark.parametrize('calendar_type', CALENDARS)
+def test_business_day_tests_match_stepping(calendar_type):
+    bitmap, stepping = calendars(calendar_type)
+    for dt in DATES:
+        assert bitmap.isBusinessDay(dt) == stepping.isBusinessDay(dt)
+        assert bitmap.isHoliday(dt) == stepping.isHoliday(dt)
+
+
+@pytest.mark.parametrize('calendar_type', CALENDARS)
+@pytest.mark.parametrize('convention', CONVENTIONS)
+def test_adjust_matches_stepping(calendar_type, convention):
+    bitmap, stepping = calendars(calendar_type)
+    expected = [stepping.adjust(dt, convention)._excelDate for dt in DATES]
+    assert [bitmap.adjust(dt, convention)._excelDate for dt in DATES] == expected
+    excel_dates = np.array([dt._excelDate for dt in DATES], dtype=np.int64)
+    np.testing.assert_array_equal(bitmap.adjustExcelDates(excel_dates, convention), expected)
+
+
+@pytest.mark.parametrize('calendar_type', CALENDARS)
+@pytest.mark.parametrize('num_days', [-30, -1, 1, 5, 250])
+def test_add_business_days_matches_stepping(calendar_type, num_days):
+    bitmap, stepping = calendars(calendar_type)
+    for dt in DATES[::5]:
+        assert bitmap.addBusinessDays(dt, num_days)._excelDate == stepping.addBusinessDays(dt, num_days)._excelDate
+
+
+@pytest.mark.parametrize('calendar_type', CALENDARS)
+def test_business_days_between(calendar_type):
+    bitmap, stepping = calendars(calendar_type)
+    for start, end in zip(DATES[::7], DATES[20::7]):
+        count = sum(1 for i in range(1, int(end - start) + 1) if stepping.isBusinessDay(start.addDays(i)))
+        assert bitmap.businessDaysBetween(start, end) == count
+        assert stepping.businessDaysBetween(start, end) == count
+        assert bitmap.businessDaysBetween(end, start) == -count
+
+
+def test_excel_date_round_trip():
+    for dt in DATES:
+        assert dateFromExcel(dt._excelDate)._excelDate == dt._excelDate
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+from turing_models.instruments.rates.irs import create_ibor_single_curve
+from turing_models.market.curves.curve_jacobian import TuringCurveJacobian, curveJacobian
+from turing_models.market.curves.discount_curve_zeros import TuringDiscountCurveZeros
+from turing_models.utilities.day_count import DayCountType
+from turing_models.utilities.frequency import FrequencyType
+from turing_models.utilities.global_types import TuringSwapTypes
+from turing_models.utilities.helper_functions import timesFromDates
+from turing_models.utilities.error import TuringError
+from turing_models.utilities.turing_date import TuringDate
+
+VALUE_DATE = TuringDate(2021, 11, 1)
+DEPOSIT_TERMS = ['1M', '3M', '6M']
+DEPOSIT_RATES = [0.021, 0.022, 0.0235]
+SWAP_TERMS = ['1Y', '2Y', '3Y', '5Y', '7Y', '10Y']
+SWAP_RATES = [0.024, 0.0255, 0.0265, 0.028, 0.0288, 0.0295]
+H = 1e-5
+
+
+def ibor_curve(deposit_rates=DEPOSIT_RATES, swap_rates=SWAP_RATES):
+    return create_ibor_single_curve(VALUE_DATE, DEPOSIT_TERMS, list(deposit_rates), DayCountType.ACT_360,
+                                    SWAP_TERMS, TuringSwapTypes.PAY, list(swap_rates), FrequencyType.QUARTERLY,
+                                    DayCountType.ACT_365F, 0)
+
+
+def bumped_ibor_curves(i):
+    """ 第i个报价（先存款后互换）上下移动H后重新自举的曲线 """
+    curves = []
+    for h in (H, -H):
+        deposit_rates = np.array(DEPOSIT_RATES)
+        swap_rates = np.array(SWAP_RATES)
+        if i < len(DEPOSIT_RATES):
+            deposit_rates[i] += h
+        else:
+            swap_rates[i - len(DEPOSIT_RATES)] += h
+        curves.append(ibor_curve(deposit_rates, swap_rates))
+    return curves
+
+
+def node_zero_rates(curve, nodes):
+    return -np.log(curve._dfs[nodes]) / curve._times[nodes]
+
+
+def instruments():
+    """ 以曲线为参数的估值函数 """
+    dates = [VALUE_DATE.addTenor(t) for t in ['2M', '9M', '18M', '4Y', '8Y', '10Y']]
+    return [lambda c, dt=dt: 1e6 * c.df(dt) for dt in dates] + \
+        [lambda c: 1e6 * sum(c.df(VALUE_DATE.addTenor('%dY' % k)) for k in range(1, 11))]
+
+
+def test_ibor_jacobian_matches_rebuilt_curves():
+    curve = ibor_curve()
+    jacobian = TuringCurveJacobian(curve)
+    nodes = jacobian._nodeIndices
+    num_quotes = len(DEPOSIT_RATES) + len(SWAP_RATES)
+    assert jacobian.jacobian().shape == (len(nodes), num_quotes)
+    np.testing.assert_array_equal(jacobian.swapQuoteIndices(), np.arange(len(DEPOSIT_RATES), num_quotes))
+
+    for i in range(num_quotes):
+        up, down = bumped_ibor_curves(i)
+        expected = (node_zero_rates(up, nodes) - node_zero_rates(down, nodes)) / (2.0 * H)
+        np.testing.assert_allclose(jacobian.jacobian()[:, i], expected, rtol=1e-4, atol=1e-6)
+
+
+def test_ibor_bucketed_dv01_matches_rebuilt_curves():
+    curve = ibor_curve()
+    jacobian = curveJacobian(curve)
+    assert curveJacobian(curve) is jacobian
+    bucketed = jacobian.bucketedDv01(instruments())
+    for i in range(bucketed.shape[1]):
+        up, down = bumped_ibor_curves(i)
+        expected = [(f(up) - f(down)) / (2.0 * H) * 1e-4 for f in instruments()]
+        np.testing.assert_allclose(bucketed[:, i], expected, rtol=1e-4, atol=1e-6)
+
+
+class ShiftedCurve:
+    """ 连续复利零息利率平行移动shift后的曲线（线性零息利率插值下与移动节点利率相同） """
+
+    def __init__(self, curve, shift):
+        self.curve = curve
+        self.shift = shift
+
+    def df(self, dt):
+        t = timesFromDates(dt, self.curve._valuationDate, self.curve._dayCountType)
+        return self.curve.df(dt) * np.exp(-self.shift * t)
+
+
+def test_parallel_dv01_matches_shifted_curve():
+    curve = ibor_curve()
+    jacobian = curveJacobian(curve)
+    expected = [(f(ShiftedCurve(curve, H)) - f(ShiftedCurve(curve, -H))) / (2.0 * H) * 1e-4
+                for f in instruments()]
+    np.testing.assert_allclose(jacobian.parallelDv01(instruments()), expected, rtol=1e-6)
+    np.testing.assert_allclose(jacobian.parallelDv01(instruments()),
+                               jacobian.keyRateDv01(instruments()).sum(axis=1), rtol=1e-12)
+
+
+def test_zero_curve_bucketed_dv01_matches_rebuilt_curves(make_bond):
+    bonds = [make_bond(i, settlement_terms=0, curve_code='CBD100') for i in range(0, 12, 3)]
+    curve = bonds[0].fitted_curve()
+    assert isinstance(curve, TuringDiscountCurveZeros)
+    bucketed = curveJacobian(curve).bucketedDv01(bonds)
+
+    def full_price(bond, zero_curve):
+        # 债券从结算日起按曲线贴现现金流
+        dates, amounts = bond._curve_cash_flows()
+        pv = sum(a * zero_curve.df(dt) for dt, a in zip(dates, amounts))
+        return pv / zero_curve.df(bond.settlement_date) * bond.par
+
+    for i in range(len(curve._zeroRates)):
+        prices = []
+        for h in (H, -H):
+            rates = np.array(curve._zeroRates)
+            rates[i] += h
+            bumped = TuringDiscountCurveZeros(curve._valuationDate, curve._zeroDates, rates, curve._freqType,
+                                              curve._dayCountType, curve._interpType)
+            prices.append([full_price(bond, bumped) for bond in bonds])
+        expected = (np.array(prices[0]) - np.array(prices[1])) / (2.0 * H) * 1e-4
+        np.testing.assert_allclose(bucketed[:, i], expected, rtol=1e-4, atol=1e-9)
+
+
+def test_unknown_curve():
+    with pytest.raises(TuringError):
+        TuringCurveJacobian(object())
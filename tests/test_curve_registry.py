@@ -0,0 +1,100 @@
+import datetime
+
+import numpy as np
+from conftest import fake_bond_yield_curve
+from fundamental.turing_db.data import TuringDB
+
+from turing_models.instruments.common import YieldCurve
+from turing_models.market.curves.curve_cache import curve_cache, shared_flat_curve, shared_zero_curve
+from turing_models.market.curves.curve_jacobian import curveJacobian
+from turing_models.market.curves.discount_curve_zeros import TuringDiscountCurveZeros
+from turing_models.market.data.market_data_cache import market_data_cache
+from turing_models.utilities.turing_date import TuringDate
+
+TENORS = [0.5, 1, 2, 5, 10]
+RATES = [0.021, 0.022, 0.024, 0.027, 0.03]
+
+
+def test_bonds_on_one_curve_share_curve_objects(make_bond):
+    bonds = [make_bond(i) for i in range(0, 40, 4)]
+    first = bonds[0]
+    assert all(bond.cv.curve_data is first.cv.curve_data for bond in bonds)
+    assert all(bond.cv.discount_curve() is first.cv.discount_curve() for bond in bonds)
+    assert all(bond.fitted_curve() is first.fitted_curve() for bond in bonds)
+
+
+def test_registry_size_is_flat_in_position_count(make_bond):
+    for i in range(8):
+        make_bond(i).fitted_curve()
+    size = len(curve_cache)
+    for i in range(8, 80):
+        make_bond(i).fitted_curve()
+    # 新增持仓的曲线编码、估值日期和结算日与已有持仓相同，不增加曲线对象
+    assert len(curve_cache) == size
+
+
+def test_curve_inputs_separate_registered_curves(make_bond):
+    base = make_bond(0)
+    other_code = make_bond(1)
+    other_date = make_bond(0, value_date=datetime.datetime(2021, 11, 2))
+    assert other_code.cv.curve_data is not base.cv.curve_data
+    assert other_date.cv.curve_data is not base.cv.curve_data
+    assert other_code.fitted_curve() is not base.fitted_curve()
+
+
+def test_shared_curves_price_as_fresh_curves(make_bond):
+    bonds = [make_bond(i) for i in range(12)]
+    shared = [bond.full_price_from_discount_curve() for bond in bonds]
+    curve_cache.clear()
+    curve_cache.enabled = False
+    try:
+        fresh = [bond.full_price_from_discount_curve() for bond in bonds]
+        assert bonds[0].fitted_curve() is not bonds[0].fitted_curve()
+    finally:
+        curve_cache.enabled = True
+    np.testing.assert_array_equal(shared, fresh)
+
+
+def test_shared_curve_helpers():
+    curve_cache.clear()
+    value_date = TuringDate(2021, 11, 1)
+    zero = shared_zero_curve(value_date, TENORS, RATES)
+    assert shared_zero_curve(TuringDate(2021, 11, 1), list(TENORS), list(RATES)) is zero
+    assert shared_zero_curve(TuringDate(2021, 11, 2), TENORS, RATES) is not zero
+    fresh = TuringDiscountCurveZeros(value_date, value_date.addYears(TENORS), RATES)
+    dates = [value_date.addTenor(t) for t in ['3M', '1Y', '4Y', '15Y']]
+    assert [zero.df(dt) for dt in dates] == [fresh.df(dt) for dt in dates]
+    flat = shared_flat_curve(value_date, 0.02)
+    assert shared_flat_curve(value_date, 0.02) is flat
+    assert shared_flat_curve(value_date, 0.025) is not flat
+    curve_cache.clear()
+
+
+def test_jacobian_leaves_registered_curve_unchanged():
+    curve_cache.clear()
+    curve = shared_zero_curve(TuringDate(2021, 11, 1), TENORS, RATES)
+    dfs = curve._dfs.copy()
+    times = curve._times.copy()
+    curveJacobian(curve)
+    np.testing.assert_array_equal(curve._dfs, dfs)
+    np.testing.assert_array_equal(curve._times, times)
+    curve_cache.clear()
+
+
+def test_latest_curve_data_is_shared_within_a_snapshot(market, monkeypatch):
+    # 'latest'的行情按当天取数
+    monkeypatch.setattr(TuringDB, 'bond_yield_curve',
+                        lambda curve_code, date, forward_term=None:
+                        fake_bond_yield_curve(curve_code, datetime.date(2021, 11, 1)),
+                        raising=False)
+    first = YieldCurve(value_date='latest', curve_code='CBD100')
+    second = YieldCurve(value_date='latest', curve_code='CBD100')
+    first.resolve()
+    second.resolve()
+    assert first.curve_data is second.curve_data
+
+    # 'latest'快照结束后重新取数并登记
+    market_data_cache.invalidate(date='latest')
+    third = YieldCurve(value_date='latest', curve_code='CBD100')
+    third.resolve()
+    assert third.curve_data is not first.curve_data
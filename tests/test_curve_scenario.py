@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from turing_models.instruments.rates.bond_book import BondBook
+from turing_models.instruments.rates.ibor_curve_swap import TuringIborCurveSwap
+from turing_models.market.curves.curve_adjust import CurveAdjustmentImpl
+from turing_models.market.curves.curve_scenario import TuringCurveScenarios, TuringCurveScenarioGenerator
+from turing_models.market.curves.discount_curve_zeros import TuringDiscountCurveZeros
+from turing_models.market.curves.interpolator import TuringInterpTypes
+from turing_models.utilities.day_count import DayCountType
+from turing_models.utilities.error import TuringError
+from turing_models.utilities.frequency import FrequencyType
+from turing_models.utilities.global_types import TuringSwapTypes
+from turing_models.utilities.turing_date import TuringDate
+
+VALUE_DATE = TuringDate(2021, 11, 1)
+TENORS = [0.25, 0.5, 1, 2, 3, 5, 7, 10, 20, 30]
+RATES = [0.021, 0.0215, 0.022, 0.0232, 0.0241, 0.0256, 0.0266, 0.0278, 0.0295, 0.0301]
+NUM_SCENARIOS = 6
+
+
+def base_curve(interp_type=TuringInterpTypes.FLAT_FWD_RATES, freq_type=FrequencyType.ANNUAL,
+               day_count_type=DayCountType.ACT_ACT_ISDA):
+    return TuringDiscountCurveZeros(VALUE_DATE, VALUE_DATE.addYears(TENORS), RATES, freq_type,
+                                    day_count_type, interp_type)
+
+
+def random_shifts(num_nodes=len(TENORS)):
+    return np.random.default_rng(19).normal(0.0, 0.002, (NUM_SCENARIOS, num_nodes))
+
+
+def scenario_curve(curve, shifts):
+    """ 逐个情景构建的曲线 """
+    return TuringDiscountCurveZeros(curve._valuationDate, curve._zeroDates, np.asarray(curve._zeroRates) + shifts,
+                                    curve._freqType, curve._dayCountType, curve._interpType)
+
+
+DATES = [VALUE_DATE.addTenor(t) for t in ['1D', '1M', '3M', '8M', '1Y', '18M', '4Y', '9Y', '15Y', '30Y', '35Y']]
+
+
+@pytest.mark.parametrize('interp_type', list(TuringInterpTypes))
+@pytest.mark.parametrize('freq_type, day_count_type', [(FrequencyType.ANNUAL, DayCountType.ACT_ACT_ISDA),
+                                                        (FrequencyType.CONTINUOUS, DayCountType.ACT_365F),
+                                                        (FrequencyType.SEMI_ANNUAL, DayCountType.ACT_360)])
+def test_scenario_dfs_match_scenario_curves(interp_type, freq_type, day_count_type):
+    curve = base_curve(interp_type, freq_type, day_count_type)
+    shifts = random_shifts()
+    scenarios = TuringCurveScenarios(curve, shifts)
+    assert len(scenarios) == NUM_SCENARIOS
+
+    block = scenarios.df(DATES)
+    assert block.shape == (NUM_SCENARIOS, len(DATES))
+    for i in range(NUM_SCENARIOS):
+        expected = scenario_curve(curve, shifts[i]).df(DATES)
+        np.testing.assert_allclose(block[i], expected, rtol=1e-12)
+        np.testing.assert_allclose(scenarios.curve(i).df(DATES), expected, rtol=1e-15)
+    # 单个日期返回每个情景一个值
+    np.testing.assert_allclose(scenarios.df(DATES[3]), block[:, 3], rtol=1e-15)
+    np.testing.assert_allclose(scenarios.df(VALUE_DATE),
+                               [scenario_curve(curve, s).df(VALUE_DATE) for s in shifts], rtol=1e-12)
+
+
+def test_zero_shift_reproduces_base_curve():
+    curve = base_curve()
+    scenarios = TuringCurveScenarios(curve, np.zeros((2, len(TENORS))))
+    np.testing.assert_allclose(scenarios.df(DATES), np.vstack([curve.df(DATES)] * 2), rtol=1e-15)
+
+
+def test_scenarios_reject_bad_inputs():
+    curve = base_curve()
+    with pytest.raises(TuringError):
+        TuringCurveScenarios(curve, np.zeros((2, len(TENORS) - 1)))
+    with pytest.raises(TuringError):
+        TuringCurveScenarios(object(), np.zeros((2, len(TENORS))))
+    with pytest.raises(TuringError):
+        TuringCurveScenarios(curve, np.zeros((2, len(TENORS)))).df(VALUE_DATE.addDays(-1))
+
+
+def test_shock_shapes():
+    generator = TuringCurveScenarioGenerator(base_curve())
+    times = generator._times
+    shocks = np.array([-25.0, 10.0, 100.0])
+
+    np.testing.assert_allclose(generator.parallel(shocks), np.outer(shocks * 1e-4, np.ones(len(times))))
+
+    twist = generator.twist([10.0], pivot=2.0, start=1.0, end=10.0)[0]
+    # 起止期限之间的利差变动等于冲击量，支点处不变，区间外保持水平
+    assert twist[times >= 10.0] - twist[times <= 1.0][:, np.newaxis] == pytest.approx(1e-3)
+    assert np.interp(2.0, times, twist) == pytest.approx(0.0, abs=1e-18)
+
+    butterfly = generator.butterfly([10.0], belly=5.0, start=1.0, end=20.0)[0]
+    assert np.interp(5.0, times, butterfly) == pytest.approx(-1e-3)
+    assert butterfly[times <= 1.0] == pytest.approx(1e-3)
+    assert butterfly[times >= 20.0] == pytest.approx(1e-3)
+
+    shapes = generator.keyRateShapes([1.0, 5.0, 10.0])
+    np.testing.assert_allclose(shapes.sum(axis=0), np.ones(len(times)))
+    np.testing.assert_allclose(generator.keyRate([[7.0, 7.0, 7.0]], [1.0, 5.0, 10.0]), generator.parallel([7.0]))
+
+    with pytest.raises(TuringError):
+        generator.twist([1.0], pivot=40.0)
+    with pytest.raises(TuringError):
+        generator.keyRateShapes([5.0, 1.0])
+    with pytest.raises(TuringError):
+        generator.keyRate([[1.0, 2.0]], [1.0, 5.0, 10.0])
+
+
+@pytest.mark.parametrize('shift', [-30.0, 15.0, 80.0])
+def test_parallel_shock_matches_curve_adjustment(shift):
+    curve_data = pd.DataFrame({'tenor': TENORS, 'rate': RATES})
+    generator = TuringCurveScenarioGenerator.fromCurveData(curve_data, VALUE_DATE)
+    scenarios = generator.scenarios(generator.parallel([shift]))
+    adjusted = CurveAdjustmentImpl(curve_data=curve_data, parallel_shift=shift,
+                                   value_date=VALUE_DATE).get_curve_result()
+    np.testing.assert_allclose(scenarios.df(DATES)[0], adjusted.df(DATES), rtol=1e-12)
+
+
+def test_bond_book_prices_scenarios_as_scenario_curves(make_bond):
+    bonds = [make_bond(i) for i in range(12)]
+    curve = bonds[2].fitted_curve()
+    generator = TuringCurveScenarioGenerator(curve)
+    shifts = generator.parallel(np.linspace(-50.0, 50.0, NUM_SCENARIOS)) + \
+        generator.twist(np.linspace(20.0, -20.0, NUM_SCENARIOS)) + \
+        generator.butterfly(np.full(NUM_SCENARIOS, 5.0))
+    book = BondBook(bonds)
+    prices = book.full_price(generator.scenarios(shifts))
+    assert prices.shape == (NUM_SCENARIOS, len(bonds))
+    expected = book.full_price([scenario_curve(curve, s) for s in shifts])
+    np.testing.assert_allclose(prices, expected, rtol=1e-12)
+
+
+def test_swap_values_scenarios_as_scenario_curves():
+    curve = base_curve(TuringInterpTypes.LINEAR_ZERO_RATES)
+    swaps = TuringIborCurveSwap.strip(VALUE_DATE, VALUE_DATE.addTenor(['2Y', '5Y', '10Y']), TuringSwapTypes.PAY,
+                                      [0.024, 0.027, 0.029], FrequencyType.QUARTERLY, DayCountType.ACT_365F)
+    shifts = random_shifts()
+    scenarios = TuringCurveScenarios(curve, shifts)
+    for swap in swaps:
+        values = swap.value(VALUE_DATE, scenarios)
+        expected = [swap.value(VALUE_DATE, scenario_curve(curve, s)) for s in shifts]
+        np.testing.assert_allclose(values, expected, rtol=1e-10)
+        # 贴现曲线和远期曲线可以分别为情景块和单条曲线
+        values = swap.value(VALUE_DATE, curve, scenarios)
+        expected = [swap.value(VALUE_DATE, curve, scenario_curve(curve, s)) for s in shifts]
+        np.testing.assert_allclose(values, expected, rtol=1e-10)
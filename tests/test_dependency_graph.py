@@ -0,0 +1,84 @@
+import pytest
+
+from turing_models.utilities.dependency_graph import DependencyGraph
+from turing_models.utilities.error import TuringError
+
+
+class Inputs:
+    """ 记录各节点计算次数的输入 """
+
+    def __init__(self):
+        self.spot = 1.0
+        self.vol = 0.2
+        self.source = 'wind'
+        self.calls = {}
+
+    def count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+
+@pytest.fixture
+def graph():
+    inputs = Inputs()
+    graph = DependencyGraph()
+
+    def spot():
+        inputs.count('spot')
+        return inputs.spot
+
+    def vol():
+        inputs.count('vol')
+        return inputs.vol
+
+    def forward():
+        inputs.count('forward')
+        return graph.value('spot') * 1.01
+
+    def price():
+        inputs.count('price')
+        return graph.value('forward') * graph.value('vol')
+
+    graph.add('spot', spot, key=lambda: (inputs.spot, inputs.source))
+    graph.add('vol', vol, key=lambda: inputs.vol)
+    graph.add('forward', forward)
+    graph.add('price', price)
+    graph.inputs = inputs
+    return graph
+
+
+def test_values_are_cached(graph):
+    assert graph.value('price') == pytest.approx(1.01 * 0.2)
+    assert graph.value('price') == pytest.approx(1.01 * 0.2)
+    assert graph.inputs.calls == {'spot': 1, 'vol': 1, 'forward': 1, 'price': 1}
+
+
+def test_only_downstream_nodes_are_recomputed(graph):
+    graph.value('price')
+    graph.inputs.vol = 0.3
+    assert graph.value('price') == pytest.approx(1.01 * 0.3)
+    # 波动率变化不影响远期
+    assert graph.inputs.calls == {'spot': 1, 'vol': 2, 'forward': 1, 'price': 2}
+
+    graph.inputs.spot = 2.0
+    assert graph.value('price') == pytest.approx(2.02 * 0.3)
+    assert graph.inputs.calls == {'spot': 2, 'vol': 2, 'forward': 2, 'price': 3}
+
+
+def test_unchanged_value_does_not_invalidate_dependants(graph):
+    graph.value('price')
+    graph.inputs.source = 'bloomberg'
+    graph.value('price')
+    # spot的键变化后重算，但值不变，forward和price不重算
+    assert graph.inputs.calls == {'spot': 2, 'vol': 1, 'forward': 1, 'price': 1}
+
+
+def test_invalidate_all(graph):
+    graph.value('price')
+    graph.invalidate()
+    graph.value('price')
+    assert graph.inputs.calls == {'spot': 2, 'vol': 2, 'forward': 2, 'price': 2}
+
+
+def test_unknown_node():
+    with pytest.raises(TuringError):
+        DependencyGraph().value('missing')
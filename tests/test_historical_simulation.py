@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from conftest import fake_bond_yield_curve
+from fundamental.turing_db.data import TuringDB
+from turing_models.market.data.market_data_cache import market_data_cache
+from turing_models.utilities.calendar import TuringCalendarTypes
+from turing_models.utilities.error import TuringError
+from turing_models.utilities.frequency import FrequencyType
+from turing_models.utilities.helper_functions import to_datetime
+from turing_models.utilities.schedule import TuringSchedule
+from turing_models.utilities.turing_date import TuringDate
+from turing_models.var.fi_portfolio_var import FIPortfolioVaR
+from turing_models.var.historical_simulation import HistoricalSimulationRunner
+
+NUM_BONDS = 16
+
+
+def history_dates(num_days=12):
+    end = TuringDate(2021, 11, 1)
+    return TuringSchedule(end.addDays(-num_days), end, FrequencyType.DAILY,
+                          TuringCalendarTypes.CHINA_IB).scheduleDates()
+
+
+def fresh_position_values(make_bond, bonds, dates):
+    """ 每个日期按该日的估值日重新构建债券，逐只用曲线定价 """
+    values = np.zeros((len(dates), NUM_BONDS))
+    for d, date in enumerate(dates):
+        for i in range(NUM_BONDS):
+            # 零息和贴现债券的到期日随估值日生成，重新构建时沿用原到期日
+            bond = make_bond(i, value_date=to_datetime(date), due_date=to_datetime(bonds[i].due_date))
+            if bond.settlement_date > bond.due_date:
+                continue
+            values[d, i] = bond.full_price_from_discount_curve()
+    return values
+
+
+@pytest.fixture
+def bonds(make_bond):
+    return [make_bond(i) for i in range(NUM_BONDS)]
+
+
+def test_runner_matches_fresh_bonds(make_bond, bonds):
+    dates = history_dates()
+    values = HistoricalSimulationRunner(bonds, processes=1).position_values(dates)
+    np.testing.assert_allclose(values, fresh_position_values(make_bond, bonds, dates), rtol=1e-12)
+
+
+def test_portfolio_values_weight_positions(bonds):
+    dates = history_dates()
+    quantities = np.arange(NUM_BONDS, dtype=np.float64)
+    runner = HistoricalSimulationRunner(bonds, quantities, processes=1)
+    positions = runner.position_values(dates)
+    values = runner.portfolio_values(dates)
+    np.testing.assert_allclose(values, positions @ quantities, rtol=1e-14)
+    np.testing.assert_allclose(runner.portfolio_returns(dates), values[1:] / values[:-1] - 1.0, rtol=1e-10)
+
+
+def test_prefetch_fetches_each_date_once(monkeypatch, bonds):
+    calls = []
+
+    def counting_bond_yield_curve(curve_code, date, forward_term=None):
+        calls.append(date)
+        return fake_bond_yield_curve(curve_code, date, forward_term)
+
+    monkeypatch.setattr(TuringDB, 'bond_yield_curve', counting_bond_yield_curve, raising=False)
+    market_data_cache.clear()
+    dates = history_dates()
+    HistoricalSimulationRunner(bonds, processes=1).position_values(dates)
+    # 组合的全部曲线编码每个日期一次取回
+    assert len(calls) == len(dates)
+
+
+def test_runner_rejects_bad_inputs(bonds):
+    with pytest.raises(TuringError):
+        HistoricalSimulationRunner([])
+    with pytest.raises(TuringError):
+        HistoricalSimulationRunner(bonds + [object()])
+    with pytest.raises(TuringError):
+        HistoricalSimulationRunner(bonds, quantities=[1.0, 2.0])
+
+
+def test_bond_positions_keep_zero_quantities(bonds):
+    positions = [SimpleNamespace(tradable=bonds[0], quantity=0),
+                 SimpleNamespace(tradable=bonds[1], quantity=None),
+                 SimpleNamespace(tradable=bonds[2]),
+                 SimpleNamespace(tradable=bonds[3], quantity=3.0)]
+    portfolio = SimpleNamespace(_position_sets=SimpleNamespace(positions=positions))
+    tradables, quantities = FIPortfolioVaR._bond_positions(portfolio)
+    assert tradables == bonds[:4]
+    assert quantities == [0, 1.0, 1.0, 3.0]
+
+    positions.append(SimpleNamespace(tradable=object(), quantity=1.0))
+    assert FIPortfolioVaR._bond_positions(portfolio) is None
+
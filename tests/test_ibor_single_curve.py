@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from turing_models.instruments.rates.ibor_curve_swap import TuringIborCurveSwap
+from turing_models.instruments.rates.ibor_deposit import TuringIborDeposit
+from turing_models.market.curves.ibor_single_curve import TuringIborSingleCurve
+from turing_models.market.curves.interpolator import TuringInterpTypes
+from turing_models.utilities.calendar import TuringCalendarTypes, TuringBusDayAdjustTypes, TuringDateGenRuleTypes
+from turing_models.utilities.day_count import DayCountType
+from turing_models.utilities.frequency import FrequencyType
+from turing_models.utilities.global_types import TuringSwapTypes
+from turing_models.utilities.turing_date import TuringDate
+
+VALUE_DATE = TuringDate(2021, 11, 1)
+SWAP_TERMS = ['1Y', '2Y', '3Y', '4Y', '5Y', '7Y', '10Y']
+SWAP_RATES = [0.024, 0.0255, 0.0265, 0.0273, 0.028, 0.0288, 0.0295]
+
+
+def make_curve(interp_type, leg_type, day_count_type, reset_freq_type):
+    depos = [TuringIborDeposit(VALUE_DATE, VALUE_DATE.addTenor(t), r, DayCountType.ACT_360)
+             for t, r in zip(['1M', '3M', '6M'], [0.021, 0.022, 0.0235])]
+    swaps = TuringIborCurveSwap.strip(VALUE_DATE, VALUE_DATE.addTenor(SWAP_TERMS), leg_type, SWAP_RATES,
+                                      FrequencyType.QUARTERLY, day_count_type, notional=1000000.0,
+                                      floatFreqType=FrequencyType.QUARTERLY,
+                                      floatDayCountType=DayCountType.ACT_360, resetFreqType=reset_freq_type,
+                                      calendarType=TuringCalendarTypes.WEEKEND,
+                                      busDayAdjustType=TuringBusDayAdjustTypes.FOLLOWING,
+                                      dateGenRuleType=TuringDateGenRuleTypes.FORWARD)
+    return TuringIborSingleCurve(VALUE_DATE, depos, [], swaps, interp_type)
+
+
+@pytest.mark.parametrize('interp_type', [TuringInterpTypes.FLAT_FWD_RATES,
+                                         TuringInterpTypes.LINEAR_ZERO_RATES,
+                                         TuringInterpTypes.LINEAR_FWD_RATES])
+@pytest.mark.parametrize('leg_type, day_count_type, reset_freq_type', [
+    (TuringSwapTypes.PAY, DayCountType.ACT_365F, FrequencyType.QUARTERLY),
+    (TuringSwapTypes.RECEIVE, DayCountType.ACT_360, FrequencyType.MONTHLY),
+])
+def test_compiled_bootstrap_matches_python(monkeypatch, interp_type, leg_type, day_count_type, reset_freq_type):
+    compiled = make_curve(interp_type, leg_type, day_count_type, reset_freq_type)
+    # 逐只互换用scipy求根和Python估值的原有路径
+    monkeypatch.setattr(TuringIborSingleCurve, '_useSwapSchedules', lambda self: False)
+    python = make_curve(interp_type, leg_type, day_count_type, reset_freq_type)
+
+    np.testing.assert_allclose(compiled._times, python._times, rtol=1e-14)
+    np.testing.assert_allclose(compiled._dfs, python._dfs, rtol=1e-10)
+    # 每只互换在自举出的曲线上的价值为零
+    for swap in make_curve(interp_type, leg_type, day_count_type, reset_freq_type)._usedSwaps:
+        assert swap.value(VALUE_DATE, compiled) == pytest.approx(0.0, abs=1e-4)
+
+
+def test_compiled_swap_value_matches_python(monkeypatch):
+    from turing_models.instruments.rates import ibor_curve_swap
+    curve = make_curve(TuringInterpTypes.FLAT_FWD_RATES, TuringSwapTypes.PAY, DayCountType.ACT_365F,
+                       FrequencyType.MONTHLY)
+    swaps = curve._usedSwaps
+    compiled = [swap.value(VALUE_DATE, curve.bump(0.001)) for swap in swaps]
+    monkeypatch.setattr(ibor_curve_swap, '_swapValue', ibor_curve_swap._swapValue.py_func)
+    python = [swap.value(VALUE_DATE, curve.bump(0.001)) for swap in swaps]
+    np.testing.assert_allclose(compiled, python, rtol=1e-13)
+    assert np.all(np.abs(compiled) > 1.0)
@@ -0,0 +1,47 @@
+import pytest
+
+from turing_models.instruments.rates.irs import IRS
+from turing_models.market.curves.curve_cache import curve_cache
+from turing_models.utilities.turing_date import TuringDate
+
+
+def make_irs(**kwargs):
+    terms = dict(asset_id='IRS_1', effective_date=TuringDate(2021, 11, 3),
+                 termination_date=TuringDate(2026, 11, 3), fixed_leg_type='PAY', fixed_coupon=0.028,
+                 fixed_freq_type='按季付息', fixed_day_count_type='ACT/365F', reset_freq_type='按季重置',
+                 value_date=TuringDate(2021, 11, 1), deposit_term=['1M', '3M', '6M'],
+                 deposit_rate=[0.021, 0.022, 0.0235], deposit_day_count_type='ACT/360',
+                 swap_curve_dates=[1.0, 2.0, 3.0, 5.0, 7.0, 10.0],
+                 swap_curve_rates=[0.024, 0.0255, 0.0265, 0.028, 0.0288, 0.0295],
+                 fixed_freq_type_for_curve='按季付息', fixed_day_count_type_for_curve='ACT/365F',
+                 fixed_leg_type_for_curve='PAY')
+    terms.update(kwargs)
+    return IRS(**terms)
+
+
+def test_swaps_on_one_curve_share_curves(market):
+    first = make_irs()
+    second = make_irs(asset_id='IRS_2', fixed_coupon=0.03, termination_date=TuringDate(2028, 11, 3))
+    assert second.libor_curve is first.libor_curve
+    assert second.discount_curve is first.discount_curve
+    size = len(curve_cache)
+    make_irs(asset_id='IRS_3', fixed_leg_type='RECEIVE').price()
+    assert len(curve_cache) == size
+
+
+def test_curve_quotes_separate_cached_curves(market):
+    base = make_irs()
+    shifted = make_irs(swap_curve_rates=[0.025, 0.0265, 0.0275, 0.029, 0.0298, 0.0305])
+    assert shifted.libor_curve is not base.libor_curve
+    assert shifted.price() != base.price()
+
+
+def test_cached_curves_price_as_fresh_curves(market, monkeypatch):
+    swaps = [make_irs(), make_irs(asset_id='IRS_2', fixed_coupon=0.03, fixed_leg_type='RECEIVE')]
+    cached = [(irs.price(), irs.dv01()) for irs in swaps]
+    monkeypatch.setattr(curve_cache, 'enabled', False)
+    fresh = [make_irs(), make_irs(asset_id='IRS_2', fixed_coupon=0.03, fixed_leg_type='RECEIVE')]
+    assert fresh[0].libor_curve is not fresh[1].libor_curve
+    for (price, dv01), irs in zip(cached, fresh):
+        assert price == pytest.approx(irs.price(), rel=1e-14)
+        assert dv01 == pytest.approx(irs.dv01(), rel=1e-14)
@@ -0,0 +1,53 @@
+import datetime
+
+import pytest
+
+from turing_models.instruments.eq.knockout_option import KnockOutOption
+from turing_models.utilities.global_types import OptionType
+
+
+@pytest.fixture
+def option(equity_market):
+    option = KnockOutOption(underlier_symbol='600067.SH',
+                            option_type=OptionType.CALL,
+                            start_date=datetime.datetime(2021, 6, 3),
+                            expiry=datetime.datetime(2022, 3, 3),
+                            strike_price=4.19,
+                            participation_rate=1.0,
+                            barrier=5.5,
+                            notional=1000000,
+                            rebate=0.2,
+                            value_date=datetime.datetime(2021, 11, 1))
+    option.num_paths = 4000
+    return option
+
+
+def test_crn_greeks_match_bumped_price_mc(option):
+    greeks = option.price_mc_crn_greeks()
+    assert greeks['price'] == pytest.approx(option.price_mc(), rel=1e-12)
+
+    # 与用同一个种子扰动后重新定价的结果相同
+    s0 = option.stock_price
+    ds = s0 * 0.01
+    option.stock_price = s0 + ds
+    up = option.price_mc()
+    option.stock_price = s0 - ds
+    down = option.price_mc()
+    option.stock_price = s0
+    assert greeks['delta'] == pytest.approx((up - down) / (2 * ds), rel=1e-8)
+
+    vol = option.v
+    option.v = vol + 0.01
+    up = option.price_mc()
+    option.v = vol - 0.01
+    down = option.price_mc()
+    option.v = vol
+    assert greeks['vega'] == pytest.approx((up - down) / 0.02, rel=1e-8)
+
+
+def test_crn_greeks_agree_with_likelihood_ratio(option):
+    crn = option.price_mc_crn_greeks()
+    lr = option.price_mc_greeks()
+    for name in ('delta', 'vega'):
+        std_error = (crn[name + '_std_error'] ** 2 + lr[name + '_std_error'] ** 2) ** 0.5
+        assert abs(crn[name] - lr[name]) < 4 * std_error
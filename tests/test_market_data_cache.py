@@ -0,0 +1,169 @@
+import datetime
+
+import pandas as pd
+
+from fundamental.turing_db.data import TuringDB
+from turing_models.instruments.common import YieldCurve
+from turing_models.instruments.rates.bond_fixed_rate import BondFixedRate
+from turing_models.market.curves.curve_cache import curve_cache
+from turing_models.market.data import market_data_cache as market_data_cache_module
+from turing_models.market.data.market_data_cache import MarketDataCache, market_data_cache
+from turing_models.utilities.turing_date import TuringDate
+
+
+class Loader:
+    """ 记录调用次数的取数函数 """
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = []
+
+    def __call__(self, *args):
+        self.calls.append(args)
+        return self.value
+
+
+def frame(*symbols):
+    return pd.DataFrame({'price': range(len(symbols))}, index=list(symbols))
+
+
+def test_fetch_calls_loader_once_per_key():
+    cache = MarketDataCache()
+    loader = Loader(frame('600000.SH'))
+    first = cache.fetch('stock_price', loader, symbol='600000.SH', date=datetime.datetime(2021, 8, 13))
+    # TuringDate、datetime和date表示同一天时命中同一个键
+    second = cache.fetch('stock_price', loader, symbol='600000.SH', date=TuringDate(2021, 8, 13))
+    third = cache.fetch('stock_price', loader, symbol='600000.SH', date=datetime.date(2021, 8, 13))
+    assert len(loader.calls) == 1
+    assert first is second is third
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_latest_shares_one_snapshot():
+    cache = MarketDataCache()
+    loader = Loader(frame('600000.SH'))
+    for _ in range(3):
+        cache.fetch('stock_price', loader, symbol='600000.SH', date='latest')
+    assert len(loader.calls) == 1
+    (key,) = cache._data
+    assert key[2] == cache.snapshot_date('latest')
+    # 结束快照后重新取数
+    assert cache.invalidate(date='latest') == 1
+    cache.fetch('stock_price', loader, symbol='600000.SH', date='latest')
+    assert len(loader.calls) == 2
+
+
+def test_latest_snapshot_expires(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(market_data_cache_module.time, 'monotonic', lambda: clock[0])
+    cache = MarketDataCache(latest_ttl=60.0)
+    loader = Loader(frame('600000.SH'))
+    cache.fetch('stock_price', loader, symbol='600000.SH', date='latest')
+    clock[0] += 59.0
+    cache.fetch('stock_price', loader, symbol='600000.SH', date='latest')
+    assert len(loader.calls) == 1
+    clock[0] += 2.0
+    cache.fetch('stock_price', loader, symbol='600000.SH', date='latest')
+    assert len(loader.calls) == 2
+    # 过期快照的缓存项随之删除
+    assert len(cache) == 1
+
+
+def test_prefetched_latest_serves_fetch():
+    cache = MarketDataCache()
+    loader = Loader(frame('A', 'B'))
+    assert cache.prefetch('bond_yield_curve', loader, ['A', 'B'], date='latest') == 2
+    single = Loader(None)
+    assert cache.fetch('bond_yield_curve', single, symbol='B', date='latest') is loader.value
+    assert single.calls == []
+
+    # 子进程载入快照后沿用同一个'latest'快照
+    other = MarketDataCache()
+    other.load(cache.snapshot())
+    assert other.snapshot_date('latest') == cache.snapshot_date('latest')
+    assert other.fetch('bond_yield_curve', single, symbol='A', date='latest') is loader.value
+    assert single.calls == []
+
+
+def test_latest_bonds_share_one_fetch(monkeypatch):
+    calls = []
+
+    def bond_yield_curve(curve_code, date, forward_term=None):
+        calls.append((curve_code, date))
+        codes = [curve_code] if isinstance(curve_code, str) else list(curve_code)
+        tenors = [0.5, 1, 2, 5, 10, 30]
+        return pd.concat([pd.DataFrame({'tenor': tenors, 'spot_rate': [0.02 + 0.001 * t ** 0.5 for t in tenors],
+                                        'ytm': [0.025] * len(tenors)}, index=[code] * len(tenors))
+                          for code in codes])
+
+    def make_bond(i, curve_code='CBD100'):
+        return BondFixedRate(asset_id='B%d' % i, issue_date=datetime.datetime(2020, 1, 1),
+                             due_date=datetime.datetime(2030 + i, 1, 1), par=100.0, coupon_rate=0.03,
+                             pay_interest_cycle='ANNUAL', interest_rules='ACT/365',
+                             pay_interest_mode='COUPON_CARRYING', curve_code=curve_code)
+
+    monkeypatch.setattr(TuringDB, 'bond_yield_curve', bond_yield_curve, raising=False)
+    market_data_cache.clear()
+    curve_cache.clear()
+    try:
+        # 估值日期默认为'latest'
+        bonds = [make_bond(i) for i in range(5)]
+        assert calls == [('CBD100', 'latest')]
+        assert all(bond.cv.curve_data is bonds[0].cv.curve_data for bond in bonds)
+
+        assert YieldCurve.prefetch(['CBD101', 'CBD102'], 'latest') == 2
+        make_bond(5, 'CBD101')
+        make_bond(6, 'CBD102')
+        assert calls == [('CBD100', 'latest'), (['CBD101', 'CBD102'], 'latest')]
+    finally:
+        market_data_cache.clear()
+        curve_cache.clear()
+
+
+def test_empty_result_is_not_cached():
+    cache = MarketDataCache()
+    loader = Loader(pd.DataFrame())
+    cache.fetch('stock_price', loader, symbol='X', date=datetime.date(2021, 8, 13))
+    cache.fetch('stock_price', loader, symbol='X', date=datetime.date(2021, 8, 13))
+    assert len(loader.calls) == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = MarketDataCache(max_size=2)
+    date = datetime.date(2021, 8, 13)
+    loaders = {symbol: Loader(frame(symbol)) for symbol in 'ABC'}
+    cache.fetch('stock_price', loaders['A'], symbol='A', date=date)
+    cache.fetch('stock_price', loaders['B'], symbol='B', date=date)
+    cache.fetch('stock_price', loaders['A'], symbol='A', date=date)  # A成为最近使用
+    cache.fetch('stock_price', loaders['C'], symbol='C', date=date)  # 淘汰B
+    assert len(cache) == 2
+    cache.fetch('stock_price', loaders['A'], symbol='A', date=date)
+    cache.fetch('stock_price', loaders['B'], symbol='B', date=date)
+    assert len(loaders['A'].calls) == 1
+    assert len(loaders['B'].calls) == 2
+
+
+def test_prefetch_shares_one_request():
+    cache = MarketDataCache()
+    date = datetime.date(2021, 8, 13)
+    loader = Loader(frame('A', 'B'))
+    assert cache.prefetch('bond_yield_curve', loader, ['A', 'B', 'C'], date=date) == 2
+    assert loader.calls == [(['A', 'B', 'C'],)]
+    single = Loader(None)
+    assert cache.fetch('bond_yield_curve', single, symbol='B', date=date) is loader.value
+    assert single.calls == []
+    # 已缓存的代码不再请求
+    assert cache.prefetch('bond_yield_curve', loader, ['A', 'B'], date=date) == 0
+    assert len(loader.calls) == 1
+
+
+def test_invalidate_and_snapshot():
+    cache = MarketDataCache()
+    date = datetime.date(2021, 8, 13)
+    cache.fetch('stock_price', Loader(frame('A')), symbol='A', date=date)
+    cache.fetch('volatility', Loader(frame('A')), symbol='A', date=date)
+    other = MarketDataCache()
+    other.load(cache.snapshot())
+    assert len(other) == 2
+    assert cache.invalidate(kind='stock_price') == 1
+    assert len(cache) == 1
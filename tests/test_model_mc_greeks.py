@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from turing_models.models.model_black_scholes_analytical import bs_delta, bs_gamma, bs_vega
+from turing_models.models.model_mc_greeks import gbm_lr_pair_weights, gbm_lr_weights, lr_estimate
+from turing_models.models.process_simulator import TuringProcessSimulator, TuringProcessTypes, \
+    TuringGBMNumericalScheme
+from turing_models.utilities.error import TuringError
+from turing_models.utilities.global_types import TuringOptionTypes
+
+S0, K, R, SIGMA, T = 100.0, 105.0, 0.03, 0.25, 0.5
+NUM_ANN_STEPS = 24
+NUM_PATHS = 100000
+
+
+@pytest.fixture(scope='module')
+def paths():
+    return TuringProcessSimulator().getProcess(TuringProcessTypes.GBM, T,
+                                               (S0, R, SIGMA, TuringGBMNumericalScheme.ANTITHETIC),
+                                               NUM_ANN_STEPS, NUM_PATHS, 17, parallel=True)
+
+
+def test_european_call_greeks_match_black_scholes(paths):
+    payoff = np.maximum(paths[:, -1] - K, 0.0) * np.exp(-R * T)
+    w_delta, w_gamma, w_vega = gbm_lr_weights(paths, R, SIGMA, 1.0 / NUM_ANN_STEPS)
+    call = TuringOptionTypes.EUROPEAN_CALL.value
+    expected = {'delta': bs_delta(S0, T, K, R, 0.0, SIGMA, call, T),
+                'gamma': bs_gamma(S0, T, K, R, 0.0, SIGMA, call, T),
+                'vega': bs_vega(S0, T, K, R, 0.0, SIGMA, call, T)}
+    for name, weight in (('delta', w_delta), ('gamma', w_gamma), ('vega', w_vega)):
+        estimate, std_error = lr_estimate(payoff, weight)
+        assert abs(estimate - expected[name]) < 4 * std_error
+
+
+def test_pair_weights_match_path_weights(paths):
+    dt = 1.0 / NUM_ANN_STEPS
+    weights = gbm_lr_weights(paths, R, SIGMA, dt)
+    num_steps = paths.shape[1] - 1
+    drift = (R - SIGMA * SIGMA / 2.0) * dt
+    for ip in (0, 1, 1000):
+        z = (np.diff(np.log(paths[ip])) - drift) / (SIGMA * np.sqrt(dt))
+        pair = gbm_lr_pair_weights(z[0], z.sum(), (z * z).sum(), num_steps, S0, SIGMA, np.sqrt(dt))
+        np.testing.assert_allclose(pair[:3], weights[:, ip], rtol=1e-8, atol=1e-12)
+        # 对偶路径的增量为-z
+        np.testing.assert_allclose(pair[3:], weights[:, ip + NUM_PATHS], rtol=1e-8, atol=1e-12)
+
+
+def test_lr_estimate_checks_inputs():
+    with pytest.raises(TuringError):
+        lr_estimate(np.ones(3), np.ones(4))
+    with pytest.raises(TuringError):
+        lr_estimate(np.ones(1), np.ones(1))
@@ -0,0 +1,52 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from turing_models.instruments.eq.american_option import AmericanOption
+from turing_models.models.model_black_scholes_analytical import bs_value, bs_delta, bs_gamma
+from turing_models.models.model_crr_tree import crrTreeValAvg
+from turing_models.models.model_pde_1d import TuringPDE1DEngine
+from turing_models.utilities.global_types import TuringOptionTypes, OptionType
+
+S0, K, R, Q, SIGMA, T = 100.0, 105.0, 0.03, 0.01, 0.25, 0.75
+
+
+def test_european_call_matches_black_scholes():
+    engine = TuringPDE1DEngine(S0, SIGMA, R - Q, T, r=R, num_space_steps=800, extra_spots=(K,))
+    payoff = np.maximum(engine.spots - K, 0.0)
+    layers = engine.solve(payoff, np.linspace(0.0, T, 101))
+    value, delta, gamma = engine.greeks(layers[0])
+    call = TuringOptionTypes.EUROPEAN_CALL.value
+    assert value == pytest.approx(bs_value(S0, T, K, R, Q, SIGMA, call, T), rel=1e-3)
+    assert delta == pytest.approx(bs_delta(S0, T, K, R, Q, SIGMA, call, T), rel=1e-3)
+    assert gamma == pytest.approx(bs_gamma(S0, T, K, R, Q, SIGMA, call, T), rel=1e-2)
+
+
+def test_american_put_matches_binomial_tree():
+    engine = TuringPDE1DEngine(S0, SIGMA, R - Q, T, r=R, num_space_steps=800, extra_spots=(K,))
+    exercise = np.maximum(K - engine.spots, 0.0)
+    times = np.linspace(0.0, T, 201)
+    american = engine.greeks(engine.solve(exercise, times, exercise=exercise)[0])[0]
+    european = engine.greeks(engine.solve(exercise, times)[0])[0]
+    tree = crrTreeValAvg(S0, R, Q, SIGMA, 1000, T, TuringOptionTypes.AMERICAN_PUT.value, K)['value']
+    assert american == pytest.approx(tree, rel=2e-3)
+    # 提前行权权利有正的价值
+    assert american > european + 0.05
+
+
+def test_region_fraction_is_cell_average():
+    engine = TuringPDE1DEngine(S0, SIGMA, R, T, num_space_steps=100)
+    level = engine.spots[engine.center] * np.exp(engine.dx * 0.3)
+    above = engine.region_fraction(level, above=True)
+    below = engine.region_fraction(level, above=False)
+    np.testing.assert_allclose(above + below, 1.0)
+    assert above[engine.center] == pytest.approx(0.2)
+    assert above[engine.center + 1] == 1.0 and above[engine.center - 1] == 0.0
+
+
+def test_american_option_pde_price_matches_tree(equity_market):
+    option = AmericanOption(asset_id='OPTION_1', underlier_symbol='600000.SH', option_type=OptionType.PUT,
+                            expiry=datetime.datetime(2022, 6, 1), strike_price=4.5, multiplier=1,
+                            number_of_options=100, value_date=datetime.datetime(2021, 11, 1))
+    assert option.price_pde() == pytest.approx(option.price(), rel=5e-3)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from turing_models.models.model_snowball_mc import TuringSnowballMCEngine, SNOWBALL_CALL, SNOWBALL_PUT, \
+    KNOCK_IN_RETURN, KNOCK_IN_VANILLA, KNOCK_IN_SPREADS
+from turing_models.models.process_simulator import TuringProcessSimulator, TuringProcessTypes, \
+    TuringGBMNumericalScheme
+
+NUM_STEPS = 120
+OBS_INDEX = list(range(20, NUM_STEPS + 1, 20))
+RATE = 0.03
+
+
+def make_engine(option_type=SNOWBALL_CALL, knock_in_type=KNOCK_IN_RETURN):
+    out_values = [0.2 * (i + 5) / 252 * np.exp(-RATE * i / 252) for i in OBS_INDEX]
+    if option_type == SNOWBALL_CALL:
+        barrier, knock_in_price = 1.03, 0.85
+    else:
+        barrier, knock_in_price = 0.97, 1.15
+    return TuringSnowballMCEngine(NUM_STEPS, OBS_INDEX, out_values, 0.2 * np.exp(-RATE), barrier,
+                                  knock_in_price, option_type, knock_in_type, -np.exp(-RATE), 1.0,
+                                  sk1=1.0, sk2=0.8 if option_type == SNOWBALL_CALL else 1.2)
+
+
+def score_path(engine, path):
+    """ 逐日判断敲出和敲入的参考实现 """
+    call = engine.option_type == SNOWBALL_CALL
+    knocked_in = False
+    for i, s in enumerate(path):
+        if i in OBS_INDEX and (s >= engine.barrier if call else s <= engine.barrier):
+            return engine.out_values[OBS_INDEX.index(i)]
+        if s < engine.knock_in_price if call else s > engine.knock_in_price:
+            knocked_in = True
+    if not knocked_in:
+        return engine.untriggered_value
+    return engine._knock_in_payoff(path[-1])
+
+
+def gbm_paths(num_paths, seed, chunk_size, s0=1.0, sigma=0.25):
+    return TuringProcessSimulator().getProcess(
+        TuringProcessTypes.GBM, NUM_STEPS / 252, (s0, RATE, sigma, TuringGBMNumericalScheme.ANTITHETIC),
+        252, num_paths, seed, numTimeSteps=NUM_STEPS, parallel=True, blockSize=chunk_size)
+
+
+@pytest.mark.parametrize('option_type', [SNOWBALL_CALL, SNOWBALL_PUT])
+@pytest.mark.parametrize('knock_in_type', [KNOCK_IN_RETURN, KNOCK_IN_VANILLA, KNOCK_IN_SPREADS])
+def test_value_paths_matches_reference(option_type, knock_in_type):
+    engine = make_engine(option_type, knock_in_type)
+    paths = gbm_paths(200, 7, 50)
+    expected = [score_path(engine, path) for path in paths]
+    np.testing.assert_allclose(engine.value_paths(paths), expected, rtol=1e-12, atol=1e-15)
+
+
+def test_chunked_value_matches_scored_paths():
+    engine = make_engine()
+    value, std_error = engine.value_gbm(1.0, RATE, 0.25, 252, 5000, 42, chunk_size=1000)
+    # 分块引擎与先生成全部路径再逐条计算收益的结果相同
+    assert value == pytest.approx(engine.value_paths(gbm_paths(5000, 42, 1000)).mean(), abs=1e-12)
+    assert 0 < std_error < 0.01
+
+
+def test_chunked_value_is_reproducible():
+    engine = make_engine()
+    first = engine.value_gbm(1.0, RATE, 0.25, 252, 3000, 11, chunk_size=500)
+    assert engine.value_gbm(1.0, RATE, 0.25, 252, 3000, 11, chunk_size=500) == first
+    assert engine.value_gbm(1.0, RATE, 0.25, 252, 3000, 12, chunk_size=500) != first
+
+
+def test_chunked_value_agrees_with_pde():
+    engine = make_engine()
+    value, std_error = engine.value_gbm(1.0, RATE, 0.25, 252, 20000, 3)
+    pde_value = engine.value_pde(1.0, RATE, 0.25, 252)[0]
+    assert abs(value - pde_value) < 4 * std_error
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from scipy.stats import norm
+
+from turing_models.utilities.error import TuringError
+from turing_models.utilities.turing_date import TuringDate
+from turing_models.var.fi_portfolio_var import FIPortfolioVaR
+from turing_models.var.key_rate_var import KeyRateVaR
+
+V0 = 1.0e6
+SIGMA = 0.01
+
+
+def normal_returns(num_returns=200000):
+    """ 按N(0, SIGMA^2)的分位数等距取的收益率，经验分位数即正态分位数 """
+    return norm.ppf((np.arange(num_returns) + 0.5) / num_returns) * SIGMA
+
+
+def historical_var(monkeypatch, returns, confidence_interval):
+    var = FIPortfolioVaR(value_date=TuringDate(2021, 11, 1), confidence_interval=confidence_interval)
+    monkeypatch.setattr(var, '_historical_returns', lambda: (returns, V0))
+    return var
+
+
+@pytest.mark.parametrize('confidence_interval', [0.9, 0.95, 0.99])
+def test_historical_var_and_es_of_normal_returns(monkeypatch, confidence_interval):
+    var = historical_var(monkeypatch, normal_returns(), confidence_interval)
+    z = norm.ppf(confidence_interval)
+    assert var.VaR() == pytest.approx(z * SIGMA * V0, rel=1e-4)
+    assert var.ES() == pytest.approx(SIGMA * norm.pdf(z) / (1.0 - confidence_interval) * V0, rel=1e-3)
+
+
+def test_historical_var_is_the_loss_quantile(monkeypatch):
+    # 收益率为-0.99%到0.99%的100个值，5%分位数在第5和第6小的收益率之间
+    returns = np.arange(-99, 101, 2) / 10000.0
+    var = historical_var(monkeypatch, np.random.default_rng(21).permutation(returns), 0.95)
+    assert var.VaR() == pytest.approx(-np.quantile(returns, 0.05) * V0)
+    assert 0.0089 * V0 < var.VaR() < 0.0091 * V0
+    assert var.ES() == pytest.approx(-returns[:5].mean() * V0)
+
+
+def test_unknown_formula_is_rejected(monkeypatch):
+    var = historical_var(monkeypatch, normal_returns(100), 0.95)
+    var.formula = 'Unknown'
+    with pytest.raises(TuringError):
+        var.VaR()
+    with pytest.raises(TuringError):
+        var.ES()
+
+
+@pytest.fixture
+def key_rate_var(make_bond):
+    bonds = [make_bond(i) for i in range(0, 24, 4)]
+    model = KeyRateVaR(bonds, quantities=np.arange(1.0, len(bonds) + 1), key_tenors=[1, 2, 5, 10],
+                       confidence_interval=0.99)
+    # 日波动5bp、相邻期限相关系数0.9的因子协方差
+    index = np.arange(len(model.key_tenors))
+    correlation = 0.9 ** np.abs(np.subtract.outer(index, index))
+    model.set_covariance(25.0 * correlation)
+    return model
+
+
+def test_delta_normal_is_normal_quantile(key_rate_var):
+    _, delta, _ = key_rate_var.sensitivities()
+    sigma = np.sqrt(delta @ key_rate_var.covariance @ delta)
+    z = norm.ppf(0.99)
+    result = key_rate_var.delta_normal()
+    assert result.var == pytest.approx(z * sigma, rel=1e-12)
+    assert result.es == pytest.approx(sigma * norm.pdf(z) / 0.01, rel=1e-12)
+
+
+def test_simulated_var_converges_to_delta_normal(key_rate_var):
+    expected = key_rate_var.delta_normal()
+    delta_gamma = key_rate_var.delta_gamma(num_paths=200000, seed=7)
+    monte_carlo = key_rate_var.monte_carlo(num_paths=20000, seed=7)
+    # 日变动几个bp时二阶项很小，模拟结果接近解析值
+    assert delta_gamma.var == pytest.approx(expected.var, rel=0.02)
+    assert delta_gamma.es == pytest.approx(expected.es, rel=0.02)
+    assert monte_carlo.var == pytest.approx(expected.var, rel=0.05)
+    # 相同的随机数下完整重估与二次近似的差异是三阶及以上的项
+    approx = key_rate_var.delta_gamma(num_paths=20000, seed=7)
+    assert monte_carlo.var == pytest.approx(approx.var, rel=1e-3)
+    assert monte_carlo.es == pytest.approx(approx.es, rel=1e-3)
+
+
+def test_key_rate_var_rejects_bad_inputs(make_bond):
+    with pytest.raises(TuringError):
+        KeyRateVaR([])
+    with pytest.raises(TuringError):
+        KeyRateVaR([make_bond(0)], confidence_interval=1.5)
+    model = KeyRateVaR([make_bond(0)], key_tenors=[1, 5])
+    with pytest.raises(TuringError):
+        model.delta_normal()
+    with pytest.raises(TuringError):
+        model.set_covariance(np.eye(3))
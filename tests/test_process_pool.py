@@ -0,0 +1,41 @@
+import multiprocessing
+
+import numba
+import pytest
+
+from turing_models.utilities.process_pool import pool_context
+
+
+@pytest.fixture
+def threading_layer(monkeypatch):
+    """ 设置numba.threading_layer()的返回值，None表示尚未启动线程层 """
+    monkeypatch.setattr(multiprocessing, 'get_start_method', lambda allow_none=False: None)
+
+    def set_layer(layer):
+        def threading_layer():
+            if layer is None:
+                raise ValueError("Threading layer is not initialized.")
+            return layer
+
+        monkeypatch.setattr(numba, 'threading_layer', threading_layer)
+
+    return set_layer
+
+
+@pytest.mark.parametrize('layer', [None, 'workqueue'])
+def test_fork_is_kept_without_a_fork_unsafe_layer(threading_layer, layer):
+    threading_layer(layer)
+    assert pool_context() is None
+
+
+@pytest.mark.parametrize('layer', ['tbb', 'omp'])
+def test_fork_unsafe_layer_avoids_fork(threading_layer, layer):
+    threading_layer(layer)
+    context = pool_context()
+    assert context.get_start_method() in ('forkserver', 'spawn')
+
+
+def test_configured_start_method_is_kept(threading_layer, monkeypatch):
+    threading_layer('tbb')
+    monkeypatch.setattr(multiprocessing, 'get_start_method', lambda allow_none=False: 'spawn')
+    assert pool_context() is None
@@ -0,0 +1,61 @@
+import numba
+import numpy as np
+import pytest
+
+from turing_models.models.process_simulator import TuringProcessSimulator, TuringProcessTypes, \
+    TuringGBMNumericalScheme, TuringHestonNumericalScheme, TuringVasicekNumericalScheme, \
+    TuringCIRNumericalScheme, blockSeeds
+
+T = 0.5
+NUM_ANN_STEPS = 52
+
+PROCESSES = [
+    (TuringProcessTypes.GBM, (100.0, 0.03, 0.2, TuringGBMNumericalScheme.ANTITHETIC)),
+    (TuringProcessTypes.HESTON, (100.0, 0.03, 0.04, 1.5, 0.04, 0.3, -0.7, TuringHestonNumericalScheme.EULERLOG)),
+    (TuringProcessTypes.VASICEK, (0.03, 0.5, 0.04, 0.01, TuringVasicekNumericalScheme.ANTITHETIC)),
+    (TuringProcessTypes.CIR, (0.03, 0.5, 0.04, 0.05, TuringCIRNumericalScheme.MILSTEIN)),
+]
+
+
+def simulate(process_type, params, num_paths, seed, block_size, parallel=True):
+    return TuringProcessSimulator().getProcess(process_type, T, params, NUM_ANN_STEPS, num_paths, seed,
+                                               parallel=parallel, blockSize=block_size)
+
+
+@pytest.mark.parametrize('process_type, params', PROCESSES)
+def test_parallel_paths_do_not_depend_on_thread_count(process_type, params):
+    threads = numba.get_num_threads()
+    try:
+        numba.set_num_threads(1)
+        single = simulate(process_type, params, 1000, 5, 64)
+    finally:
+        numba.set_num_threads(threads)
+    np.testing.assert_array_equal(simulate(process_type, params, 1000, 5, 64), single)
+
+
+@pytest.mark.parametrize('process_type, params', PROCESSES)
+def test_blocks_do_not_depend_on_number_of_paths(process_type, params):
+    short = simulate(process_type, params, 300, 9, 100)
+    long = simulate(process_type, params, 700, 9, 100)
+    if len(short) == 600:
+        # 对偶路径排在全部正向路径之后
+        np.testing.assert_array_equal(long[:300], short[:300])
+        np.testing.assert_array_equal(long[700:1000], short[300:])
+    else:
+        np.testing.assert_array_equal(long[:300], short)
+
+
+@pytest.mark.parametrize('process_type, params', PROCESSES[1:])
+def test_single_block_matches_serial_paths(process_type, params):
+    # 块内与串行版本使用相同的单条路径格式，以块种子为种子时路径相同
+    seed = int(blockSeeds(3, 200, 200)[0])
+    np.testing.assert_allclose(simulate(process_type, params, 200, 3, 200),
+                               simulate(process_type, params, 200, seed, 200, parallel=False),
+                               rtol=1e-12)
+
+
+def test_parallel_gbm_has_correct_mean():
+    s0, mu, sigma, scheme = PROCESSES[0][1]
+    paths = simulate(TuringProcessTypes.GBM, PROCESSES[0][1], 20000, 1, 1000)
+    assert paths.shape == (40000, int(T * NUM_ANN_STEPS + 0.5) + 1)
+    assert paths[:, -1].mean() == pytest.approx(s0 * np.exp(mu * T), rel=2e-3)
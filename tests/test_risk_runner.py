@@ -0,0 +1,144 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from turing_models.instruments.common import RiskMeasure
+from turing_models.instruments.risk_runner import PortfolioRiskRunner
+from turing_models.market.data.market_data_cache import market_data_cache
+from turing_models.utilities.error import TuringError
+
+NUM_BONDS = 12
+RISK_MEASURES = [RiskMeasure.FullPrice, RiskMeasure.CleanPrice, RiskMeasure.Dv01,
+                 RiskMeasure.DollarConvexity, RiskMeasure.YTM]
+
+# 子进程中先调用并行的numba函数再启动进程池，使用numba默认选择的线程层，退出时不应挂起
+PARALLEL_KERNEL_THEN_POOL = textwrap.dedent('''
+    import sys
+
+    import numba
+    import numpy as np
+
+    sys.path.insert(0, {tests_dir!r})
+    from conftest import _make_bond, fake_bond_yield_curve
+    from fundamental.turing_db.data import TuringDB
+    from turing_models.instruments.common import RiskMeasure
+    from turing_models.instruments.risk_runner import PortfolioRiskRunner
+
+
+    @numba.njit(parallel=True)
+    def total(x):
+        s = 0.0
+        for i in numba.prange(x.size):
+            s += x[i]
+        return s
+
+
+    if __name__ == '__main__':
+        assert total(np.ones(1000)) == 1000.0
+        TuringDB.bond_yield_curve = fake_bond_yield_curve
+        bonds = [_make_bond(i) for i in range(6)]
+        results = PortfolioRiskRunner(bonds, processes=2).run(RiskMeasure.FullPrice)
+        serial = PortfolioRiskRunner(bonds, processes=1).run(RiskMeasure.FullPrice)
+        assert results.errors.empty
+        assert results.values.equals(serial.values)
+        print(numba.threading_layer())
+''')
+
+
+class BrokenInstrument:
+    """ 估值时抛出异常的持仓 """
+    asset_id = 'BROKEN'
+
+    def isvalid(self):
+        return True
+
+    def full_price(self):
+        raise ValueError('no price')
+
+    def _calc(self, risk, value):
+        return value
+
+
+class ExpiredInstrument(BrokenInstrument):
+    asset_id = 'EXPIRED'
+
+    def isvalid(self):
+        return False
+
+
+@pytest.fixture
+def bonds(make_bond):
+    return [make_bond(i) for i in range(NUM_BONDS)]
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_runner_matches_instrument_calc(bonds, processes):
+    results = PortfolioRiskRunner(bonds, processes=processes).run(RISK_MEASURES)
+    expected = pd.DataFrame([bond.calc(RISK_MEASURES) for bond in bonds],
+                            index=pd.Index([bond.asset_id for bond in bonds], name='asset_id'),
+                            columns=[risk.value for risk in RISK_MEASURES])
+    pd.testing.assert_frame_equal(results.values.astype(float), expected.astype(float), rtol=1e-12)
+    assert results.timings.shape == expected.shape
+    assert (results.timings.values >= 0.0).all()
+    assert results.errors.empty
+
+
+def test_pooled_run_matches_serial_run(bonds):
+    serial = PortfolioRiskRunner(bonds, processes=1).run(RISK_MEASURES)
+    # 分片数多于进程数，各进程领取多个分片
+    pooled = PortfolioRiskRunner(bonds, processes=2, shards_per_process=3).run(RISK_MEASURES)
+    pd.testing.assert_frame_equal(pooled.values, serial.values)
+    assert list(pooled.timings.index) == list(serial.timings.index)
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_errors_are_captured_per_measure(bonds, processes):
+    instruments = bonds[:3] + [BrokenInstrument()] + bonds[3:5] + [ExpiredInstrument()]
+    measures = [RiskMeasure.FullPrice, 'no_such_measure']
+    results = PortfolioRiskRunner(instruments, processes=processes).run(measures)
+
+    values = results.values
+    assert values.shape == (len(instruments), 2)
+    np.testing.assert_allclose(values['full_price'].iloc[[0, 1, 2, 4, 5]].astype(float),
+                               [bond.calc(RiskMeasure.FullPrice) for bond in bonds[:5]], rtol=1e-12)
+    assert values['full_price'].iloc[[3, 6]].isna().all()
+    assert values['no_such_measure'].isna().all()
+
+    errors = results.errors.set_index(['position', 'risk_measure'])
+    assert len(errors) == len(instruments) + 2
+    assert errors.loc[(3, 'full_price'), 'error'] == 'ValueError: no price'
+    assert 'ValueError: no price' in errors.loc[(3, 'full_price'), 'traceback']
+    assert errors.loc[(6, 'full_price'), 'error'] == 'TuringError: The instrument expired'
+    assert errors.loc[(6, 'full_price'), 'asset_id'] == 'EXPIRED'
+    assert errors.loc[(0, 'no_such_measure'), 'error'].startswith('AttributeError')
+
+
+def test_workers_share_the_market_data_snapshot(monkeypatch, bonds):
+    from fundamental.turing_db.data import TuringDB
+
+    def unavailable(*args, **kwargs):
+        raise RuntimeError('market data was fetched again')
+
+    # 持仓构建时行情已写入缓存，子进程载入快照后不再取数
+    assert len(market_data_cache) > 0
+    monkeypatch.setattr(TuringDB, 'bond_yield_curve', unavailable, raising=False)
+    results = PortfolioRiskRunner(bonds, processes=2).run(RiskMeasure.FullPrice)
+    assert results.errors.empty
+
+
+def test_empty_portfolio_is_rejected():
+    with pytest.raises(TuringError):
+        PortfolioRiskRunner([])
+
+
+def test_pool_after_parallel_kernel_exits(tmp_path):
+    script = tmp_path / 'parallel_kernel_then_pool.py'
+    script.write_text(PARALLEL_KERNEL_THEN_POOL.format(tests_dir=os.path.dirname(os.path.abspath(__file__))))
+    env = {key: value for key, value in os.environ.items() if key != 'NUMBA_THREADING_LAYER'}
+    result = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=120, env=env)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,169 @@
+import copy
+import datetime
+import os
+import subprocess
+import sys
+import textwrap
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from turing_models.instruments.eq.american_option import AmericanOption
+from turing_models.instruments.eq.european_option import EuropeanOption
+from turing_models.instruments.rates.bond_book import BondBook
+from turing_models.instruments.scenario_grid import ScenarioGrid, _price_points
+from turing_models.market.curves.curve_adjust import CurveAdjustmentImpl
+from turing_models.utilities.error import TuringError
+
+SPOT_SHOCKS = [-0.2, -0.05, 0.0, 0.1]
+VOL_SHOCKS = [-0.05, 0.0, 0.08]
+CURVE_SHIFTS = [-50.0, 0.0, 25.0]
+
+# 子进程中先调用并行的numba函数再由进程池计算网格，使用numba默认选择的线程层，退出时不应挂起
+PARALLEL_KERNEL_THEN_GRID = textwrap.dedent('''
+    import datetime
+    import sys
+
+    import numba
+    import numpy as np
+
+    sys.path.insert(0, {tests_dir!r})
+    from conftest import fake_bond_yield_curve, fake_national_debt, fake_stock_price, fake_volatility
+    from fundamental.turing_db.data import TuringDB
+    from turing_models.instruments.eq.american_option import AmericanOption
+    from turing_models.instruments.scenario_grid import ScenarioGrid
+
+
+    @numba.njit(parallel=True)
+    def total(x):
+        s = 0.0
+        for i in numba.prange(x.size):
+            s += x[i]
+        return s
+
+
+    if __name__ == '__main__':
+        assert total(np.ones(1000)) == 1000.0
+        TuringDB.bond_yield_curve = fake_bond_yield_curve
+        TuringDB.get_national_debt = fake_national_debt
+        TuringDB.get_stock_price = fake_stock_price
+        TuringDB.get_volatility = fake_volatility
+        option = AmericanOption(asset_id='OPTION_PUT', underlier_symbol='600000.SH', option_type='PUT',
+                                expiry=datetime.datetime(2022, 6, 1), strike_price=4.5, multiplier=1,
+                                number_of_options=100, value_date=datetime.datetime(2021, 11, 1))
+        grid = ScenarioGrid([-0.1, 0.0, 0.1], [0.0, 0.05], [0.0, 20.0])
+        assert np.array_equal(grid.evaluate([option], processes=2), grid.evaluate([option], processes=1))
+        print(numba.threading_layer())
+''')
+
+
+def make_option(option_class, option_type, strike_price=4.5):
+    return option_class(asset_id='OPTION_%s' % option_type, underlier_symbol='600000.SH',
+                        option_type=option_type, expiry=datetime.datetime(2022, 6, 1),
+                        strike_price=strike_price, multiplier=1, number_of_options=100,
+                        value_date=datetime.datetime(2021, 11, 1))
+
+
+@pytest.fixture
+def grid():
+    return ScenarioGrid(SPOT_SHOCKS, VOL_SHOCKS, CURVE_SHIFTS)
+
+
+@pytest.mark.parametrize('option_type', ['CALL', 'PUT'])
+def test_vectorised_european_grid_matches_scenario_copies(equity_market, grid, option_type):
+    option = make_option(EuropeanOption, option_type)
+    values = grid.evaluate([option])[0]
+    assert values.shape == grid.shape
+    # 逐个情景在副本上施加情景并定价的原有路径
+    expected = _price_points(option, grid.points()).reshape(grid.shape)
+    np.testing.assert_allclose(values, expected, rtol=1e-12)
+    assert values[SPOT_SHOCKS.index(0.0), VOL_SHOCKS.index(0.0), CURVE_SHIFTS.index(0.0)] == \
+        pytest.approx(option.price(), rel=1e-14)
+
+
+def test_scenario_copies_leave_the_instrument_unchanged(equity_market, grid):
+    option = make_option(AmericanOption, 'PUT')
+    option._ctx_resolve()
+    state = (option.stock_price, option.v, option.discount_curve)
+    base = option.price()
+    _price_points(option, grid.points())
+    assert (option.stock_price, option.v, option.discount_curve) == state
+    assert option.price() == base
+
+
+def test_pooled_grid_matches_serial_grid(equity_market):
+    grid = ScenarioGrid([-0.1, 0.0, 0.1], [0.0, 0.05], [0.0, 20.0])
+    options = [make_option(AmericanOption, 'PUT'), make_option(AmericanOption, 'CALL', 4.0)]
+    serial = grid.evaluate(options, processes=1)
+    pooled = grid.evaluate(options, processes=2)
+    np.testing.assert_array_equal(pooled, serial)
+    for option, values in zip(options, serial):
+        expected = []
+        for spot_shock, vol_shock, curve_shift in grid.points():
+            scenario = copy.copy(option)
+            scenario._apply_scenario(spot_shock, vol_shock, curve_shift)
+            expected.append(scenario.price())
+        np.testing.assert_array_equal(values.ravel(), expected)
+
+
+def test_bond_grid_matches_parallel_full_price(make_bond, grid):
+    bonds = [make_bond(i) for i in range(8)]
+    values = grid.evaluate(bonds)
+    prices = BondBook(bonds).parallel_full_price(CURVE_SHIFTS)
+    # 债券价格只随曲线平移变化
+    np.testing.assert_array_equal(values, np.broadcast_to(prices.T[:, None, None, :], values.shape))
+    np.testing.assert_allclose(prices[CURVE_SHIFTS.index(0.0)],
+                               [bond.full_price_from_discount_curve() for bond in bonds], rtol=1e-12)
+
+
+def test_parallel_full_price_matches_shifted_curves(make_bond):
+    bonds = [make_bond(i) for i in range(8)]
+    prices = BondBook(bonds).parallel_full_price(CURVE_SHIFTS)
+    for k, shift in enumerate(CURVE_SHIFTS):
+        for i, bond in enumerate(bonds):
+            curve = CurveAdjustmentImpl(curve_data=bond.cv.curve_data,
+                                        parallel_shift=bond._spread_adjustment + shift,
+                                        value_date=bond.settlement_date).get_curve_result()
+            assert prices[k, i] == pytest.approx(BondBook([bond]).full_price(curve)[0], rel=1e-12)
+
+
+def test_portfolio_values_weight_positions(equity_market, make_bond, grid):
+    instruments = [make_option(EuropeanOption, 'CALL'), make_bond(0), make_bond(5)]
+    quantities = np.array([2.0, 0.0, 3.0])
+    values = grid.evaluate(instruments)
+    np.testing.assert_allclose(grid.portfolio_values(instruments, quantities),
+                               np.tensordot(quantities, values, axes=1), rtol=1e-14)
+
+    frame = grid.to_frame(values[0])
+    assert len(frame) == np.prod(grid.shape)
+    assert frame.loc[(0.1, 0.08, 25.0), 'value'] == values[0][-1, -1, -1]
+
+
+def test_portfolio_grid_keeps_zero_quantities(equity_market, make_bond, grid):
+    instruments = [make_option(EuropeanOption, 'CALL'), make_bond(0), make_bond(5)]
+    positions = [SimpleNamespace(tradable=instruments[0], quantity=0),
+                 SimpleNamespace(tradable=instruments[1], quantity=None),
+                 SimpleNamespace(tradable=instruments[2], quantity=2.0)]
+    portfolio = SimpleNamespace(_position_sets=SimpleNamespace(positions=positions))
+    expected = grid.portfolio_values(instruments, [0.0, 1.0, 2.0])
+    np.testing.assert_array_equal(grid.portfolio_grid(portfolio), expected)
+
+
+def test_grid_rejects_bad_inputs(make_bond, grid):
+    with pytest.raises(TuringError):
+        ScenarioGrid(spot_shocks=[])
+    with pytest.raises(TuringError):
+        grid.evaluate([])
+    with pytest.raises(TuringError):
+        grid.evaluate([object()])
+    with pytest.raises(TuringError):
+        grid.portfolio_values([make_bond(0)], [1.0, 2.0])
+
+
+def test_pooled_grid_after_parallel_kernel_exits(tmp_path):
+    script = tmp_path / 'parallel_kernel_then_grid.py'
+    script.write_text(PARALLEL_KERNEL_THEN_GRID.format(tests_dir=os.path.dirname(os.path.abspath(__file__))))
+    env = {key: value for key, value in os.environ.items() if key != 'NUMBA_THREADING_LAYER'}
+    result = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=120, env=env)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,130 @@
+import threading
+
+import pytest
+
+from turing_models.market.curves.curve_cache import CurveCache
+from turing_models.market.data.market_data_cache import MarketDataCache
+from turing_models.utilities.business_days import BusinessDayCache
+from turing_models.utilities.shared_cache import SharedCache
+
+
+class Builder:
+    """ 记录调用次数的构建函数 """
+
+    def __init__(self, value, gate=None):
+        self.value = value
+        self.gate = gate
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        return self.value
+
+
+def test_evicts_least_recently_used():
+    cache = SharedCache(max_size=2)
+    cache._get_or_build('a', Builder(1))
+    cache._get_or_build('b', Builder(2))
+    # 读取'a'后'b'成为最久未使用的一项
+    assert cache._get_or_build('a', Builder(None)) == 1
+    cache._get_or_build('c', Builder(3))
+    assert list(cache._data) == ['a', 'c']
+    rebuilt = Builder(2)
+    cache._get_or_build('b', rebuilt)
+    assert rebuilt.calls == 1
+    assert list(cache._data) == ['c', 'b']
+
+
+def test_uncacheable_value_is_not_stored():
+    cache = SharedCache(max_size=2)
+    builder = Builder(None)
+    assert cache._get_or_build('a', builder) is None
+    assert cache._get_or_build('a', builder) is None
+    assert builder.calls == 2
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_builder_error_releases_key():
+    cache = SharedCache(max_size=2)
+
+    def failing():
+        raise ValueError('build failed')
+
+    with pytest.raises(ValueError):
+        cache._get_or_build('a', failing)
+    assert cache._key_locks == {}
+    assert len(cache) == 0
+    assert cache._get_or_build('a', Builder(1)) == 1
+
+
+def test_same_key_is_built_once_under_concurrency():
+    cache = SharedCache(max_size=10)
+    gate = threading.Event()
+    builder = Builder(object(), gate)
+    results = []
+
+    def worker():
+        results.append(cache._get_or_build('a', builder))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert builder.calls == 1
+    assert len(results) == 8
+    assert all(result is builder.value for result in results)
+    assert (cache.hits, cache.misses) == (7, 1)
+    assert cache._key_locks == {}
+
+
+def test_different_keys_do_not_block():
+    cache = SharedCache(max_size=10)
+    gate = threading.Event()
+    slow = Builder('slow', gate)
+    thread = threading.Thread(target=cache._get_or_build, args=('slow', slow))
+    thread.start()
+    try:
+        # 'slow'的构建尚未完成时，其他键可以正常构建和读取
+        assert cache._get_or_build('fast', Builder('fast')) == 'fast'
+        assert cache._get_or_build('fast', Builder(None)) == 'fast'
+    finally:
+        gate.set()
+        thread.join()
+    assert cache._get_or_build('slow', Builder(None)) == 'slow'
+
+
+@pytest.mark.parametrize('cache_type', [MarketDataCache, CurveCache, BusinessDayCache])
+def test_caches_share_the_base(cache_type):
+    cache = cache_type(max_size=1)
+    assert isinstance(cache, SharedCache)
+    cache._get_or_build('a', Builder(1))
+    cache._get_or_build('b', Builder(2))
+    assert list(cache._data) == ['b']
+    cache.clear()
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_curve_cache_get_evicts_least_recently_used():
+    cache = CurveCache(max_size=2)
+    cache.get('flat', Builder('a'), 'CBOND', 0.01)
+    cache.get('flat', Builder('b'), 'CBOND', 0.02)
+    assert cache.get('flat', Builder(None), 'CBOND', 0.01) == 'a'
+    cache.get('flat', Builder('c'), 'CBOND', 0.03)
+    assert cache.get('flat', Builder(None), 'CBOND', 0.01) == 'a'
+    assert cache.get('flat', Builder(None), 'CBOND', 0.02) is None
+
+
+def test_disabled_cache_always_builds():
+    cache = CurveCache()
+    cache.enabled = False
+    builder = Builder(1)
+    cache.get('flat', builder, 'CBOND')
+    cache.get('flat', builder, 'CBOND')
+    assert builder.calls == 2
+    assert len(cache) == 0
@@ -0,0 +1,130 @@
+import copy
+import datetime
+
+import numpy as np
+import pytest
+
+from turing_models.instruments.common import RiskMeasure
+from turing_models.instruments.eq.snowball_option import SnowballOption
+from turing_models.models.model_snowball_mc import TuringSnowballMCEngine
+from turing_models.utilities.global_types import OptionType
+
+GREEKS = [RiskMeasure.EqDelta, RiskMeasure.EqGamma, RiskMeasure.EqVega, RiskMeasure.EqRho, RiskMeasure.EqTheta]
+
+
+def make_snowball():
+    option = SnowballOption(underlier_symbol='600067.SH',
+                            option_type=OptionType.CALL,
+                            start_date=datetime.datetime(2021, 6, 3),
+                            expiry=datetime.datetime(2022, 6, 2),
+                            participation_rate=1.0,
+                            barrier=4.4,
+                            knock_in_price=3.6,
+                            notional=1000000,
+                            rebate=0.2,
+                            initial_spot=4.2,
+                            untriggered_rebate=0.2,
+                            knock_in_type='RETURN',
+                            value_date=datetime.datetime(2021, 11, 1))
+    option.num_paths = 2000
+    option.chunk_size = 500
+    return option
+
+
+@pytest.fixture
+def simulations(equity_market, monkeypatch):
+    """ 记录value_scenarios的调用次数 """
+    calls = []
+    value_scenarios = TuringSnowballMCEngine.value_scenarios
+
+    def counted(engine, scenarios, *args, **kwargs):
+        calls.append(len(scenarios))
+        return value_scenarios(engine, scenarios, *args, **kwargs)
+
+    monkeypatch.setattr(TuringSnowballMCEngine, 'value_scenarios', counted)
+    return calls
+
+
+def test_batched_greeks_share_one_simulation(simulations):
+    option = make_snowball()
+    batched = option.calc(GREEKS)
+    # 一次模拟得到全部希腊字母：基准、股价上下、波动率上下、利率上下和theta共8个情景
+    assert simulations == [8]
+
+    expected = make_snowball().mc_greeks(('delta', 'gamma', 'vega', 'rho', 'theta'))
+    np.testing.assert_allclose(batched, [expected['delta'], expected['gamma'], expected['vega'],
+                                         expected['rho'], expected['theta']], rtol=1e-10)
+
+    # 单个希腊字母的结果与批量计算一致
+    single = [make_snowball().calc(greek) for greek in GREEKS]
+    np.testing.assert_allclose(single, batched, rtol=1e-10)
+
+
+def test_greeks_match_bumped_prices(equity_market, monkeypatch):
+    option = make_snowball()
+    s0, vol, r0 = option.stock_price, option.volatility, option.r
+    greeks = [option.eq_delta(), option.eq_gamma(), option.eq_vega(), option.eq_rho()]
+
+    def bumped_price(**attrs):
+        scenario = copy.copy(option)
+        for name, value in attrs.items():
+            setattr(scenario, name, value)
+        return scenario.price()
+
+    def rate_bumped_price(rate):
+        with monkeypatch.context() as m:
+            m.setattr(SnowballOption, 'r', property(lambda self: rate))
+            return option.price()
+
+    # 同一种子下的价格重估：股价相对bump 1%，波动率绝对bump 0.01，利率绝对bump 1bp
+    base = option.price()
+    up = bumped_price(stock_price=s0 * 1.01)
+    down = bumped_price(stock_price=s0 * 0.99)
+    ds = 0.01 * s0
+    expected = [(up - down) / (2.0 * ds),
+                (up - 2.0 * base + down) / ds**2,
+                (bumped_price(volatility=vol + 0.01) - bumped_price(volatility=vol - 0.01)) / 0.02,
+                (rate_bumped_price(r0 + 1e-4) - rate_bumped_price(r0 - 1e-4)) / 2e-4]
+    np.testing.assert_allclose(greeks, expected, rtol=1e-8)
+
+
+def test_greeks_are_memoized_per_valuation_state(simulations):
+    option = make_snowball()
+    delta = option.eq_delta()
+    assert option.eq_delta() == delta
+    assert simulations == [2]
+
+    option.stock_price = 4.3
+    assert option.eq_delta() != delta
+    assert simulations == [2, 2]
+
+    option.seed += 1
+    option.eq_delta()
+    assert simulations == [2, 2, 2]
+
+
+def test_lr_greeks_agree_with_crn_greeks(equity_market):
+    option = make_snowball()
+    option.num_paths = 20000
+    lr = option.lr_greeks()
+    crn = option.mc_greeks(('price', 'delta', 'vega'))
+    assert lr['price'] == pytest.approx(option.price(), rel=1e-10)
+    for name in ('delta', 'vega'):
+        std_error = (lr[name + '_std_error'] ** 2 + crn[name + '_std_error'] ** 2) ** 0.5
+        assert abs(lr[name] - crn[name]) < 4 * std_error
+
+
+def test_knock_out_obs_days_match_trading_days(equity_market):
+    option = make_snowball()
+    # 用户传入的观察日可能重复，也可能落在非交易日或估值日之前
+    days = [datetime.datetime(2021, 7, 5), datetime.datetime(2021, 12, 3), datetime.datetime(2022, 1, 1),
+            datetime.datetime(2022, 3, 3), datetime.datetime(2021, 12, 3), datetime.datetime(2022, 6, 2)]
+    option.knock_out_obs_days_whole = days
+    option._calculate_intermediate_variable()
+    bus_days = [day._excelDate for day in option.bus_days]
+    expected = [day._excelDate for day in option.knock_out_obs_days_whole if day._excelDate in bus_days]
+    expected = sorted(set(expected))
+
+    knock_out_obs_days, obs_index = option._knock_out_obs_days()
+    assert [day._excelDate for day in knock_out_obs_days] == expected
+    assert obs_index == [bus_days.index(day) for day in expected]
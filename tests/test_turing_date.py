@@ -0,0 +1,75 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from turing_models.utilities.error import TuringError
+from turing_models.utilities.turing_date import TuringDate
+
+EXCEL_EPOCH = datetime.date(1899, 12, 30)
+
+
+def random_dates(n, seed=1):
+    rng = np.random.default_rng(seed)
+    start = datetime.date(1910, 1, 1).toordinal()
+    end = datetime.date(2090, 12, 31).toordinal()
+    return [datetime.date.fromordinal(int(o)) for o in rng.integers(start, end, n)]
+
+
+def as_date(dt: TuringDate):
+    return datetime.date(dt._y, dt._m, dt._d)
+
+
+def test_ordinal_fields_match_datetime():
+    for d in random_dates(2000):
+        dt = TuringDate(d.year, d.month, d.day)
+        assert dt._excelDate == (d - EXCEL_EPOCH).days
+        assert dt._weekday == d.weekday()
+
+
+def test_add_days_and_differences_match_datetime():
+    rng = np.random.default_rng(2)
+    for d in random_dates(2000, seed=3):
+        k = int(rng.integers(-3000, 3000))
+        dt = TuringDate(d.year, d.month, d.day)
+        shifted = dt.addDays(k)
+        assert as_date(shifted) == d + datetime.timedelta(days=k)
+        assert shifted - dt == k
+        assert (shifted > dt) == (k > 0)
+
+
+def test_add_months_clips_to_month_end():
+    assert as_date(TuringDate(2021, 1, 31).addMonths(1)) == datetime.date(2021, 2, 28)
+    assert as_date(TuringDate(2020, 1, 31).addMonths(1)) == datetime.date(2020, 2, 29)
+    assert as_date(TuringDate(2021, 3, 31).addMonths(-1)) == datetime.date(2021, 2, 28)
+    assert as_date(TuringDate(2021, 5, 15).addMonths(-17)) == datetime.date(2019, 12, 15)
+
+
+@pytest.mark.parametrize('tenor, expected', [
+    ('1D', datetime.date(2021, 8, 14)),
+    ('-3D', datetime.date(2021, 8, 10)),
+    ('2W', datetime.date(2021, 8, 27)),
+    ('-1W', datetime.date(2021, 8, 6)),
+    ('7M', datetime.date(2022, 3, 13)),
+    ('-3M', datetime.date(2021, 5, 13)),
+    ('-18M', datetime.date(2020, 2, 13)),
+    ('2Y', datetime.date(2023, 8, 13)),
+    ('-2Y', datetime.date(2019, 8, 13)),
+    ('ON', datetime.date(2021, 8, 14)),
+])
+def test_add_tenor(tenor, expected):
+    assert as_date(TuringDate(2021, 8, 13).addTenor(tenor)) == expected
+
+
+def test_negative_tenor_reverses_positive_tenor_away_from_month_end():
+    for d in random_dates(500, seed=4):
+        dt = TuringDate(d.year, d.month, min(d.day, 28))
+        for tenor in ('5M', '3Y'):
+            assert dt.addTenor(tenor).addTenor('-' + tenor)._excelDate == dt._excelDate
+
+
+def test_add_tenor_list_and_errors():
+    dates = TuringDate(2021, 8, 13).addTenor(['1M', '-1M'])
+    assert [as_date(dt) for dt in dates] == [datetime.date(2021, 9, 13), datetime.date(2021, 7, 13)]
+    with pytest.raises(TuringError):
+        TuringDate(2021, 8, 13).addTenor(3)
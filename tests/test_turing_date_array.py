@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+
+from turing_models.market.curves.discount_curve_zeros import TuringDiscountCurveZeros
+from turing_models.utilities.calendar import TuringCalendar, TuringCalendarTypes, TuringBusDayAdjustTypes, \
+    TuringDateGenRuleTypes
+from turing_models.utilities.day_count import TuringDayCount, DayCountType
+from turing_models.utilities.frequency import TuringFrequency, FrequencyType
+from turing_models.utilities.schedule import TuringSchedule
+from turing_models.utilities.turing_date import TuringDate
+from turing_models.utilities.turing_date_array import TuringDateArray
+
+START = TuringDate(2019, 12, 1)
+rng = np.random.default_rng(10)
+DATES = [START.addDays(int(k)) for k in rng.integers(-2000, 4000, 300)]
+# 覆盖月末和二月底
+DATES += [TuringDate(2020, 1, 31), TuringDate(2020, 2, 29), TuringDate(2021, 2, 28), TuringDate(2021, 8, 31)]
+ARRAY = TuringDateArray(DATES)
+
+
+def excel(dates):
+    return [dt._excelDate for dt in dates]
+
+
+def test_round_trip():
+    assert excel(ARRAY) == excel(DATES)
+    assert excel(ARRAY.toList()) == excel(DATES)
+    assert ARRAY[3]._excelDate == DATES[3]._excelDate
+    np.testing.assert_array_equal(ARRAY.weekdays(), [dt._weekday for dt in DATES])
+    np.testing.assert_array_equal(ARRAY - START, [dt - START for dt in DATES])
+
+
+def test_add_days_and_months_match_dates():
+    assert excel(ARRAY.addDays(45)) == excel([dt.addDays(45) for dt in DATES])
+    for months in (1, 5, -7, 30):
+        assert excel(ARRAY.addMonths(months)) == excel([dt.addMonths(months) for dt in DATES])
+    months = rng.integers(-40, 40, len(DATES))
+    assert excel(ARRAY.addMonths(months)) == excel([dt.addMonths(int(m)) for dt, m in zip(DATES, months)])
+    assert excel(ARRAY.EOM()) == excel([dt.EOM() for dt in DATES])
+    np.testing.assert_array_equal(ARRAY.isEOM(), [dt.isEOM() for dt in DATES])
+
+
+@pytest.mark.parametrize('tenor', ['ON', '10D', '-3D', '2W', '1M', '-1M', '7M', '-18M', '3Y', '-2Y'])
+def test_add_tenor_matches_dates(tenor):
+    assert excel(ARRAY.addTenor(tenor)) == excel([dt.addTenor(tenor) for dt in DATES])
+
+
+@pytest.mark.parametrize('convention', [TuringBusDayAdjustTypes.FOLLOWING,
+                                        TuringBusDayAdjustTypes.MODIFIED_FOLLOWING,
+                                        TuringBusDayAdjustTypes.PRECEDING])
+@pytest.mark.parametrize('calendar_type', [TuringCalendarTypes.WEEKEND, TuringCalendarTypes.CHINA_SSE])
+def test_adjust_matches_calendar(calendar_type, convention):
+    calendar = TuringCalendar(calendar_type)
+    dates = [dt for dt in DATES if dt.addDays(-10) > TuringDate(2010, 1, 1)]
+    adjusted = TuringDateArray(dates).adjust(calendar_type, convention)
+    assert excel(adjusted) == excel([calendar.adjust(dt, convention) for dt in dates])
+
+
+@pytest.mark.parametrize('day_count_type', list(DayCountType))
+def test_year_fracs_match_year_frac(day_count_type):
+    day_count = TuringDayCount(day_count_type)
+    end = ARRAY.addTenor('9M')
+    dt3 = ARRAY.addTenor('1Y')
+    freq = FrequencyType.SEMI_ANNUAL
+    expected = [day_count.yearFrac(d1, d2, d3, freq)[0] for d1, d2, d3 in zip(DATES, end, dt3)]
+    np.testing.assert_allclose(day_count.yearFracs(ARRAY, end, dt3, freq), expected, rtol=1e-14)
+    # 标量日期与日期数组广播
+    expected = [day_count.yearFrac(START, d2, d3, freq)[0] for d2, d3 in zip(end, dt3)]
+    np.testing.assert_allclose(day_count.yearFracs(START, end, dt3, freq), expected, rtol=1e-14)
+
+
+def test_discount_factors_match_dates():
+    zero_dates = [START.addTenor(t) for t in ['3M', '1Y', '2Y', '5Y', '10Y', '30Y']]
+    curve = TuringDiscountCurveZeros(START, zero_dates, [0.02, 0.022, 0.025, 0.028, 0.03, 0.031])
+    dates = ARRAY[ARRAY.ordinals() > START._ordinal]
+    np.testing.assert_allclose(curve.df(dates), [curve.df(dt) for dt in dates], rtol=1e-14)
+    np.testing.assert_allclose(curve.df(dates), curve.df(dates.toList()), rtol=1e-14)
+
+
+def reference_schedule(effective_date, termination_date, freq_type, calendar_type, convention, rule, eom):
+    """ 逐个日期生成并调整的参考实现 """
+    calendar = TuringCalendar(calendar_type)
+    num_months = int(12 / TuringFrequency(freq_type))
+    if rule == TuringDateGenRuleTypes.BACKWARD:
+        unadjusted = []
+        next_date, ordinal = termination_date, 1
+        while next_date > effective_date:
+            unadjusted.append(next_date)
+            next_date = termination_date.addMonths(-num_months * ordinal)
+            ordinal += 1
+            if eom:
+                next_date = next_date.EOM()
+        unadjusted.append(next_date)
+        unadjusted.reverse()
+    else:
+        unadjusted = []
+        next_date, ordinal = effective_date, 1
+        while next_date < termination_date:
+            unadjusted.append(next_date)
+            next_date = effective_date.addMonths(num_months * ordinal)
+            ordinal += 1
+        unadjusted.append(next_date)
+    dates = {unadjusted[0]._excelDate}
+    dates.update(calendar.adjust(dt, convention)._excelDate for dt in unadjusted[1:-1])
+    if rule == TuringDateGenRuleTypes.FORWARD:
+        dates.add(calendar.adjust(unadjusted[-1], convention)._excelDate)
+    else:
+        dates.add(unadjusted[-1]._excelDate)
+    dates = sorted(dates)
+    dates[0] = max(dates[0], effective_date._excelDate)
+    dates[-1] = calendar.adjust(termination_date, convention)._excelDate
+    return sorted(set(dates))
+
+
+@pytest.mark.parametrize('rule', [TuringDateGenRuleTypes.BACKWARD, TuringDateGenRuleTypes.FORWARD])
+@pytest.mark.parametrize('freq_type', [FrequencyType.ANNUAL, FrequencyType.SEMI_ANNUAL,
+                                       FrequencyType.QUARTERLY, FrequencyType.MONTHLY])
+def test_schedule_matches_reference(rule, freq_type):
+    calendar_type = TuringCalendarTypes.CHINA_IB
+    convention = TuringBusDayAdjustTypes.MODIFIED_FOLLOWING
+    for i, dt in enumerate(DATES[:60]):
+        effective_date = dt.addDays(3000) if dt.addDays(-10) < TuringDate(2012, 1, 1) else dt
+        termination_date = effective_date.addDays(200 + 37 * i)
+        eom = rule == TuringDateGenRuleTypes.BACKWARD and i % 3 == 0
+        schedule = TuringSchedule(effective_date, termination_date, freq_type, calendar_type, convention, rule,
+                                  endOfMonthFlag=eom)
+        assert excel(schedule.scheduleDates()) == reference_schedule(
+            effective_date, termination_date, freq_type, calendar_type, convention, rule, eom)
+        assert excel(schedule.scheduleDateArray()) == excel(schedule.scheduleDates())
@@ -0,0 +1,107 @@
+import copy
+
+import numpy as np
+import pytest
+
+from turing_models.utilities.calendar import TuringCalendarTypes
+from turing_models.utilities.error import TuringError
+from turing_models.utilities.frequency import FrequencyType
+from turing_models.utilities.schedule import TuringSchedule
+from turing_models.utilities.turing_date import TuringDate
+from turing_models.var import historical_simulation
+from turing_models.var.historical_simulation import HistoricalSimulationRunner, bond_position_key
+from turing_models.var.value_store import HistoricalValueStore
+
+NUM_BONDS = 8
+
+
+def history_dates(end, num_days=10):
+    return TuringSchedule(end.addDays(-num_days), end, FrequencyType.DAILY,
+                          TuringCalendarTypes.CHINA_IB).scheduleDates()
+
+
+@pytest.fixture
+def bonds(make_bond):
+    return [make_bond(i) for i in range(NUM_BONDS)]
+
+
+def without_curve_code(bond, rate_shift=0.0):
+    """ 去掉曲线编码、曲线数据由外部传入的债券 """
+    b = copy.copy(bond)
+    b.curve_code = None
+    b.cv = copy.copy(bond.cv)
+    b.cv.curve_data = bond.cv.curve_data.assign(rate=bond.cv.curve_data['rate'] + rate_shift)
+    return b
+
+
+def test_get_update_and_discard():
+    store = HistoricalValueStore()
+    dates = [TuringDate(2021, 10, 28), TuringDate(2021, 10, 29), TuringDate(2021, 11, 1)]
+    store.update({(('B1',), dt._excelDate): float(k) for k, dt in enumerate(dates)})
+    assert len(store) == 3
+    assert store.get(('B1',), TuringDate(2021, 10, 29)) == 1.0
+    assert store.get(('B2',), TuringDate(2021, 10, 29)) is None
+    assert store.discard_before(TuringDate(2021, 10, 29)) == 1
+    assert store.get(('B1',), dates[0]) is None
+    assert len(store) == 2
+    store.clear()
+    assert len(store) == 0
+
+
+def test_save_and_load_round_trip(tmp_path, bonds):
+    path = str(tmp_path / 'values.pkl')
+    store = HistoricalValueStore(path)
+    dates = history_dates(TuringDate(2021, 11, 1))
+    HistoricalSimulationRunner(bonds, processes=1, value_store=store).position_values(dates)
+    assert len(store) > 0
+
+    loaded = HistoricalValueStore(path)
+    assert loaded._data == store._data
+    assert not (tmp_path / 'values.pkl.tmp').exists()
+
+
+def test_store_prices_only_new_dates(monkeypatch, bonds):
+    priced = []
+    value_dates = historical_simulation._value_dates
+
+    def counting_value_dates(bonds, tasks):
+        priced.extend((date._excelDate, i) for date, _, index in tasks for i in index)
+        return value_dates(bonds, tasks)
+
+    monkeypatch.setattr(historical_simulation, '_value_dates', counting_value_dates)
+    store = HistoricalValueStore()
+    first = history_dates(TuringDate(2021, 10, 29))
+    second = history_dates(TuringDate(2021, 11, 1))
+    runner = HistoricalSimulationRunner(bonds, np.arange(1.0, NUM_BONDS + 1), processes=1, value_store=store)
+    runner.portfolio_values(first)
+    assert len(priced) == len(first) * NUM_BONDS
+
+    priced.clear()
+    stored = runner.portfolio_values(second)
+    new_dates = [dt for dt in second if dt._excelDate > first[-1]._excelDate]
+    # 窗口前移后只重估新进入窗口的日期
+    assert sorted({date for date, _ in priced}) == [dt._excelDate for dt in new_dates]
+    assert len(priced) == len(new_dates) * NUM_BONDS
+
+    fresh = HistoricalSimulationRunner(bonds, np.arange(1.0, NUM_BONDS + 1), processes=1).portfolio_values(second)
+    np.testing.assert_allclose(stored, fresh, rtol=1e-14)
+
+
+def test_changed_terms_are_new_positions(bonds):
+    bond = bonds[0]
+    changed = copy.copy(bond)
+    changed.coupon_rate = bond.coupon_rate + 0.001
+    assert bond_position_key(changed) != bond_position_key(bond)
+    assert bond_position_key(copy.copy(bond)) == bond_position_key(bond)
+
+
+def test_position_key_without_curve_code_includes_curve_data(bonds):
+    bond = without_curve_code(bonds[0])
+    assert bond_position_key(bond) == bond_position_key(without_curve_code(bonds[0]))
+    # 外部传入的曲线不同时重估值不同，不能共用存储
+    assert bond_position_key(without_curve_code(bonds[0], 0.001)) != bond_position_key(bond)
+    assert bond_position_key(bond) != bond_position_key(bonds[0])
+
+    bond.cv.curve_data = None
+    with pytest.raises(TuringError):
+        bond_position_key(bond)
@@ -9,7 +9,8 @@ import pandas as pd
 from fundamental import ctx
 from fundamental.turing_db.data import TuringDB
 from turing_models.market.curves.curve_adjust import CurveAdjustmentImpl
-from turing_models.market.curves.discount_curve_zeros import TuringDiscountCurveZeros
+from turing_models.market.curves.curve_cache import curve_cache, shared_zero_curve
+from turing_models.market.data.market_data_cache import market_data_cache
 from turing_models.utilities.error import TuringError
 from turing_models.utilities.helper_functions import to_datetime, to_turing_date
 from turing_models.utilities.turing_date import TuringDate
@@ -1338,6 +1339,54 @@ class YieldCurve:
         if self.curve_type == 'forward_spot_rate' or self.curve_type == 'forward_ytm':
             self.curve_data = None
 
+    def _fetch_bond_yield_curve(self, curve_code: str, forward_term: float = None):
+        """通过行情快照缓存获取收益率曲线，同一曲线编码、估值日期和远期期限只调用一次接口"""
+        if forward_term is None:
+            loader = lambda: TuringDB.bond_yield_curve(curve_code=curve_code, date=self._original_value_date)
+        else:
+            loader = lambda: TuringDB.bond_yield_curve(curve_code=curve_code, date=self._original_value_date,
+                                                       forward_term=forward_term)
+        return market_data_cache.fetch('bond_yield_curve', loader, symbol=curve_code,
+                                       date=self._original_value_date, forward_term=forward_term)
+
+    @staticmethod
+    def prefetch(curve_codes: list, value_date, forward_term: float = None):
+        """一次接口调用取回多条曲线同一估值日期的数据并写入行情快照缓存，之后这些曲线的resolve不再调用接口；
+        返回写入缓存的曲线条数；value_date为'latest'时写入当前的'latest'快照"""
+        date = value_date if isinstance(value_date, str) and value_date == 'latest' else to_datetime(value_date)
+        curve_codes = [code.name if isinstance(code, YieldCurveCode) else code for code in curve_codes]
+        if forward_term is None:
+            loader = lambda codes: TuringDB.bond_yield_curve(curve_code=codes, date=date)
+        else:
+            loader = lambda codes: TuringDB.bond_yield_curve(curve_code=codes, date=date,
+                                                             forward_term=forward_term)
+        return market_data_cache.prefetch('bond_yield_curve', loader, curve_codes,
+                                          date=date, forward_term=forward_term)
+
+    def _fetch_national_debt(self):
+        """通过行情快照缓存获取国债收益率曲线"""
+        return market_data_cache.fetch('national_debt',
+                                       lambda: TuringDB.get_national_debt(date=self._original_value_date),
+                                       date=self._original_value_date)
+
+    def _shared_curve_data(self, column: str, curve_code: str = None, forward_term: float = None):
+        """从共享曲线登记表获取'tenor'和'rate'两列的曲线数据，曲线编码、估值日期、远期期限和曲线类型相同的
+        曲线对象共享同一个DataFrame；curve_code为None时取国债收益率曲线；接口数据为空时返回None。
+        'latest'按行情快照缓存当前的快照登记，快照更新后重新取数"""
+        def build():
+            if curve_code is None:
+                data = self._fetch_national_debt()
+            else:
+                data = self._fetch_bond_yield_curve(curve_code, forward_term)
+            if data.empty:
+                return None
+            if curve_code is not None:
+                data = data.loc[curve_code]
+            return data[['tenor', column]].rename(columns={column: 'rate'})
+
+        return curve_cache.get('yield_curve_data', build, curve_code, column,
+                               market_data_cache.snapshot_date(self._original_value_date), forward_term)
+
     def resolve(self):
         """补全/更新数据"""
         if not self.is_treasury_yield_curve:
@@ -1347,40 +1396,12 @@ class YieldCurve:
                 else:
                     curve_code = self.curve_code
                 if self.curve_data is None:
-                    if self.curve_type == 'spot_rate':
-                        self.curve_data = TuringDB.bond_yield_curve(curve_code=curve_code, date=self._original_value_date)
-                        if not self.curve_data.empty:
-                            self.curve_data = self.curve_data.loc[curve_code][['tenor', 'spot_rate']]. \
-                                rename(columns={'spot_rate': 'rate'})
-                        else:
-                            self.curve_data = None
-                    elif self.curve_type == 'ytm':
-                        self.curve_data = TuringDB.bond_yield_curve(curve_code=curve_code, date=self._original_value_date)
-                        if not self.curve_data.empty:
-                            self.curve_data = self.curve_data.loc[curve_code][['tenor', 'ytm']].\
-                                rename(columns={'ytm': 'rate'})
-                        else:
-                            self.curve_data = None
-                    elif self.curve_type == 'forward_spot_rate':
+                    if self.curve_type == 'spot_rate' or self.curve_type == 'ytm':
+                        self.curve_data = self._shared_curve_data(self.curve_type, curve_code)
+                    elif self.curve_type == 'forward_spot_rate' or self.curve_type == 'forward_ytm':
                         if self.forward_term is not None and isinstance(self.forward_term, (float, int)):
-                            self.curve_data = TuringDB.bond_yield_curve(curve_code=curve_code, date=self._original_value_date,
-                                                                        forward_term=self.forward_term)
-                            if not self.curve_data.empty:
-                                self.curve_data = self.curve_data.loc[curve_code][['tenor', 'forward_spot_rate']].\
-                                    rename(columns={'forward_spot_rate': 'rate'})
-                            else:
-                                self.curve_data = None
-                        else:
-                            raise TuringError('Please check the input of forward_term')
-                    elif self.curve_type == 'forward_ytm':
-                        if self.forward_term is not None and isinstance(self.forward_term, (float, int)):
-                            self.curve_data = TuringDB.bond_yield_curve(curve_code=curve_code, date=self._original_value_date,
-                                                                        forward_term=self.forward_term)
-                            if not self.curve_data.empty:
-                                self.curve_data = self.curve_data.loc[curve_code][['tenor', 'forward_ytm']].\
-                                    rename(columns={'forward_ytm': 'rate'})
-                            else:
-                                self.curve_data = None
+                            self.curve_data = self._shared_curve_data(self.curve_type, curve_code,
+                                                                      self.forward_term)
                         else:
                             raise TuringError('Please check the input of forward_term')
                     else:
@@ -1393,38 +1414,11 @@ class YieldCurve:
         else:
             # 国债收益率曲线单独处理
             if self.curve_data is None:
-                if self.curve_type == 'spot_rate':
-                    self.curve_data = TuringDB.get_national_debt(date=self._original_value_date)
-                    if not self.curve_data.empty:
-                        self.curve_data = self.curve_data[['tenor', 'spot_rate']]. \
-                            rename(columns={'spot_rate': 'rate'})
-                    else:
-                        self.curve_data = None
-                elif self.curve_type == 'ytm':
-                    self.curve_data = TuringDB.get_national_debt(date=self._original_value_date)
-                    if not self.curve_data.empty:
-                        self.curve_data = self.curve_data[['tenor', 'ytm']]. \
-                            rename(columns={'ytm': 'rate'})
-                    else:
-                        self.curve_data = None
-                elif self.curve_type == 'forward_spot_rate':
+                if self.curve_type == 'spot_rate' or self.curve_type == 'ytm':
+                    self.curve_data = self._shared_curve_data(self.curve_type)
+                elif self.curve_type == 'forward_spot_rate' or self.curve_type == 'forward_ytm':
                     if self.forward_term is not None and isinstance(self.forward_term, (float, int)):
-                        self.curve_data = TuringDB.get_national_debt(date=self._original_value_date)
-                        if not self.curve_data.empty:
-                            self.curve_data = self.curve_data[['tenor', 'forward_spot_rate']]. \
-                                rename(columns={'forward_spot_rate': 'rate'})
-                        else:
-                            self.curve_data = None
-                    else:
-                        raise TuringError('Please check the input of forward_term')
-                elif self.curve_type == 'forward_ytm':
-                    if self.forward_term is not None and isinstance(self.forward_term, (float, int)):
-                        self.curve_data = TuringDB.get_national_debt(date=self._original_value_date)
-                        if not self.curve_data.empty:
-                            self.curve_data = self.curve_data[['tenor', 'forward_ytm']]. \
-                                rename(columns={'forward_ytm': 'rate'})
-                        else:
-                            self.curve_data = None
+                        self.curve_data = self._shared_curve_data(self.curve_type)
                     else:
                         raise TuringError('Please check the input of forward_term')
                 else:
@@ -1447,10 +1441,7 @@ class YieldCurve:
         self.curve_data = ca_impl.get_curve_data()
 
     def discount_curve(self):
-        """生成折现曲线"""
+        """生成折现曲线，估值日期和（经旋转平移后的）曲线数据相同的曲线对象共享登记表中的同一条曲线"""
         tenors = self.curve_data['tenor'].tolist()
-        dates = self.value_date.addYears(tenors)
         rates = self.curve_data['rate'].tolist()
-        return TuringDiscountCurveZeros(valuationDate=self.value_date,
-                                        zeroDates=dates,
-                                        zeroRates=rates)
+        return shared_zero_curve(self.value_date, tenors, rates)
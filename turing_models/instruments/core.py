@@ -24,9 +24,31 @@ class IsPriceable:
 
 class PricingMixin:
     """所有models的定价服务入口,默认走evaluation方法"""
+    # 通过calculate_greek对price做bump重估、可以共享重估结果的风险指标，由各instrument声明
+    _shared_bump_measures = ()
+
     def __init__(self):
         self.ctx: Context = ctx
 
+    def _start_batch(self, risk_names: list):
+        """ 请求的风险指标中有多个共享bump时开启批量计算：基准价格只计算一次，
+        相同属性、相同bump的重估结果在各指标间共享 """
+        if len(set(self._shared_bump_measures).intersection(risk_names)) > 1:
+            self._revaluation_memo = {}
+
+    def _end_batch(self):
+        self.__dict__.pop('_revaluation_memo', None)
+
+    def _evaluate(self, risk_name: str):
+        memo = getattr(self, '_revaluation_memo', None)
+        if memo is not None and risk_name == 'price':
+            # 与calculate_greek中基准价格的键相同
+            key = (self.price.__name__,)
+            if key not in memo:
+                memo[key] = self.price()
+            return memo[key]
+        return getattr(self, risk_name)()
+
     def api_calc(self, risk_measure: list):
         """calc 结果集"""
         msg = ''
@@ -37,18 +59,22 @@ class PricingMixin:
             if not getattr(self, 'isvalid')():
                 raise TuringError(f"{getattr(self,'asset_id')}: is not valid")
             if isinstance(risk_measure, list):
-                for risk_fun in risk_measure:
-                    try:
-                        result = getattr(self, risk_fun)()
-                    except Exception as e:
-                        traceback.print_exc()
-                        msg += f'{risk_fun} error: {str(e)};'
-                        result = ''
-                        msg += f'调用{risk_fun}出错;'
-                    response = {}
-                    response['risk_measure'] = risk_fun
-                    response['value'] = result
-                    response_data.append(response)
+                self._start_batch(risk_measure)
+                try:
+                    for risk_fun in risk_measure:
+                        try:
+                            result = self._evaluate(risk_fun)
+                        except Exception as e:
+                            traceback.print_exc()
+                            msg += f'{risk_fun} error: {str(e)};'
+                            result = ''
+                            msg += f'调用{risk_fun}出错;'
+                        response = {}
+                        response['risk_measure'] = risk_fun
+                        response['value'] = result
+                        response_data.append(response)
+                finally:
+                    self._end_batch()
             elif isinstance(risk_measure, str):
                 result = getattr(self, risk_measure)()
                 return result
@@ -110,15 +136,18 @@ class InstrumentBase(PricingMixin):
                 result = getattr(self, rs)() if not option_all else getattr(self, rs)(option_all)
                 result = self._calc(risk_measure, result)
                 return result
+            self._start_batch([risk.value if isinstance(risk, RiskMeasure) else risk for risk in risk_measure])
             for risk in risk_measure:
                 rs = risk.value if isinstance(risk, RiskMeasure) else risk
-                res = getattr(self, rs)()
+                res = self._evaluate(rs)
                 res = self._calc(risk, res)
                 result.append(res)
             return result
         except Exception as e:
             traceback.print_exc()
             return ""
+        finally:
+            self._end_batch()
 
     def _calc(self, risk, value):
         """二次计算,默认为直接返回当前值"""
@@ -1,7 +1,10 @@
 from dataclasses import dataclass
 
+import numpy as np
+
 from turing_models.utilities.global_variables import gNumObsInYear
 from turing_models.models.model_crr_tree import crrTreeValAvg
+from turing_models.models.model_pde_1d import TuringPDE1DEngine
 from turing_models.instruments.eq.equity_option import EqOption
 from turing_models.utilities.global_types import OptionType, TuringOptionTypes
 from turing_models.utilities.error import TuringError
@@ -41,6 +44,34 @@ class AmericanOption(EqOption):
 
         return v * self.multiplier * self.number_of_options
 
+    def price_pde(self) -> float:
+        """ 用Crank-Nicolson/PSOR有限差分定价，时间步与二叉树一致 """
+        s0 = self.stock_price
+        k = self.strike_price
+        r = self.r
+        q = self.q
+        vol = self.v
+        texp = self.texp
+        option_type = self.option_type
+
+        if texp <= 0:
+            raise TuringError("Option expires before value date.")
+
+        engine = TuringPDE1DEngine(s0, vol, r - q, texp, r=r, extra_spots=(k,))
+        if option_type == TuringOptionTypes.AMERICAN_CALL:
+            exercise = np.maximum(engine.spots - k, 0.0)
+        elif option_type == TuringOptionTypes.AMERICAN_PUT:
+            exercise = np.maximum(k - engine.spots, 0.0)
+        else:
+            raise TuringError("Unknown option type.")
+
+        num_steps = max(int(texp * self.num_ann_obs + 0.5), 1)
+        times = np.linspace(0.0, texp, num_steps + 1)
+        layers = engine.solve(exercise, times, exercise=exercise)
+        v, _, _ = engine.greeks(layers[0])
+
+        return v * self.multiplier * self.number_of_options
+
     def _resolve(self):
         super()._resolve()
         if self.product_type is None:
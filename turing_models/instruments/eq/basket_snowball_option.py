@@ -131,7 +131,8 @@ class BasketSnowballOption(SnowballOption):
         model_params = (smean, mu, np.sqrt(vhat2), scheme)
 
         Sall = process.getProcess(process_type, texp, model_params,
-                                  num_ann_obs, num_paths, seed, num_time_steps)
+                                  num_ann_obs, num_paths, seed, num_time_steps,
+                                  parallel=True)
 
         (num_paths, _) = Sall.shape
 
@@ -11,7 +11,8 @@ from fundamental.turing_db.data import TuringDB
 from turing_utils.log.request_id_log import logger
 from turing_models.instruments.common import Currency, Eq, YieldCurve
 from turing_models.instruments.core import InstrumentBase
-from turing_models.market.curves.discount_curve_flat import TuringDiscountCurveFlat
+from turing_models.market.data.market_data_cache import market_data_cache
+from turing_models.market.curves.curve_cache import shared_flat_curve
 from turing_models.models.model_black_scholes import TuringModelBlackScholes
 from turing_models.utilities.error import TuringError
 from turing_models.utilities.global_types import OptionType
@@ -43,6 +44,8 @@ class EqOption(Eq, InstrumentBase, metaclass=ABCMeta):
     premium_date: Union[datetime.datetime, str] = None
     annualized_flag: bool = True
     value_date: Union[datetime.datetime, str] = 'latest'  # 估值日期
+    # 差分法希腊字母共享基准价格和bump：delta和gamma共用标的价格的上下bump，theta共用基准价格
+    _shared_bump_measures = ('price', 'eq_delta', 'eq_gamma', 'eq_vega', 'eq_theta', 'eq_rho', 'eq_rho_q')
 
     def __post_init__(self):
         super().__init__()
@@ -80,10 +83,13 @@ class EqOption(Eq, InstrumentBase, metaclass=ABCMeta):
         """ 调用接口补全股票价格 """
         if self.underlier_symbol is not None \
            and self.value_date is not None:
-            original_data = TuringDB.get_stock_price(
+            original_data = market_data_cache.fetch(
+                'stock_price',
+                lambda: TuringDB.get_stock_price(symbol=self.underlier_symbol,
+                                                 start=self.value_date,
+                                                 end=self.value_date),
                 symbol=self.underlier_symbol,
-                start=self.value_date,
-                end=self.value_date
+                date=self.value_date
             )
             if not original_data.empty:
                 if isinstance(self.underlier_symbol, str):
@@ -104,9 +110,12 @@ class EqOption(Eq, InstrumentBase, metaclass=ABCMeta):
         """ 调用接口补全股票历史波动率 """
         if self.underlier_symbol is not None \
            and self.value_date is not None:
-            original_data = TuringDB.get_volatility(
-                symbols=self.underlier_symbol,
-                end=self.value_date
+            original_data = market_data_cache.fetch(
+                'volatility',
+                lambda: TuringDB.get_volatility(symbols=self.underlier_symbol,
+                                                end=self.value_date),
+                symbol=self.underlier_symbol,
+                date=self.value_date
             )
             if not original_data.empty:
                 if isinstance(self.underlier_symbol, str):
@@ -190,10 +199,7 @@ class EqOption(Eq, InstrumentBase, metaclass=ABCMeta):
                                    range(len(self.underlier_symbol))]
         # 无风险利率
         if ctx_interest_rate is not None:
-            self.discount_curve = TuringDiscountCurveFlat(
-                to_turing_date(self.value_date),
-                ctx_interest_rate
-            )
+            self.discount_curve = shared_flat_curve(to_turing_date(self.value_date), ctx_interest_rate)
         else:
             self.discount_curve = _original_data.get('discount_curve')
         # 分红率
@@ -214,15 +220,12 @@ class EqOption(Eq, InstrumentBase, metaclass=ABCMeta):
         if getattr(self, 'underlier_symbol', None) is not None:
             if isinstance(self.underlier_symbol, str):
                 # 根据分红率生成折现曲线
-                self.dividend_curve = TuringDiscountCurveFlat(
-                    self.transformed_value_date,
-                    self.dividend_yield
-                )
+                self.dividend_curve = shared_flat_curve(self.transformed_value_date, self.dividend_yield)
                 if getattr(self, 'volatility', None) is not None:
                     self.bs_model = TuringModelBlackScholes(self.volatility)
                     self.v = self.bs_model._volatility
             else:
-                self.dividend_curve = [TuringDiscountCurveFlat(self.transformed_value_date, dy) for dy in
+                self.dividend_curve = [shared_flat_curve(self.transformed_value_date, dy) for dy in
                                        self.dividend_yield]
                 if getattr(self, 'volatility', None) is not None:
                     self.v = [TuringModelBlackScholes(vol)._volatility for vol in self.volatility]
@@ -290,6 +293,22 @@ class EqOption(Eq, InstrumentBase, metaclass=ABCMeta):
         return calculate_greek(self, self.price, "dividend_curve",
                                cus_inc=(self.dividend_curve.bump, bump))
 
+    def _apply_scenario(self, spot_shock: float, vol_shock: float, curve_shift: float):
+        """ 情景网格中的一个情景：股价相对变动spot_shock，波动率绝对变动vol_shock，折现曲线平移curve_shift（bp），
+        修改的属性与差分法希腊字母bump的属性相同；会改变实例，应在副本上调用 """
+        if isinstance(self.stock_price, list):
+            self.stock_price = [s * (1.0 + spot_shock) for s in self.stock_price]
+        else:
+            self.stock_price = self.stock_price * (1.0 + spot_shock)
+        for attr in ('volatility', 'v'):
+            vol = getattr(self, attr, None)
+            if isinstance(vol, list):
+                setattr(self, attr, [v + vol_shock for v in vol])
+            elif vol is not None:
+                setattr(self, attr, vol + vol_shock)
+        if curve_shift:
+            self.discount_curve = self.discount_curve.bump(curve_shift * bump)
+
     def _resolve(self):
         # OPTION_ 为自定义时自动生成
         if self.asset_id and not self.asset_id.startswith("OPTION_"):
@@ -1,14 +1,15 @@
 from dataclasses import dataclass
 
-from turing_models.utilities.frequency import FrequencyType
+import numpy as np
+
 from turing_models.utilities.calendar import TuringCalendarTypes
-from turing_models.utilities.schedule import TuringSchedule
-from turing_models.utilities.global_variables import gNumObsInYear
+from turing_models.utilities.business_days import business_day_cache
 from turing_models.utilities.global_types import TuringOptionTypes, OptionType
 from turing_models.models.model_black_scholes_analytical import bs_value, bs_delta, \
     bs_vega, bs_gamma, bs_rho, bs_psi, bs_theta, bsImpliedVolatility
 from turing_models.instruments.eq.equity_option import EqOption
 from turing_models.utilities.error import TuringError
+from turing_models.utilities.helper_functions import bump
 
 
 @dataclass(repr=False, eq=False, order=False, unsafe_hash=True)
@@ -34,13 +35,10 @@ class EuropeanOption(EqOption):
     @property
     def texp(self):
         if getattr(self, 'expiry', None) is not None:
-            schedule_daily = TuringSchedule(self.transformed_value_date,
-                                            self.expiry,
-                                            freqType=FrequencyType.DAILY,
-                                            calendarType=TuringCalendarTypes.CHINA_SSE)
-            # 考虑一开一闭区间
-            num_days = len(schedule_daily._adjustedDates) - 1
-            return num_days / gNumObsInYear
+            # 按交易日计算，考虑一开一闭区间
+            return business_day_cache.trading_year_frac(self.transformed_value_date,
+                                                        self.expiry,
+                                                        TuringCalendarTypes.CHINA_SSE)
 
     def params(self) -> list:
         return [
@@ -75,6 +73,16 @@ class EuropeanOption(EqOption):
     def eq_rho_q(self) -> float:
         return bs_psi(*self.params()[:-1]) * self.multiplier * self.number_of_options
 
+    def scenario_prices(self, spot_shocks, vol_shocks, curve_shifts) -> np.ndarray:
+        """ 情景网格上的价格，bs_value按股价、波动率和利率三个轴广播一次计算，
+        返回形状为(股价情景数, 波动率情景数, 曲线情景数)的数组，情景的含义与_apply_scenario相同 """
+        s = self.stock_price * (1.0 + np.asarray(spot_shocks, dtype=np.float64))[:, None, None]
+        v = (self.v + np.asarray(vol_shocks, dtype=np.float64))[None, :, None]
+        r = np.array([self.discount_curve.bump(shift * bump).zeroRate(self.expiry) if shift else self.r
+                      for shift in curve_shifts])[None, None, :]
+        return bs_value(s, self.texp, self.strike_price, r, self.q, v, self.option_type.value, False) \
+            * self.multiplier * self.number_of_options
+
     def implied_volatility(self, mkt, signal):
         """ Calculate the Black-Scholes implied volatility of a European
         vanilla option. """
@@ -5,9 +5,11 @@ import numpy as np
 from turing_models.instruments.eq.equity_option import EqOption
 from turing_models.models.process_simulator import TuringProcessSimulator, TuringProcessTypes, \
     TuringGBMNumericalScheme
+from turing_models.models.model_mc_greeks import gbm_lr_weights, lr_estimate
 from turing_models.utilities.error import TuringError
 from turing_models.utilities.global_types import TuringKnockOutTypes, OptionType
 from turing_models.utilities.global_variables import gNumObsInYear, gDaysInYear
+from turing_models.utilities.helper_functions import bump
 from turing_models.utilities.mathematics import N
 
 
@@ -134,61 +136,167 @@ class KnockOutOption(EqOption):
         v = price * notional / s0
         return v
 
-    def price_mc(self) -> float:
+    def _mc_paths(self, mu: float = None, vol: float = None):
+        """ mu和vol不传时取当前的r - q和波动率，扰动后的情景与基准使用同一个种子（公共随机数） """
         s0 = self.stock_price
+        mu = self.r - self.q if mu is None else mu
+        vol = self.v if vol is None else vol
+        texp = self.texp
+
+        process = TuringProcessSimulator()
+        process_type = TuringProcessTypes.GBM
+        scheme = TuringGBMNumericalScheme.ANTITHETIC
+        model_params = (s0, mu, vol, scheme)
+
+        return process.getProcess(process_type, texp, model_params,
+                                  self.num_ann_obs, self.num_paths, self.seed, parallel=True)
+
+    def _mc_payoff(self, Sall, s0: float = None):
+        """ 返回每条路径未折现的收益，拆成随初始价格缩放的部分（已除以s0）和敲出票息部分 """
+        s0 = self.stock_price if s0 is None else s0
         k = self.strike_price
         b = self.barrier
-        r = self.r
-        q = self.q
-        vol = self.v
         rebate = self.rebate
-        notional = self.notional
         texp = self.texp
         knock_out_type = self.knock_out_type
         flag = self.annualized_flag
         participation_rate = self.participation_rate
-        num_ann_obs = self.num_ann_obs
-        num_paths = self.num_paths
-        seed = self.seed
-
-        if knock_out_type == TuringKnockOutTypes.UP_AND_OUT_CALL and s0 >= b:
-            return rebate * texp ** flag * notional * np.exp(-r * texp)
-        elif knock_out_type == TuringKnockOutTypes.DOWN_AND_OUT_PUT and s0 <= b:
-            return rebate * texp ** flag * notional * np.exp(-r * texp)
-
-        process = TuringProcessSimulator()
-        process_type = TuringProcessTypes.GBM
-        scheme = TuringGBMNumericalScheme.ANTITHETIC
-        model_params = (s0, r - q, vol, scheme)
-
-        Sall = process.getProcess(process_type, texp, model_params,
-                                  num_ann_obs, num_paths, seed)
 
         (num_paths, _) = Sall.shape
 
         if knock_out_type == TuringKnockOutTypes.UP_AND_OUT_CALL:
-            barrier_crossed_from_below = [False] * num_paths
-            for p in range(0, num_paths):
-                barrier_crossed_from_below[p] = np.any(Sall[p] >= b)
+            barrier_crossed = (Sall >= b).any(axis=1)
+            vanilla = np.maximum((Sall[:, -1] - k) / s0, 0.0)
         elif knock_out_type == TuringKnockOutTypes.DOWN_AND_OUT_PUT:
-            barrier_crossed_from_above = [False] * num_paths
-            for p in range(0, num_paths):
-                barrier_crossed_from_above[p] = np.any(Sall[p] <= b)
+            barrier_crossed = (Sall <= b).any(axis=1)
+            vanilla = np.maximum((k - Sall[:, -1]) / s0, 0.0)
+        else:
+            raise TuringError("Unknown barrier option type." +
+                              str(knock_out_type))
 
-        payoff = np.zeros(num_paths)
-        ones = np.ones(num_paths)
+        scaled = vanilla * participation_rate * ~barrier_crossed
+        fixed = rebate * texp ** flag * barrier_crossed
+        return scaled, fixed
 
-        if knock_out_type == TuringKnockOutTypes.UP_AND_OUT_CALL:
-            payoff = np.maximum((Sall[:, -1] - k) / s0, 0.0) * \
-                participation_rate * (ones - barrier_crossed_from_below) + \
-                rebate * texp ** flag * (ones * barrier_crossed_from_below)
-        elif knock_out_type == TuringKnockOutTypes.DOWN_AND_OUT_PUT:
-            payoff = np.maximum((k - Sall[:, -1]) / s0, 0.0) * \
-                participation_rate * (ones - barrier_crossed_from_above) + \
-                rebate * texp ** flag * (ones * barrier_crossed_from_above)
+    def _mc_knocked_out_at_start(self):
+        s0 = self.stock_price
+        b = self.barrier
+        knock_out_type = self.knock_out_type
+        return (knock_out_type == TuringKnockOutTypes.UP_AND_OUT_CALL and s0 >= b) or \
+            (knock_out_type == TuringKnockOutTypes.DOWN_AND_OUT_PUT and s0 <= b)
+
+    def price_mc(self) -> float:
+        r = self.r
+        rebate = self.rebate
+        notional = self.notional
+        texp = self.texp
+        flag = self.annualized_flag
+
+        if self._mc_knocked_out_at_start():
+            return rebate * texp ** flag * notional * np.exp(-r * texp)
+
+        Sall = self._mc_paths()
+        scaled, fixed = self._mc_payoff(Sall)
+        payoff = scaled + fixed
 
         return payoff.mean() * np.exp(- r * texp) * notional
 
+    def price_mc_greeks(self) -> dict:
+        """ 在price_mc的同一次模拟中用似然比方法计算delta、gamma、vega，并给出各自的标准误差
+
+        障碍收益不连续，似然比估计量无需扰动；收益中直接除以s0的部分按显式导数计入。
+        返回字典，如{'delta': ..., 'delta_std_error': ...} """
+        s0 = self.stock_price
+        r = self.r
+        q = self.q
+        vol = self.v
+        rebate = self.rebate
+        notional = self.notional
+        texp = self.texp
+        flag = self.annualized_flag
+        scale = np.exp(- r * texp) * notional
+
+        if self._mc_knocked_out_at_start():
+            value = rebate * texp ** flag * scale
+            return {'price': value, 'price_std_error': 0.0,
+                    'delta': 0.0, 'delta_std_error': 0.0,
+                    'gamma': 0.0, 'gamma_std_error': 0.0,
+                    'vega': 0.0, 'vega_std_error': 0.0}
+
+        Sall = self._mc_paths()
+        scaled, fixed = self._mc_payoff(Sall)
+        payoff = (scaled + fixed) * scale
+        scaled = scaled * scale
+        w_delta, w_gamma, w_vega = gbm_lr_weights(Sall, r - q, vol, 1.0 / self.num_ann_obs)
+
+        num_paths = payoff.shape[0]
+        result = {'price': payoff.mean(),
+                  'price_std_error': payoff.std(ddof=1) / np.sqrt(num_paths)}
+        # scaled部分为A/s0，对s0的显式导数为-A/s0^2，二阶为2A/s0^3
+        estimates = {
+            'delta': lr_estimate(payoff, w_delta, -scaled / s0),
+            'gamma': lr_estimate(payoff, w_gamma, scaled * (2.0 / s0 / s0 - 2.0 * w_delta / s0)),
+            'vega': lr_estimate(payoff, w_vega)
+        }
+        for name, (estimate, std_error) in estimates.items():
+            result[name] = estimate
+            result[name + '_std_error'] = std_error
+        return result
+
+    def price_mc_crn_greeks(self,
+                            spot_bump: float = 0.01,
+                            vol_bump: float = 0.01,
+                            rate_bump: float = bump) -> dict:
+        """ 对price_mc用公共随机数差分计算delta、gamma、vega、rho，并给出各自的标准误差
+
+        各扰动情景与price_mc使用同一个种子，股价扰动的路径由基准路径按比例缩放得到（GBM路径与初始价格成正比）。
+        spot_bump为股价的相对扰动，vol_bump和rate_bump为波动率和利率的绝对扰动，返回字典格式与price_mc_greeks相同 """
+        s0 = self.stock_price
+        r = self.r
+        q = self.q
+        vol = self.v
+        notional = self.notional
+        texp = self.texp
+        greeks = ('price', 'delta', 'gamma', 'vega', 'rho')
+
+        if self._mc_knocked_out_at_start():
+            value = self.rebate * texp ** self.annualized_flag * notional * np.exp(-r * texp)
+            result = {}
+            for name in greeks:
+                result[name] = value if name == 'price' else 0.0
+                result[name + '_std_error'] = 0.0
+            return result
+
+        def discounted_payoff(Sall, s, rate):
+            scaled, fixed = self._mc_payoff(Sall, s)
+            return (scaled + fixed) * np.exp(-rate * texp) * notional
+
+        ds = s0 * spot_bump
+        Sall = self._mc_paths()
+        base = discounted_payoff(Sall, s0, r)
+        spot_up = discounted_payoff(Sall * (1.0 + spot_bump), s0 + ds, r)
+        spot_down = discounted_payoff(Sall * (1.0 - spot_bump), s0 - ds, r)
+        del Sall
+        vol_up = discounted_payoff(self._mc_paths(vol=vol + vol_bump), s0, r)
+        vol_down = discounted_payoff(self._mc_paths(vol=vol - vol_bump), s0, r)
+        rate_up = discounted_payoff(self._mc_paths(mu=r + rate_bump - q), s0, r + rate_bump)
+        rate_down = discounted_payoff(self._mc_paths(mu=r - rate_bump - q), s0, r - rate_bump)
+
+        # 逐条路径组合各情景的价值，标准误差按路径间的离散程度计算
+        estimates = {
+            'price': base,
+            'delta': (spot_up - spot_down) / (2.0 * ds),
+            'gamma': (spot_up - 2.0 * base + spot_down) / (ds * ds),
+            'vega': (vol_up - vol_down) / (2.0 * vol_bump),
+            'rho': (rate_up - rate_down) / (2.0 * rate_bump)
+        }
+        result = {}
+        for name in greeks:
+            x = estimates[name]
+            result[name] = x.mean()
+            result[name + '_std_error'] = x.std(ddof=1) / np.sqrt(x.shape[0])
+        return result
+
     def _resolve(self):
         super()._resolve()
         if self.product_type is None:
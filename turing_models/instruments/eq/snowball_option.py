@@ -7,15 +7,18 @@ import numpy as np
 from turing_models.utilities.schedule import TuringSchedule
 from turing_models.utilities.frequency import FrequencyType
 from turing_models.utilities.calendar import TuringCalendarTypes, TuringBusDayAdjustTypes
+from turing_models.utilities.business_days import business_day_cache
 from turing_models.utilities.global_variables import gNumObsInYear, gDaysInYear
 from turing_models.utilities.global_types import TuringOptionTypes, \
     TuringKnockInTypes, OptionType
-from turing_models.models.process_simulator import TuringProcessSimulator, TuringProcessTypes, \
-    TuringGBMNumericalScheme
+from turing_models.models.model_snowball_mc import TuringSnowballMCEngine, \
+    TuringSnowballMCScenario, SNOWBALL_CALL, SNOWBALL_PUT
+from turing_models.models.process_simulator import PARALLEL_BLOCK_SIZE
 from turing_models.instruments.eq.equity_option import EqOption
-from turing_models.utilities.helper_functions import to_turing_date
+from turing_models.utilities.helper_functions import to_turing_date, bump
 from turing_models.utilities.error import TuringError
 from turing_models.utilities.turing_date import TuringDate
+from turing_models.utilities.turing_date_array import TuringDateArray
 
 
 @dataclass(repr=False, eq=False, order=False, unsafe_hash=True)
@@ -32,12 +35,17 @@ class SnowballOption(EqOption):
     business_day_adjust_type: Union[str,
                                     TuringBusDayAdjustTypes] = TuringBusDayAdjustTypes.FOLLOWING
     knock_out_obs_days_whole: List[datetime.datetime] = None
+    # 由mc_greeks计算的风险指标及其对应的希腊字母
+    _mc_greek_measures = {'eq_delta': 'delta', 'eq_gamma': 'gamma', 'eq_vega': 'vega',
+                          'eq_theta': 'theta', 'eq_rho': 'rho'}
 
     def __post_init__(self):
         super().__post_init__()
         self.num_ann_obs = gNumObsInYear
         self.days_in_year = gDaysInYear
         self.num_paths = 1_000_000
+        # 蒙特卡洛按块并行模拟，每块的路径数决定内存占用的上限
+        self.chunk_size = PARALLEL_BLOCK_SIZE
         self.seed = 4242
         self._check_param()
 
@@ -86,11 +94,10 @@ class SnowballOption(EqOption):
         if getattr(self, 'expiry', None) is not None \
            and getattr(self, 'business_day_adjust_type', None) is not None:
             # 生成从估值日到到期日的交易日时间表（包含首尾日）
-            self.bus_days = TuringSchedule(self.transformed_value_date,
-                                           self.expiry,
-                                           freqType=FrequencyType.DAILY,
-                                           calendarType=TuringCalendarTypes.CHINA_SSE,
-                                           busDayAdjustType=self.business_day_adjust_type)._adjustedDates
+            self.bus_days = business_day_cache.bus_days(self.transformed_value_date,
+                                                        self.expiry,
+                                                        TuringCalendarTypes.CHINA_SSE,
+                                                        self.business_day_adjust_type)
         # 如果用户未传入敲出观察日时间表，就按月生成（包含首尾日）
         if getattr(self, 'knock_out_obs_days_whole', None) is None:
             if getattr(self, 'start_date', None) is not None \
@@ -106,166 +113,254 @@ class SnowballOption(EqOption):
             if not all(isinstance(day, TuringDate) for day in self.knock_out_obs_days_whole):
                 self.knock_out_obs_days_whole = [to_turing_date(day) for day in self.knock_out_obs_days_whole]
 
+    def _bus_day_offsets(self, dates: TuringDateArray):
+        """ 各日期在交易日时间表中的索引值（早于该日期的交易日数），以及是否为时间表中的交易日 """
+        return business_day_cache.bus_day_offsets(self.transformed_value_date,
+                                                  self.expiry,
+                                                  dates,
+                                                  TuringCalendarTypes.CHINA_SSE,
+                                                  self.business_day_adjust_type)
+
+    def _knock_out_obs_days(self):
+        """ 返回估值日到到期日之间的敲出观察日及其在交易日列表中的索引值 """
+        # TuringDate的哈希值都相同，按excel日期去重排序
+        excel_dates = np.unique([day._excelDate for day in self.knock_out_obs_days_whole])
+        obs_days = TuringDateArray.fromExcelDates(excel_dates)
+        offsets, found = self._bus_day_offsets(obs_days)
+        knock_out_obs_days = obs_days[found].toList()
+        obs_index = offsets[found].tolist()
+        return knock_out_obs_days, obs_index
+
+    def _discounted_payoffs(self, knock_out_obs_days, r, value_date):
+        """ 计算给定利率和估值日下，各观察日敲出、未敲出未敲入时的折现收益以及敲入收益的系数 """
+        flag = self.annualized_flag
+        notional = self.notional
+        days_in_year = self.days_in_year
+        start_date = self.start_date
+        texp = (self.expiry - value_date) / gDaysInYear
+
+        # 各观察日敲出时的折现收益：实际期限从起始日计算，折现从估值日计算
+        out_values = np.array([notional * self.rebate * ((day - start_date) / days_in_year)**flag *
+                               np.exp(-r * (day - value_date) / days_in_year)
+                               for day in knock_out_obs_days])
+
+        whole_term = (self.expiry - start_date) / days_in_year
+        untriggered_value = notional * self.untriggered_rebate * \
+            whole_term**flag * np.exp(-r * texp)
+
+        knock_in_coef = -notional * self.participation_rate * np.exp(-r * texp)
+        if self.knock_in_type != TuringKnockInTypes.RETURN:
+            knock_in_coef *= whole_term**flag
+
+        return out_values, untriggered_value, knock_in_coef
+
+    def _mc_engine(self, num_time_steps: int) -> TuringSnowballMCEngine:
+        knock_out_obs_days, obs_index = self._knock_out_obs_days()
+        out_values, untriggered_value, knock_in_coef = self._discounted_payoffs(
+            knock_out_obs_days, self.r, self.transformed_value_date)
+
+        option_type = SNOWBALL_CALL if self.option_type == TuringOptionTypes.SNOWBALL_CALL \
+            else SNOWBALL_PUT
+
+        return TuringSnowballMCEngine(num_time_steps,
+                                      obs_index,
+                                      out_values,
+                                      untriggered_value,
+                                      self.barrier,
+                                      self.knock_in_price,
+                                      option_type,
+                                      self.knock_in_type.value,
+                                      knock_in_coef,
+                                      self.initial_spot,
+                                      self.knock_in_strike1,
+                                      self.knock_in_strike2)
+
     def price(self) -> float:
         s0 = self.stock_price
         r = self.r
         q = self.q
         vol = self.volatility
-        texp = self.texp
-        num_ann_obs = self.num_ann_obs
-        num_paths = self.num_paths
-        seed = self.seed
-
-        process = TuringProcessSimulator()
-        process_type = TuringProcessTypes.GBM
-        scheme = TuringGBMNumericalScheme.ANTITHETIC
-        model_params = (s0, r - q, vol, scheme)
-        # 减一是为了适配getGBMPaths函数
+        # 减一是为了与交易日时间表对齐（包含首尾日）
         num_time_steps = len(self.bus_days) - 1
 
-        sall = process.getProcess(process_type, texp, model_params,
-                                  num_ann_obs, num_paths, seed, num_time_steps)
-        (num_paths, _) = sall.shape
-        return self._payoff(sall, num_paths)
+        engine = self._mc_engine(num_time_steps)
+        value, _ = engine.value_gbm(s0, r - q, vol, self.num_ann_obs,
+                                    self.num_paths, self.seed, self.chunk_size)
+        return value
 
-    def _payoff(self, sall, num_paths):
-        k1 = self.barrier
-        k2 = self.knock_in_price
-        sk1 = self.knock_in_strike1
-        sk2 = self.knock_in_strike2
-        start_date = self.start_date
-        initial_spot = self.initial_spot
-        expiry = self.expiry
+    def pde_greeks(self) -> dict:
+        """ 用一维PDE定价，并从网格直接读取delta和gamma
+
+        与蒙特卡洛使用相同的交易日时间表和收益描述，返回{'price': ..., 'delta': ..., 'gamma': ...} """
+        s0 = self.stock_price
+        r = self.r
+        q = self.q
+        vol = self.volatility
+        num_time_steps = len(self.bus_days) - 1
+
+        engine = self._mc_engine(num_time_steps)
+        value, delta, gamma = engine.value_pde(s0, r - q, vol, self.num_ann_obs)
+        return {'price': float(value), 'delta': float(delta), 'gamma': float(gamma)}
+
+    def price_pde(self) -> float:
+        return self.pde_greeks()['price']
+
+    def mc_greeks(self,
+                  greeks=('price', 'delta', 'gamma', 'vega', 'rho', 'theta'),
+                  spot_bump: float = 0.01,
+                  vol_bump: float = 0.01,
+                  rate_bump: float = bump) -> dict:
+        """ 用同一组随机数一次模拟计算价格和希腊字母，并给出各自的标准误差
+
+        spot_bump为股价的相对扰动，vol_bump和rate_bump为波动率和利率的绝对扰动，
+        theta与eq_theta一致，为估值日推后一天的价格变化按年化计算。
+        返回字典，如{'delta': ..., 'delta_std_error': ...} """
+        s0 = self.stock_price
+        r = self.r
+        q = self.q
+        vol = self.volatility
         value_date = self.transformed_value_date
+        num_time_steps = len(self.bus_days) - 1
+
+        engine = self._mc_engine(num_time_steps)
+        knock_out_obs_days, _ = self._knock_out_obs_days()
+
+        def scenario(s=s0, rate=r, sigma=vol, date=value_date):
+            offset = int(self._bus_day_offsets(TuringDateArray.fromDate(date))[0][0])
+            if offset > num_time_steps:
+                raise TuringError("Scenario value date is after expiry")
+            if date == value_date and rate == r:
+                payoffs = (engine.out_values, engine.untriggered_value, engine.knock_in_coef)
+            else:
+                payoffs = self._discounted_payoffs(knock_out_obs_days, rate, date)
+            return TuringSnowballMCScenario(s, rate - q, sigma, *payoffs, offset=offset)
+
+        ds = s0 * spot_bump
+        scenarios = {
+            'base': lambda: scenario(),
+            'spot_up': lambda: scenario(s=s0 + ds),
+            'spot_down': lambda: scenario(s=s0 - ds),
+            'vol_up': lambda: scenario(sigma=vol + vol_bump),
+            'vol_down': lambda: scenario(sigma=vol - vol_bump),
+            'rate_up': lambda: scenario(rate=r + rate_bump),
+            'rate_down': lambda: scenario(rate=r - rate_bump),
+            'theta': lambda: scenario(date=value_date.addDays(1))
+        }
+        # 每个希腊字母表示为各情景价值的线性组合
+        definitions = {
+            'price': {'base': 1.0},
+            'delta': {'spot_up': 0.5 / ds, 'spot_down': -0.5 / ds},
+            'gamma': {'spot_up': 1.0 / ds**2, 'base': -2.0 / ds**2, 'spot_down': 1.0 / ds**2},
+            'vega': {'vol_up': 0.5 / vol_bump, 'vol_down': -0.5 / vol_bump},
+            'rho': {'rate_up': 0.5 / rate_bump, 'rate_down': -0.5 / rate_bump},
+            'theta': {'theta': gDaysInYear, 'base': -gDaysInYear}
+        }
+        for name in greeks:
+            if name not in definitions:
+                raise TuringError(f"Unknown greek: {name}")
+
+        names = []
+        for name in greeks:
+            for scenario_name in definitions[name]:
+                if scenario_name not in names:
+                    names.append(scenario_name)
+        weights = np.zeros((len(greeks), len(names)))
+        for i, name in enumerate(greeks):
+            for scenario_name, weight in definitions[name].items():
+                weights[i, names.index(scenario_name)] = weight
+
+        _, _, estimates, std_errors = engine.value_scenarios(
+            [scenarios[scenario_name]() for scenario_name in names], weights,
+            self.num_ann_obs, self.num_paths, self.seed, self.chunk_size)
+
+        result = {}
+        for i, name in enumerate(greeks):
+            result[name] = float(estimates[i])
+            result[name + '_std_error'] = float(std_errors[i])
+        return result
+
+    def lr_greeks(self) -> dict:
+        """ 在定价的同一次模拟中用似然比方法计算delta、gamma、vega，并给出各自的标准误差
+
+        敲出票息对标的价格不连续，似然比估计量无需扰动，也不会漏掉敲出边界处的跳跃。
+        返回字典，格式与mc_greeks相同 """
+        s0 = self.stock_price
         r = self.r
-        rebate = self.rebate
-        untriggered_rebate = self.untriggered_rebate
-        notional = self.notional
-        texp = self.texp
-        option_type = self.option_type
-        knock_in_type = self.knock_in_type
-        flag = self.annualized_flag
-        participation_rate = self.participation_rate
-        days_in_year = self.days_in_year
-        bus_days = self.bus_days
-
-        # 统计从估值日到到期日之间的敲出观察日
-        knock_out_obs_days = sorted(
-            list(set(self.knock_out_obs_days_whole).intersection(set(bus_days))))
-
-        # 统计敲出观察日在交易日列表中的索引值
-        knock_out_obs_days_index = []
-        for day in knock_out_obs_days:
-            i = bus_days.index(day)
-            knock_out_obs_days_index.append(i)
-
-        out_call_sign = [False] * num_paths
-        out_call_index = [False] * num_paths
-        out_call_index2 = [False] * num_paths
-        in_call_sign = [False] * num_paths
-        out_put_sign = [False] * num_paths
-        out_put_index = [False] * num_paths
-        out_put_index2 = [False] * num_paths
-        in_put_sign = [False] * num_paths
-
-        if option_type == TuringOptionTypes.SNOWBALL_CALL:
-            for p in range(0, num_paths):
-                # 判断每条路径是否存在敲出
-                out_call_sign[p] = any(
-                    [sall[p][i] >= k1 for i in knock_out_obs_days_index])
-
-                # 如果敲出，就填充对应的索引值，用于计算相关天数
-                if out_call_sign[p]:
-                    for i in knock_out_obs_days_index:
-                        if sall[p][i] >= k1:
-                            # 用来计算实际期限
-                            out_call_index[p] = bus_days[i] - start_date
-                            # 用来做折现
-                            out_call_index2[p] = bus_days[i] - value_date
-                            break
-
-                # 每天判断是否敲入
-                in_call_sign[p] = np.any(sall[p] < k2)
-
-        elif option_type == TuringOptionTypes.SNOWBALL_PUT:
-            for p in range(0, num_paths):
-                # 判断每条路径是否存在敲出
-                out_put_sign[p] = any(
-                    [sall[p][i] <= k1 for i in knock_out_obs_days_index])
-
-                # 如果敲出，就填充对应的索引值，用于计算相关天数
-                if out_put_sign[p]:
-                    for i in knock_out_obs_days_index:
-                        if sall[p][i] <= k1:
-                            # 用来计算实际期限
-                            out_put_index[p] = bus_days[i] - start_date
-                            # 用来做折现
-                            out_put_index2[p] = bus_days[i] - value_date
-                            break
-
-                # 每天判断是否敲入
-                in_put_sign[p] = np.any(sall[p] > k2)
-
-        ones = np.ones(num_paths)
-        # list转成ndarray
-        out_call_sign = np.array(out_call_sign)
-        not_out_call_sign = ones - out_call_sign
-        out_call_index = np.array(out_call_index)
-        out_call_index2 = np.array(out_call_index2)
-        in_call_sign = np.array(in_call_sign)
-        not_in_call_sign = ones - in_call_sign
-        out_put_sign = np.array(out_put_sign)
-        not_out_put_sign = ones - out_put_sign
-        out_put_index = np.array(out_put_index)
-        out_put_index2 = np.array(out_put_index2)
-        in_put_sign = np.array(in_put_sign)
-        not_in_put_sign = ones - in_put_sign
-
-        whole_term = (expiry - start_date) / days_in_year
-
-        if option_type == TuringOptionTypes.SNOWBALL_CALL:
-
-            payoff = out_call_sign * ((notional * rebate * (out_call_index / days_in_year)**flag) *
-                                      np.exp(-r * out_call_index2 / days_in_year)) + not_out_call_sign * not_in_call_sign * \
-                ((notional * untriggered_rebate * whole_term**flag) * np.exp(-r * texp))
-
-            if knock_in_type == TuringKnockInTypes.RETURN:
-                payoff += not_out_call_sign * in_call_sign * \
-                    (-notional * (1 - sall[:, -1] / initial_spot) *
-                     participation_rate * np.exp(-r * texp))
-
-            elif knock_in_type == TuringKnockInTypes.VANILLA:
-                payoff += not_out_call_sign * in_call_sign * \
-                    (-notional * np.maximum(sk1 - sall[:, -1] / initial_spot, 0) *
-                     participation_rate * whole_term**flag * np.exp(-r * texp))
-
-            elif knock_in_type == TuringKnockInTypes.SPREADS:
-                payoff += not_out_call_sign * in_call_sign * \
-                    (-notional * np.maximum(sk1 - np.maximum(sall[:, -1] / initial_spot, sk2), 0) *
-                     participation_rate * whole_term**flag * np.exp(-r * texp))
-
-        elif option_type == TuringOptionTypes.SNOWBALL_PUT:
-
-            payoff = out_put_sign * ((notional * rebate * (out_put_index / days_in_year)**flag) *
-                                     np.exp(-r * out_put_index2 / days_in_year)) + not_out_put_sign * not_in_put_sign * \
-                ((notional * untriggered_rebate * whole_term**flag) * np.exp(-r * texp))
-
-            if knock_in_type == TuringKnockInTypes.RETURN:
-                payoff += not_out_put_sign * in_put_sign * \
-                    (-notional * (sall[:, -1] / initial_spot - 1) *
-                     participation_rate * np.exp(-r * texp))
-
-            elif knock_in_type == TuringKnockInTypes.VANILLA:
-                payoff += not_out_put_sign * in_put_sign * \
-                    (-notional * np.maximum(sall[:, -1] / initial_spot - sk1, 0) *
-                     participation_rate * whole_term**flag * np.exp(-r * texp))
-
-            elif knock_in_type == TuringKnockInTypes.SPREADS:
-                payoff += not_out_put_sign * in_put_sign * \
-                    (-notional * np.maximum(np.minimum(sall[:, -1] / initial_spot, sk2) - sk1, 0) *
-                     participation_rate * whole_term**flag * np.exp(-r * texp))
-
-        return payoff.mean()
+        q = self.q
+        vol = self.volatility
+        num_time_steps = len(self.bus_days) - 1
+
+        engine = self._mc_engine(num_time_steps)
+        value, std_error, estimates, std_errors = engine.value_gbm_lr(
+            s0, r - q, vol, self.num_ann_obs, self.num_paths, self.seed, self.chunk_size)
+
+        result = {'price': value, 'price_std_error': std_error}
+        for i, name in enumerate(('delta', 'gamma', 'vega')):
+            result[name] = float(estimates[i])
+            result[name + '_std_error'] = float(std_errors[i])
+        return result
+
+    def _mc_greeks_key(self):
+        """ 决定mc_greeks结果的全部输入：行情、估值日、条款和模拟参数（TuringDate的哈希值都相同，用excel日期） """
+        return (self.stock_price, self.r, self.q, self.volatility,
+                self.transformed_value_date._excelDate, self.expiry._excelDate, self.start_date._excelDate,
+                tuple(day._excelDate for day in self.knock_out_obs_days_whole),
+                self.option_type, self.barrier, self.rebate, self.untriggered_rebate, self.knock_in_price,
+                self.knock_in_type, self.knock_in_strike1, self.knock_in_strike2, self.initial_spot,
+                self.participation_rate, self.notional, self.annualized_flag, self.business_day_adjust_type,
+                self.num_ann_obs, self.days_in_year, self.num_paths, self.seed, self.chunk_size)
+
+    def _start_batch(self, risk_names: list):
+        super()._start_batch(risk_names)
+        self._batch_mc_greeks = tuple(self._mc_greek_measures[name] for name in risk_names
+                                      if name in self._mc_greek_measures)
+
+    def _end_batch(self):
+        super()._end_batch()
+        self.__dict__.pop('_batch_mc_greeks', None)
+
+    def _shared_mc_greek(self, name: str) -> float:
+        """ eq_delta等共用的蒙特卡洛希腊字母，按估值状态缓存
+
+        按mc_greeks的默认bump计算：股价相对bump 1%，波动率绝对bump 0.01，利率绝对bump 1bp，
+        theta为估值日推后一天，均为中心差分（theta除外），与同一种子下bump后的price()重估一致。
+        不沿用EqOption按calculate_greek的bump（股价绝对bump 1e-4、bump属性v），在蒙特卡洛噪声下
+        gamma会被放大到无意义的量级，而雪球定价读取volatility，bump v时vega恒为0。
+        估值状态不变时各希腊字母只模拟一次；批量计算风险指标时，请求的全部希腊字母在第一次用到时
+        由同一次模拟得到，之后的希腊字母直接读取缓存 """
+        key = self._mc_greeks_key()
+        memo = getattr(self, '_mc_greeks_memo', None)
+        if memo is None or memo[0] != key:
+            memo = (key, {})
+            self._mc_greeks_memo = memo
+        results = memo[1]
+        if name not in results:
+            greeks = getattr(self, '_batch_mc_greeks', None) or ()
+            if name not in greeks:
+                greeks = (name,)
+            results.update(self.mc_greeks(greeks))
+        return results[name]
+
+    def eq_delta(self) -> float:
+        return self._shared_mc_greek('delta')
+
+    def eq_gamma(self) -> float:
+        return self._shared_mc_greek('gamma')
+
+    def eq_vega(self) -> float:
+        return self._shared_mc_greek('vega')
+
+    def eq_theta(self) -> float:
+        return self._shared_mc_greek('theta')
+
+    def eq_rho(self) -> float:
+        return self._shared_mc_greek('rho')
+
+    def _payoff(self, sall, num_paths):
+        """ 对给定的路径矩阵计算平均折现收益 """
+        (_, num_steps) = sall.shape
+        engine = self._mc_engine(num_steps - 1)
+        return engine.value_paths(sall[:num_paths]).mean()
 
     def __repr__(self):
         s = super().__repr__()
@@ -6,6 +6,7 @@ from fundamental.turing_db.data import TuringDB
 from fundamental.turing_db.stock_data import StockApi
 from turing_models.instruments.common import Currency, Eq
 from turing_models.instruments.core import InstrumentBase
+from turing_models.market.data.market_data_cache import market_data_cache
 from turing_models.utilities.error import TuringError
 
 
@@ -68,10 +69,13 @@ class Stock(Eq, InstrumentBase):
         """ 调用接口补全股票价格 """
         if self.comb_symbol is not None \
            and self.value_date is not None:
-            original_data = TuringDB.get_stock_price(
+            original_data = market_data_cache.fetch(
+                'stock_price',
+                lambda: TuringDB.get_stock_price(symbol=self.comb_symbol,
+                                                 start=self.value_date,
+                                                 end=self.value_date),
                 symbol=self.comb_symbol,
-                start=self.value_date,
-                end=self.value_date
+                date=self.value_date
             )
             if not original_data.empty:
                 if isinstance(self.value_date, str) and self.value_date == 'latest':
@@ -6,6 +6,7 @@ from fundamental.turing_db.data import TuringDB
 from fundamental.turing_db.fx_data import FxApi
 from turing_models.instruments.common import FX, CurrencyPair
 from turing_models.instruments.core import InstrumentBase
+from turing_models.market.data.market_data_cache import market_data_cache
 from turing_models.utilities.error import TuringError
 
 
@@ -60,7 +61,11 @@ class ForeignExchange(FX, InstrumentBase):
         """从接口获取汇率"""
         if self.comb_symbol is not None \
            and self.value_date is not None:
-            original_data = TuringDB.exchange_rate(symbol=self.comb_symbol, date=self.value_date)
+            original_data = market_data_cache.fetch(
+                'exchange_rate',
+                lambda: TuringDB.exchange_rate(symbol=self.comb_symbol, date=self.value_date),
+                symbol=self.comb_symbol,
+                date=self.value_date)
             if original_data is not None:
                 self.exchange_rate = original_data[self.comb_symbol]
             else:
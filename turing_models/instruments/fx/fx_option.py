@@ -16,7 +16,9 @@ from turing_models.instruments.common import FX, Currency, CurrencyPair, Discoun
 from turing_models.instruments.core import InstrumentBase
 from turing_models.market.curves.curve_generation import DomDiscountCurveGen, ForDiscountCurveGen, FXForwardCurveGen
 from turing_models.market.volatility.vol_surface_generation import FXVolSurfaceGen
+from turing_models.market.data.market_data_cache import market_data_cache
 from turing_models.models.model_volatility_fns import TuringVolFunctionTypes
+from turing_models.utilities.dependency_graph import DependencyGraph
 from turing_models.utilities.error import TuringError
 from turing_models.utilities.global_types import OptionType, TuringExerciseType
 from turing_models.utilities.helper_functions import to_datetime, to_turing_date
@@ -47,6 +49,7 @@ class FXOption(FX, InstrumentBase, metaclass=ABCMeta):
     volatility: float = None
 
     def __post_init__(self):
+        self._graph = self._build_graph()
         super().__init__()
         self.check_underlier()
         self.domestic_name = None
@@ -93,9 +96,46 @@ class FXOption(FX, InstrumentBase, metaclass=ABCMeta):
         if not self.cut_off_time or not isinstance(self.cut_off_time, TuringDate):
             self.cut_off_time = self.expiry
 
+    def _build_graph(self):
+        """ 构建行情→曲线→波动率曲面的依赖图，各节点按输入缓存，
+        ctx中的值或bump的属性变化时只重算其下游节点 """
+        graph = DependencyGraph()
+        graph.add('value_date', self._calc_value_date,
+                  key=lambda: (getattr(self, '_value_date_', None), self._original_value_date, self.start_date))
+        graph.add('exchange_rate', self._calc_exchange_rate,
+                  key=lambda: (getattr(self, '_exchange_rate', None), self.underlier_symbol,
+                               self.ctx_exchange_rate(currency_pair=self.underlier_symbol),
+                               self._original_value_date))
+        graph.add('shibor_data', self._calc_shibor_data,
+                  key=lambda: (self.ctx_global_ibor_curve(ibor_type='Shibor', currency='CNY'),
+                               self._original_value_date))
+        graph.add('shibor_swap_data', self._calc_shibor_swap_data,
+                  key=lambda: (self.ctx_irs_curve(ir_type="Shibor3M", currency='CNY'),
+                               self._original_value_date))
+        graph.add('fx_swap_data', self._calc_fx_swap_data,
+                  key=lambda: (self.underlier_symbol,
+                               self.ctx_fx_swap_curve(currency_pair=self.underlier_symbol),
+                               self._original_value_date))
+        graph.add('fx_implied_vol_data', self._calc_fx_implied_vol_data,
+                  key=lambda: (self.underlier_symbol,
+                               self.ctx_fx_implied_volatility_curve(currency_pair=self.underlier_symbol,
+                                                                    volatility_type=self.volatility_type),
+                               self._original_value_date))
+        graph.add('domestic_discount_curve', self._calc_domestic_discount_curve)
+        graph.add('fx_forward_curve', self._calc_fx_forward_curve)
+        graph.add('foreign_discount_curve', self._calc_foreign_discount_curve)
+        graph.add('volatility_surface', self._calc_volatility_surface)
+        graph.add('volatility', self._calc_volatility,
+                  key=lambda: (getattr(self, '_volatility', None), self.ctx_volatility(self.underlier_symbol),
+                               self.volatility, self.strike, self.expiry))
+        return graph
+
     @property
     def _value_date(self):
         """优先考虑通过what-if传出的估值日期"""
+        return self._graph.value('value_date')
+
+    def _calc_value_date(self):
         if getattr(self, '_value_date_', None) is not None:
             return getattr(self, '_value_date_', None)
         date = to_turing_date(self._original_value_date)
@@ -129,13 +169,19 @@ class FXOption(FX, InstrumentBase, metaclass=ABCMeta):
     @property
     def get_exchange_rate(self):
         """从接口获取汇率"""
+        return self._graph.value('exchange_rate')
+
+    def _calc_exchange_rate(self):
         if getattr(self, "_exchange_rate", None) is not None:
             return getattr(self, "_exchange_rate", None)
         exchange_rate = self.ctx_exchange_rate(currency_pair=self.underlier_symbol)
         if exchange_rate is not None:
             return exchange_rate
         date = self._original_value_date
-        original_data = TuringDB.exchange_rate(symbol=self.underlier_symbol, date=date)
+        original_data = market_data_cache.fetch(
+            'exchange_rate',
+            lambda: TuringDB.exchange_rate(symbol=self.underlier_symbol, date=date),
+            symbol=self.underlier_symbol, date=date)
         if original_data is not None:
             data = original_data[self.underlier_symbol]
             self.exchange_rate = data
@@ -150,11 +196,17 @@ class FXOption(FX, InstrumentBase, metaclass=ABCMeta):
     @property
     def get_shibor_data(self):
         """ 从接口获取shibor """
+        return self._graph.value('shibor_data')
+
+    def _calc_shibor_data(self):
         shibor_data = self.ctx_global_ibor_curve(ibor_type='Shibor', currency='CNY')
         if shibor_data is not None:
             return pd.DataFrame(shibor_data)
         date = self._original_value_date
-        original_data = TuringDB.get_global_ibor_curve(ibor_type='Shibor', currency='CNY', start=date, end=date)
+        original_data = market_data_cache.fetch(
+            'global_ibor_curve',
+            lambda: TuringDB.get_global_ibor_curve(ibor_type='Shibor', currency='CNY', start=date, end=date),
+            symbol=('Shibor', 'CNY'), date=date)
         if not original_data.empty:
             return original_data
         else:
@@ -163,11 +215,17 @@ class FXOption(FX, InstrumentBase, metaclass=ABCMeta):
     @property
     def get_shibor_swap_data(self):
         """ 从接口获取利率互换曲线 """
+        return self._graph.value('shibor_swap_data')
+
+    def _calc_shibor_swap_data(self):
         irs_curve = self.ctx_irs_curve(ir_type="Shibor3M", currency='CNY')
         if irs_curve is not None:
             return pd.DataFrame(irs_curve)
         date = self._original_value_date
-        original_data = TuringDB.get_irs_curve(ir_type="Shibor3M", currency='CNY', start=date, end=date)
+        original_data = market_data_cache.fetch(
+            'irs_curve',
+            lambda: TuringDB.get_irs_curve(ir_type="Shibor3M", currency='CNY', start=date, end=date),
+            symbol=('Shibor3M', 'CNY'), date=date)
         if not original_data.empty:
             return original_data.loc["Shibor3M"]
         else:
@@ -176,29 +234,45 @@ class FXOption(FX, InstrumentBase, metaclass=ABCMeta):
     @property
     def get_fx_swap_data(self):
         """ 获取外汇掉期曲线 """
+        return self._graph.value('fx_swap_data')
+
+    def _calc_fx_swap_data(self):
         fx_swap_curve = self.ctx_fx_swap_curve(currency_pair=self.underlier_symbol)
         if fx_swap_curve is not None:
             return pd.DataFrame(fx_swap_curve)
         date = self._original_value_date
-        original_data = TuringDB.get_fx_swap_curve(currency_pair=self.underlier_symbol, start=date, end=date)
+        original_data = market_data_cache.fetch(
+            'fx_swap_curve',
+            lambda: TuringDB.get_fx_swap_curve(currency_pair=self.underlier_symbol, start=date, end=date),
+            symbol=self.underlier_symbol, date=date)
         if not original_data.empty:
             return original_data.loc[self.underlier_symbol]
         else:
             raise TuringError(f"Cannot find fx swap curve data for {self.underlier_symbol}")
 
+    @property
+    def volatility_type(self):
+        return ["ATM", "25D BF", "25D RR", "10D BF", "10D RR"]
+
     @property
     def get_fx_implied_vol_data(self):
         """ 获取外汇期权隐含波动率曲线 """
-        volatility_type = ["ATM", "25D BF", "25D RR", "10D BF", "10D RR"]
+        return self._graph.value('fx_implied_vol_data')
+
+    def _calc_fx_implied_vol_data(self):
+        volatility_type = self.volatility_type
         fx_implied_volatility_curve = self.ctx_fx_implied_volatility_curve(currency_pair=self.underlier_symbol,
                                                                            volatility_type=volatility_type)
         if fx_implied_volatility_curve is not None:
             return pd.DataFrame(fx_implied_volatility_curve)
         date = self._original_value_date
-        original_data = TuringDB.get_fx_implied_volatility_curve(currency_pair=self.underlier_symbol,
-                                                                 volatility_type=volatility_type,
-                                                                 start=date,
-                                                                 end=date)
+        original_data = market_data_cache.fetch(
+            'fx_implied_volatility_curve',
+            lambda: TuringDB.get_fx_implied_volatility_curve(currency_pair=self.underlier_symbol,
+                                                             volatility_type=volatility_type,
+                                                             start=date,
+                                                             end=date),
+            symbol=(self.underlier_symbol, tuple(volatility_type)), date=date)
         if not original_data.empty:
             tenor = original_data.loc[self.underlier_symbol].loc["ATM"]['tenor']
             origin_tenor = original_data.loc[self.underlier_symbol].loc["ATM"]['origin_tenor']
@@ -219,6 +293,9 @@ class FXOption(FX, InstrumentBase, metaclass=ABCMeta):
 
     @property
     def domestic_discount_curve(self):
+        return self._graph.value('domestic_discount_curve')
+
+    def _calc_domestic_discount_curve(self):
         return DomDiscountCurveGen(value_date=self._value_date,
                                    shibor_tenors=self.get_shibor_data['tenor'].tolist(),
                                    shibor_rates=self.get_shibor_data['rate'].tolist(),
@@ -228,6 +305,9 @@ class FXOption(FX, InstrumentBase, metaclass=ABCMeta):
 
     @property
     def fx_forward_curve(self):
+        return self._graph.value('fx_forward_curve')
+
+    def _calc_fx_forward_curve(self):
         return FXForwardCurveGen(value_date=self._value_date,
                                  exchange_rate=self.get_exchange_rate,
                                  fx_swap_tenors=self.get_fx_swap_data['tenor'].tolist(),
@@ -235,6 +315,9 @@ class FXOption(FX, InstrumentBase, metaclass=ABCMeta):
 
     @property
     def foreign_discount_curve(self):
+        return self._graph.value('foreign_discount_curve')
+
+    def _calc_foreign_discount_curve(self):
         return ForDiscountCurveGen(value_date=self._value_date,
                                    domestic_discount_curve=self.domestic_discount_curve,
                                    fx_forward_curve=self.fx_forward_curve,
@@ -242,6 +325,9 @@ class FXOption(FX, InstrumentBase, metaclass=ABCMeta):
 
     @property
     def volatility_surface(self):
+        return self._graph.value('volatility_surface')
+
+    def _calc_volatility_surface(self):
         if self.underlier_symbol:
             return FXVolSurfaceGen(value_date=self._value_date,
                                    currency_pair=self.underlier_symbol,
@@ -290,6 +376,9 @@ class FXOption(FX, InstrumentBase, metaclass=ABCMeta):
 
     @property
     def volatility_(self):
+        return self._graph.value('volatility')
+
+    def _calc_volatility(self):
         if getattr(self, '_volatility', None) is not None:
             return getattr(self, '_volatility', None)
         v = self.ctx_volatility(self.underlier_symbol) or self.volatility or self.volatility_surface.volatilityFromStrikeDate(self.strike, self.expiry)
@@ -54,12 +54,24 @@ class FXVanillaOption(FXOption):
         else:
             raise TuringError('Please check the input of option_type')
 
+    def _build_graph(self):
+        """ 在曲线和波动率曲面节点之后追加价格节点，合约条款作为节点的键 """
+        graph = super()._build_graph()
+        graph.add('price', self._calc_price,
+                  key=lambda: (self.strike, self.option_type, self.exercise_type, self.cut_off_time,
+                               self.expiry, self.spot_days, self.premium_currency,
+                               self.notional_dom, self.notional_for))
+        return graph
+
     def price(self):
         """ This function calculates the value of the option using a specified
         model with the resulting value being in domestic i.e. ccy2 terms.
         Recall that Domestic = CCY2 and Foreign = CCY1 and FX rate is in
         price in domestic of one unit of foreign currency. """
 
+        return self._graph.value('price')
+
+    def _calc_price(self):
         s0 = self.get_exchange_rate
         K = self.strike
         df_d = self.df_d
@@ -3,22 +3,117 @@ from abc import ABCMeta
 from dataclasses import dataclass
 from typing import Union
 
+import numpy as np
+
 from fundamental.turing_db.bond_data import BondApi
 from turing_models.instruments.common import IR, YieldCurveCode, CurveCode, CurveAdjustment, Currency
 from turing_models.instruments.core import InstrumentBase
+from turing_models.market.curves.discount_curve import TuringDiscountCurve
 from turing_models.utilities.calendar import TuringCalendarTypes, TuringBusDayAdjustTypes, \
     TuringDateGenRuleTypes, TuringCalendar
 from turing_models.utilities.day_count import DayCountType, TuringDayCount
 from turing_models.utilities.error import TuringError
 from turing_models.utilities.frequency import TuringFrequency, FrequencyType
 from turing_models.utilities.global_types import TuringYTMCalcType, CouponType
-from turing_models.utilities.helper_functions import to_turing_date
+from turing_models.utilities.global_variables import gSmall
+from turing_models.utilities.helper_functions import to_turing_date, timesFromDates
 from turing_models.utilities.schedule import TuringSchedule
 from turing_utils.log.request_id_log import logger
 
 dy = 0.0001
 
 
+def coupon_bond_price_from_ytm(ytm, frequency, coupon_rate, redemption, num_after_ncd, alpha, use_vw, par):
+    """ 付息债券由YTM计算全价及其对YTM的一阶、二阶解析导数
+
+    与BondFixedRate.full_price_from_ytm的公式相同：下一付息日的价值为c/f * (1 + v + ... + v^n) + R * v^n，
+    再按v^alpha（UK_DMO）或1 / (1 + alpha * y / f)（use_vw为True时）贴现到结算日。
+    参数均可为数组并相互广播，按现金流逐项求和以避免收益率接近0时闭式公式的数值误差。 """
+    ytm, frequency, coupon_rate, redemption, num_after_ncd, alpha, use_vw, par = np.broadcast_arrays(
+        ytm, frequency, coupon_rate, redemption, num_after_ncd, alpha, use_vw, par)
+    shape = ytm.shape
+    y = ytm.ravel().astype(np.float64)
+    f = frequency.ravel().astype(np.float64)
+    a = alpha.ravel().astype(np.float64)
+    r = redemption.ravel().astype(np.float64)
+    n = num_after_ncd.ravel().astype(np.int64)
+    cf = coupon_rate.ravel() / f
+
+    v = 1.0 / (1.0 + y / f)
+    dv = -v * v / f
+    d2v = 2.0 * v ** 3 / (f * f)
+
+    # 逐个元素展开k = 0, ..., n
+    counts = n + 1
+    element = np.repeat(np.arange(len(y)), counts)
+    k = np.arange(len(element)) - np.repeat(np.cumsum(counts) - counts, counts)
+    vk = v[element] ** k
+    s = cf * np.bincount(element, vk, len(y)) + r * v ** n
+    ds = cf * np.bincount(element, k * vk / v[element], len(y)) + r * n * v ** n / v
+    d2s = cf * np.bincount(element, k * (k - 1) * vk / v[element] ** 2, len(y)) + r * n * (n - 1) * v ** n / v ** 2
+
+    vw = 1.0 / (1.0 + a * y / f)
+    va = v ** a
+    use_vw = use_vw.ravel()
+    disc = np.where(use_vw, vw, va)
+    ddisc = np.where(use_vw, -vw * vw * a / f, a * va / v * dv)
+    d2disc = np.where(use_vw, 2.0 * vw ** 3 * (a / f) ** 2,
+                      a * (a - 1.0) * va / (v * v) * dv * dv + a * va / v * d2v)
+
+    sy = ds * dv
+    s2y = d2s * dv * dv + ds * d2v
+    p = par.ravel()
+    price = p * disc * s
+    deriv = p * (ddisc * s + disc * sy)
+    deriv2 = p * (d2disc * s + 2.0 * ddisc * sy + disc * s2y)
+    return price.reshape(shape), deriv.reshape(shape), deriv2.reshape(shape)
+
+
+def ytm_uses_simple_first_period(convention, num_after_ncd):
+    """ YTM公式中结算日到下一付息日是否按1 / (1 + alpha * y / f)贴现（否则按v^alpha），
+    与BondFixedRate.full_price_from_ytm一致：US_TREASURY在下一付息日后还有现金流时使用，
+    US_STREET只在最后一期使用，UK_DMO不使用 """
+    if convention == TuringYTMCalcType.UK_DMO:
+        return np.zeros_like(num_after_ncd, dtype=bool)[()]
+    elif convention == TuringYTMCalcType.US_TREASURY:
+        return (np.asarray(num_after_ncd) != 0)[()]
+    elif convention == TuringYTMCalcType.US_STREET:
+        return (np.asarray(num_after_ncd) == 0)[()]
+    raise TuringError("Unknown yield convention")
+
+
+def zero_coupon_bond_price_from_ytm(ytm, time_to_maturity, amount):
+    """ 零息和贴现债券由YTM计算全价及其对YTM的一阶、二阶解析导数，amount为到期支付额（已乘面值） """
+    y = np.asarray(ytm, dtype=np.float64)
+    t = np.asarray(time_to_maturity, dtype=np.float64)
+    with np.errstate(over='ignore', invalid='ignore'):
+        short = t <= 1
+        price = np.where(short, amount / (y * t + 1), (amount / (y + 1)) ** t)
+        deriv = np.where(short, -amount * t / (y * t + 1) ** 2, -t * price / (y + 1))
+        deriv2 = np.where(short, 2.0 * amount * t * t / (y * t + 1) ** 3, t * (t + 1) * price / (y + 1) ** 2)
+    return price, deriv, deriv2
+
+
+def compounded_df_log_derivatives(rate, times, frequency):
+    """ 复利频率为frequency的平坦零息利率下的贴现因子，以及对数贴现因子对利率的一阶、二阶导数
+    （与TuringDiscountCurveFlat.df一致，期限不小于gSmall） """
+    t = np.maximum(times, gSmall)
+    base = 1.0 + rate / frequency
+    df = base ** (-frequency * t)
+    return df, -t / base, t / (frequency * base * base)
+
+
+def curve_dfs(curve, dates):
+    """ 对一组日期一次计算贴现因子，与逐个日期调用curve.df一致（期限为0时贴现因子为1） """
+    times = np.atleast_1d(timesFromDates(dates, curve._valuationDate, curve._dayCountType))
+    if type(curve).df is TuringDiscountCurve.df:
+        # 基类的df只是先算期限再插值，期限已算出时直接插值
+        dfs = np.atleast_1d(curve._df(times))
+    else:
+        dfs = np.atleast_1d(curve.df(dates))
+    return np.where(np.abs(times) < gSmall, 1.0, dfs)
+
+
 @dataclass(repr=False, eq=False, order=False, unsafe_hash=True)
 class Bond(IR, InstrumentBase, metaclass=ABCMeta):
     asset_id: str = None
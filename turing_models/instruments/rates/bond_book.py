@@ -0,0 +1,535 @@
+import numpy as np
+
+from turing_models.instruments.rates.bond import dy, coupon_bond_price_from_ytm, zero_coupon_bond_price_from_ytm, \
+    ytm_uses_simple_first_period
+from turing_models.market.curves.curve_adjust import CurveAdjustmentImpl
+from turing_models.market.curves.curve_scenario import TuringCurveScenarios, TuringCurveScenarioGenerator
+from turing_models.market.curves.discount_curve import TuringDiscountCurve
+from turing_models.market.curves.interpolator import TuringInterpTypes
+from turing_models.utilities.day_count import TuringDayCount
+from turing_models.utilities.error import TuringError
+from turing_models.utilities.frequency import TuringFrequency, FrequencyType
+from turing_models.utilities.global_types import CouponType
+from turing_models.utilities.global_variables import gSmall
+from turing_models.utilities.helper_functions import timesFromDates
+from turing_models.utilities.solvers_1d import newton_vector, vector_results
+from turing_models.utilities.turing_date_array import TuringDateArray
+
+
+class BondBook:
+    """ 固定利率债券组合的向量化定价引擎
+
+    把组合内所有BondFixedRate结算日之后的现金流日期和金额按债券依次拼接成一维数组（不规则数组，
+    用每只债券的起始下标划分），每条曲线只计算一次全部现金流的贴现因子，再用np.add.reduceat
+    按债券汇总，一次得到全价、净价、DV01和凸性。
+    DV01和凸性是对曲线连续复利零息利率平行移动的解析导数（与TuringDiscountCurve.bump一致），
+    单位与BondFixedRate.dv01相同（每1bp、按面值计）。
+    yield_to_maturity和implied_spread用带解析导数的向量化牛顿法一次反解大量债券或价格点的YTM和隐含基差。
+    curves也可以是TuringCurveScenarios情景块，此时一次得到形状为(情景数, 债券数)的结果，用于压力测试。 """
+
+    def __init__(self, bonds: list):
+        if len(bonds) == 0:
+            raise TuringError("Bond book is empty")
+
+        self.bonds = list(bonds)
+        self._pack_cash_flows()
+        self._accrued_interest = self._calc_accrued_interest()
+
+    def __len__(self):
+        return len(self.bonds)
+
+    def _pack_cash_flows(self):
+        """ 拼接结算日之后的现金流，本金并入最后一笔现金流 """
+        flow_ordinals = []
+        flow_amounts = []
+        offsets = np.zeros(len(self.bonds), dtype=np.int64)
+        pcd_ordinals = np.zeros(len(self.bonds), dtype=np.int64)
+        ncd_ordinals = np.zeros(len(self.bonds), dtype=np.int64)
+        num_after_ncd = np.zeros(len(self.bonds), dtype=np.int64)
+
+        for i, bond in enumerate(self.bonds):
+            for attr in ('_flow_dates', 'settlement_date', 'par', 'coupon_rate', 'pay_interest_mode'):
+                if getattr(bond, attr, None) is None:
+                    raise TuringError(f"Bond {i} has no {attr}")
+
+            settle = bond.settlement_date
+            flow_dates = bond._flow_dates
+            excel_dates = np.array([dt._excelDate for dt in flow_dates])
+            # 与full_price_from_discount_curve一致：计入结算日当天及之后的现金流
+            first = max(int(np.searchsorted(excel_dates, settle._excelDate, side='left')), 1)
+            num_flows = len(flow_dates) - first
+            if num_flows <= 0:
+                raise TuringError(f"Bond {i} has no coupons left")
+
+            if bond.pay_interest_mode == CouponType.COUPON_CARRYING:
+                cpn = bond.coupon_rate / bond.frequency
+            else:
+                cpn = bond._flow_amounts[-1]
+            amounts = np.full(num_flows, cpn, dtype=np.float64)
+            amounts[-1] += bond._redemption
+
+            offsets[i] = len(flow_amounts)
+            flow_ordinals.extend(dt._ordinal for dt in flow_dates[first:])
+            flow_amounts.extend(amounts)
+            pcd_ordinals[i] = flow_dates[first - 1]._ordinal  # 结算日前一个现金流
+            ncd_ordinals[i] = flow_dates[first]._ordinal  # 结算日后一个现金流
+            # 与full_price_from_ytm一致：下一付息日后的现金流个数
+            num_after_ncd[i] = len(flow_dates) - int(np.searchsorted(excel_dates, settle._excelDate, side='right')) - 1
+
+        self._offsets = offsets
+        self._flow_dates = TuringDateArray.fromOrdinals(np.array(flow_ordinals, dtype=np.int64))
+        self._flow_amounts = np.array(flow_amounts)
+        self._flow_bond = np.repeat(np.arange(len(self.bonds)),
+                                    np.diff(np.append(offsets, len(flow_amounts))))
+        self._settlement_dates = TuringDateArray([bond.settlement_date for bond in self.bonds])
+        self._pcd = TuringDateArray.fromOrdinals(pcd_ordinals)
+        self._ncd = TuringDateArray.fromOrdinals(ncd_ordinals)
+        self._par = np.array([bond.par for bond in self.bonds], dtype=np.float64)
+        self._coupon_rate = np.array([bond.coupon_rate for bond in self.bonds], dtype=np.float64)
+        self._num_after_ncd = num_after_ncd
+        self._coupon_carrying = np.array([bond.pay_interest_mode == CouponType.COUPON_CARRYING
+                                          for bond in self.bonds])
+        self._redemption = np.array([bond._redemption for bond in self.bonds], dtype=np.float64)
+
+    def _calc_accrued_interest(self):
+        """ 应计利息，按计息规则分组向量化计算 """
+        acc_factor = np.zeros(len(self.bonds))
+        groups = {}
+        for i, bond in enumerate(self.bonds):
+            key = (bond.interest_rules, bond.pay_interest_mode, bond.pay_interest_cycle)
+            groups.setdefault(key, []).append(i)
+
+        for (interest_rules, pay_interest_mode, pay_interest_cycle), index in groups.items():
+            if interest_rules is None:
+                raise TuringError("Bond has no interest_rules")
+            index = np.array(index)
+            dc = TuringDayCount(interest_rules)
+            pcd = self._pcd[index]
+            settle = self._settlement_dates[index]
+            if pay_interest_mode == CouponType.COUPON_CARRYING:
+                acc_factor[index] = dc.yearFracs(pcd, settle, self._ncd[index], pay_interest_cycle)
+            else:
+                acc_factor[index] = dc.yearFracs(pcd, settle)
+
+        # 结算日在除息日之后的减去一期（固定利率债券除息天数为0，通常不会发生）
+        for i, bond in enumerate(self.bonds):
+            num_ex_dividend_days = getattr(bond, '_num_ex_dividend_days', 0)
+            if num_ex_dividend_days and bond.pay_interest_mode == CouponType.COUPON_CARRYING:
+                ex_dividend_date = bond.calendar.addBusinessDays(self._ncd[i], -num_ex_dividend_days)
+                if bond.settlement_date > ex_dividend_date:
+                    acc_factor[i] -= 1.0 / bond.frequency
+
+        self._acc_factor = acc_factor
+        return acc_factor * self._par * self._coupon_rate
+
+    def accrued_interest(self):
+        """ 各债券的应计利息 """
+        return self._accrued_interest.copy()
+
+    def _curve_groups(self, curves):
+        """ 返回[(曲线, 债券下标)]列表，curves为None时使用各债券自身的拟合曲线，相同曲线只构建一次 """
+        if curves is None:
+            # 先按曲线数据对象、基差和结算日分组，每组只取一次曲线，避免逐只债券从DataFrame生成缓存键
+            groups = {}
+            for i, bond in enumerate(self.bonds):
+                key = (id(bond.cv.curve_data), bond._spread_adjustment, bond.settlement_date._excelDate)
+                if key not in groups:
+                    groups[key] = (bond, [])
+                groups[key][1].append(i)
+            return [(bond.fitted_curve(), np.array(index)) for bond, index in groups.values()]
+        elif isinstance(curves, TuringDiscountCurve):
+            return [(curves, np.arange(len(self.bonds)))]
+        else:
+            raise TuringError("Curve must be a TuringDiscountCurve")
+
+    def _flow_values(self, curves):
+        """ 每笔现金流相对结算日的贴现值和期限（年） """
+        if isinstance(curves, TuringCurveScenarios):
+            return self._scenario_flow_values(curves)
+
+        pv = np.empty(len(self._flow_amounts))
+        tau = np.empty(len(self._flow_amounts))
+        for curve, index in self._curve_groups(curves):
+            if len(index) == len(self.bonds):
+                flow_mask = slice(None)
+                flow_bond = self._flow_bond
+            else:
+                flow_mask = np.isin(self._flow_bond, index)
+                # 债券下标映射到子集内的位置
+                position = np.zeros(len(self.bonds), dtype=np.int64)
+                position[index] = np.arange(len(index))
+                flow_bond = position[self._flow_bond[flow_mask]]
+
+            t_flow = timesFromDates(self._flow_dates[flow_mask], curve._valuationDate, curve._dayCountType)
+            t_settle = timesFromDates(self._settlement_dates[index], curve._valuationDate, curve._dayCountType)
+            df_flow = self._curve_df(curve, t_flow)
+            df_settle = self._curve_df(curve, t_settle)
+
+            pv[flow_mask] = self._flow_amounts[flow_mask] * df_flow / df_settle[flow_bond]
+            tau[flow_mask] = t_flow - t_settle[flow_bond]
+        return pv, tau
+
+    def _scenario_flow_values(self, scenarios, index=None):
+        """ 情景块下的现金流贴现值，形状为(情景数, 现金流数)，所有债券使用同一组情景曲线；
+        index不为None时只计算这些债券（按下标升序）的现金流 """
+        if index is None:
+            flow_mask = slice(None)
+            flow_bond = self._flow_bond
+            settlement_dates = self._settlement_dates
+        else:
+            flow_mask = np.isin(self._flow_bond, index)
+            flow_bond = np.repeat(np.arange(len(index)), self._flow_counts()[index])
+            settlement_dates = self._settlement_dates[index]
+        t_flow = timesFromDates(self._flow_dates[flow_mask], scenarios._valuationDate, scenarios._dayCountType)
+        t_settle = timesFromDates(settlement_dates, scenarios._valuationDate, scenarios._dayCountType)
+        df_flow = self._curve_df(scenarios, t_flow)
+        df_settle = self._curve_df(scenarios, t_settle)
+        pv = self._flow_amounts[flow_mask] * df_flow / df_settle[:, flow_bond]
+        return pv, t_flow - t_settle[flow_bond]
+
+    def _flow_counts(self):
+        """ 每只债券的现金流个数 """
+        return np.diff(np.append(self._offsets, len(self._flow_amounts)))
+
+    @staticmethod
+    def _curve_df(curve, times):
+        """ 向量化的贴现因子，与逐个日期调用curve.df一致：期限为0时贴现因子为1 """
+        times = np.asarray(times, dtype=np.float64)
+        return np.where(np.abs(times) < gSmall, 1.0, curve._df(times))
+
+    def _reduce(self, values):
+        """ 按债券汇总现金流，values的最后一维对应现金流 """
+        return np.add.reduceat(values, self._offsets, axis=-1) * self._par
+
+    def _evaluate(self, func, curves):
+        if isinstance(curves, (list, tuple)):
+            return np.array([func(curve) for curve in curves])
+        return func(curves)
+
+    def full_price(self, curves=None):
+        """ 通过利率曲线计算全价
+
+        curves为None时每只债券使用自身经基差调整的曲线（与BondFixedRate.full_price_from_discount_curve一致），
+        为一条曲线时所有债券使用这条曲线，为曲线列表或TuringCurveScenarios时返回形状为(曲线数, 债券数)的数组 """
+        return self._evaluate(lambda curve: self._reduce(self._flow_values(curve)[0]), curves)
+
+    def clean_price(self, curves=None):
+        """ 通过利率曲线计算净价 """
+        return self._evaluate(lambda curve: self._reduce(self._flow_values(curve)[0])
+                              - self._accrued_interest, curves)
+
+    def dv01(self, curves=None):
+        """ 曲线平行上移1bp的价格减少量 """
+        return self._evaluate(lambda curve: self._risk(curve)['dv01'], curves)
+
+    def dollar_convexity(self, curves=None):
+        """ 价格对曲线平行移动的二阶导数 """
+        return self._evaluate(lambda curve: self._risk(curve)['dollar_convexity'], curves)
+
+    def risk(self, curves=None):
+        """ 一次计算全价、净价、应计利息、DV01和凸性，返回字典 """
+        if isinstance(curves, (list, tuple)):
+            results = [self._risk(curve) for curve in curves]
+            return {k: np.array([r[k] for r in results]) for k in results[0]}
+        return self._risk(curves)
+
+    def _risk(self, curves):
+        pv, tau = self._flow_values(curves)
+        full_price = self._reduce(pv)
+        return {'full_price': full_price,
+                'clean_price': full_price - self._accrued_interest,
+                'accrued_interest': self._accrued_interest.copy(),
+                'dv01': self._reduce(pv * tau) * dy,
+                'dollar_convexity': self._reduce(pv * tau * tau)}
+
+    def _shocked_full_price(self, shift_fn, num_scenarios: int):
+        """ 按曲线分组，对每组曲线用shift_fn(generator)生成的节点利率平移矩阵一次定价全部情景，
+        返回形状为(情景数, 债券数)的数组 """
+        counts = self._flow_counts()
+        prices = np.empty((num_scenarios, len(self.bonds)))
+        for curve, index in self._curve_groups(None):
+            generator = TuringCurveScenarioGenerator(curve)
+            scenarios = generator.scenarios(shift_fn(generator))
+            pv = self._scenario_flow_values(scenarios, index)[0]
+            offsets = np.cumsum(counts[index]) - counts[index]
+            prices[:, index] = np.add.reduceat(pv, offsets, axis=-1) * self._par[index]
+        return prices
+
+    def key_rate_full_price(self, key_tenors: list, shocks):
+        """ 对每只债券自身的曲线（与full_price()相同）施加同一组关键期限利率冲击后的全价
+
+        shocks的形状为(情景数, 关键期限数)，单位bp，冲击形状见TuringCurveScenarioGenerator.keyRate。
+        按曲线分组，每组曲线的全部情景一次定价，返回形状为(情景数, 债券数)的数组 """
+        shocks = np.atleast_2d(np.asarray(shocks, dtype=np.float64))
+        return self._shocked_full_price(lambda generator: generator.keyRate(shocks, key_tenors), len(shocks))
+
+    def parallel_full_price(self, shifts):
+        """ 每只债券自身的曲线平移shifts（bp，每个情景一个值）后的全价，返回形状为(情景数, 债券数)的数组 """
+        shifts = np.atleast_1d(np.asarray(shifts, dtype=np.float64))
+        return self._shocked_full_price(lambda generator: generator.parallel(shifts), len(shifts))
+
+    def key_rate_risk(self, key_tenors: list, bump: float = 1.0):
+        """ 全价对自身曲线各关键期限利率（bp）的一阶和二阶导数
+
+        对所有关键期限一次生成单独上移、下移bump（bp）以及两两同时上下移动的情景，用中心差分得到一阶导数和
+        二阶导数矩阵，返回字典：full_price形状为(债券数,)，delta为(债券数, 关键期限数)，
+        gamma为(债券数, 关键期限数, 关键期限数) """
+        m = len(key_tenors)
+        unit = np.eye(m) * bump
+        j, k = np.triu_indices(m, 1)
+        shocks = np.vstack([np.zeros((1, m)), unit, -unit,
+                            unit[j] + unit[k], unit[j] - unit[k], -unit[j] + unit[k], -unit[j] - unit[k]])
+        prices = self.key_rate_full_price(key_tenors, shocks)
+
+        num_pairs = len(j)
+        base = prices[0]
+        up = prices[1:m + 1]
+        down = prices[m + 1:2 * m + 1]
+        pp, pm, mp, mm = prices[2 * m + 1:].reshape(4, num_pairs, len(self.bonds))
+
+        delta = (up - down).T / (2.0 * bump)
+        gamma = np.zeros((len(self.bonds), m, m))
+        diagonal = np.arange(m)
+        gamma[:, diagonal, diagonal] = (up + down - 2.0 * base).T / (bump * bump)
+        cross = (pp - pm - mp + mm).T / (4.0 * bump * bump)
+        gamma[:, j, k] = cross
+        gamma[:, k, j] = cross
+        return {'full_price': base, 'delta': delta, 'gamma': gamma}
+
+    def _flatten_prices(self, prices):
+        """ 展开价格数组（最后一维对应债券），返回展开后的价格和每个元素对应的债券下标 """
+        prices = np.asarray(prices, dtype=np.float64)
+        if prices.ndim == 0 or prices.shape[-1] != len(self.bonds):
+            raise TuringError("The last dimension of prices must equal the number of bonds")
+        index = np.broadcast_to(np.arange(len(self.bonds)), prices.shape).ravel()
+        return prices.ravel(), index
+
+    def _ytm_data(self):
+        """ YTM定价公式用到的参数，首次使用时计算 """
+        if getattr(self, '_ytm_params', None) is None:
+            num_bonds = len(self.bonds)
+            frequency = np.ones(num_bonds)
+            use_vw = np.zeros(num_bonds, dtype=bool)
+            time_to_maturity = np.zeros(num_bonds)
+            last_amount = np.zeros(num_bonds)
+            for i, bond in enumerate(self.bonds):
+                if self._coupon_carrying[i]:
+                    frequency[i] = bond.frequency
+                    use_vw[i] = ytm_uses_simple_first_period(bond.convention, self._num_after_ncd[i])
+                else:
+                    time_to_maturity[i] = bond.time_to_maturity_in_year
+                    last_amount[i] = bond._flow_amounts[-1]
+            if np.any(self._coupon_carrying & (self._num_after_ncd < 0)):
+                raise TuringError("No coupons left")
+            alpha = np.where(self._coupon_carrying, 1.0 - self._acc_factor * frequency, 0.0)
+            self._ytm_params = (frequency, use_vw, alpha, time_to_maturity, last_amount)
+        return self._ytm_params
+
+    def _price_from_ytm(self, ytm, index):
+        """ 与BondFixedRate.full_price_from_ytm相同的全价公式及其对YTM的解析导数，index为每个元素对应的债券，
+        付息债券和零息债券分别调用与BondFixedRate共用的coupon_bond_price_from_ytm和zero_coupon_bond_price_from_ytm """
+        frequency, use_vw, alpha, time_to_maturity, last_amount = self._ytm_data()
+        y = ytm + 0.000000000012345  # 防止ytm = 0
+        price = np.empty(len(index))
+        deriv = np.empty(len(index))
+        coupon_carrying = self._coupon_carrying[index]
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            elements = np.nonzero(coupon_carrying)[0]
+            if len(elements):
+                i = index[elements]
+                price[elements], deriv[elements], _ = coupon_bond_price_from_ytm(
+                    y[elements], frequency[i], self._coupon_rate[i], self._redemption[i],
+                    self._num_after_ncd[i], alpha[i], use_vw[i], self._par[i])
+
+            # 零息和贴现债券
+            elements = np.nonzero(~coupon_carrying)[0]
+            if len(elements):
+                i = index[elements]
+                price[elements], deriv[elements], _ = zero_coupon_bond_price_from_ytm(
+                    y[elements], time_to_maturity[i], (self._redemption[i] + last_amount[i]) * self._par[i])
+        return price, deriv
+
+    def full_price_from_ytm(self, ytm):
+        """ 通过YTM计算全价，ytm的最后一维对应债券 """
+        ytm_flat, index = self._flatten_prices(ytm)
+        return self._price_from_ytm(ytm_flat, index)[0].reshape(np.shape(ytm))
+
+    def yield_to_maturity(self, clean_prices, tol: float = 1e-8, maxiter: int = 50):
+        """ 由净价批量求YTM
+
+        clean_prices的最后一维对应债券，例如形状为(价格个数, 债券数)。使用带区间保护的向量化牛顿法，
+        返回vector_results，其中root为YTM，另有每个元素的残差、迭代次数、是否收敛和是否有根区间 """
+        prices, index = self._flatten_prices(clean_prices)
+        target = prices + self._accrued_interest[index]
+
+        def func(ytm):
+            price, deriv = self._price_from_ytm(ytm, index)
+            return price - target, deriv
+
+        # 初值与yield_to_maturity相同取5%
+        result = newton_vector(func, np.full(len(prices), 0.05), -0.5, 1.0, tol=tol, maxiter=maxiter)
+        return self._reshape_result(result, np.shape(clean_prices))
+
+    def _spread_data(self):
+        """ 按未经基差调整的基础曲线分组：每组的曲线网格、现金流所在区间和期限，首次使用时计算 """
+        if getattr(self, '_spread_params', None) is None:
+            groups = {}
+            for i, bond in enumerate(self.bonds):
+                curve_data = bond.cv.curve_data
+                key = (tuple(curve_data['tenor'].tolist()),
+                       tuple(curve_data['rate'].tolist()),
+                       bond.settlement_date._excelDate)
+                if key not in groups:
+                    groups[key] = (bond, [])
+                groups[key][1].append(i)
+
+            bond_group = np.zeros(len(self.bonds), dtype=np.int64)
+            flow_times = np.zeros(len(self._flow_amounts))
+            flow_interval = np.zeros(len(self._flow_amounts), dtype=np.int64)
+            grids = []
+            for g, (bond, index) in enumerate(groups.values()):
+                curve = CurveAdjustmentImpl(curve_data=bond.cv.curve_data,
+                                            value_date=bond.settlement_date).get_curve_result()
+                if curve._interpType != TuringInterpTypes.PCHIP_LOG_DISCOUNT or len(curve._times) < 2:
+                    raise TuringError("Implied spread needs a PCHIP log discount curve with at least two points")
+                if curve._freqType not in (FrequencyType.ANNUAL, FrequencyType.SEMI_ANNUAL,
+                                           FrequencyType.QUARTERLY, FrequencyType.MONTHLY):
+                    raise TuringError("Implied spread needs compounded zero rates")
+
+                index = np.array(index)
+                bond_group[index] = g
+                flow_mask = np.isin(self._flow_bond, index)
+                times = timesFromDates(self._flow_dates[flow_mask], curve._valuationDate, curve._dayCountType)
+                flow_times[flow_mask] = times
+                flow_interval[flow_mask] = np.clip(np.searchsorted(curve._times, times, side='right') - 1,
+                                                   0, len(curve._times) - 2)
+                grids.append((np.asarray(curve._times, dtype=np.float64),
+                              np.asarray(curve._zeroRates, dtype=np.float64),
+                              TuringFrequency(curve._freqType)))
+
+            self._spread_params = (bond_group, flow_times, flow_interval, grids)
+        return self._spread_params
+
+    def _price_from_spread(self, spread, index, pairs):
+        """ 与BondFixedRate.full_price_from_discount_curve相同的全价及其对基差（bp）的解析导数
+
+        基差平移零息利率后按PCHIP对数贴现因子插值，节点斜率对基差的导数按PCHIP公式逐项求导 """
+        bond_group, flow_times, flow_interval, grids = self._spread_data()
+        price = np.zeros(len(index))
+        deriv = np.zeros(len(index))
+
+        for g, (elements, pair_element, pair_flow) in enumerate(pairs):
+            if len(elements) == 0:
+                continue
+            times, rates, f = grids[g]
+            t = np.maximum(times, gSmall)
+            shift = spread[elements, None] * 0.0001
+            base = 1.0 + (rates[None, :] + shift) / f
+            y = -f * t * np.log(base)
+            dy_ds = -t / base
+            d, dd = _pchip_slopes(np.diff(times), y, dy_ds)
+
+            k = flow_interval[pair_flow]
+            h = times[k + 1] - times[k]
+            tau = flow_times[pair_flow]
+            x = (tau - times[k]) / h
+            h00 = 2 * x ** 3 - 3 * x ** 2 + 1
+            h10 = x ** 3 - 2 * x ** 2 + x
+            h01 = -2 * x ** 3 + 3 * x ** 2
+            h11 = x ** 3 - x ** 2
+            log_df = (h00 * y[pair_element, k] + h10 * h * d[pair_element, k]
+                      + h01 * y[pair_element, k + 1] + h11 * h * d[pair_element, k + 1])
+            dlog_df = (h00 * dy_ds[pair_element, k] + h10 * h * dd[pair_element, k]
+                       + h01 * dy_ds[pair_element, k + 1] + h11 * h * dd[pair_element, k + 1])
+
+            # 曲线以结算日为起点，结算日的贴现因子为1
+            at_settle = np.abs(tau) < gSmall
+            df = np.where(at_settle, 1.0, np.exp(log_df))
+            ddf = np.where(at_settle, 0.0, df * dlog_df)
+
+            amounts = self._flow_amounts[pair_flow]
+            par = self._par[index[elements]]
+            price[elements] = np.bincount(pair_element, amounts * df, len(elements)) * par
+            deriv[elements] = np.bincount(pair_element, amounts * ddf, len(elements)) * par * 0.0001
+
+        return price, deriv
+
+    def _spread_pairs(self, index):
+        """ 每组曲线内（元素，现金流）对的下标 """
+        bond_group = self._spread_data()[0]
+        counts = np.diff(np.append(self._offsets, len(self._flow_amounts)))
+        pairs = []
+        for g in range(bond_group.max() + 1):
+            elements = np.nonzero(bond_group[index] == g)[0]
+            element_counts = counts[index[elements]]
+            pair_element = np.repeat(np.arange(len(elements)), element_counts)
+            starts = np.cumsum(element_counts) - element_counts
+            pair_flow = (np.repeat(self._offsets[index[elements]], element_counts)
+                         + np.arange(len(pair_element)) - np.repeat(starts, element_counts))
+            pairs.append((elements, pair_element, pair_flow))
+        return pairs
+
+    def full_price_from_spread(self, spread):
+        """ 对各债券的基础曲线平移基差（bp）后计算全价，spread的最后一维对应债券 """
+        spread_flat, index = self._flatten_prices(spread)
+        pairs = self._spread_pairs(index)
+        return self._price_from_spread(spread_flat, index, pairs)[0].reshape(np.shape(spread))
+
+    def implied_spread(self, clean_prices, tol: float = 1e-8, maxiter: int = 50):
+        """ 由净价批量求隐含基差（bp）
+
+        与BondFixedRate.implied_spread相同，基差是使曲线定价等于给定价格的零息利率平移量。
+        返回vector_results，其中root为隐含基差，另有每个元素的诊断信息 """
+        prices, index = self._flatten_prices(clean_prices)
+        target = prices + self._accrued_interest[index]
+        pairs = self._spread_pairs(index)
+
+        def func(spread):
+            price, deriv = self._price_from_spread(spread, index, pairs)
+            return price - target, deriv
+
+        # 初值与implied_spread相同
+        result = newton_vector(func, np.full(len(prices), 0.05), -2000.0, 2000.0, tol=tol, maxiter=maxiter)
+        return self._reshape_result(result, np.shape(clean_prices))
+
+    @staticmethod
+    def _reshape_result(result, shape):
+        return vector_results(*(np.reshape(x, shape) for x in result))
+
+
+def _pchip_edge(h0, h1, m0, m1, dm0, dm1):
+    """ PCHIP端点斜率（与scipy一致）及其导数 """
+    d = ((2 * h0 + h1) * m0 - h0 * m1) / (h0 + h1)
+    dd = ((2 * h0 + h1) * dm0 - h0 * dm1) / (h0 + h1)
+    zero = np.sign(d) != np.sign(m0)
+    clip = ~zero & (np.sign(m0) != np.sign(m1)) & (np.abs(d) > 3.0 * np.abs(m0))
+    d = np.where(zero, 0.0, np.where(clip, 3.0 * m0, d))
+    dd = np.where(zero, 0.0, np.where(clip, 3.0 * dm0, dd))
+    return d, dd
+
+
+def _pchip_slopes(h, y, dy):
+    """ 与scipy.interpolate.PchipInterpolator相同的节点斜率及其导数，y和dy的每一行是一组节点值及其导数 """
+    m = np.diff(y, axis=1) / h
+    dm = np.diff(dy, axis=1) / h
+    if y.shape[1] == 2:
+        return np.repeat(m, 2, axis=1), np.repeat(dm, 2, axis=1)
+
+    m0, m1 = m[:, :-1], m[:, 1:]
+    dm0, dm1 = dm[:, :-1], dm[:, 1:]
+    w1 = 2 * h[1:] + h[:-1]
+    w2 = h[1:] + 2 * h[:-1]
+    flat = (np.sign(m0) != np.sign(m1)) | (m0 == 0) | (m1 == 0)
+
+    d = np.zeros_like(y)
+    dd = np.zeros_like(y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        whmean = (w1 / m0 + w2 / m1) / (w1 + w2)
+        dwhmean = -(w1 * dm0 / m0 ** 2 + w2 * dm1 / m1 ** 2) / (w1 + w2)
+        d[:, 1:-1] = np.where(flat, 0.0, 1.0 / whmean)
+        dd[:, 1:-1] = np.where(flat, 0.0, -dwhmean / whmean ** 2)
+
+    d[:, 0], dd[:, 0] = _pchip_edge(h[0], h[1], m[:, 0], m[:, 1], dm[:, 0], dm[:, 1])
+    d[:, -1], dd[:, -1] = _pchip_edge(h[-1], h[-2], m[:, -1], m[:, -2], dm[:, -1], dm[:, -2])
+    return d, dd
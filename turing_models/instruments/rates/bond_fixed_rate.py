@@ -5,12 +5,16 @@ from scipy import optimize
 
 from fundamental.turing_db.data import TuringDB
 from turing_models.instruments.common import YieldCurve
-from turing_models.instruments.rates.bond import Bond, dy
+from turing_models.instruments.rates.bond import Bond, dy, coupon_bond_price_from_ytm, \
+    zero_coupon_bond_price_from_ytm, curve_dfs, ytm_uses_simple_first_period
+from turing_models.market.data.market_data_cache import market_data_cache
 from turing_models.utilities.day_count import TuringDayCount, DayCountType
 from turing_models.utilities.error import TuringError
 from turing_models.utilities.global_types import CouponType, TuringYTMCalcType
 from turing_models.market.curves.curve_adjust import CurveAdjustmentImpl
-from turing_models.utilities.helper_functions import calculate_greek, newton_fun
+from turing_models.market.curves.curve_cache import curve_cache
+from turing_models.utilities.helper_functions import newton_fun
+from turing_models.utilities.turing_date_array import TuringDateArray
 
 
 @dataclass(repr=False, eq=False, order=False, unsafe_hash=True)
@@ -52,9 +56,13 @@ class BondFixedRate(Bond):
 
     def _get_market_clean_price(self):
         if getattr(self, 'comb_symbol', None) is not None:
-            original_data = TuringDB.get_bond_valuation_cnbd_history(symbols=self.comb_symbol,
-                                                                     start=self.value_date,
-                                                                     end=self.value_date)
+            original_data = market_data_cache.fetch(
+                'bond_valuation_cnbd',
+                lambda: TuringDB.get_bond_valuation_cnbd_history(symbols=self.comb_symbol,
+                                                                 start=self.value_date,
+                                                                 end=self.value_date),
+                symbol=self.comb_symbol,
+                date=self.value_date)
 
             if not original_data.empty:
                 self._market_clean_price = original_data.loc[self.comb_symbol]['net_prc'][0]
@@ -110,46 +118,18 @@ class BondFixedRate(Bond):
         return implied_spread
 
     def dv01(self):
-        """ 数值法计算dv01 """
-        return calculate_greek(self, self.full_price_from_ytm, "_ytm", dy) * -dy
+        """ 解析法计算dv01 """
+        return -self._full_price_from_ytm_with_derivatives()[1] * dy
 
     def macauley_duration(self):
         """ 麦考利久期 """
-        fitted_curve = CurveAdjustmentImpl(curve_data=self.cv.curve_data,
-                                           parallel_shift=self._spread_adjustment,
-                                           value_date=self.settlement_date).get_curve_result()
-
-        px = 0.0
-        df = 1.0
-        df_settle = fitted_curve.df(self.settlement_date)
-        dc = TuringDayCount(DayCountType.ACT_ACT_ISDA)
-
-        for dt in self._flow_dates[1:]:
-
-            dates = dc.yearFrac(self.settlement_date, dt)[0]
-            # 将结算日的票息加入计算
-            if dt >= self.settlement_date:
-                df = fitted_curve.df(dt)
-                if self.pay_interest_mode == CouponType.COUPON_CARRYING:
-                    flow = self.coupon_rate / self.frequency
-                    pv = flow * df * dates * self.par
-                    px += pv
-                else:
-                    flow = self._flow_amounts[-1]
-                    pv = flow * df * dates * self.par
-                    px += pv
-
-        px += df * self._redemption * self.par * dates
-        px = px / df_settle
-
-        fp = self.full_price_from_ytm()
-        dmac = px / fp
-
-        return dmac
+        return self._curve_flow_values()[1] / self.full_price_from_ytm()
 
     def modified_duration(self):
         """ 修正久期 """
-        dmac = self.macauley_duration()
+        return self._modified_duration(self.macauley_duration())
+
+    def _modified_duration(self, dmac):
         if self.pay_interest_mode == CouponType.COUPON_CARRYING:
             md = dmac / (1.0 + self._ytm / self.frequency)
         else:
@@ -157,8 +137,73 @@ class BondFixedRate(Bond):
         return md
 
     def dollar_convexity(self):
-        """ 凸性 """
-        return calculate_greek(self, self.full_price_from_ytm, "_ytm", order=2)
+        """ 凸性（解析法） """
+        return self._full_price_from_ytm_with_derivatives()[2]
+
+    def _full_price_from_ytm_with_derivatives(self):
+        """ 与full_price_from_ytm相同的全价及其对YTM的一阶、二阶解析导数 """
+        ytm = np.array(self._ytm)  # 向量化
+        ytm = ytm + 0.000000000012345  # 防止ytm = 0
+        if self.pay_interest_mode == CouponType.COUPON_CARRYING:
+            # n是下一付息日后的现金流个数
+            n = sum(1 for dt in self._flow_dates if dt > self.settlement_date) - 1
+            if n < 0:
+                raise TuringError("No coupons left")
+
+            use_vw = ytm_uses_simple_first_period(self.convention, n)
+            fp, dfp, d2fp = coupon_bond_price_from_ytm(ytm, self.frequency, self.coupon_rate, self._redemption,
+                                                       n, self._alpha, use_vw, self.par)
+        else:
+            fp, dfp, d2fp = zero_coupon_bond_price_from_ytm(
+                ytm, self.time_to_maturity_in_year, (self._redemption + self._flow_amounts[-1]) * self.par)
+        return fp[()], dfp[()], d2fp[()]
+
+    def _curve_cash_flows(self):
+        """ 结算日当天及之后的现金流日期和金额，到期本金并入最后一笔现金流 """
+        dates = [dt for dt in self._flow_dates[1:] if dt >= self.settlement_date]
+        if self.pay_interest_mode == CouponType.COUPON_CARRYING:
+            flow = self.coupon_rate / self.frequency
+        else:
+            flow = self._flow_amounts[-1]
+        amounts = np.full(len(dates), flow, dtype=np.float64)
+        if len(dates) > 0:
+            amounts[-1] += self._redemption
+        return dates, amounts
+
+    def _curve_flow_values(self):
+        """ 一次计算拟合曲线下各现金流的现值和距结算日的期限（ACT_ACT_ISDA），
+        返回(全价, 期限加权现值之和, 期限平方加权现值之和) """
+        fitted_curve = self.fitted_curve()
+        dates, amounts = self._curve_cash_flows()
+        df_settle = fitted_curve.df(self.settlement_date)
+        if len(dates) == 0:
+            # 没有剩余现金流时只计本金
+            return self._redemption * self.par / df_settle, 0.0, 0.0
+        dates = TuringDateArray(dates)
+        pv = amounts * curve_dfs(fitted_curve, dates) * self.par / df_settle
+        times = TuringDayCount(DayCountType.ACT_ACT_ISDA).yearFracs(self.settlement_date, dates)
+        return np.sum(pv), np.sum(pv * times), np.sum(pv * times * times)
+
+    def risk_report(self):
+        """ 一次计算价格和全部敏感度
+
+        YTM敏感度为解析导数；曲线敏感度为拟合曲线连续复利零息利率平行移动的解析导数
+        （拟合曲线以结算日为起点，日期计数为ACT_ACT_ISDA，与久期的期限一致）。 """
+        fp, dfp, d2fp = self._full_price_from_ytm_with_derivatives()
+        curve_full_price, pv_times, pv_times2 = self._curve_flow_values()
+        dmac = pv_times / fp
+        return {'clean_price': self._clean_price,
+                'full_price': self._clean_price + self._accrued_interest,
+                'accrued_interest': self._accrued_interest,
+                'ytm': self._ytm,
+                'dv01': -dfp * dy,
+                'dollar_duration': -dfp,
+                'dollar_convexity': d2fp,
+                'macauley_duration': dmac,
+                'modified_duration': self._modified_duration(dmac),
+                'curve_full_price': curve_full_price,
+                'curve_dv01': pv_times * dy,
+                'curve_dollar_convexity': pv_times2}
 
     def full_price_from_ytm(self):
         """ 通过YTM计算全价 """
@@ -229,37 +274,29 @@ class BondFixedRate(Bond):
         clean_Price = full_price - self._accrued_interest
         return clean_Price
 
+    def fitted_curve_key(self):
+        """ 拟合曲线的缓存键：曲线数据、基差调整和结算日 """
+        curve_data = self.cv.curve_data
+        # TuringDate的哈希值都相同，用excel日期作为键
+        return (tuple(curve_data['tenor'].tolist()),
+                tuple(curve_data['rate'].tolist()),
+                self._spread_adjustment,
+                self.settlement_date._excelDate)
+
+    def fitted_curve(self):
+        """ 经基差调整后的贴现曲线，曲线数据、基差和结算日相同的债券共享登记表中的同一条曲线 """
+        return curve_cache.get('bond_fitted_curve',
+                               lambda: CurveAdjustmentImpl(curve_data=self.cv.curve_data,
+                                                           parallel_shift=self._spread_adjustment,
+                                                           value_date=self.settlement_date).get_curve_result(),
+                               *self.fitted_curve_key())
+
     def full_price_from_discount_curve(self):
         """ 通过利率曲线计算全价 """
         if getattr(self, 'pay_interest_mode', None) \
            and getattr(self, 'frequency', None) \
            and getattr(self, 'par', None):
-            fitted_curve = CurveAdjustmentImpl(curve_data=self.cv.curve_data,
-                                               parallel_shift=self._spread_adjustment,
-                                               value_date=self.settlement_date).get_curve_result()
-
-            px = 0.0
-            df = 1.0
-            df_settle = fitted_curve.df(self.settlement_date)
-
-            for dt in self._flow_dates[1:]:
-
-                # 将结算日的票息加入计算
-                if dt >= self.settlement_date:
-                    df = fitted_curve.df(dt)
-                    if self.pay_interest_mode == CouponType.COUPON_CARRYING:
-                        flow = self.coupon_rate / self.frequency
-                        pv = flow * df
-                        px += pv
-                    else:
-                        flow = self._flow_amounts[-1]
-                        pv = flow * df
-                        px += pv
-
-            px += df * self._redemption
-            px = px / df_settle
-
-            return px * self.par
+            return self._curve_flow_values()[0]
 
     def clean_price_from_discount_curve(self):
         """ 通过利率曲线计算净价 """
@@ -1,14 +1,17 @@
 from dataclasses import dataclass
 
+import numpy as np
 from scipy import optimize
 
 from fundamental.turing_db.data import TuringDB
 from turing_models.instruments.common import YieldCurve
 from turing_models.instruments.rates.bond import Bond, dy
+from turing_models.market.data.market_data_cache import market_data_cache
 from turing_models.utilities.day_count import TuringDayCount
 from turing_models.utilities.error import TuringError
-from turing_models.utilities.helper_functions import greek, newton_fun
+from turing_models.utilities.helper_functions import newton_fun
 from turing_models.utilities.bond_terms import EcnomicTerms, FloatingRateTerms
+from turing_models.utilities.turing_date_array import TuringDateArray
 
 
 @dataclass(repr=False, eq=False, order=False, unsafe_hash=True)
@@ -68,7 +71,11 @@ class BondFloatingRate(Bond):
     def _get_next_base_interest_rate(self):
         if getattr(self, 'floating_rate_benchmark', None) is not None:
             date = self.value_date
-            original_data = TuringDB.rate_interest_rate_levels(ir_codes=self.floating_rate_benchmark, date=date)
+            original_data = market_data_cache.fetch(
+                'interest_rate_levels',
+                lambda: TuringDB.rate_interest_rate_levels(ir_codes=self.floating_rate_benchmark, date=date),
+                symbol=self.floating_rate_benchmark,
+                date=date)
             if not original_data.empty:
                 self._next_base_interest_rate = original_data.loc[self.floating_rate_benchmark, 'rate']
             else:
@@ -84,7 +91,8 @@ class BondFloatingRate(Bond):
         return self._ytm
 
     def dv01(self):
-        return greek(self, self.full_price_from_ytm, "_ytm", dy) * -dy
+        """ 解析法计算dv01 """
+        return -self._full_price_from_ytm_with_derivatives()[1] * dy
 
     def dollar_convexity(self):
         """ Calculate the bond convexity from the discount margin (DM) using a
@@ -92,23 +100,16 @@ class BondFloatingRate(Bond):
         next Ibor payment which has reset is entered, so to is the current
         Ibor rate from settlement to the next coupon date (NCD). Finally there
         is the level of subsequent future Ibor payments and the discount
-        margin. """
+        margin. The second derivative is computed analytically. """
 
-        return greek(self, self.full_price_from_ytm, "_ytm", dy, order=2)
+        return self._full_price_from_ytm_with_derivatives()[2]
 
     def dollar_credit_duration(self):
-        """ Calculate the risk or dP/dy of the bond by bumping. """
-
-        self.calc_accrued_interest()
-
-        dm = self.dm
-        self.dm = dm + dy
-        p0 = self.full_price_from_dm()
-        self.dm = dm
-        p2 = self.full_price_from_dm()
+        """ Calculate the risk -dP/dm of the bond analytically. As with the
+        previous bumping (P(dm) - P(dm + dy)) / dy it is positive when the
+        price falls as the discount margin rises. """
 
-        durn = (p2 - p0) / dy
-        return durn
+        return -self._full_price_from_dm_with_derivatives(self.dm)[1]
 
     def modified_credit_duration(self):
         """ Calculate the modified duration of the bond on a settlement date
@@ -168,35 +169,49 @@ class BondFloatingRate(Bond):
         is the level of subsequent future Ibor payments and the discount
         margin. """
 
+        return self._full_price_from_dm_with_derivatives(self.dm)[0]
+
+    def _full_price_from_dm_with_derivatives(self, dm):
+        """ 由贴现边际计算全价及其对贴现边际的一阶、二阶解析导数
+
+        现金流与full_price_from_dm的逐期循环相同：第k期贴现因子
+        df_k = 1 / (1 + a_0 * (base + dm)) * prod_{j<=k} 1 / (1 + a_j * (next_base + dm))，
+        记g_k = sum a_j / (1 + a_j * r_j)，h_k = sum (a_j / (1 + a_j * r_j))^2，
+        则df_k' = -df_k * g_k，df_k'' = df_k * (g_k^2 + h_k)。 """
+
         self.calc_accrued_interest()
 
         dc = TuringDayCount(self.interest_rules)
 
         q = self.floating_spread
-        num_flows = len(self._flow_dates)
+
+        # 贴现边际可为数组，现金流沿最后一维展开
+        dm = np.asarray(dm, dtype=np.float64)[..., np.newaxis]
 
         # We discount using Libor over the period from settlement to the ncd
-        (alpha, _, _) = dc.yearFrac(self.settlement_date, self._ncd)
-        df = 1.0 / (1.0 + alpha * (self.base_interest_rate + self.dm))
+        (alpha0, _, _) = dc.yearFrac(self.settlement_date, self._ncd)
+        rate0 = 1.0 + alpha0 * (self.base_interest_rate + dm)
 
         # A full coupon is paid
         (alpha, _, _) = dc.yearFrac(self._pcd, self._ncd)
-        pv = self.coupon_rate * alpha * df
 
         # Now do all subsequent coupons that fall after the ncd
-        for i_flow in range(1, num_flows):
-            
-            if self._flow_dates[i_flow] > self._ncd:
-                pcd = self._flow_dates[i_flow - 1]
-                ncd = self._flow_dates[i_flow]
-                (alpha, _, _) = dc.yearFrac(pcd, ncd)
-                df = df / (1.0 + alpha * (self._next_base_interest_rate + self.dm))
-                c = self._next_base_interest_rate + q
-                pv = pv + c * alpha * df
-
-        pv += df
-        pv = pv * self.par
-        return pv
+        flow_dates = TuringDateArray(self._flow_dates)
+        after_ncd = np.flatnonzero(flow_dates[1:] > self._ncd) + 1
+        alphas = np.concatenate(([alpha0], dc.yearFracs(flow_dates[after_ncd - 1], flow_dates[after_ncd])))
+        rates = np.concatenate((rate0, 1.0 + alphas[1:] * (self._next_base_interest_rate + dm)), axis=-1)
+        coupons = np.concatenate(([self.coupon_rate * alpha], (self._next_base_interest_rate + q) * alphas[1:]))
+        coupons[-1] += 1.0
+
+        ratios = alphas / rates
+        dfs = np.exp(-np.cumsum(np.log(rates), axis=-1))
+        g = np.cumsum(ratios, axis=-1)
+        h = np.cumsum(ratios * ratios, axis=-1)
+
+        pv = np.sum(coupons * dfs, axis=-1) * self.par
+        dpv = -np.sum(coupons * dfs * g, axis=-1) * self.par
+        d2pv = np.sum(coupons * dfs * (g * g + h), axis=-1) * self.par
+        return pv[()], dpv[()], d2pv[()]
 
     def clean_price_from_dm(self):
         """ Calculate the bond clean price from the discount margin
@@ -221,16 +236,31 @@ class BondFloatingRate(Bond):
         is the level of subsequent future Ibor payments and the discount
         margin. '''
 
-        self.calc_accrued_interest()
+        return self._full_price_from_ytm_with_derivatives()[0]
 
-        ytm = self._ytm  # 向量化
+    def _full_price_from_ytm_with_derivatives(self):
+        """ 与full_price_from_ytm相同的全价及其对YTM的一阶、二阶解析导数 """
+        ytm = self._ytm
         ytm = ytm + 0.000000000012345  # 防止ytm = 0
-        dm = self.dm
-        self.dm = ytm - self._next_base_interest_rate
-        full_price = self.full_price_from_dm()
-        self.dm = dm
-        return full_price
-    
+        return self._full_price_from_dm_with_derivatives(ytm - self._next_base_interest_rate)
+
+    def risk_report(self):
+        """ 一次计算价格和全部敏感度（解析法），贴现边际和YTM只相差下一期基准利率，
+        因此利率敏感度与信用敏感度来自同一组现金流 """
+        fp, dfp, d2fp = self._full_price_from_ytm_with_derivatives()
+        fp_dm, dfp_dm, d2fp_dm = self._full_price_from_dm_with_derivatives(self.dm)
+        return {'clean_price': self._clean_price,
+                'full_price': self._clean_price + self._accrued_interest,
+                'accrued_interest': self._accrued_interest,
+                'ytm': self._ytm,
+                'dv01': -dfp * dy,
+                'dollar_duration': -dfp,
+                'dollar_convexity': d2fp,
+                'modified_duration': -dfp / fp_dm,
+                'dollar_credit_duration': -dfp_dm,
+                'modified_credit_duration': -dfp_dm / fp_dm,
+                'credit_convexity': d2fp_dm}
+
     def clean_price_from_ytm(self):
         ''' Calculate the bond clean price from the discount margin
         using standard model based on assumptions about future Ibor rates. The
@@ -6,15 +6,15 @@ import pandas as pd
 from scipy import optimize
 
 from turing_models.instruments.common import YieldCurve
-from turing_models.instruments.rates.bond import Bond
+from turing_models.instruments.rates.bond import Bond, compounded_df_log_derivatives
 from turing_models.instruments.rates.bond_fixed_rate import BondFixedRate
-from turing_models.market.curves.discount_curve_flat import TuringDiscountCurveFlat
 from turing_models.utilities.bond_terms import EcnomicTerms, EmbeddedPutableOptions, \
      EmbeddedRateAdjustmentOptions
 from turing_models.utilities.day_count import TuringDayCount, DayCountType
 from turing_models.utilities.error import TuringError
 from turing_models.utilities.global_variables import gDaysInYear
-from turing_models.utilities.helper_functions import datetime_to_turingdate, greek, newton_fun
+from turing_models.utilities.helper_functions import datetime_to_turingdate, newton_fun, timesFromDates
+from turing_models.utilities.turing_date_array import TuringDateArray
 
 dy = 0.0001
 
@@ -370,54 +370,49 @@ class BondPutableAdjustable(Bond):
             return self.fixed_rate_bond.full_price_from_ytm()
         else:
             if self.recommend_dir == "long":
-                # Generate bond coupon flow schedule
-                cpn1 = self.coupon_rate / self.frequency
-                cpn2 = self.adjust_fix / self.frequency
-                cpnTimes = []
-                cpn_dates = []
-                cpnAmounts = []
-
-                for flow_date in self._flow_dates[1:]:
-                    if self.settlement_date <= flow_date < self.exercise_dates:
-                        cpnTime = (flow_date - self.settlement_date) / gDaysInYear
-                        cpn_date = flow_date
-                        cpnTimes.append(cpnTime)
-                        cpn_dates.append(cpn_date)
-                        cpnAmounts.append(cpn1)
-                    if flow_date >= self.exercise_dates:
-                        cpnTime = (flow_date - self.settlement_date) / gDaysInYear
-                        cpn_date = flow_date
-                        cpnTimes.append(cpnTime)
-                        cpn_dates.append(cpn_date)
-                        cpnAmounts.append(cpn2)
-
-                cpnTimes = np.array(cpnTimes)
-                cpnAmounts = np.array(cpnAmounts)
-
-                pv = 0
-                self.discount_curve_flat = TuringDiscountCurveFlat(
-                    self.settlement_date,
-                    self._ytm,
-                    self.pay_interest_cycle,
-                    self.interest_rules
-                )
-                dfSettle = self.discount_curve_flat.df(self.settlement_date)
-                numCoupons = len(cpnTimes)
-                for i in range(0, numCoupons):
-                    # tcpn = cpnTimes[i]
-                    # df_flow = _uinterpolate(tcpn, dfTimes, dfValues, interp)
-                    df = self.discount_curve_flat.df(cpn_dates[i])
-                    flow = cpnAmounts[i]
-                    pv += flow * df
-
-                pv += df * self._redemption / dfSettle
-
-                return pv * self.par
+                return self._long_full_price_from_ytm_with_derivatives()[0]
 
             elif self.recommend_dir == "short":
                 v = self._pure_bond.full_price_from_ytm()
             return v
 
+    def _long_full_price_from_ytm_with_derivatives(self):
+        """ 中债推荐方向为"long"时由YTM计算全价及其对YTM的一阶、二阶解析导数
+
+        以YTM为平坦利率（复利频率为付息频率，日期计数为interest_rules）贴现行权日前后的票息和本金，
+        与TuringDiscountCurveFlat的贴现因子一致。 """
+        cpn1 = self.coupon_rate / self.frequency
+        cpn2 = self.adjust_fix / self.frequency
+        cpn_dates = []
+        cpn_amounts = []
+        for flow_date in self._flow_dates[1:]:
+            if self.settlement_date <= flow_date < self.exercise_dates:
+                cpn_dates.append(flow_date)
+                cpn_amounts.append(cpn1)
+            if flow_date >= self.exercise_dates:
+                cpn_dates.append(flow_date)
+                cpn_amounts.append(cpn2)
+        if len(cpn_dates) == 0:
+            raise TuringError("No coupons left")
+
+        # 第一项为结算日，本金按结算日贴现因子调整
+        times = np.concatenate(([0.0], timesFromDates(TuringDateArray(cpn_dates), self.settlement_date,
+                                                      self.interest_rules)))
+        ytm = np.asarray(self._ytm, dtype=np.float64)[..., np.newaxis]  # 向量化
+        dfs, dlog, d2log = compounded_df_log_derivatives(ytm, times, self.frequency)
+        cpn_amounts = np.array(cpn_amounts)
+
+        pv = np.sum(cpn_amounts * dfs[..., 1:], axis=-1)
+        dpv = np.sum(cpn_amounts * dfs[..., 1:] * dlog[..., 1:], axis=-1)
+        d2pv = np.sum(cpn_amounts * dfs[..., 1:] * (dlog[..., 1:] ** 2 + d2log[..., 1:]), axis=-1)
+
+        redemption = self._redemption * dfs[..., -1] / dfs[..., 0]
+        rdlog = dlog[..., -1] - dlog[..., 0]
+        pv = pv + redemption
+        dpv = dpv + redemption * rdlog
+        d2pv = d2pv + redemption * (rdlog ** 2 + d2log[..., -1] - d2log[..., 0])
+        return (pv * self.par)[()], (dpv * self.par)[()], (d2pv * self.par)[()]
+
     def full_price_from_discount_curve(self):
         ''' Value the bond that settles on the specified date, which have
         both an put option and an option to adjust the coupon rates embedded.
@@ -561,14 +556,14 @@ class BondPutableAdjustable(Bond):
                 return self._pure_bond.yield_to_maturity()
 
     def dv01(self):
-        """ 数值法计算dv01 """
+        """ 解析法计算dv01 """
         if self.fixed_rate_bond is not None:
             return self.fixed_rate_bond.dv01()
         else:
             if self.recommend_dir == "long":
                 if not self.isvalid():
                     raise TuringError("Bond settles after it matures.")
-                return greek(self, self.full_price_from_ytm, "_ytm", dy) * -dy
+                return -self._long_full_price_from_ytm_with_derivatives()[1] * dy
             elif self.recommend_dir == "short":
                 return self._pure_bond.dv01()
 
@@ -638,17 +633,35 @@ class BondPutableAdjustable(Bond):
             return md
 
     def dollar_convexity(self):
-        """ 凸性 """
+        """ 凸性（解析法） """
         if self.fixed_rate_bond is not None:
             return self.fixed_rate_bond.dollar_convexity()
         else:
             if self.recommend_dir == 'long':
                 if not self.isvalid():
                     raise TuringError("Bond settles after it matures.")
-                return greek(self, self.full_price_from_ytm, "_ytm", order=2)
+                return self._long_full_price_from_ytm_with_derivatives()[2]
             elif self.recommend_dir == "short":
                 return self._pure_bond.dollar_convexity()
 
+    def risk_report(self):
+        """ 一次计算价格和YTM敏感度（解析法），"short"方向和按固息债估值时由对应的固息债计算 """
+        if self.fixed_rate_bond is not None:
+            return self.fixed_rate_bond.risk_report()
+        elif self.recommend_dir == "short":
+            return self._pure_bond.risk_report()
+        if not self.isvalid():
+            raise TuringError("Bond settles after it matures.")
+        fp, dfp, d2fp = self._long_full_price_from_ytm_with_derivatives()
+        return {'clean_price': self._clean_price,
+                'full_price': self._clean_price + self._accrued_interest,
+                'accrued_interest': self._accrued_interest,
+                'ytm': self._ytm,
+                'dv01': -dfp * dy,
+                'dollar_duration': -dfp,
+                'dollar_convexity': d2fp,
+                'modified_duration': -dfp / fp}
+
     def check_ecnomic_terms(self):
         """检测ecnomic_terms是否为字典格式，若为字典格式，则处理成EcnomicTerms的实例对象"""
         ecnomic_terms = getattr(self, 'ecnomic_terms', None)
@@ -0,0 +1,419 @@
+import numpy as np
+from numba import njit
+
+from turing_models.utilities.error import TuringError
+from turing_models.utilities.turing_date import TuringDate
+from turing_models.utilities.turing_date_array import TuringDateArray
+from turing_models.utilities.mathematics import ONE_MILLION
+from turing_models.utilities.day_count import TuringDayCount, DayCountType
+from turing_models.utilities.frequency import FrequencyType
+from turing_models.utilities.calendar import TuringCalendarTypes, TuringDateGenRuleTypes
+from turing_models.utilities.calendar import TuringBusDayAdjustTypes
+from turing_models.utilities.schedule import scheduleDateArrays
+from turing_models.utilities.helper_functions import to_string, checkArgumentTypes
+from turing_models.utilities.global_types import TuringSwapTypes
+from turing_models.market.curves.discount_curve import TuringDiscountCurve
+from turing_models.market.curves.curve_scenario import TuringCurveScenarios
+
+from .float_leg import TuringFreqDaycount
+
+###############################################################################
+
+
+@njit(cache=True)
+def _swapValue(fixedCoupon,
+               fixedSign,
+               fixedYearFracs,
+               fixedDfs,
+               floatSpread,
+               floatYearFracs,
+               resetDfs,
+               endDfs,
+               paymentDfs,
+               numResets,
+               resetDays,
+               dfValue):
+    ''' Value per unit notional of a curve swap given the discount factors on
+    its fixed payment dates and, for each floating period, on its reset dates
+    (numResets per period starting with the period start date), on its end
+    date and on its payment date. The floating rate is compounded over the
+    resets as in TuringFloatLeg. The fixed sign is +1 to receive fixed. '''
+
+    annuity = 0.0
+    for i in range(0, fixedDfs.size):
+        annuity += fixedYearFracs[i] * fixedDfs[i]
+
+    floatPV = 0.0
+    for i in range(0, endDfs.size):
+
+        alpha = floatYearFracs[i] / numResets
+        lastAccrual = floatYearFracs[i] - (numResets - 1) * resetDays / 365
+        k = i * numResets
+
+        growth = 1.0
+        for j in range(0, numResets - 1):
+            growth *= resetDfs[k + j] / resetDfs[k + j + 1] \
+                + floatSpread * alpha
+
+        fwdGrowth = resetDfs[k + numResets - 1] / endDfs[i] - 1.0
+        growth *= 1.0 + fwdGrowth * lastAccrual / alpha \
+            + floatSpread * lastAccrual
+
+        floatPV += (growth - 1.0) * paymentDfs[i]
+
+    return fixedSign * (fixedCoupon * annuity - floatPV) / dfValue
+
+###############################################################################
+
+
+@njit(cache=True)
+def _swapValues(fixedCoupon,
+                fixedSign,
+                fixedYearFracs,
+                fixedDfs,
+                floatSpread,
+                floatYearFracs,
+                resetDfs,
+                endDfs,
+                paymentDfs,
+                numResets,
+                resetDays,
+                dfValues):
+    ''' Values per unit notional of a curve swap under a block of curve
+    scenarios. The discount factor arrays have one row per scenario. '''
+
+    numScenarios = fixedDfs.shape[0]
+    values = np.empty(numScenarios)
+    for i in range(0, numScenarios):
+        values[i] = _swapValue(fixedCoupon, fixedSign, fixedYearFracs,
+                               fixedDfs[i], floatSpread, floatYearFracs,
+                               resetDfs[i], endDfs[i], paymentDfs[i],
+                               numResets, resetDays, dfValues[i])
+    return values
+
+###############################################################################
+
+
+def _scenarioDfs(dfs,
+                 numScenarios: int):
+    ''' Discount factors from a curve or from curve scenarios as an array with
+    one row per scenario. '''
+
+    dfs = np.asarray(dfs, dtype=np.float64)
+    if dfs.ndim == 1:
+        dfs = dfs[np.newaxis, :]
+    return np.ascontiguousarray(np.broadcast_to(dfs, (numScenarios, dfs.shape[-1])))
+
+###############################################################################
+
+
+def _periodDates(dateArrays: list):
+    ''' Start and end dates of the periods of several schedules as two date
+    arrays, with the indices at which to split them back by schedule. '''
+
+    ordinals = [dates.ordinals() for dates in dateArrays]
+    startDates = TuringDateArray.fromOrdinals(
+        np.concatenate([o[:-1] for o in ordinals]))
+    endDates = TuringDateArray.fromOrdinals(
+        np.concatenate([o[1:] for o in ordinals]))
+    splits = np.cumsum([len(o) - 1 for o in ordinals])[:-1]
+    return startDates, endDates, splits
+
+###############################################################################
+
+
+class TuringIborCurveSwap(object):
+    ''' A fixed versus Ibor swap used to build an Ibor curve. It has the same
+    cash flows as the IRS class, with the floating rate compounded over the
+    reset periods, but its leg schedules are held as date and year fraction
+    arrays so that it is valued in one pass over them rather than flow by
+    flow. As a curve swap starts on the curve date there is no first fixing
+    and there is no payment lag. A strip of swaps which differ only in their
+    termination dates and coupons can be created together with the strip
+    method which generates all of their schedules at once. '''
+
+    def __init__(self,
+                 effectiveDate: TuringDate,  # Date interest starts to accrue
+                 terminationDate: TuringDate,  # Date contract ends
+                 fixedLegType: TuringSwapTypes,
+                 fixedCoupon: float,  # Fixed coupon (annualised)
+                 fixedFreqType: FrequencyType,
+                 fixedDayCountType: DayCountType,
+                 notional: float = ONE_MILLION,
+                 floatSpread: float = 0.0,
+                 floatFreqType: FrequencyType = FrequencyType.QUARTERLY,
+                 floatDayCountType: DayCountType = DayCountType.ACT_360,
+                 resetFreqType: FrequencyType = None,
+                 calendarType: TuringCalendarTypes = TuringCalendarTypes.WEEKEND,
+                 busDayAdjustType: TuringBusDayAdjustTypes = TuringBusDayAdjustTypes.FOLLOWING,
+                 dateGenRuleType: TuringDateGenRuleTypes = TuringDateGenRuleTypes.BACKWARD):
+        ''' Create a curve swap from its start date, termination date, fixed
+        leg details and notional. The floating leg resets at the float leg
+        frequency unless a higher reset frequency is given in which case the
+        rate is compounded over the resets within each period. '''
+
+        checkArgumentTypes(self.__init__, locals())
+
+        self._setConventions(effectiveDate, fixedLegType, fixedFreqType,
+                             fixedDayCountType, notional, floatSpread,
+                             floatFreqType, floatDayCountType, resetFreqType,
+                             calendarType, busDayAdjustType, dateGenRuleType)
+
+        self._fixedCoupon = fixedCoupon
+        TuringIborCurveSwap._generateSchedules([self], [terminationDate])
+
+###############################################################################
+
+    @classmethod
+    def strip(cls,
+              effectiveDate: TuringDate,
+              terminationDates: list,
+              fixedLegType: TuringSwapTypes,
+              fixedCoupons: list,
+              fixedFreqType: FrequencyType,
+              fixedDayCountType: DayCountType,
+              notional: float = ONE_MILLION,
+              floatSpread: float = 0.0,
+              floatFreqType: FrequencyType = FrequencyType.QUARTERLY,
+              floatDayCountType: DayCountType = DayCountType.ACT_360,
+              resetFreqType: FrequencyType = None,
+              calendarType: TuringCalendarTypes = TuringCalendarTypes.WEEKEND,
+              busDayAdjustType: TuringBusDayAdjustTypes = TuringBusDayAdjustTypes.FOLLOWING,
+              dateGenRuleType: TuringDateGenRuleTypes = TuringDateGenRuleTypes.BACKWARD):
+        ''' Create a list of curve swaps with the same start date and
+        conventions, one for each termination date and fixed coupon. '''
+
+        if len(terminationDates) != len(fixedCoupons):
+            raise TuringError("Need one fixed coupon per termination date")
+
+        swaps = []
+        for fixedCoupon in fixedCoupons:
+            swap = cls.__new__(cls)
+            swap._setConventions(effectiveDate, fixedLegType, fixedFreqType,
+                                 fixedDayCountType, notional, floatSpread,
+                                 floatFreqType, floatDayCountType,
+                                 resetFreqType, calendarType,
+                                 busDayAdjustType, dateGenRuleType)
+            swap._fixedCoupon = fixedCoupon
+            swaps.append(swap)
+
+        if len(swaps) > 0:
+            cls._generateSchedules(swaps, terminationDates)
+
+        return swaps
+
+###############################################################################
+
+    def _setConventions(self,
+                        effectiveDate,
+                        fixedLegType,
+                        fixedFreqType,
+                        fixedDayCountType,
+                        notional,
+                        floatSpread,
+                        floatFreqType,
+                        floatDayCountType,
+                        resetFreqType,
+                        calendarType,
+                        busDayAdjustType,
+                        dateGenRuleType):
+
+        if resetFreqType is None:
+            resetFreqType = floatFreqType
+
+        numResets = int(resetFreqType.value / floatFreqType.value)
+
+        if numResets < 1:
+            raise TuringError("Float leg cannot reset less often than it pays")
+
+        self.effective_date = effectiveDate
+        self._fixedLegType = fixedLegType
+        self._fixedFreqType = fixedFreqType
+        self._fixedDayCountType = fixedDayCountType
+        self._notional = notional
+        self._floatSpread = floatSpread
+        self._floatFreqType = floatFreqType
+        self._floatDayCountType = floatDayCountType
+        self._resetFreqType = resetFreqType
+        self._numResets = numResets
+        self._resetDays = TuringFreqDaycount(resetFreqType)
+        self._calendarType = calendarType
+        self._busDayAdjustType = busDayAdjustType
+        self._dateGenRuleType = dateGenRuleType
+
+###############################################################################
+
+    @staticmethod
+    def _generateSchedules(swaps: list,
+                           terminationDates: list):
+        ''' Generate the leg schedules of swaps which share their start date
+        and conventions. '''
+
+        swap = swaps[0]
+
+        fixedDates = scheduleDateArrays(swap.effective_date,
+                                        terminationDates,
+                                        swap._fixedFreqType,
+                                        swap._calendarType,
+                                        swap._busDayAdjustType,
+                                        swap._dateGenRuleType)
+
+        # the year fractions of all of the swaps come from one vectorised
+        # day count and the legs share the period dates if they can
+        startDates, endDates, splits = _periodDates(fixedDates)
+        dayCounter = TuringDayCount(swap._fixedDayCountType)
+        fixedYearFracs = np.split(dayCounter.yearFracs(startDates, endDates),
+                                  splits)
+
+        if swap._floatFreqType == swap._fixedFreqType:
+            floatDates = fixedDates
+        else:
+            floatDates = scheduleDateArrays(swap.effective_date,
+                                            terminationDates,
+                                            swap._floatFreqType,
+                                            swap._calendarType,
+                                            swap._busDayAdjustType,
+                                            swap._dateGenRuleType)
+            startDates, endDates, splits = _periodDates(floatDates)
+
+        dayCounter = TuringDayCount(swap._floatDayCountType)
+        floatYearFracs = np.split(dayCounter.yearFracs(startDates, endDates),
+                                  splits)
+
+        for i, swap in enumerate(swaps):
+            swap.termination_date = terminationDates[i]
+            swap.maturity_date = fixedDates[i][-1]
+            swap._fixedPaymentDates = fixedDates[i][1:]
+            swap._fixedYearFracs = fixedYearFracs[i]
+            swap._floatStartDates = floatDates[i][:-1]
+            swap._floatEndDates = floatDates[i][1:]
+            swap._floatYearFracs = floatYearFracs[i]
+
+###############################################################################
+
+    def _resetDates(self,
+                    periods: np.ndarray):
+        ''' Reset dates of the given floating periods, the period start date
+        followed by the start of each later reset, as an array with one row
+        per period. '''
+
+        offsets = self._resetDays * np.arange(self._numResets)
+        ordinals = self._floatStartDates.ordinals()[periods]
+        return ordinals[:, np.newaxis] + offsets
+
+###############################################################################
+
+    def _fixedSign(self):
+        if self._fixedLegType == TuringSwapTypes.PAY:
+            return -1.0
+        return 1.0
+
+###############################################################################
+
+    def value(self,
+              valuationDate: TuringDate,
+              discountCurve: TuringDiscountCurve,
+              indexCurve: TuringDiscountCurve = None,
+              firstFixingRate: float = None):
+        ''' Value the swap on a valuation date. The floating rates are implied
+        by the index curve which is the discount curve if it is not given.
+        Either curve can be a block of TuringCurveScenarios in which case the
+        values of the swap under all of the scenarios are returned. '''
+
+        if firstFixingRate is not None:
+            raise TuringError("A curve swap has no first fixing")
+
+        if indexCurve is None:
+            indexCurve = discountCurve
+
+        isFixed = self._fixedPaymentDates > valuationDate
+        isFloat = self._floatEndDates > valuationDate
+
+        fixedDfs = discountCurve.df(self._fixedPaymentDates[isFixed])
+        endDates = self._floatEndDates[isFloat]
+        endDfs = indexCurve.df(endDates)
+        paymentDfs = discountCurve.df(endDates)
+
+        resetOrdinals = self._resetDates(isFloat)
+        resetDfs = indexCurve.df(
+            TuringDateArray.fromOrdinals(resetOrdinals.ravel()))
+
+        scenarios = [c for c in (discountCurve, indexCurve)
+                     if isinstance(c, TuringCurveScenarios)]
+
+        if len(scenarios) > 0:
+            n = len(scenarios[0])
+            if any(len(c) != n for c in scenarios):
+                raise TuringError("Curve scenarios have different lengths")
+            dfValues = np.broadcast_to(
+                np.asarray(discountCurve.df(valuationDate), dtype=np.float64), n)
+            v = _swapValues(self._fixedCoupon,
+                            self._fixedSign(),
+                            self._fixedYearFracs[isFixed],
+                            _scenarioDfs(fixedDfs, n),
+                            self._floatSpread,
+                            self._floatYearFracs[isFloat],
+                            _scenarioDfs(resetDfs, n),
+                            _scenarioDfs(endDfs, n),
+                            _scenarioDfs(paymentDfs, n),
+                            self._numResets,
+                            self._resetDays,
+                            np.ascontiguousarray(dfValues))
+            return v * self._notional
+
+        v = _swapValue(self._fixedCoupon,
+                       self._fixedSign(),
+                       self._fixedYearFracs[isFixed],
+                       np.asarray(fixedDfs, dtype=np.float64),
+                       self._floatSpread,
+                       self._floatYearFracs[isFloat],
+                       np.asarray(resetDfs, dtype=np.float64),
+                       np.asarray(endDfs, dtype=np.float64),
+                       np.asarray(paymentDfs, dtype=np.float64),
+                       self._numResets,
+                       self._resetDays,
+                       discountCurve.df(valuationDate))
+
+        return v * self._notional
+
+###############################################################################
+
+    def pv01(self,
+             valuationDate: TuringDate,
+             discountCurve: TuringDiscountCurve):
+        ''' Value of 1 unit of fixed coupon per unit notional, which is
+        positive whatever the direction of the swap. '''
+
+        isFixed = self._fixedPaymentDates > valuationDate
+        fixedDfs = discountCurve.df(self._fixedPaymentDates[isFixed])
+        annuity = np.sum(self._fixedYearFracs[isFixed] * fixedDfs)
+        return annuity / discountCurve.df(valuationDate)
+
+###############################################################################
+
+    def __repr__(self):
+        ''' Print the contractual details of the curve swap. '''
+        s = to_string("OBJECT TYPE", type(self).__name__)
+        s += to_string("EFFECTIVE DATE", self.effective_date)
+        s += to_string("TERMINATION DATE", self.termination_date)
+        s += to_string("MATURITY DATE", self.maturity_date)
+        s += to_string("FIXED LEG TYPE", self._fixedLegType)
+        s += to_string("FIXED COUPON", self._fixedCoupon)
+        s += to_string("FIXED FREQUENCY", self._fixedFreqType)
+        s += to_string("FIXED DAY COUNT", self._fixedDayCountType)
+        s += to_string("NOTIONAL", self._notional)
+        s += to_string("FLOAT SPREAD", self._floatSpread)
+        s += to_string("FLOAT FREQUENCY", self._floatFreqType)
+        s += to_string("FLOAT DAY COUNT", self._floatDayCountType)
+        s += to_string("RESET FREQUENCY", self._resetFreqType)
+        s += to_string("CALENDAR", self._calendarType)
+        s += to_string("BUS DAY ADJUST TYPE", self._busDayAdjustType)
+        s += to_string("DATE GEN RULE TYPE", self._dateGenRuleType, "")
+        return s
+
+###############################################################################
+
+    def _print(self):
+        print(self)
+
+###############################################################################
@@ -20,8 +20,8 @@ from turing_utils.log.request_id_log import logger
 from turing_models.utilities.helper_functions import to_string, to_datetime, to_turing_date
 from turing_models.utilities.turing_date import TuringDate
 from turing_models.utilities.global_types import OptionType, TuringExerciseType
-from turing_models.market.curves.discount_curve_flat import TuringDiscountCurveFlat
 from turing_models.market.curves.discount_curve_zeros import TuringDiscountCurveZeros
+from turing_models.market.curves.curve_cache import shared_flat_curve, shared_zero_curve
 from turing_models.utilities.global_variables import gDaysInYear
 
 dy = 0.0001
@@ -105,12 +105,11 @@ class IROption(IR, InstrumentBase, metaclass=ABCMeta):
         if self._discount_curve_rf:
             return self._discount_curve_rf
         else:
+            # 估值日期和利率相同的期权共享登记表中的同一条曲线
             if self._interest_rate:
-                return TuringDiscountCurveFlat(
-                    self._value_date, self._interest_rate)
-            elif self._zero_dates and self.zero_rates:
-                return TuringDiscountCurveZeros(
-                    self._value_date, self._zero_dates, self.zero_rates)
+                return shared_flat_curve(self._value_date, self._interest_rate)
+            elif self.zero_dates and self.zero_rates:
+                return shared_zero_curve(self._value_date, self.zero_dates, self.zero_rates)
 
     @discount_curve_rf.setter
     def discount_curve_rf(self, value: TuringDiscountCurveZeros):
@@ -5,7 +5,6 @@ from typing import Union, List
 import numpy as np
 
 from turing_models.market.curves.discount_curve import TuringDiscountCurve
-from turing_models.market.curves.discount_curve_zeros import TuringDiscountCurveZeros
 from turing_models.utilities.turing_date import TuringDate
 from turing_models.utilities.global_variables import gSmall
 from turing_models.utilities.day_count import DayCountType
@@ -16,16 +15,16 @@ from turing_models.utilities.global_types import TuringSwapTypes
 from turing_models.instruments.rates.fixed_leg import TuringFixedLeg
 from turing_models.instruments.rates.float_leg import TuringFloatLeg
 from turing_models.instruments.rates.ibor_deposit import TuringIborDeposit
+from turing_models.instruments.rates.ibor_curve_swap import TuringIborCurveSwap
 from turing_models.market.curves.ibor_single_curve import TuringIborSingleCurve
+from turing_models.market.curves.curve_jacobian import curveJacobian
+from turing_models.market.curves.curve_cache import curve_cache, shared_zero_curve
 from turing_models.instruments.core import InstrumentBase
 from turing_models.instruments.common import IR
 from turing_models.utilities.helper_functions import to_string
 from turing_models.utilities.error import TuringError
 
 
-bump = 5e-4
-
-
 def modify_day_count_type(day_count_type):
     if isinstance(day_count_type, DayCountType):
         return day_count_type
@@ -93,7 +92,6 @@ def create_ibor_single_curve(value_date: TuringDate,
 
     depos = []
     fras = []
-    swaps = []
     if isinstance(deposit_terms, str) or isinstance(deposit_terms, float):
         deposit_terms = [deposit_terms]
         deposit_rates = [deposit_rates]
@@ -119,17 +117,23 @@ def create_ibor_single_curve(value_date: TuringDate,
     elif isinstance(swap_curve_dates[0], float):
         swap_curve_dates = value_date.addYears(swap_curve_dates)
 
-    for i in range(len(swap_curve_dates)):
-        swap = IRS(effective_date=value_date,
-                   termination_date=swap_curve_dates[i],
-                   fixed_leg_type=fixed_leg_type,
-                   fixed_coupon=swap_curve_rates[i] + dx,
-                   fixed_freq_type=fixed_freq_type,
-                   fixed_day_count_type=fixed_day_count_type,
-                   value_date=value_date,
-                   reset_freq_type=fixed_freq_type,
-                   date_gen_rule_type=TuringDateGenRuleTypes.FORWARD)
-        swaps.append(swap)
+    # 曲线互换只需要现金流的日期和年化期限，一次性生成所有期限的日程，
+    # 其余条款与IRS的默认值一致（浮动端按季付息、ACT/360，重置频率与固定端相同）
+    fixed_freq_type = modify_freq_type(fixed_freq_type)
+    swaps = TuringIborCurveSwap.strip(
+        value_date,
+        swap_curve_dates,
+        modify_leg_type(fixed_leg_type),
+        [rate + dx for rate in swap_curve_rates],
+        fixed_freq_type,
+        modify_day_count_type(fixed_day_count_type),
+        notional=1000000.0,
+        floatFreqType=FrequencyType.QUARTERLY,
+        floatDayCountType=DayCountType.ACT_360,
+        resetFreqType=fixed_freq_type,
+        calendarType=TuringCalendarTypes.WEEKEND,
+        busDayAdjustType=TuringBusDayAdjustTypes.FOLLOWING,
+        dateGenRuleType=TuringDateGenRuleTypes.FORWARD)
 
     libor_curve = TuringIborSingleCurve(value_date, depos, fras, swaps)
 
@@ -266,16 +270,15 @@ class IRS(IR, InstrumentBase):
 
     @property
     def discount_curve(self):
-        return TuringDiscountCurveZeros(
-            self.value_date_, self.swap_curve_dates_, self.swap_curve_rates)
+        """ 由互换曲线期限和利率构建的零息曲线，估值日期（含ctx中的pricing_date）和曲线数据相同时共享缓存 """
+        return shared_zero_curve(self.value_date_, self.swap_curve_dates, self.swap_curve_rates)
 
     @property
     def index_curve(self):
         if self._index_curve:
             return self._index_curve
         elif self.index_curve_dates and self.index_curve_rates:
-            return TuringDiscountCurveZeros(
-                self.value_date_, self.index_curve_dates_, self.index_curve_rates)
+            return shared_zero_curve(self.value_date_, self.index_curve_dates, self.index_curve_rates)
         else:
             return None
 
@@ -292,46 +295,62 @@ class IRS(IR, InstrumentBase):
         self._libor_curve = value
 
     def build_ibor_single_curve(self, dx):
-        return create_ibor_single_curve(self.value_date_,
-                                        self.deposit_term,
-                                        self.deposit_rate,
-                                        self.deposit_day_count_type_,
-                                        self.swap_curve_dates_,
-                                        self.fixed_leg_type_for_curve,
-                                        self.swap_curve_rates,
-                                        self.fixed_freq_type_for_curve,
-                                        self.fixed_day_count_type_for_curve,
-                                        dx)
+        """ 自举Ibor单曲线，估值日期（含ctx中的pricing_date）、存款和互换报价、曲线惯例及bump量
+        都相同的互换共享同一次构建 """
+        return curve_cache.get('ibor_single_curve',
+                               lambda: create_ibor_single_curve(self.value_date_,
+                                                                self.deposit_term,
+                                                                self.deposit_rate,
+                                                                self.deposit_day_count_type_,
+                                                                self.swap_curve_dates_,
+                                                                self.fixed_leg_type_for_curve,
+                                                                self.swap_curve_rates,
+                                                                self.fixed_freq_type_for_curve,
+                                                                self.fixed_day_count_type_for_curve,
+                                                                dx),
+                               self.value_date_,
+                               self.deposit_term,
+                               self.deposit_rate,
+                               self.deposit_day_count_type_,
+                               self.swap_curve_dates,
+                               self.fixed_leg_type_for_curve,
+                               self.swap_curve_rates,
+                               self.fixed_freq_type_for_curve,
+                               self.fixed_day_count_type_for_curve,
+                               dx)
 
     def price(self):
         """ Value the interest rate swap on a value date given a single Ibor
         discount curve. """
 
         libor_curve = self.libor_curve
-        if self.index_curve is None:
-            self.index_curve = libor_curve
+        index_curve = self.index_curve
+        if index_curve is None:
+            index_curve = libor_curve
 
         fixed_leg_value = self.fixed_leg.value(self.value_date_,
                                                libor_curve)
 
         float_leg_value = self.float_leg.value(self.value_date_,
                                                libor_curve,
-                                               self.index_curve,
+                                               index_curve,
                                                self.first_fixing_rate)
 
         return fixed_leg_value + float_leg_value
 
     def dv01(self):
-        """ Calculate the value of 1 basis point coupon on the fixed leg. """
+        """ 互换曲线报价整体上移1bp的价值变化，由曲线自举的雅可比矩阵解析得到，无需重建曲线 """
+        jacobian = curveJacobian(self.libor_curve)
+        bucketed_dv01 = jacobian.bucketedDv01([self])[0]
+        return np.sum(bucketed_dv01[jacobian.swapQuoteIndices()])
 
-        libor_curve = self.libor_curve
-        self.libor_curve = self.build_ibor_single_curve(bump)
-        pv_bumpup = self.price()
-        self.libor_curve = self.build_ibor_single_curve(-bump)
-        pv_bumpdown = self.price()
-        dv01 = (pv_bumpup - pv_bumpdown) / 10
-        self.libor_curve = libor_curve
-        return dv01
+    def bucketed_dv01(self):
+        """ 构建曲线的各个报价（存款利率、FRA利率、互换利率）分别上移1bp的价值变化 """
+        return curveJacobian(self.libor_curve).bucketedDv01([self])[0]
+
+    def key_rate_dv01(self):
+        """ 曲线各节点零息利率（连续复利）分别上移1bp的价值变化 """
+        return curveJacobian(self.libor_curve).keyRateDv01([self])[0]
 
     def dollar_duration(self):
         pass
@@ -366,12 +385,13 @@ class IRS(IR, InstrumentBase):
             raise TuringError("PV01 is zero. Cannot compute swap rate.")
 
         libor_curve = self.libor_curve
-        if self.index_curve is None:
-            self.index_curve = libor_curve
+        index_curve = self.index_curve
+        if index_curve is None:
+            index_curve = libor_curve
 
         float_leg_pv = self.float_leg.value(self.value_date_,
                                             libor_curve,
-                                            self.index_curve,
+                                            index_curve,
                                             self.first_fixing_rate)
 
         float_leg_pv = np.abs(float_leg_pv)
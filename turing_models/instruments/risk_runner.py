@@ -0,0 +1,146 @@
+import copy
+import os
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Union, List
+
+import numpy as np
+import pandas as pd
+
+from fundamental.base import ctx
+from turing_models.instruments.common import RiskMeasure
+from turing_models.market.data.market_data_cache import market_data_cache
+from turing_models.utilities.error import TuringError
+from turing_models.utilities.process_pool import pool_context
+from turing_utils.log.request_id_log import logger
+
+risk_run_results = namedtuple('risk_run_results', ['values', 'timings', 'errors'])
+
+
+def _measure_name(risk):
+    return risk.value if isinstance(risk, RiskMeasure) else risk
+
+
+def _calc_shard(instruments, index, risk_measures):
+    """ 计算一组持仓的全部风险指标，与InstrumentBase.calc的步骤相同，但每个(持仓, 指标)的
+    异常和耗时单独记录，不打断其余的计算。返回(下标, 结果, 耗时, 错误记录) """
+    m = len(risk_measures)
+    values = [[None] * m for _ in index]
+    timings = np.full((len(index), m), np.nan)
+    errors = []
+    for row, i in enumerate(index):
+        instrument = instruments[i]
+        start = time.perf_counter()
+        try:
+            if not instrument.isvalid():
+                raise TuringError("The instrument expired")
+            if getattr(instrument, '_ctx_resolve', None) is not None:
+                instrument._ctx_resolve()
+        except Exception as e:
+            # 持仓本身无效或行情解析失败，所有指标都记为错误
+            for risk in risk_measures:
+                errors.append((i, _measure_name(risk), f'{type(e).__name__}: {e}', traceback.format_exc()))
+            timings[row, :] = time.perf_counter() - start
+            continue
+        for col, risk in enumerate(risk_measures):
+            start = time.perf_counter()
+            try:
+                values[row][col] = instrument._calc(risk, getattr(instrument, _measure_name(risk))())
+            except Exception as e:
+                errors.append((i, _measure_name(risk), f'{type(e).__name__}: {e}', traceback.format_exc()))
+            timings[row, col] = time.perf_counter() - start
+    return index, values, timings, errors
+
+
+_worker_state = {}
+
+
+def _init_worker(instruments, market_data):
+    """ 子进程初始化：持仓和只读行情快照每个进程只传一次，fork启动时直接继承父进程内存，
+    forkserver启动时经pickle传入 """
+    for instrument in instruments:
+        instrument.ctx = ctx
+    _worker_state['instruments'] = instruments
+    market_data_cache.load(market_data)
+
+
+def _worker_calc_shard(args):
+    index, risk_measures = args
+    return _calc_shard(_worker_state['instruments'], index, risk_measures)
+
+
+class PortfolioRiskRunner:
+    """ 组合风险指标的多进程计算引擎
+
+    持仓按下标切分成若干分片，由进程池并行计算，子进程启动时载入父进程行情快照缓存中的数据，
+    调用前先批量预取行情（如YieldCurve.prefetch）即可让所有子进程共享同一份只读行情而不重复取数。
+    分片数为进程数的若干倍，各进程计算完一个分片后再领取下一个，持仓计算量不均时也能保持负载均衡。
+    结果汇总成按持仓排列、每个风险指标一列的DataFrame，每个(持仓, 指标)的耗时和异常单独记录，
+    出错的指标值为None，不影响其余持仓和指标。
+    进程池的启动方式由pool_context决定，本进程调用过并行的numba函数后改用forkserver启动。 """
+
+    def __init__(self, instruments: list, processes: int = None, shards_per_process: int = 4):
+        if len(instruments) == 0:
+            raise TuringError("Portfolio is empty")
+
+        self.instruments = list(instruments)
+        self.asset_ids = [getattr(instrument, 'asset_id', None) for instrument in instruments]
+        self.processes = processes or os.cpu_count() or 1
+        self.shards_per_process = shards_per_process
+
+    @classmethod
+    def from_portfolio(cls, portfolio, **kwargs):
+        """ 由fundamental的Portfolio创建，计算各持仓的tradable """
+        positions = portfolio._position_sets.positions
+        return cls([position.tradable for position in positions], **kwargs)
+
+    def _shards(self):
+        num_shards = min(len(self.instruments), self.processes * self.shards_per_process)
+        return [list(index) for index in np.array_split(np.arange(len(self.instruments)), num_shards)]
+
+    def run(self, risk_measure: Union[RiskMeasure, List[RiskMeasure]]):
+        """ 计算全部持仓的风险指标，返回risk_run_results(values, timings, errors)：
+        values和timings按持仓排列、每个指标一列，timings单位为秒；
+        errors每行为一个出错的(持仓, 指标)，含错误信息和完整的traceback """
+        if isinstance(risk_measure, (RiskMeasure, str)):
+            risk_measure = [risk_measure]
+        risk_measures = list(risk_measure)
+        columns = [_measure_name(risk) for risk in risk_measures]
+        shards = self._shards()
+
+        num_workers = min(self.processes, len(shards))
+        if num_workers <= 1:
+            results = [_calc_shard(self.instruments, index, risk_measures) for index in shards]
+        else:
+            instruments = []
+            for instrument in self.instruments:
+                i = copy.copy(instrument)
+                # 上下文对象不传给子进程，子进程中重新指向该进程的全局上下文
+                i.__dict__.pop('ctx', None)
+                instruments.append(i)
+            with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                     initargs=(instruments, market_data_cache.snapshot()),
+                                     mp_context=pool_context([__name__])) as pool:
+                results = list(pool.map(_worker_calc_shard, [(index, risk_measures) for index in shards]))
+
+        n = len(self.instruments)
+        values = [None] * n
+        timings = np.full((n, len(columns)), np.nan)
+        errors = []
+        for index, shard_values, shard_timings, shard_errors in results:
+            for row, i in enumerate(index):
+                values[i] = shard_values[row]
+            timings[index] = shard_timings
+            errors.extend(shard_errors)
+
+        index = pd.Index(self.asset_ids, name='asset_id')
+        values = pd.DataFrame(values, index=index, columns=columns)
+        timings = pd.DataFrame(timings, index=index, columns=columns)
+        errors = pd.DataFrame([(self.asset_ids[i], i, risk, message, trace)
+                               for i, risk, message, trace in errors],
+                              columns=['asset_id', 'position', 'risk_measure', 'error', 'traceback'])
+        if len(errors):
+            logger.debug(f"{len(errors)} risk measure(s) failed in portfolio risk run")
+        return risk_run_results(values, timings, errors)
@@ -0,0 +1,146 @@
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from fundamental.base import ctx
+from turing_models.instruments.rates.bond_book import BondBook
+from turing_models.instruments.rates.bond_fixed_rate import BondFixedRate
+from turing_models.market.data.market_data_cache import market_data_cache
+from turing_models.utilities.error import TuringError
+from turing_models.utilities.process_pool import pool_context
+
+
+def _price_points(instrument, points):
+    """ 逐个情景在副本上施加情景并定价 """
+    values = np.empty(len(points))
+    for k, (spot_shock, vol_shock, curve_shift) in enumerate(points):
+        scenario = copy.copy(instrument)
+        scenario._apply_scenario(spot_shock, vol_shock, curve_shift)
+        values[k] = scenario.price()
+    return values
+
+
+_worker_state = {}
+
+
+def _init_worker(instruments, market_data):
+    """ 子进程初始化：持仓和只读行情快照每个进程只传一次 """
+    for instrument in instruments:
+        instrument.ctx = ctx
+    _worker_state['instruments'] = instruments
+    market_data_cache.load(market_data)
+
+
+def _worker_price_points(args):
+    i, points = args
+    return _price_points(_worker_state['instruments'][i], points)
+
+
+class ScenarioGrid:
+    """ 股价 × 波动率 × 曲线平移 的情景网格
+
+    spot_shocks为股价的相对变动（-0.1即下跌10%），vol_shocks为波动率的绝对变动，curve_shifts为折现曲线的
+    平行移动（bp），网格为三个轴的全部组合。情景在当前PricingContext的what-if数据之上施加，
+    不必逐个情景进入PricingContext：
+    提供scenario_prices的instrument（如EuropeanOption用bs_value按三个轴广播）一次算出整个网格；
+    固定利率债券只受曲线平移影响，全部债券用BondBook按曲线情景块一次定价；
+    其余提供_apply_scenario的instrument逐个情景在副本上定价，各(持仓, 情景分片)由进程池并行计算，
+    进程池的启动方式由pool_context决定，本进程调用过并行的numba函数后改用forkserver启动。 """
+
+    def __init__(self, spot_shocks=(0.0,), vol_shocks=(0.0,), curve_shifts=(0.0,)):
+        self.spot_shocks = np.atleast_1d(np.asarray(spot_shocks, dtype=np.float64))
+        self.vol_shocks = np.atleast_1d(np.asarray(vol_shocks, dtype=np.float64))
+        self.curve_shifts = np.atleast_1d(np.asarray(curve_shifts, dtype=np.float64))
+        for axis in (self.spot_shocks, self.vol_shocks, self.curve_shifts):
+            if axis.ndim != 1 or len(axis) == 0:
+                raise TuringError("Scenario axes must be non-empty vectors")
+
+    @property
+    def shape(self):
+        return len(self.spot_shocks), len(self.vol_shocks), len(self.curve_shifts)
+
+    def points(self):
+        """ 网格上的全部情景，形状为(情景数, 3)，按股价、波动率、曲线平移的顺序展开 """
+        grid = np.meshgrid(self.spot_shocks, self.vol_shocks, self.curve_shifts, indexing='ij')
+        return np.stack([axis.ravel() for axis in grid], axis=1)
+
+    def evaluate(self, instruments: list, processes: int = None, shards_per_process: int = 4):
+        """ 每个持仓在网格上的价格（债券为全价），返回形状为(持仓数, 股价情景数, 波动率情景数, 曲线情景数)的数组 """
+        if len(instruments) == 0:
+            raise TuringError("Portfolio is empty")
+        for instrument in instruments:
+            if getattr(instrument, '_ctx_resolve', None) is not None:
+                instrument._ctx_resolve()
+
+        values = np.empty((len(instruments),) + self.shape)
+        bonds = []
+        scattered = []
+        for i, instrument in enumerate(instruments):
+            if isinstance(instrument, BondFixedRate):
+                bonds.append(i)
+            elif getattr(instrument, 'scenario_prices', None) is not None:
+                values[i] = instrument.scenario_prices(self.spot_shocks, self.vol_shocks, self.curve_shifts)
+            elif getattr(instrument, '_apply_scenario', None) is not None:
+                scattered.append(i)
+            else:
+                raise TuringError(f"Scenario grid does not support {type(instrument).__name__}")
+
+        if bonds:
+            # 债券价格与股价、波动率无关，沿这两个轴广播
+            prices = BondBook([instruments[i] for i in bonds]).parallel_full_price(self.curve_shifts)
+            values[bonds] = prices.T[:, None, None, :]
+
+        if scattered:
+            points = self.points()
+            processes = processes or os.cpu_count() or 1
+            num_shards = max(1, min(len(points), processes * shards_per_process // len(scattered)))
+            tasks = [(i, points[index]) for i in scattered
+                     for index in np.array_split(np.arange(len(points)), num_shards)]
+            num_workers = min(processes, len(tasks))
+            if num_workers <= 1:
+                results = [_price_points(instruments[i], shard) for i, shard in tasks]
+            else:
+                shared = []
+                for instrument in instruments:
+                    i = copy.copy(instrument)
+                    # 上下文对象不传给子进程，子进程中重新指向该进程的全局上下文
+                    i.__dict__.pop('ctx', None)
+                    shared.append(i)
+                with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                         initargs=(shared, market_data_cache.snapshot()),
+                                         mp_context=pool_context([__name__])) as pool:
+                    results = list(pool.map(_worker_price_points, tasks))
+            flat = {i: [] for i in scattered}
+            for (i, _), result in zip(tasks, results):
+                flat[i].append(result)
+            for i in scattered:
+                values[i] = np.concatenate(flat[i]).reshape(self.shape)
+        return values
+
+    def portfolio_values(self, instruments: list, quantities=None, processes: int = None):
+        """ 组合在网格上的价值，各持仓价格按持仓数量加权求和，返回形状为(股价情景数, 波动率情景数, 曲线情景数)的数组 """
+        if quantities is None:
+            quantities = np.ones(len(instruments))
+        quantities = np.asarray(quantities, dtype=np.float64)
+        if quantities.shape != (len(instruments),):
+            raise TuringError("Quantities must have one value per instrument")
+        return np.tensordot(quantities, self.evaluate(instruments, processes), axes=1)
+
+    def portfolio_grid(self, portfolio, processes: int = None):
+        """ fundamental的Portfolio在网格上的价值 """
+        positions = portfolio._position_sets.positions
+        quantities = [getattr(position, 'quantity', None) for position in positions]
+        # 未给出持仓数量时按1计，数量为0的持仓保留为0
+        return self.portfolio_values([position.tradable for position in positions],
+                                     [1.0 if quantity is None else quantity for quantity in quantities],
+                                     processes)
+
+    def to_frame(self, values: np.ndarray):
+        """ 把网格上的价值展开成以(spot_shock, vol_shock, curve_shift)为索引的表，
+        values为portfolio_values的结果或evaluate结果中的一个持仓 """
+        index = pd.MultiIndex.from_product([self.spot_shocks, self.vol_shocks, self.curve_shifts],
+                                           names=['spot_shock', 'vol_shock', 'curve_shift'])
+        return pd.Series(np.asarray(values).ravel(), index=index, name='value').to_frame()
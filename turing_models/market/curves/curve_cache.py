@@ -0,0 +1,61 @@
+import datetime
+
+import numpy as np
+
+from turing_models.utilities.shared_cache import SharedCache
+from turing_models.utilities.turing_date import TuringDate
+from turing_models.market.curves.discount_curve_flat import TuringDiscountCurveFlat
+from turing_models.market.curves.discount_curve_zeros import TuringDiscountCurveZeros
+
+
+def _normalise_input(value):
+    """ 统一曲线输入的键格式：TuringDate的哈希值都相同，用excel日期代替；
+    datetime转成date；列表、元组和数组逐项转换成元组 """
+    if isinstance(value, TuringDate):
+        return value._excelDate
+    elif isinstance(value, datetime.datetime):
+        return value.date()
+    elif isinstance(value, (list, tuple, np.ndarray)):
+        return tuple(_normalise_input(v) for v in value)
+    return value
+
+
+class CurveCache(SharedCache):
+    """ 进程级曲线缓存，即各instrument共享的曲线登记表
+
+    以 (曲线类型, 构建曲线的全部输入) 为键缓存构建好的曲线对象，输入包括曲线编码、估值日期、期限、
+    利率、计息惯例、曲线调整和bump量等，相同输入的曲线无论来自哪个instrument都只构建一次，
+    持仓数量增加时曲线对象的数量不变，插值系数、曲线上缓存的雅可比矩阵等也随之共享。
+    登记的曲线被视为不可变对象：调用方不能原地修改，需要bump时应在副本上进行。
+    builder返回None时不缓存，缓存项数超过max_size时淘汰最久未使用的一项。 """
+
+    def __init__(self, max_size: int = 1000):
+        super().__init__(max_size)
+
+    @staticmethod
+    def make_key(kind: str, *inputs):
+        return (kind,) + tuple(_normalise_input(value) for value in inputs)
+
+    def get(self, kind: str, builder, *inputs):
+        """ 命中缓存则直接返回，否则调用builder()构建曲线并写入缓存。
+        同一个键的并发请求只会构建一次 """
+        if not self.enabled:
+            return builder()
+        return self._get_or_build(self.make_key(kind, *inputs), builder)
+
+
+curve_cache = CurveCache()
+
+
+def shared_flat_curve(value_date: TuringDate, rate: float):
+    """ 登记表中的水平贴现曲线 """
+    return curve_cache.get('discount_curve_flat',
+                           lambda: TuringDiscountCurveFlat(value_date, rate),
+                           value_date, rate)
+
+
+def shared_zero_curve(value_date: TuringDate, tenors: list, rates: list):
+    """ 登记表中由期限（年）和零息利率构建的零息曲线 """
+    return curve_cache.get('discount_curve_zeros',
+                           lambda: TuringDiscountCurveZeros(value_date, value_date.addYears(tenors), rates),
+                           value_date, tenors, rates)
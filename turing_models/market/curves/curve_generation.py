@@ -10,6 +10,7 @@ from turing_models.instruments.common import CurrencyPair, DiscountCurveType, Ct
 from turing_models.instruments.rates.irs import create_ibor_single_curve
 from turing_models.market.curves.discount_curve import TuringDiscountCurve
 from turing_models.market.curves.discount_curve_fx_implied import TuringDiscountCurveFXImplied
+from turing_models.market.data.market_data_cache import market_data_cache
 from turing_models.utilities.day_count import DayCountType
 from turing_models.utilities.error import TuringError
 from turing_models.utilities.frequency import FrequencyType
@@ -18,6 +19,7 @@ from turing_models.utilities.helper_classes import Base
 from turing_models.utilities.helper_functions import turingdate_to_qldate, to_datetime, \
      to_turing_date
 from turing_models.utilities.turing_date import TuringDate
+from turing_models.utilities.turing_date_array import TuringDateArray
 
 
 class CurveGeneration(Base, Ctx):
@@ -67,7 +69,10 @@ class CurveGeneration(Base, Ctx):
         if shibor_data is not None:
             return pd.DataFrame(shibor_data)
         date = self._original_value_date
-        original_data = TuringDB.get_global_ibor_curve(ibor_type='Shibor', currency='CNY', start=date, end=date)
+        original_data = market_data_cache.fetch(
+            'global_ibor_curve',
+            lambda: TuringDB.get_global_ibor_curve(ibor_type='Shibor', currency='CNY', start=date, end=date),
+            symbol=('Shibor', 'CNY'), date=date)
         if not original_data.empty:
             return original_data
         else:
@@ -80,7 +85,10 @@ class CurveGeneration(Base, Ctx):
         if irs_curve is not None:
             return pd.DataFrame(irs_curve)
         date = self._original_value_date
-        original_data = TuringDB.get_irs_curve(ir_type="Shibor3M", currency='CNY', start=date, end=date)
+        original_data = market_data_cache.fetch(
+            'irs_curve',
+            lambda: TuringDB.get_irs_curve(ir_type="Shibor3M", currency='CNY', start=date, end=date),
+            symbol=('Shibor3M', 'CNY'), date=date)
         if not original_data.empty:
             return original_data.loc["Shibor3M"]
         else:
@@ -199,15 +207,13 @@ class FXIRCurve:
                                                           fx_forward_curve=fx_forward_curve,
                                                           curve_type=for_curve_type).discount_curve
 
-        self.nature_days = []
-        for i in range(1, number_of_days + 1):
-            day = value_date.addDays(i)
-            self.nature_days.append(day)
+        self.nature_days = TuringDateArray.fromOrdinals(
+            value_date._ordinal + np.arange(1, number_of_days + 1))
 
     def get_ccy1_curve(self):
         """获取外币利率曲线的DataFrame"""
         nature_days = self.nature_days
-        days = [day.datetime() for day in nature_days]
+        days = pd.to_datetime(nature_days.toDatetime64())
         foreign_discount_curve = self.foreign_discount_curve
         if self.for_curve_type == DiscountCurveType.FX_Implied_tr:
             rates = foreign_discount_curve.zeroRate(nature_days, freqType=FrequencyType.ANNUAL).tolist()
@@ -221,7 +227,7 @@ class FXIRCurve:
     def get_ccy2_curve(self):
         """获取人民币利率曲线的DataFrame"""
         nature_days = self.nature_days
-        days = [day.datetime() for day in nature_days]
+        days = pd.to_datetime(nature_days.toDatetime64())
         domestic_discount_curve = self.domestic_discount_curve
         if self.dom_curve_type == DiscountCurveType.Shibor3M_tr:
             rates = domestic_discount_curve.zeroRate(nature_days, freqType=FrequencyType.ANNUAL).tolist()
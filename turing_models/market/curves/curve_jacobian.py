@@ -0,0 +1,414 @@
+import copy
+
+import numpy as np
+
+from turing_models.utilities.error import TuringError
+from turing_models.utilities.day_count import TuringDayCount
+from turing_models.utilities.frequency import FrequencyType, TuringFrequency
+from turing_models.utilities.global_types import TuringSwapTypes
+from turing_models.utilities.global_variables import gSmall
+from turing_models.utilities.helper_functions import timesFromDates
+from turing_models.utilities.turing_date_array import TuringDateArray
+from turing_models.market.curves.discount_curve_zeros import TuringDiscountCurveZeros
+from turing_models.market.curves.ibor_single_curve import TuringIborSingleCurve
+from turing_models.market.curves.interpolator import TuringInterpTypes
+from turing_models.instruments.rates.ibor_curve_swap import TuringIborCurveSwap
+
+gBasisPoint = 0.0001
+
+###############################################################################
+# Key-rate and bucketed curve risk. The node zero rates of a bootstrapped curve
+# are an implicit function of the input quotes, so their Jacobian can be found
+# once per curve from the sensitivities of the calibration instruments to the
+# nodes. The risk of any instrument to the input quotes is then the product of
+# its node sensitivities with this Jacobian and no curve is ever rebuilt.
+###############################################################################
+
+
+class TuringCurveJacobian():
+    ''' Sensitivities of the continuously compounded zero rates at the grid
+    points of a TuringIborSingleCurve or TuringDiscountCurveZeros to the
+    quotes used to build the curve. For an Ibor curve the quotes are the
+    deposit rates, FRA rates and swap rates, for a zero curve they are the
+    zero rates themselves. Node sensitivities are found by bumping the grid
+    discount factors in place and refitting the interpolator, which costs
+    one valuation of each instrument per bump rather than one bootstrap. '''
+
+###############################################################################
+
+    def __init__(self,
+                 curve: (TuringIborSingleCurve, TuringDiscountCurveZeros),
+                 bumpSize: float = 1e-6):
+        ''' Compute the Jacobian of the node zero rates with respect to the
+        quotes of the curve. The bump size is the zero rate perturbation used
+        for the central differences of the instrument values. '''
+
+        self._curve = curve
+        self._bumpSize = bumpSize
+
+        if isinstance(curve, TuringIborSingleCurve):
+            self._buildIborJacobian()
+        elif isinstance(curve, TuringDiscountCurveZeros):
+            self._buildZerosJacobian()
+        else:
+            raise TuringError("Curve Jacobian needs a TuringIborSingleCurve"
+                              " or a TuringDiscountCurveZeros")
+
+###############################################################################
+
+    def _buildIborJacobian(self):
+        ''' The bootstrap makes every calibration instrument reprice exactly
+        so by the implicit function theorem dz/dq = -(dF/dz)^-1 dF/dq where F
+        are the instrument values. Each instrument depends on its own quote
+        only so dF/dq is diagonal and is computed analytically. '''
+
+        curve = self._curve
+        valuationDate = curve._valuationDate
+
+        # The first grid point is the valuation date with a fixed df of one
+        self._nodeIndices = np.arange(1, len(curve._times))
+
+        deposits = curve._usedDeposits
+        fras = curve._usedFRAs
+        swaps = curve._usedSwaps
+
+        if len(deposits) + len(fras) + len(swaps) != len(self._nodeIndices):
+            raise TuringError("Curve grid does not match its instruments")
+
+        values = []
+        quoteDerivs = []
+        quoteDates = []
+
+        for depo in deposits:
+            values.append(lambda c, d=depo:
+                          d.value(valuationDate, c) / d._notional)
+            dc = TuringDayCount(depo._dayCountType)
+            accFactor = dc.yearFrac(depo._startDate, depo.maturity_date)[0]
+            quoteDerivs.append(accFactor * curve.df(depo.maturity_date)
+                               / curve.df(depo._startDate))
+            quoteDates.append(depo.maturity_date)
+
+        for fra in fras:
+            values.append(lambda c, f=fra:
+                          f.value(valuationDate, c) / f._notional)
+            dc = TuringDayCount(fra._dayCountType)
+            accFactor = dc.yearFrac(fra._startDate, fra._maturityDate)[0]
+            deriv = -accFactor * curve.df(fra._maturityDate) \
+                / curve.df(valuationDate)
+            if fra._payFixedRate is True:
+                deriv *= -1.0
+            quoteDerivs.append(deriv)
+            quoteDates.append(fra._maturityDate)
+
+        for swap in swaps:
+            if isinstance(swap, TuringIborCurveSwap):
+                values.append(lambda c, s=swap:
+                              s.value(valuationDate, c) / s._notional)
+            else:
+                values.append(lambda c, s=swap:
+                              swapValue(s, c) / s.fixed_leg._notional)
+            quoteDerivs.append(self._swapAnnuity(swap))
+            quoteDates.append(swap.maturity_date)
+
+        # With a local interpolation scheme an instrument only depends on the
+        # grid points up to its own maturity, so the matrix is triangular
+        if curve._interpType in (TuringInterpTypes.FLAT_FWD_RATES,
+                                 TuringInterpTypes.LINEAR_ZERO_RATES):
+            firstRows = np.arange(0, len(values))
+        else:
+            firstRows = None
+
+        dFdz = self._nodeGradients(values, firstRows)
+        self._jacobian = -np.linalg.solve(dFdz, np.diag(quoteDerivs))
+        self._quoteDates = quoteDates
+        self._swapQuotes = np.arange(len(deposits) + len(fras),
+                                     len(quoteDates))
+
+###############################################################################
+
+    def _swapAnnuity(self,
+                     swap):
+        ''' Derivative of the swap value per unit notional with respect to
+        its fixed coupon. The fixed leg payments are linear in the coupon. '''
+
+        curve = self._curve
+
+        if isinstance(swap, TuringIborCurveSwap):
+            annuity = swap.pv01(curve._valuationDate, curve)
+            legType = swap._fixedLegType
+        else:
+            fixedLeg = swap.fixed_leg
+            valuationDate = swap.value_date_
+            dfValue = curve.df(valuationDate)
+
+            annuity = 0.0
+            for pmntDate, yearFrac in zip(fixedLeg._paymentDates,
+                                          fixedLeg._yearFracs):
+                if pmntDate > valuationDate:
+                    annuity += yearFrac * curve.df(pmntDate) / dfValue
+
+            legType = fixedLeg._legType
+
+        if legType == TuringSwapTypes.PAY:
+            annuity *= -1.0
+
+        return annuity
+
+###############################################################################
+
+    def _buildZerosJacobian(self):
+        ''' The quotes are the zero rates on the curve grid so the Jacobian
+        is diagonal with the derivative of the continuously compounded rate
+        with respect to the rate in the curve's compounding convention. '''
+
+        curve = self._curve
+        rates = np.array(curve._zeroRates, dtype=np.float64)
+        times = np.maximum(curve._times, gSmall)
+
+        if curve._freqType == FrequencyType.CONTINUOUS:
+            derivs = np.ones(len(rates))
+        elif curve._freqType == FrequencyType.SIMPLE:
+            derivs = 1.0 / (1.0 + rates * times)
+        else:
+            f = TuringFrequency(curve._freqType)
+            derivs = 1.0 / (1.0 + rates / f)
+
+        self._nodeIndices = np.arange(0, len(curve._times))
+        self._jacobian = np.diag(derivs)
+        self._quoteDates = list(curve._zeroDates)
+        self._swapQuotes = self._nodeIndices
+
+###############################################################################
+
+    def _bumpCurve(self):
+        ''' A copy of the curve with its own interpolator whose grid discount
+        factors can be bumped. The curve itself may be shared by many
+        instruments so it is never changed. '''
+
+        curve = copy.copy(self._curve)
+        curve._interpolator = copy.copy(self._curve._interpolator)
+        return curve
+
+###############################################################################
+
+    @staticmethod
+    def _setDfs(curve,
+                dfs: np.ndarray):
+        ''' Replace the grid discount factors and refit the interpolator. '''
+
+        curve._dfs = dfs
+        curve._interpolator.fit(curve._times, dfs)
+
+###############################################################################
+
+    def _nodeGradients(self,
+                       valueFunctions: list,
+                       firstRows: np.ndarray = None):
+        ''' Central difference derivatives of a list of functions of the
+        curve with respect to each node zero rate. If firstRows is given the
+        functions before firstRows[j] are known not to depend on node j and
+        are skipped. The functions are given a bumped copy of the curve. '''
+
+        curve = self._bumpCurve()
+        dfs = self._curve._dfs
+        h = self._bumpSize
+
+        grads = np.zeros((len(valueFunctions), len(self._nodeIndices)))
+
+        for j, k in enumerate(self._nodeIndices):
+            for sign in (1.0, -1.0):
+                bumpedDfs = np.array(dfs, dtype=np.float64)
+                bumpedDfs[k] *= np.exp(-sign * h * curve._times[k])
+                self._setDfs(curve, bumpedDfs)
+                start = 0 if firstRows is None else firstRows[j]
+                for i in range(start, len(valueFunctions)):
+                    grads[i, j] += sign * valueFunctions[i](curve)
+
+        return grads / (2.0 * h)
+
+###############################################################################
+
+    def _cashFlowGradients(self,
+                           bonds: list):
+        ''' Node sensitivities of bonds valued from their cash flows on the
+        curve. All flow dates are discounted together, so the derivatives of
+        the discount factors are found for every date in one pass and the
+        bond sensitivities are a single matrix product. '''
+
+        curve = self._bumpCurve()
+
+        excelDates = []
+        owners = []
+        weights = []
+        settleDates = []
+
+        for i, bond in enumerate(bonds):
+            dates, amounts = bond._curve_cash_flows()
+            excelDates += [dt._excelDate for dt in dates]
+            owners += [i] * len(dates)
+            weights += list(amounts * bond.par)
+            settleDates.append(bond.settlement_date._excelDate)
+
+        uniqueDates, index = np.unique(np.concatenate((excelDates,
+                                                       settleDates)),
+                                       return_inverse=True)
+        dates = TuringDateArray.fromExcelDates(uniqueDates)
+        times = timesFromDates(dates, curve._valuationDate,
+                               curve._dayCountType)
+
+        def curveDfs():
+            dfs = np.atleast_1d(curve._df(times))
+            return np.where(np.abs(times) < gSmall, 1.0, dfs)
+
+        dfs = curveDfs()
+        flowIndex = index[:len(excelDates)]
+        settleIndex = index[len(excelDates):]
+        owners = np.array(owners, dtype=np.int64)
+        weights = np.array(weights, dtype=np.float64)
+
+        # The value is sum(a * df) / dfSettle so its gradient with respect
+        # to the discount factors has a term on each flow date and one on the
+        # settlement date
+        dfSettle = dfs[settleIndex]
+        values = np.bincount(owners, weights * dfs[flowIndex], len(bonds)) \
+            / dfSettle
+        dvddf = np.zeros((len(bonds), len(uniqueDates)))
+        np.add.at(dvddf, (owners, flowIndex), weights / dfSettle[owners])
+        np.add.at(dvddf, (np.arange(len(bonds)), settleIndex),
+                  -values / dfSettle)
+
+        h = self._bumpSize
+        baseDfs = curve._dfs
+        dfdz = np.zeros((len(uniqueDates), len(self._nodeIndices)))
+
+        for j, k in enumerate(self._nodeIndices):
+            for sign in (1.0, -1.0):
+                bumpedDfs = np.array(baseDfs, dtype=np.float64)
+                bumpedDfs[k] *= np.exp(-sign * h * curve._times[k])
+                self._setDfs(curve, bumpedDfs)
+                dfdz[:, j] += sign * curveDfs()
+
+        return dvddf @ (dfdz / (2.0 * h))
+
+###############################################################################
+
+    def nodeGradients(self,
+                      instruments: list):
+        ''' Derivatives of the instrument values with respect to each node
+        zero rate, one row per instrument. Instruments may be swaps priced on
+        the curve (IRS), fixed rate bonds valued from their cash flows, or
+        any function that takes the curve and returns a value. '''
+
+        grads = np.zeros((len(instruments), len(self._nodeIndices)))
+
+        bondRows = []
+        bonds = []
+        valueRows = []
+        values = []
+
+        for i, instrument in enumerate(instruments):
+            if hasattr(instrument, "_curve_cash_flows"):
+                bondRows.append(i)
+                bonds.append(instrument)
+            elif hasattr(instrument, "libor_curve"):
+                valueRows.append(i)
+                values.append(lambda c, s=instrument: swapValue(s, c))
+            elif callable(instrument):
+                valueRows.append(i)
+                values.append(instrument)
+            else:
+                raise TuringError("Cannot value " + type(instrument).__name__
+                                  + " on a curve")
+
+        if len(bonds) > 0:
+            grads[bondRows] = self._cashFlowGradients(bonds)
+
+        if len(values) > 0:
+            grads[valueRows] = self._nodeGradients(values)
+
+        return grads
+
+###############################################################################
+
+    def keyRateDv01(self,
+                    instruments: list):
+        ''' Change in value of each instrument for a one basis point rise in
+        each node zero rate of the curve. '''
+
+        return self.nodeGradients(instruments) * gBasisPoint
+
+###############################################################################
+
+    def bucketedDv01(self,
+                     instruments: list):
+        ''' Change in value of each instrument for a one basis point rise in
+        each of the quotes used to build the curve. '''
+
+        return self.nodeGradients(instruments) @ self._jacobian * gBasisPoint
+
+###############################################################################
+
+    def parallelDv01(self,
+                     instruments: list):
+        ''' Change in value of each instrument for a one basis point parallel
+        shift of the continuously compounded node zero rates. '''
+
+        return np.sum(self.keyRateDv01(instruments), axis=1)
+
+###############################################################################
+
+    def jacobian(self):
+        ''' Derivatives of the node zero rates (rows) with respect to the
+        curve quotes (columns). '''
+        return self._jacobian
+
+###############################################################################
+
+    def nodeTimes(self):
+        ''' Times of the curve grid points that carry risk. '''
+        return self._curve._times[self._nodeIndices]
+
+###############################################################################
+
+    def quoteDates(self):
+        ''' Maturity dates of the curve quotes, one per bucket. '''
+        return self._quoteDates
+
+###############################################################################
+
+    def swapQuoteIndices(self):
+        ''' Columns of the Jacobian belonging to swap rates (all of them for a
+        zero curve). '''
+        return self._swapQuotes
+
+###############################################################################
+
+
+def curveJacobian(curve: (TuringIborSingleCurve, TuringDiscountCurveZeros),
+                  bumpSize: float = 1e-6):
+    ''' Returns the TuringCurveJacobian of a curve, computing it only once per
+    curve object. '''
+
+    jacobian = getattr(curve, "_curveJacobian", None)
+    if jacobian is None or jacobian._bumpSize != bumpSize:
+        jacobian = TuringCurveJacobian(curve, bumpSize)
+        curve._curveJacobian = jacobian
+    return jacobian
+
+###############################################################################
+
+
+def swapValue(swap,
+              curve):
+    ''' Value a swap on the curve, leaving the curve of the swap as it was.
+    Unless the swap has its own index curve the curve is also used for the
+    index, as in the single curve bootstrap. '''
+
+    liborCurve = swap._libor_curve
+    swap._libor_curve = curve
+    try:
+        return swap.price()
+    finally:
+        swap._libor_curve = liborCurve
+
+###############################################################################
@@ -0,0 +1,342 @@
+import numpy as np
+from numba import njit
+from scipy.interpolate import PchipInterpolator
+from scipy.interpolate import CubicSpline
+
+from turing_models.utilities.error import TuringError
+from turing_models.utilities.turing_date import TuringDate
+from turing_models.utilities.global_variables import gSmall
+from turing_models.utilities.helper_functions import timesFromDates
+from turing_models.market.curves.curve_cache import shared_zero_curve
+from turing_models.market.curves.discount_curve_zeros import TuringDiscountCurveZeros
+from turing_models.market.curves.interpolator import TuringInterpTypes, _uinterpolate
+
+gBasisPoint = 0.0001
+
+###############################################################################
+# Curve stress scenarios. A scenario is a shift of the node zero rates of a
+# base zero curve, written as a linear combination of a few shock shapes, so a
+# whole set of scenarios is one matrix of node shifts. The shocked discount
+# factors of every scenario at every date are then found in one pass over the
+# matrix rather than by building one curve object per scenario.
+###############################################################################
+
+
+@njit(fastmath=True, cache=True)
+def _blockInterpolate(t, times, dfs, method):
+    ''' Interpolate each row of a block of node discount factors at the
+    times t using one of the local interpolation schemes. '''
+
+    numScenarios = dfs.shape[0]
+    out = np.empty((numScenarios, t.size))
+    for i in range(0, numScenarios):
+        for j in range(0, t.size):
+            out[i, j] = _uinterpolate(t[j], times, dfs[i], method)
+    return out
+
+###############################################################################
+
+
+class TuringCurveScenarios():
+    ''' A block of shocked copies of a TuringDiscountCurveZeros, one per
+    scenario, which share the grid, compounding frequency, day count and
+    interpolation scheme of the base curve. The df function returns the
+    discount factors of all of the scenarios at once as an array with one
+    row per scenario, which the BondBook and TuringIborCurveSwap pricers
+    accept in place of a curve. '''
+
+###############################################################################
+
+    def __init__(self,
+                 curve: TuringDiscountCurveZeros,
+                 shifts: np.ndarray):
+        ''' Create the scenarios from a base zero curve and a matrix of zero
+        rate shifts with one row per scenario and one column per curve node.
+        The shifts are in the compounding frequency of the curve zero rates
+        and are in decimals, not basis points. '''
+
+        if isinstance(curve, TuringDiscountCurveZeros) is False:
+            raise TuringError("Curve scenarios need a TuringDiscountCurveZeros")
+
+        times = np.asarray(curve._times, dtype=np.float64)
+
+        if len(times) < 2:
+            raise TuringError("Curve scenarios need at least two curve nodes")
+
+        shifts = np.atleast_2d(np.asarray(shifts, dtype=np.float64))
+
+        if shifts.ndim != 2 or shifts.shape[1] != len(times):
+            raise TuringError("Shifts must have one column per curve node")
+
+        self._curve = curve
+        self._valuationDate = curve._valuationDate
+        self._freqType = curve._freqType
+        self._dayCountType = curve._dayCountType
+        self._interpType = curve._interpType
+        self._times = times
+        self._shifts = shifts
+        self._zeroRates = np.asarray(curve._zeroRates, dtype=np.float64) + shifts
+        self._dfs = curve._zeroToDf(self._valuationDate,
+                                    self._zeroRates,
+                                    self._times,
+                                    self._freqType,
+                                    self._dayCountType)
+        self._fit()
+
+###############################################################################
+
+    def __len__(self):
+        return self._dfs.shape[0]
+
+###############################################################################
+
+    def _fit(self):
+        ''' Fit the interpolation scheme of the base curve to all of the
+        scenarios at once. The splines are fitted along the node axis so that
+        each scenario has its own spline as in TuringInterpolator. '''
+
+        times = self._times
+        interpType = self._interpType
+        self._interpFn = None
+
+        if interpType in (TuringInterpTypes.PCHIP_LOG_DISCOUNT,
+                          TuringInterpTypes.NATCUBIC_LOG_DISCOUNT):
+            values = np.log(self._dfs).T
+        elif interpType in (TuringInterpTypes.PCHIP_ZERO_RATES,
+                            TuringInterpTypes.FINCUBIC_ZERO_RATES,
+                            TuringInterpTypes.NATCUBIC_ZERO_RATES):
+            values = (-np.log(self._dfs) / (times + gSmall)).T
+            if times[0] == 0.0:
+                values[0] = values[1]
+        else:
+            return
+
+        if interpType in (TuringInterpTypes.PCHIP_LOG_DISCOUNT,
+                          TuringInterpTypes.PCHIP_ZERO_RATES):
+            self._interpFn = PchipInterpolator(times, values, axis=0)
+        elif interpType == TuringInterpTypes.FINCUBIC_ZERO_RATES:
+            self._interpFn = CubicSpline(times, values, axis=0,
+                                         bc_type=((2, np.zeros(values.shape[1])),
+                                                  (1, np.zeros(values.shape[1]))))
+        else:
+            self._interpFn = CubicSpline(times, values, axis=0,
+                                         bc_type='natural')
+
+###############################################################################
+
+    def df(self,
+           dt: (list, TuringDate)):
+        ''' Discount factors of all of the scenarios at a date or a vector of
+        dates. A single date gives a vector with one value per scenario and a
+        vector of dates gives an array with one row per scenario. '''
+
+        times = timesFromDates(dt, self._valuationDate, self._dayCountType)
+        return self._df(times)
+
+###############################################################################
+
+    def _df(self,
+            t: (float, np.ndarray)):
+        ''' Hidden function to calculate the scenario discount factors at a
+        time or a vector of times. As with TuringDiscountCurve._df, a single
+        time of zero has a discount factor of one when a spline is used and a
+        vector of times is interpolated as it is. '''
+
+        tvec = np.atleast_1d(np.asarray(t, dtype=np.float64))
+
+        if np.any(tvec < 0.0):
+            raise TuringError("Interpolate times must all be >= 0")
+
+        if self._interpType in (TuringInterpTypes.PCHIP_LOG_DISCOUNT,
+                                TuringInterpTypes.NATCUBIC_LOG_DISCOUNT):
+            out = np.exp(self._interpFn(tvec)).T
+        elif self._interpFn is not None:
+            out = np.exp(-tvec[:, np.newaxis] * self._interpFn(tvec)).T
+        else:
+            out = _blockInterpolate(tvec, self._times, self._dfs,
+                                    self._interpType.value)
+
+        if np.ndim(t) == 0:
+            if self._interpFn is not None and np.abs(t) < gSmall:
+                return np.ones(len(self))
+            return out[:, 0]
+        return out
+
+###############################################################################
+
+    def curve(self,
+              i: int):
+        ''' The TuringDiscountCurveZeros of scenario i, for the pricers which
+        value one curve at a time. '''
+
+        curve = self._curve
+        return TuringDiscountCurveZeros(curve._valuationDate,
+                                        curve._zeroDates,
+                                        self._zeroRates[i],
+                                        curve._freqType,
+                                        curve._dayCountType,
+                                        curve._interpType)
+
+###############################################################################
+
+
+class TuringCurveScenarioGenerator():
+    ''' Generate parallel, twist, butterfly and key-rate shocks to the node
+    zero rates of a TuringDiscountCurveZeros. Each shock function takes a
+    vector of shock sizes in basis points, one per scenario, and returns the
+    matrix of node zero rate shifts with one row per scenario, so shocks of
+    different shapes are combined by adding their matrices. The tenors which
+    define the shapes are in years from the valuation date and the shapes are
+    piecewise linear in the tenor of the curve nodes. '''
+
+###############################################################################
+
+    def __init__(self,
+                 curve: TuringDiscountCurveZeros):
+        ''' Create the generator from the base zero curve. '''
+
+        if isinstance(curve, TuringDiscountCurveZeros) is False:
+            raise TuringError("Curve scenarios need a TuringDiscountCurveZeros")
+
+        self._curve = curve
+        self._times = np.asarray(curve._times, dtype=np.float64)
+
+###############################################################################
+
+    @classmethod
+    def fromCurveData(cls,
+                      curveData,
+                      valuationDate: TuringDate):
+        ''' Create the generator from a data frame of tenors and annual zero
+        rates, the curve which CurveAdjustmentImpl builds from the same data
+        without any adjustment. '''
+
+        tenors = curveData['tenor'].tolist()
+        rates = curveData['rate'].tolist()
+        return cls(shared_zero_curve(valuationDate, tenors, rates))
+
+###############################################################################
+
+    def _shock(self,
+               shocks,
+               shape: np.ndarray):
+        ''' Outer product of the shock sizes in basis points with a shape
+        which has one value per node. '''
+
+        shocks = np.atleast_1d(np.asarray(shocks, dtype=np.float64))
+        if shocks.ndim != 1:
+            raise TuringError("Shocks must be a vector with one value per scenario")
+        return np.outer(shocks * gBasisPoint, shape)
+
+###############################################################################
+
+    def _tenorRange(self,
+                    start: float,
+                    end: float):
+
+        if start is None:
+            start = self._times[0]
+        if end is None:
+            end = self._times[-1]
+        if start >= end:
+            raise TuringError("Start tenor must be before end tenor")
+        return start, end
+
+###############################################################################
+
+    def parallel(self,
+                 shocks):
+        ''' The same shift of every node zero rate. '''
+
+        return self._shock(shocks, np.ones(len(self._times)))
+
+###############################################################################
+
+    def twist(self,
+              shocks,
+              pivot: float = None,
+              start: float = None,
+              end: float = None):
+        ''' A rotation of the curve about the pivot tenor which is linear in
+        tenor between the start and end tenors and flat outside them. The
+        spread between the end and the start of the curve moves by the shock
+        size, as with the curve_shift of CurveAdjustmentImpl. The pivot, start
+        and end default to the first and last node tenors. '''
+
+        start, end = self._tenorRange(start, end)
+
+        if pivot is None:
+            pivot = start
+        if pivot < start or pivot > end:
+            raise TuringError("Pivot tenor must be between start and end tenors")
+
+        shape = (np.clip(self._times, start, end) - pivot) / (end - start)
+        return self._shock(shocks, shape)
+
+###############################################################################
+
+    def butterfly(self,
+                  shocks,
+                  belly: float = None,
+                  start: float = None,
+                  end: float = None):
+        ''' A change in curvature which moves the wings, up to the start tenor
+        and from the end tenor, up by the shock size and the belly tenor down
+        by the shock size, linearly in tenor in between. The belly defaults to
+        the middle of the start and end tenors. '''
+
+        start, end = self._tenorRange(start, end)
+
+        if belly is None:
+            belly = 0.5 * (start + end)
+        if belly <= start or belly >= end:
+            raise TuringError("Belly tenor must be between start and end tenors")
+
+        shape = np.interp(self._times, [start, belly, end], [1.0, -1.0, 1.0])
+        return self._shock(shocks, shape)
+
+###############################################################################
+
+    def keyRateShapes(self,
+                      keyTenors: list):
+        ''' Triangular shapes which are one at a key tenor and fall linearly
+        to zero at the neighbouring key tenors, with the first and last held
+        flat beyond the ends. There is one row per key tenor and the rows sum
+        to a parallel shift. '''
+
+        keyTenors = np.asarray(keyTenors, dtype=np.float64)
+
+        if keyTenors.ndim != 1 or len(keyTenors) == 0:
+            raise TuringError("Key tenors must be a non-empty vector")
+        if np.any(np.diff(keyTenors) <= 0.0):
+            raise TuringError("Key tenors must be in increasing order")
+
+        unit = np.eye(len(keyTenors))
+        return np.array([np.interp(self._times, keyTenors, row) for row in unit])
+
+###############################################################################
+
+    def keyRate(self,
+                shocks,
+                keyTenors: list):
+        ''' Key-rate shocks given as a matrix of shock sizes in basis points
+        with one row per scenario and one column per key tenor. '''
+
+        shapes = self.keyRateShapes(keyTenors)
+        shocks = np.atleast_2d(np.asarray(shocks, dtype=np.float64))
+
+        if shocks.ndim != 2 or shocks.shape[1] != shapes.shape[0]:
+            raise TuringError("Key-rate shocks must have one column per key tenor")
+
+        return (shocks * gBasisPoint) @ shapes
+
+###############################################################################
+
+    def scenarios(self,
+                  shifts: np.ndarray):
+        ''' The block of shocked curves for a matrix of node zero rate shifts,
+        usually a sum of the matrices returned by the shock functions. '''
+
+        return TuringCurveScenarios(self._curve, shifts)
+
+###############################################################################
@@ -125,35 +125,22 @@ class TuringDiscountCurve():
         else:
             dateList = maturityDts
 
-        if isinstance(dfs, float):
-            dfList = [dfs]
-        else:
-            dfList = dfs
+        dfList = np.atleast_1d(np.asarray(dfs, dtype=np.float64))
 
         if len(dateList) != len(dfList):
             raise TuringError("Date list and df list do not have same length")
 
-        numDates = len(dateList)
-        zeroRates = []
-
         times = timesFromDates(dateList, self._valuationDate, dayCountType)
+        t = np.maximum(times, gSmall)
 
-        for i in range(0, numDates):
-
-            df = dfList[i]
-
-            t = max(times[i], gSmall)
-
-            if freqType == FrequencyType.CONTINUOUS:
-                r = -np.log(df)/t
-            elif freqType == FrequencyType.SIMPLE:
-                r = (1.0/df - 1.0)/t
-            else:
-                r = (np.power(df, -1.0/(t * f))-1.0) * f
-
-            zeroRates.append(r)
+        if freqType == FrequencyType.CONTINUOUS:
+            zeroRates = -np.log(dfList)/t
+        elif freqType == FrequencyType.SIMPLE:
+            zeroRates = (1.0/dfList - 1.0)/t
+        else:
+            zeroRates = (np.power(dfList, -1.0/(t * f))-1.0) * f
 
-        return np.array(zeroRates)
+        return zeroRates
 
 ###############################################################################
 
@@ -1,4 +1,5 @@
 import numpy as np
+from numba import njit
 from scipy import optimize
 
 from scipy.interpolate import CubicSpline
@@ -8,16 +9,21 @@ import copy
 
 from turing_models.utilities.error import TuringError
 from turing_models.utilities.turing_date import TuringDate
+from turing_models.utilities.turing_date_array import TuringDateArray
 from turing_models.utilities.helper_functions import to_string
 from turing_models.utilities.helper_functions import checkArgumentTypes, _funcName
-from turing_models.utilities.global_variables import gDaysInYear
+from turing_models.utilities.global_variables import gDaysInYear, gSmall
 from turing_models.market.curves.interpolator import TuringInterpTypes, TuringInterpolator
+from turing_models.market.curves.interpolator import _uinterpolate, _vinterpolate
 from turing_models.market.curves.discount_curve import TuringDiscountCurve
 from turing_models.instruments.rates.ibor_deposit import TuringIborDeposit
 from turing_models.instruments.rates.ibor_fra import TuringIborFRA
+from turing_models.instruments.rates.ibor_curve_swap import TuringIborCurveSwap, _swapValue
 
 swaptol = 1e-10
 
+_LINEAR_FWD_RATES = TuringInterpTypes.LINEAR_FWD_RATES.value
+
 ##############################################################################
 # TODO: CHANGE times to dfTimes
 ##############################################################################
@@ -34,16 +40,167 @@ def _f(df, *args):
 
     # For curves that need a fit function, we fit it now
     curve._interpolator.fit(curve._times, curve._dfs)
-    swap.libor_curve = curve
-    # v_swap = swap.value(valueDate, curve, curve, None)
-    v_swap = swap.price()
-    notional = swap.fixed_leg._notional
+    if isinstance(swap, TuringIborCurveSwap):
+        v_swap = swap.value(valueDate, curve)
+    else:
+        swap.libor_curve = curve
+        # v_swap = swap.value(valueDate, curve, curve, None)
+        v_swap = swap.price()
+    notional = _swapNotional(swap)
     v_swap /= notional
     return v_swap
 
 ###############################################################################
 
 
+@njit(cache=True)
+def _fSchedule(df, times, dfs, method, fixedCoupon, fixedSign, fixedTimes,
+               fixedYearFracs, floatSpread, startTimes, endTimes,
+               floatYearFracs, numResets, resetDays):
+    ''' Root search objective function for a curve swap on its schedule
+    times. The grid ends with the point being solved for. '''
+
+    dfs[-1] = df
+
+    fixedDfs = _vinterpolate(fixedTimes, times, dfs, method)
+    endDfs = _vinterpolate(endTimes, times, dfs, method)
+    dfValue = _uinterpolate(0.0, times, dfs, method)
+
+    numPeriods = endTimes.size
+    resetDfs = np.empty(numPeriods * numResets)
+    for i in range(0, numPeriods):
+        for j in range(0, numResets):
+            t = startTimes[i] + j * resetDays / gDaysInYear
+            resetDfs[i * numResets + j] = _uinterpolate(t, times, dfs, method)
+
+    return _swapValue(fixedCoupon, fixedSign, fixedYearFracs, fixedDfs,
+                      floatSpread, floatYearFracs, resetDfs, endDfs, endDfs,
+                      numResets, resetDays, dfValue)
+
+###############################################################################
+
+
+@njit(cache=True)
+def _solveSchedule(df0, args, tol, maxiter):
+    ''' Secant search for the discount factor which zeroes _fSchedule. It
+    follows newton_secant but calls the objective directly so that the
+    bootstrap which uses it can be cached. '''
+
+    eps = 1e-4
+    p0 = df0
+    p1 = df0 * (1.0 + eps) + eps
+    q0 = _fSchedule(p0, *args)
+    q1 = _fSchedule(p1, *args)
+
+    if abs(q1) < abs(q0):
+        p0, p1, q0, q1 = p1, p0, q1, q0
+
+    for _ in range(0, maxiter):
+
+        if q1 == q0:
+            return (p1 + p0) / 2.0
+
+        if abs(q1) > abs(q0):
+            p = (-q0 / q1 * p1 + p0) / (1.0 - q0 / q1)
+        else:
+            p = (-q1 / q0 * p0 + p1) / (1.0 - q1 / q0)
+
+        if abs(p - p1) < tol:
+            return p
+
+        p0, q0 = p1, q1
+        p1 = p
+        q1 = _fSchedule(p1, *args)
+
+    raise TuringError("Failed to converge")
+
+###############################################################################
+
+
+@njit(cache=True)
+def _bootstrapSwaps(times, dfs, numPoints, method, dfMat, fixedCoupons,
+                    fixedSigns, floatSpreads, numResets, resetDays,
+                    fixedStarts, fixedTimes, fixedYearFracs, floatStarts,
+                    startTimes, endTimes, floatYearFracs, tol):
+    ''' Bootstrap the grid points at the maturities of a strip of curve
+    swaps given the flows of all of the swaps packed into arrays, those of
+    swap k being between its start offset and that of swap k + 1. The grid
+    arrays hold the points already found and are filled in place. If no
+    flow of a swap falls after the previous grid point other than on its
+    own maturity then its value is linear in the new discount factor and
+    this is found exactly from two valuations. Otherwise the secant method
+    is used. '''
+
+    for k in range(0, fixedCoupons.size):
+
+        f0 = fixedStarts[k]
+        f1 = fixedStarts[k + 1]
+        p0 = floatStarts[k]
+        p1 = floatStarts[k + 1]
+        m = numResets[k]
+
+        # The last payment date as the maturity date may be a holiday
+        tmat = fixedTimes[f1 - 1]
+        tprev = times[numPoints - 1]
+        times[numPoints] = tmat
+        dfs[numPoints] = dfMat
+        numPoints += 1
+
+        isLinear = True
+
+        # Linear forwards interpolate from zero with a small offset
+        if method == _LINEAR_FWD_RATES and numPoints == 2:
+            isLinear = False
+
+        for i in range(f0, f1):
+            t = fixedTimes[i]
+            if t > tprev + gSmall and abs(t - tmat) > gSmall:
+                isLinear = False
+
+        for i in range(p0, p1):
+            t = endTimes[i]
+            if t > tprev + gSmall and abs(t - tmat) > gSmall:
+                isLinear = False
+            for j in range(0, m):
+                t = startTimes[i] + j * resetDays[k] / gDaysInYear
+                if t > tprev + gSmall and abs(t - tmat) > gSmall:
+                    isLinear = False
+
+        args = (times[:numPoints], dfs[:numPoints], method, fixedCoupons[k],
+                fixedSigns[k], fixedTimes[f0:f1], fixedYearFracs[f0:f1],
+                floatSpreads[k], startTimes[p0:p1], endTimes[p0:p1],
+                floatYearFracs[p0:p1], m, resetDays[k])
+
+        if isLinear is True:
+            v0 = _fSchedule(dfMat, *args)
+            v1 = _fSchedule(0.5 * dfMat, *args)
+            dfMat = dfMat - v0 * 0.5 * dfMat / (v0 - v1)
+        else:
+            dfMat = _solveSchedule(dfMat, args, tol, 50)
+
+        dfs[numPoints - 1] = dfMat
+
+###############################################################################
+
+
+def _swapNotional(swap):
+    ''' Notional of a calibration swap. '''
+    if isinstance(swap, TuringIborCurveSwap):
+        return swap._notional
+    return swap.fixed_leg._notional
+
+###############################################################################
+
+
+def _fixedPaymentDates(swap):
+    ''' Fixed leg payment dates of a calibration swap as a date array. '''
+    if isinstance(swap, TuringIborCurveSwap):
+        return swap._fixedPaymentDates
+    return TuringDateArray(swap.fixed_leg._paymentDates)
+
+###############################################################################
+
+
 def _g(df, *args):
     ''' Root search objective function for swaps '''
     curve = args[0]
@@ -289,17 +446,17 @@ class TuringIborSingleCurve(TuringDiscountCurve):
             # Swaps must have same cashflows for bootstrap to work
             longestSwap = iborSwaps[-1]
 
-            longestSwapCpnDates = longestSwap.fixed_leg._paymentDates
+            longestSwapCpnDates = _fixedPaymentDates(longestSwap).ordinals()
 
             for swap in iborSwaps[0:-1]:
 
-                swapCpnDates = swap.fixed_leg._paymentDates
+                swapCpnDates = _fixedPaymentDates(swap).ordinals()
 
                 numFlows = len(swapCpnDates)
-                for iFlow in range(0, numFlows):
-                    if swapCpnDates[iFlow] != longestSwapCpnDates[iFlow]:
-                        raise TuringError(
-                            "Swap coupons are not on the same date grid.")
+                if numFlows > len(longestSwapCpnDates) or \
+                        np.any(swapCpnDates != longestSwapCpnDates[:numFlows]):
+                    raise TuringError(
+                        "Swap coupons are not on the same date grid.")
 
         #######################################################################
         # Now we have ensure they are in order check for overlaps and the like
@@ -405,10 +562,16 @@ class TuringIborSingleCurve(TuringDiscountCurve):
                                         args=argtuple, tol=swaptol,
                                         maxiter=50, fprime2=None)
 
+        if self._useSwapSchedules():
+            self._bootstrapSwapSchedules(dfMat)
+            if self._checkRefit is True:
+                self._checkRefits(1e-10, swaptol, 1e-5)
+            return
+
         for swap in self._usedSwaps:
             # I use the lastPaymentDate in case a date has been adjusted fwd
             # over a holiday as the maturity date is usually not adjusted CHECK
-            maturityDate = swap.fixed_leg._paymentDates[-1]
+            maturityDate = _fixedPaymentDates(swap)[-1]
             tmat = (maturityDate - self._valuationDate) / gDaysInYear
 
             self._times = np.append(self._times, tmat)
@@ -425,6 +588,103 @@ class TuringIborSingleCurve(TuringDiscountCurve):
         if self._checkRefit is True:
             self._checkRefits(1e-10, swaptol, 1e-5)
 
+###############################################################################
+
+    def _useSwapSchedules(self):
+        ''' The swaps can be bootstrapped on their schedule arrays if they are
+        curve swaps and the interpolation scheme has a compiled form. '''
+
+        if self._interpType not in (TuringInterpTypes.FLAT_FWD_RATES,
+                                    TuringInterpTypes.LINEAR_ZERO_RATES,
+                                    TuringInterpTypes.LINEAR_FWD_RATES):
+            return False
+
+        if len(self._usedSwaps) == 0:
+            return False
+
+        for swap in self._usedSwaps:
+            if isinstance(swap, TuringIborCurveSwap) is False:
+                return False
+
+        return True
+
+###############################################################################
+
+    def _bootstrapSwapSchedules(self,
+                                dfMat: float):
+        ''' Add a grid point for each curve swap by solving for the discount
+        factor which reprices it. The schedules of all of the swaps are
+        packed into arrays of times and year fractions so that the swaps are
+        bootstrapped in one compiled pass using the compiled interpolation on
+        grid arrays which are allocated once. '''
+
+        swaps = self._usedSwaps
+        numSwaps = len(swaps)
+        valuationDate = self._valuationDate
+
+        fixedOrdinals = [swap._fixedPaymentDates.ordinals() for swap in swaps]
+        startOrdinals = [swap._floatStartDates.ordinals() for swap in swaps]
+        endOrdinals = [swap._floatEndDates.ordinals() for swap in swaps]
+
+        numFixed = [len(o) for o in fixedOrdinals]
+        numFloat = [len(o) for o in startOrdinals]
+        numFixedFlows = sum(numFixed)
+        numFloatFlows = sum(numFloat)
+
+        # Date differences of all of the flows are taken in one pass
+        ordinals = np.concatenate(fixedOrdinals + startOrdinals + endOrdinals)
+        flowTimes = (TuringDateArray.fromOrdinals(ordinals) - valuationDate) \
+            / gDaysInYear
+        fixedTimes = flowTimes[:numFixedFlows]
+        startTimes = flowTimes[numFixedFlows:numFixedFlows + numFloatFlows]
+        endTimes = flowTimes[numFixedFlows + numFloatFlows:]
+
+        fixedYearFracs = np.concatenate([s._fixedYearFracs for s in swaps])
+        floatYearFracs = np.concatenate([s._floatYearFracs for s in swaps])
+
+        # Only flows after the valuation date are valued
+        isFixed = fixedTimes > 0.0
+        isFloat = endTimes > 0.0
+        fixedStarts = np.zeros(numSwaps + 1, dtype=np.int64)
+        floatStarts = np.zeros(numSwaps + 1, dtype=np.int64)
+        fixedStarts[1:] = np.cumsum(np.add.reduceat(
+            isFixed, np.cumsum([0] + numFixed[:-1])))
+        floatStarts[1:] = np.cumsum(np.add.reduceat(
+            isFloat, np.cumsum([0] + numFloat[:-1])))
+
+        fixedCoupons = np.array([swap._fixedCoupon for swap in swaps])
+        fixedSigns = np.array([swap._fixedSign() for swap in swaps])
+        floatSpreads = np.array([swap._floatSpread for swap in swaps],
+                                dtype=np.float64)
+        numResets = np.array([swap._numResets for swap in swaps],
+                             dtype=np.int64)
+        resetDays = np.array([swap._resetDays for swap in swaps],
+                             dtype=np.float64)
+
+        numPoints = len(self._times)
+        times = np.empty(numPoints + numSwaps)
+        dfs = np.empty(numPoints + numSwaps)
+        times[:numPoints] = self._times
+        dfs[:numPoints] = self._dfs
+
+        _bootstrapSwaps(times, dfs, numPoints, self._interpType.value,
+                        float(dfMat), fixedCoupons, fixedSigns, floatSpreads,
+                        numResets, resetDays, fixedStarts, fixedTimes[isFixed],
+                        fixedYearFracs[isFixed], floatStarts,
+                        startTimes[isFloat], endTimes[isFloat],
+                        floatYearFracs[isFloat], swaptol)
+
+        self._times = times
+        self._dfs = dfs
+        # Grid dates are found as in TuringDate.addYears for all swaps at once
+        months = times[numPoints:] * 12.0
+        numMonths = months.astype(np.int64)
+        numDays = ((months - numMonths) * (365.242 / 12.0)).astype(np.int64)
+        dfDates = TuringDateArray.fromDate(valuationDate, numSwaps)
+        dfDates = dfDates.addMonths(numMonths).addDays(numDays)
+        self._dfDates = np.append(self._dfDates, dfDates.toList())
+        self._interpolator.fit(self._times, self._dfs)
+
 ###############################################################################
 
     def _buildCurveUsingQuadraticMinimiser(self):
@@ -628,13 +888,14 @@ class TuringIborSingleCurve(TuringDiscountCurve):
         for swap in self._usedSwaps:
             # We value it as of the start date of the swap
             v = swap.value(swap.effective_date, self, self, None)
-            v = v / swap.fixed_leg._notional
+            v = v / _swapNotional(swap)
 #            print("REFIT SWAP VALUATION:", swap._adjustedMaturityDate, v)
             if abs(v) > swapTol:
                 print("Swap with maturity " + str(swap.maturity_date)
                       + " Not Repriced. Has Value", v)
-                swap.printFixedLegPV()
-                swap.printFloatLegPV()
+                if isinstance(swap, TuringIborCurveSwap) is False:
+                    swap.printFixedLegPV()
+                    swap.printFloatLegPV()
                 raise TuringError("Swap not repriced.")
 
 ###############################################################################
@@ -0,0 +1,151 @@
+import datetime
+import time
+from enum import Enum
+
+from turing_models.utilities.shared_cache import SharedCache
+from turing_models.utilities.turing_date import TuringDate
+
+
+def _normalise_date(date):
+    """ 统一日期键的格式：TuringDate/datetime.datetime/datetime.date都转成datetime.date，
+    'latest'等字符串保持不变（'latest'由MarketDataCache.snapshot_date换成快照的键） """
+    if isinstance(date, TuringDate):
+        return datetime.date(date._y, date._m, date._d)
+    elif isinstance(date, datetime.datetime):
+        return date.date()
+    return date
+
+
+def _normalise_symbol(symbol):
+    """ 统一代码键的格式：列表转成元组，枚举取值 """
+    if isinstance(symbol, Enum):
+        return symbol.value
+    elif isinstance(symbol, (list, tuple)):
+        return tuple(_normalise_symbol(s) for s in symbol)
+    return symbol
+
+
+class MarketDataCache(SharedCache):
+    """ 进程级行情快照缓存
+
+    以 (数据类型, 代码或曲线编码, 估值日期, 远期期限) 为键缓存TuringDB的返回结果，
+    相同的请求无论来自哪个instrument都只调用一次接口。缓存中的数据被所有调用方共享，
+    调用方不能原地修改返回的DataFrame。
+    'latest'的实时行情在第一次取数时固定为一个快照，键中的日期为('latest', 快照开始的时间戳)，
+    同一快照内的请求共享缓存；快照超过latest_ttl秒（None表示不过期）或调用invalidate()后，
+    下一次请求开始新的快照，旧快照的缓存项随之删除。
+    缓存项数超过max_size时淘汰最久未使用的一项。 """
+
+    def __init__(self, max_size: int = 10000, latest_ttl: float = 60.0):
+        super().__init__(max_size)
+        self.latest_ttl = latest_ttl
+        self._latest = None  # (快照开始的time.time(), 开始快照时的time.monotonic())
+
+    @staticmethod
+    def make_key(kind: str, symbol=None, date=None, forward_term: float = None):
+        return (kind, _normalise_symbol(symbol), _normalise_date(date), forward_term)
+
+    @staticmethod
+    def _is_latest(date):
+        return isinstance(date, str) and date == 'latest'
+
+    @staticmethod
+    def _is_latest_key(date):
+        return isinstance(date, tuple) and len(date) == 2 and date[0] == 'latest'
+
+    def _drop_latest(self):
+        """ 删除'latest'快照的缓存项并结束当前快照，调用方持有self._lock """
+        for key in [key for key in self._data if self._is_latest_key(key[2])]:
+            del self._data[key]
+        self._latest = None
+
+    def snapshot_date(self, date):
+        """ 日期在缓存键中的形式：'latest'换成当前快照的键，快照不存在或已过期时开始新的快照 """
+        if not self._is_latest(date):
+            return _normalise_date(date)
+        with self._lock:
+            now = time.monotonic()
+            if self._latest is not None and self.latest_ttl is not None \
+                    and now - self._latest[1] > self.latest_ttl:
+                self._drop_latest()
+            if self._latest is None:
+                self._latest = (time.time(), now)
+            return 'latest', self._latest[0]
+
+    @staticmethod
+    def _cacheable(value) -> bool:
+        """ 返回None或空DataFrame时不缓存 """
+        return value is not None and not getattr(value, 'empty', False)
+
+    def fetch(self, kind: str, loader, symbol=None, date=None, forward_term: float = None):
+        """ 命中缓存则直接返回，否则调用loader()取数并写入缓存。
+        同一个键的并发请求只会调用一次loader；返回None或空DataFrame时不缓存 """
+        if not self.enabled:
+            return loader()
+        return self._get_or_build(self.make_key(kind, symbol, self.snapshot_date(date), forward_term), loader)
+
+    def prefetch(self, kind: str, loader, symbols: list, date=None, forward_term: float = None):
+        """ 一次接口调用取回多个代码同一日期的数据，以同一个返回结果写入每个代码的键，
+        要求该结果能按代码用.loc取出单个代码的数据（与单个代码请求的返回格式一致）。
+        已缓存的代码不再请求，全部命中时不调用loader；返回写入的条数 """
+        if not self.enabled:
+            return 0
+        date = self.snapshot_date(date)
+        with self._lock:
+            missing = [symbol for symbol in symbols
+                       if self.make_key(kind, symbol, date, forward_term) not in self._data]
+        if not missing:
+            return 0
+        value = loader(missing)
+        if value is None or getattr(value, 'empty', False):
+            return 0
+        # 接口没有返回数据的代码不写入，之后仍按单个代码请求
+        present = [symbol for symbol in missing if _normalise_symbol(symbol) in value.index]
+        with self._lock:
+            self.misses += 1
+            for symbol in present:
+                self._store(self.make_key(kind, symbol, date, forward_term), value)
+        return len(present)
+
+    def invalidate(self, kind: str = None, symbol=None, date=None, forward_term: float = None):
+        """ 删除匹配的缓存项，参数为None表示不限定该项，返回删除的条数；
+        date为'latest'时匹配所有'latest'快照的缓存项。只按date限定或不加限定时结束当前'latest'快照 """
+        latest = self._is_latest(date)
+        symbol = _normalise_symbol(symbol)
+        date = _normalise_date(date)
+        with self._lock:
+            keys = [key for key in self._data
+                    if (kind is None or key[0] == kind)
+                    and (symbol is None or key[1] == symbol)
+                    and (date is None or key[2] == date or (latest and self._is_latest_key(key[2])))
+                    and (forward_term is None or key[3] == forward_term)]
+            for key in keys:
+                del self._data[key]
+            if (date is None or latest) and kind is None and symbol is None and forward_term is None:
+                self._latest = None
+        return len(keys)
+
+    def snapshot(self):
+        """ 当前缓存内容的浅拷贝，用于传给子进程共享只读行情 """
+        with self._lock:
+            return dict(self._data)
+
+    def load(self, snapshot: dict):
+        """ 写入snapshot()取得的缓存内容，已有的键被覆盖；内容中有'latest'快照时沿用其中最新的快照 """
+        with self._lock:
+            for key, value in snapshot.items():
+                self._store(key, value)
+            stamps = [key[2][1] for key in snapshot if self._is_latest_key(key[2])]
+            if stamps and (self._latest is None or max(stamps) > self._latest[0]):
+                self._latest = (max(stamps), time.monotonic())
+
+    def clear(self):
+        """ 清空缓存及命中统计，结束当前'latest'快照 """
+        with self._lock:
+            self._data.clear()
+            self._latest = None
+            self.hits = 0
+            self.misses = 0
+
+
+market_data_cache = MarketDataCache()
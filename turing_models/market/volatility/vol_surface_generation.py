@@ -12,6 +12,7 @@ from turing_models.market.curves.curve_generation import ForDiscountCurveGen, Do
      FXForwardCurveGen
 from turing_models.market.curves.discount_curve import TuringDiscountCurve
 from turing_models.market.volatility.fx_vol_surface_vv import TuringFXVolSurfaceVV
+from turing_models.market.data.market_data_cache import market_data_cache
 from turing_models.models.model_volatility_fns import TuringVolFunctionTypes
 from turing_models.utilities.error import TuringError
 from turing_models.utilities.global_types import TuringSolverTypes
@@ -75,7 +76,10 @@ class FXOptionImpliedVolatilitySurface(Base, Ctx):
         if exchange_rate is not None:
             return exchange_rate
         date = self._original_value_date
-        original_data = TuringDB.exchange_rate(symbol=self.fx_symbol, date=date)
+        original_data = market_data_cache.fetch(
+            'exchange_rate',
+            lambda: TuringDB.exchange_rate(symbol=self.fx_symbol, date=date),
+            symbol=self.fx_symbol, date=date)
         if original_data is not None:
             data = original_data[self.fx_symbol]
             return data
@@ -89,7 +93,10 @@ class FXOptionImpliedVolatilitySurface(Base, Ctx):
         if shibor_data is not None:
             return pd.DataFrame(shibor_data)
         date = self._original_value_date
-        original_data = TuringDB.get_global_ibor_curve(ibor_type='Shibor', currency='CNY', start=date, end=date)
+        original_data = market_data_cache.fetch(
+            'global_ibor_curve',
+            lambda: TuringDB.get_global_ibor_curve(ibor_type='Shibor', currency='CNY', start=date, end=date),
+            symbol=('Shibor', 'CNY'), date=date)
         if not original_data.empty:
             return original_data
         else:
@@ -102,7 +109,10 @@ class FXOptionImpliedVolatilitySurface(Base, Ctx):
         if irs_curve is not None:
             return pd.DataFrame(irs_curve)
         date = self._original_value_date
-        original_data = TuringDB.get_irs_curve(ir_type="Shibor3M", currency='CNY', start=date, end=date)
+        original_data = market_data_cache.fetch(
+            'irs_curve',
+            lambda: TuringDB.get_irs_curve(ir_type="Shibor3M", currency='CNY', start=date, end=date),
+            symbol=('Shibor3M', 'CNY'), date=date)
         if not original_data.empty:
             return original_data.loc["Shibor3M"]
         else:
@@ -115,7 +125,10 @@ class FXOptionImpliedVolatilitySurface(Base, Ctx):
         if fx_swap_curve is not None:
             return pd.DataFrame(fx_swap_curve)
         date = self._original_value_date
-        original_data = TuringDB.get_fx_swap_curve(currency_pair=self.fx_symbol, start=date, end=date)
+        original_data = market_data_cache.fetch(
+            'fx_swap_curve',
+            lambda: TuringDB.get_fx_swap_curve(currency_pair=self.fx_symbol, start=date, end=date),
+            symbol=self.fx_symbol, date=date)
         if not original_data.empty:
             return original_data.loc[self.fx_symbol]
         else:
@@ -130,10 +143,13 @@ class FXOptionImpliedVolatilitySurface(Base, Ctx):
         if fx_implied_volatility_curve is not None:
             return pd.DataFrame(fx_implied_volatility_curve)
         date = self._original_value_date
-        original_data = TuringDB.get_fx_implied_volatility_curve(currency_pair=self.fx_symbol,
-                                                                 volatility_type=volatility_type,
-                                                                 start=date,
-                                                                 end=date)
+        original_data = market_data_cache.fetch(
+            'fx_implied_volatility_curve',
+            lambda: TuringDB.get_fx_implied_volatility_curve(currency_pair=self.fx_symbol,
+                                                             volatility_type=volatility_type,
+                                                             start=date,
+                                                             end=date),
+            symbol=(self.fx_symbol, tuple(volatility_type)), date=date)
         if not original_data.empty:
             tenor = original_data.loc[self.fx_symbol].loc["ATM"]['tenor']
             origin_tenor = original_data.loc[self.fx_symbol].loc["ATM"]['origin_tenor']
@@ -0,0 +1,92 @@
+from math import sqrt, log
+
+import numpy as np
+from numba import njit
+
+from turing_models.utilities.error import TuringError
+
+###############################################################################
+# GBM路径的似然比（LR）希腊字母
+# 障碍、敲出票息等收益对标的价格不连续，逐路径求导（pathwise）会漏掉跳跃的贡献，差分
+# 则需要较大的扰动和大量路径。似然比方法把导数转移到路径的概率密度上：
+#   delta = E[payoff * w_delta]，gamma = E[payoff * w_gamma]，vega = E[payoff * w_vega]
+# 权重只依赖模拟时使用的标准正态增量，与收益的形式无关，可以和价格在同一次模拟中得到。
+# 对初始价格的导数只经过第一步的密度（之后各步对S_1是光滑的条件期望），即pathwise与LR
+# 结合的混合估计量；vega对每一步的密度求导。
+###############################################################################
+
+
+@njit(cache=True, fastmath=True)
+def gbm_lr_pair_weights(z1, sum_z, sum_z2, num_steps, s0, sigma, sqrtdt):
+    """ 对偶路径对的似然比权重，z1为第一步的标准正态增量，sum_z和sum_z2为各步增量及其平方之和，
+    返回(正向路径的delta、gamma、vega权重, 对偶路径的delta、gamma、vega权重) """
+
+    vsqrtdt = sigma * sqrtdt
+    den_delta = s0 * vsqrtdt
+    den_gamma = den_delta * den_delta
+    vega_even = (sum_z2 - num_steps) / sigma
+
+    w_delta = z1 / den_delta
+    w_gamma_up = (z1 * z1 - 1.0 - z1 * vsqrtdt) / den_gamma
+    w_gamma_dn = (z1 * z1 - 1.0 + z1 * vsqrtdt) / den_gamma
+    w_vega_up = vega_even - sum_z * sqrtdt
+    w_vega_dn = vega_even + sum_z * sqrtdt
+
+    return w_delta, w_gamma_up, w_vega_up, -w_delta, w_gamma_dn, w_vega_dn
+
+###############################################################################
+
+
+@njit(cache=True, fastmath=True)
+def gbm_lr_weights(sall, mu, sigma, dt):
+    """ 由GBM路径矩阵（路径数 × 时间点数，第一列为初始价格）反推各步的标准正态增量，
+    返回每条路径的delta、gamma、vega似然比权重，形状为(3, 路径数) """
+
+    num_paths, num_points = sall.shape
+    sqrtdt = sqrt(dt)
+    vsqrtdt = sigma * sqrtdt
+    drift = (mu - sigma * sigma / 2.0) * dt
+
+    weights = np.empty((3, num_paths))
+    for ip in range(num_paths):
+        s0 = sall[ip, 0]
+        z1 = 0.0
+        sum_z = 0.0
+        sum_z2 = 0.0
+        for it in range(1, num_points):
+            z = (log(sall[ip, it] / sall[ip, it - 1]) - drift) / vsqrtdt
+            if it == 1:
+                z1 = z
+            sum_z += z
+            sum_z2 += z * z
+        den_delta = s0 * vsqrtdt
+        weights[0, ip] = z1 / den_delta
+        weights[1, ip] = (z1 * z1 - 1.0 - z1 * vsqrtdt) / (den_delta * den_delta)
+        weights[2, ip] = (sum_z2 - (num_points - 1)) / sigma - sum_z * sqrtdt
+    return weights
+
+###############################################################################
+
+
+def lr_estimate(payoff, weight, explicit=None):
+    """ 中心化的似然比估计量，返回(估计值, 标准误差)
+
+    由于E[weight] = 0，用(payoff - mean(payoff)) * weight代替payoff * weight可以显著降低方差；
+    explicit为收益对参数的显式导数（如收益中直接含有初始价格时），逐路径加到估计量上。 """
+
+    payoff = np.asarray(payoff, dtype=np.float64)
+    weight = np.asarray(weight, dtype=np.float64)
+    if payoff.shape != weight.shape:
+        raise TuringError("Payoff and weight must have the same shape")
+    num_paths = payoff.shape[0]
+    if num_paths < 2:
+        raise TuringError("At least two paths are needed for the estimate")
+
+    contribution = (payoff - payoff.mean()) * weight
+    if explicit is not None:
+        contribution = contribution + explicit
+    estimate = contribution.mean()
+    std_error = contribution.std(ddof=1) / np.sqrt(num_paths)
+    return estimate, std_error
+
+###############################################################################
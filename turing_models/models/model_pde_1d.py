@@ -0,0 +1,198 @@
+from math import sqrt
+
+import numpy as np
+from numba import njit
+
+from turing_models.utilities.error import TuringError
+
+###############################################################################
+# 一维Black-Scholes有限差分（PDE）引擎
+# 在对数价格x = ln(S)的均匀网格上求解
+#   dV/dt + (mu - sigma^2/2) dV/dx + sigma^2/2 d2V/dx2 - r V = 0
+# 时间方向用Crank-Nicolson格式倒推，离散观察日处由调用方更新网格上的值（敲出、敲入、
+# 票息等），收益不连续的观察日之后用两个隐式半步（Rannacher）抑制振荡；
+# 提前行权用PSOR求解线性互补问题。
+###############################################################################
+
+
+@njit(cache=True, fastmath=True)
+def _theta_step(v, alpha, beta, gamma, dt, theta):
+    """ 用theta格式把v倒推一个时间步，边界为Dirichlet条件（保持原值） """
+
+    n = v.shape[0]
+    rhs = np.empty(n)
+    rhs[0] = v[0]
+    rhs[n - 1] = v[n - 1]
+    w = (1.0 - theta) * dt
+    for j in range(1, n - 1):
+        rhs[j] = v[j] + w * (alpha * v[j - 1] + beta * v[j] + gamma * v[j + 1])
+
+    # 追赶法求解三对角方程组
+    lower = -theta * dt * alpha
+    diag = 1.0 - theta * dt * beta
+    upper = -theta * dt * gamma
+    c = np.empty(n)
+    d = np.empty(n)
+    c[0] = 0.0
+    d[0] = rhs[0]
+    for j in range(1, n - 1):
+        m = diag - lower * c[j - 1]
+        c[j] = upper / m
+        d[j] = (rhs[j] - lower * d[j - 1]) / m
+    out = np.empty(n)
+    out[n - 1] = rhs[n - 1]
+    for j in range(n - 2, 0, -1):
+        out[j] = d[j] - c[j] * out[j + 1]
+    out[0] = rhs[0]
+    return out
+
+###############################################################################
+
+
+@njit(cache=True, fastmath=True)
+def _psor_step(v, exercise, alpha, beta, gamma, dt, theta, omega, tol, max_iter):
+    """ 带提前行权约束的theta格式时间步，用PSOR求解 V >= exercise 的线性互补问题 """
+
+    n = v.shape[0]
+    rhs = np.empty(n)
+    w = (1.0 - theta) * dt
+    for j in range(1, n - 1):
+        rhs[j] = v[j] + w * (alpha * v[j - 1] + beta * v[j] + gamma * v[j + 1])
+
+    lower = -theta * dt * alpha
+    diag = 1.0 - theta * dt * beta
+    upper = -theta * dt * gamma
+
+    out = np.maximum(v, exercise)
+    out[0] = max(v[0], exercise[0])
+    out[n - 1] = max(v[n - 1], exercise[n - 1])
+    for _ in range(max_iter):
+        error = 0.0
+        for j in range(1, n - 1):
+            y = (rhs[j] - lower * out[j - 1] - upper * out[j + 1]) / diag
+            y = max(out[j] + omega * (y - out[j]), exercise[j])
+            error += (y - out[j]) * (y - out[j])
+            out[j] = y
+        if error < tol * tol:
+            break
+    return out
+
+###############################################################################
+
+
+class TuringPDE1DEngine():
+    """ 一维Crank-Nicolson/PSOR有限差分引擎
+
+    网格以s0为中心，在对数价格上覆盖num_std个标准差；mu为漂移，r为折现率（收益已折现
+    到估值日时取0）。times为倒推时需要停下的时刻（包含0和到期时刻，单位为年），调用方
+    在每个时刻通过on_event更新网格上的值。 """
+
+    def __init__(self,
+                 s0: float,
+                 sigma: float,
+                 mu: float,
+                 t_max: float,
+                 r: float = 0.0,
+                 num_space_steps: int = 400,
+                 num_std: float = 5.0,
+                 extra_spots=()):
+
+        if s0 <= 0.0:
+            raise TuringError("Stock price must be positive")
+        if sigma <= 0.0:
+            raise TuringError("Volatility must be positive")
+        if t_max <= 0.0:
+            raise TuringError("Time to expiry must be positive")
+
+        self.s0 = s0
+        self.sigma = sigma
+        self.mu = mu
+        self.r = r
+
+        # 网格需要覆盖障碍价格等关键点
+        half_width = num_std * sigma * sqrt(t_max)
+        x0 = np.log(s0)
+        for s in extra_spots:
+            if s is not None and s > 0.0:
+                half_width = max(half_width, abs(np.log(s) - x0) * 1.2)
+        half_steps = max(int(num_space_steps) // 2, 2)
+        self.dx = half_width / half_steps
+        self.center = half_steps
+        self.x = x0 + self.dx * np.arange(-half_steps, half_steps + 1)
+        self.spots = np.exp(self.x)
+
+        a = 0.5 * sigma * sigma
+        b = mu - a
+        dx = self.dx
+        self.alpha = a / dx / dx - b / 2.0 / dx
+        self.beta = -2.0 * a / dx / dx - r
+        self.gamma = a / dx / dx + b / 2.0 / dx
+
+    def solve(self,
+              layers: np.ndarray,
+              times,
+              on_event=None,
+              sub_steps: int = 2,
+              exercise: np.ndarray = None,
+              omega: float = 1.2,
+              tol: float = 1e-8,
+              max_iter: int = 500):
+        """ 从到期日倒推到0时刻
+
+        layers为到期日的网格值（层数 × 网格点数），同一产品的不同状态（如是否已敲入）各占一层；
+        on_event(i, layers)在times[i]处被调用（包括到期日和0时刻），返回True表示该时刻的更新
+        使网格值不连续，之后的一步改用隐式半步；exercise为提前行权收益，只作用于第一层。
+        返回0时刻的网格值 """
+
+        layers = np.array(layers, dtype=np.float64, ndmin=2)
+        times = np.asarray(times, dtype=np.float64)
+        if layers.shape[1] != self.spots.shape[0]:
+            raise TuringError("Layer size does not match the grid")
+        if np.any(np.diff(times) <= 0.0):
+            raise TuringError("Event times must be strictly increasing")
+
+        num_times = times.shape[0]
+        smooth = on_event(num_times - 1, layers) if on_event is not None else True
+        for i in range(num_times - 2, -1, -1):
+            dt = (times[i + 1] - times[i]) / sub_steps
+            for k in range(layers.shape[0]):
+                layers[k] = self._step_interval(layers[k], dt, sub_steps, smooth,
+                                                exercise if k == 0 else None,
+                                                omega, tol, max_iter)
+            smooth = on_event(i, layers) if on_event is not None else False
+        return layers
+
+    def _step_interval(self, v, dt, sub_steps, smooth, exercise, omega, tol, max_iter):
+        steps = [(dt, 0.5)] * sub_steps
+        if smooth:
+            # Rannacher：用两个隐式半步替代第一步
+            steps = [(dt / 2.0, 1.0), (dt / 2.0, 1.0)] + steps[1:]
+        for step_dt, theta in steps:
+            if exercise is None:
+                v = _theta_step(v, self.alpha, self.beta, self.gamma, step_dt, theta)
+            else:
+                v = _psor_step(v, exercise, self.alpha, self.beta, self.gamma,
+                               step_dt, theta, omega, tol, max_iter)
+        return v
+
+    def region_fraction(self, level: float, above: bool = True) -> np.ndarray:
+        """ 每个网格单元中价格高于（above为True）或低于level的比例
+
+        观察日按比例混合区域内外的值（单元平均），障碍不必落在网格点上也能稳定收敛 """
+        x_level = np.log(level)
+        if above:
+            fraction = (self.x + self.dx / 2.0 - x_level) / self.dx
+        else:
+            fraction = (x_level - self.x + self.dx / 2.0) / self.dx
+        return np.clip(fraction, 0.0, 1.0)
+
+    def greeks(self, v: np.ndarray):
+        """ 从网格直接读取s0处的价格、delta和gamma """
+        j = self.center
+        dx = self.dx
+        s0 = self.s0
+        v_x = (v[j + 1] - v[j - 1]) / 2.0 / dx
+        v_xx = (v[j + 1] - 2.0 * v[j] + v[j - 1]) / dx / dx
+        return v[j], v_x / s0, (v_xx - v_x) / s0 / s0
+
+###############################################################################
@@ -0,0 +1,489 @@
+from dataclasses import dataclass
+from math import sqrt, exp
+
+import numpy as np
+from numba import njit, prange
+
+from turing_models.utilities.error import TuringError
+from turing_models.models.process_simulator import blockSeeds, PARALLEL_BLOCK_SIZE
+from turing_models.models.model_mc_greeks import gbm_lr_pair_weights
+from turing_models.models.model_pde_1d import TuringPDE1DEngine
+
+###############################################################################
+# 雪球期权的分块蒙特卡洛定价引擎
+# 路径按固定大小的块并行生成，每条路径在编译后的循环中完成敲出、敲入判断并即时累加收益，
+# 内存占用只与块大小、时间步数和线程数相关，与总路径数无关。
+###############################################################################
+
+SNOWBALL_CALL = 1
+SNOWBALL_PUT = 2
+
+KNOCK_IN_RETURN = 0
+KNOCK_IN_VANILLA = 1
+KNOCK_IN_SPREADS = 2
+
+###############################################################################
+
+
+@njit(cache=True, fastmath=True)
+def _score_path(path, obs_pos, out_values, untriggered_value,
+                barrier, knock_in_price, option_type, knock_in_type,
+                knock_in_coef, initial_spot, sk1, sk2):
+    """ 计算单条路径的折现收益，path为从估值日到到期日每个交易日的标的价格 """
+
+    num_steps = path.shape[0]
+    knocked_in = False
+    for it in range(num_steps):
+        s = path[it]
+        j = obs_pos[it]
+        if option_type == SNOWBALL_CALL:
+            if j >= 0 and s >= barrier:
+                return out_values[j]
+            if s < knock_in_price:
+                knocked_in = True
+        else:
+            if j >= 0 and s <= barrier:
+                return out_values[j]
+            if s > knock_in_price:
+                knocked_in = True
+
+    if not knocked_in:
+        return untriggered_value
+
+    ratio = path[num_steps - 1] / initial_spot
+    if option_type == SNOWBALL_CALL:
+        if knock_in_type == KNOCK_IN_RETURN:
+            return knock_in_coef * (1.0 - ratio)
+        elif knock_in_type == KNOCK_IN_VANILLA:
+            return knock_in_coef * max(sk1 - ratio, 0.0)
+        elif knock_in_type == KNOCK_IN_SPREADS:
+            return knock_in_coef * max(sk1 - max(ratio, sk2), 0.0)
+    else:
+        if knock_in_type == KNOCK_IN_RETURN:
+            return knock_in_coef * (ratio - 1.0)
+        elif knock_in_type == KNOCK_IN_VANILLA:
+            return knock_in_coef * max(ratio - sk1, 0.0)
+        elif knock_in_type == KNOCK_IN_SPREADS:
+            return knock_in_coef * max(min(ratio, sk2) - sk1, 0.0)
+    return 0.0
+
+###############################################################################
+
+
+@njit(cache=True, fastmath=True)
+def _score_paths(sall, obs_pos, out_values, untriggered_value,
+                 barrier, knock_in_price, option_type, knock_in_type,
+                 knock_in_coef, initial_spot, sk1, sk2):
+    """ 对已生成的路径矩阵逐条计算折现收益 """
+
+    num_paths = sall.shape[0]
+    payoff = np.empty(num_paths)
+    for ip in range(num_paths):
+        payoff[ip] = _score_path(sall[ip], obs_pos, out_values, untriggered_value,
+                                 barrier, knock_in_price, option_type, knock_in_type,
+                                 knock_in_coef, initial_spot, sk1, sk2)
+    return payoff
+
+###############################################################################
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def _value_chunked(num_paths, chunk_size, seeds, num_time_steps, dt,
+                   sc_s0, sc_mu, sc_sigma, sc_offset, sc_out_values,
+                   sc_untriggered, sc_knock_in_coef, weights,
+                   obs_pos, barrier, knock_in_price, option_type, knock_in_type,
+                   initial_spot, sk1, sk2):
+    """ 按块并行生成对偶GBM路径并即时累加收益
+
+    每个情景（初始价格、漂移、波动率、起始步和折现收益不同）都使用同一组随机数，
+    weights的每一行给出由各情景价值线性组合出的统计量（如差分希腊字母），
+    返回各情景价值和各统计量的(均值, 标准误差)。
+
+    每块使用独立的种子，且各块的累加值按块序号汇总，因此结果与线程数无关。
+    标准误差按对偶路径对的均值计算。 """
+
+    num_scenarios = sc_s0.shape[0]
+    num_stats = weights.shape[0]
+    sc_m = np.empty(num_scenarios)
+    sc_vsqrtdt = np.empty(num_scenarios)
+    for k in range(num_scenarios):
+        sc_vsqrtdt[k] = sc_sigma[k] * sqrt(dt)
+        sc_m[k] = exp((sc_mu[k] - sc_sigma[k] * sc_sigma[k] / 2.0) * dt)
+
+    num_chunks = seeds.shape[0]
+    totals = np.zeros((num_chunks, num_scenarios))
+    totals_sq = np.zeros((num_chunks, num_scenarios))
+    stats = np.zeros((num_chunks, num_stats))
+    stats_sq = np.zeros((num_chunks, num_stats))
+
+    for ic in prange(num_chunks):
+        np.random.seed(seeds[ic])
+        start = ic * chunk_size
+        n = min(chunk_size, num_paths - start)
+        path_up = np.empty(num_time_steps + 1)
+        path_dn = np.empty(num_time_steps + 1)
+        v = np.empty(num_scenarios)
+        g = np.random.standard_normal((n, num_time_steps))
+        for ip in range(n):
+            for k in range(num_scenarios):
+                off = sc_offset[k]
+                m = sc_m[k]
+                vsqrtdt = sc_vsqrtdt[k]
+                path_up[off] = sc_s0[k]
+                path_dn[off] = sc_s0[k]
+                # 从情景的起始步开始按顺序使用同一组随机数，使各情景路径的增量对齐
+                for it in range(off + 1, num_time_steps + 1):
+                    w = exp(g[ip, it - 1 - off] * vsqrtdt)
+                    path_up[it] = path_up[it - 1] * m * w
+                    path_dn[it] = path_dn[it - 1] * m / w
+                v_up = _score_path(path_up[off:], obs_pos[off:], sc_out_values[k],
+                                   sc_untriggered[k], barrier, knock_in_price,
+                                   option_type, knock_in_type, sc_knock_in_coef[k],
+                                   initial_spot, sk1, sk2)
+                v_dn = _score_path(path_dn[off:], obs_pos[off:], sc_out_values[k],
+                                   sc_untriggered[k], barrier, knock_in_price,
+                                   option_type, knock_in_type, sc_knock_in_coef[k],
+                                   initial_spot, sk1, sk2)
+                v[k] = 0.5 * (v_up + v_dn)
+                totals[ic, k] += v[k]
+                totals_sq[ic, k] += v[k] * v[k]
+            for i in range(num_stats):
+                x = 0.0
+                for k in range(num_scenarios):
+                    x += weights[i, k] * v[k]
+                stats[ic, i] += x
+                stats_sq[ic, i] += x * x
+
+    values = _mean_std_error(totals, totals_sq, num_paths)
+    estimates = _mean_std_error(stats, stats_sq, num_paths)
+    return values[0], values[1], estimates[0], estimates[1]
+
+###############################################################################
+
+
+@njit(cache=True)
+def _mean_std_error(totals, totals_sq, num_paths):
+    """ 按块序号汇总各块的累加值，返回(均值, 标准误差) """
+
+    num_chunks, num_cols = totals.shape
+    mean = np.zeros(num_cols)
+    std_error = np.zeros(num_cols)
+    for j in range(num_cols):
+        total = 0.0
+        total_sq = 0.0
+        for ic in range(num_chunks):
+            total += totals[ic, j]
+            total_sq += totals_sq[ic, j]
+        mean[j] = total / num_paths
+        if num_paths > 1:
+            var = max(total_sq / num_paths - mean[j] * mean[j], 0.0) * \
+                num_paths / (num_paths - 1)
+            std_error[j] = sqrt(var / num_paths)
+    return mean, std_error
+
+###############################################################################
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def _value_lr_chunked(num_paths, chunk_size, seeds, num_time_steps, dt, mu, s0, sigma,
+                      obs_pos, out_values, untriggered_value, barrier, knock_in_price,
+                      option_type, knock_in_type, knock_in_coef, initial_spot, sk1, sk2):
+    """ 在定价的同一次模拟中计算delta、gamma、vega的中心化似然比估计量
+
+    返回(价格, 价格标准误差, [delta, gamma, vega], 对应的标准误差)。 """
+
+    sqrtdt = sqrt(dt)
+    vsqrtdt = sigma * sqrtdt
+    m = exp((mu - sigma * sigma / 2.0) * dt)
+
+    num_chunks = seeds.shape[0]
+    sum_v = np.zeros(num_chunks)
+    sum_v2 = np.zeros(num_chunks)
+    sum_x = np.zeros((num_chunks, 3))
+    sum_x2 = np.zeros((num_chunks, 3))
+    sum_y = np.zeros((num_chunks, 3))
+    sum_y2 = np.zeros((num_chunks, 3))
+    sum_xy = np.zeros((num_chunks, 3))
+
+    for ic in prange(num_chunks):
+        np.random.seed(seeds[ic])
+        start = ic * chunk_size
+        n = min(chunk_size, num_paths - start)
+        path_up = np.empty(num_time_steps + 1)
+        path_dn = np.empty(num_time_steps + 1)
+        path_up[0] = s0
+        path_dn[0] = s0
+        w_up = np.empty(3)
+        w_dn = np.empty(3)
+        g = np.random.standard_normal((n, num_time_steps))
+        for ip in range(n):
+            sum_z = 0.0
+            sum_z2 = 0.0
+            for it in range(1, num_time_steps + 1):
+                z = g[ip, it - 1]
+                sum_z += z
+                sum_z2 += z * z
+                w = exp(z * vsqrtdt)
+                path_up[it] = path_up[it - 1] * m * w
+                path_dn[it] = path_dn[it - 1] * m / w
+            v_up = _score_path(path_up, obs_pos, out_values, untriggered_value,
+                               barrier, knock_in_price, option_type, knock_in_type,
+                               knock_in_coef, initial_spot, sk1, sk2)
+            v_dn = _score_path(path_dn, obs_pos, out_values, untriggered_value,
+                               barrier, knock_in_price, option_type, knock_in_type,
+                               knock_in_coef, initial_spot, sk1, sk2)
+            w_up[0], w_up[1], w_up[2], w_dn[0], w_dn[1], w_dn[2] = gbm_lr_pair_weights(
+                g[ip, 0], sum_z, sum_z2, num_time_steps, s0, sigma, sqrtdt)
+
+            v = 0.5 * (v_up + v_dn)
+            sum_v[ic] += v
+            sum_v2[ic] += v * v
+            for j in range(3):
+                x = 0.5 * (v_up * w_up[j] + v_dn * w_dn[j])
+                y = 0.5 * (w_up[j] + w_dn[j])
+                sum_x[ic, j] += x
+                sum_x2[ic, j] += x * x
+                sum_y[ic, j] += y
+                sum_y2[ic, j] += y * y
+                sum_xy[ic, j] += x * y
+
+    values = _mean_std_error(sum_v.reshape((num_chunks, 1)),
+                             sum_v2.reshape((num_chunks, 1)), num_paths)
+    v_mean = values[0][0]
+
+    estimates = np.zeros(3)
+    std_errors = np.zeros(3)
+    for j in range(3):
+        x_total = 0.0
+        x2_total = 0.0
+        y_total = 0.0
+        y2_total = 0.0
+        xy_total = 0.0
+        for ic in range(num_chunks):
+            x_total += sum_x[ic, j]
+            x2_total += sum_x2[ic, j]
+            y_total += sum_y[ic, j]
+            y2_total += sum_y2[ic, j]
+            xy_total += sum_xy[ic, j]
+        # 以价格均值为基线中心化：E[(v - v_mean) * w]
+        estimates[j] = (x_total - v_mean * y_total) / num_paths
+        if num_paths > 1:
+            second = (x2_total - 2.0 * v_mean * xy_total + v_mean * v_mean * y2_total) / num_paths
+            var = max(second - estimates[j] * estimates[j], 0.0) * num_paths / (num_paths - 1)
+            std_errors[j] = sqrt(var / num_paths)
+
+    return v_mean, values[1][0], estimates, std_errors
+
+###############################################################################
+
+
+@dataclass
+class TuringSnowballMCScenario:
+    """ 蒙特卡洛情景：offset为情景估值日在交易日序列中的位置，
+    out_values、untriggered_value和knock_in_coef为该情景下的折现收益参数 """
+    s0: float
+    mu: float
+    sigma: float
+    out_values: np.ndarray
+    untriggered_value: float
+    knock_in_coef: float
+    offset: int = 0
+
+###############################################################################
+
+
+class TuringSnowballMCEngine():
+    """ 雪球期权分块蒙特卡洛引擎
+
+    obs_index为敲出观察日在交易日序列中的索引，out_values为对应观察日敲出时的折现收益，
+    untriggered_value为未敲出未敲入时的折现收益，knock_in_coef为敲入收益的系数（含名义本金、
+    参与率和折现因子）。 """
+
+    def __init__(self,
+                 num_time_steps: int,
+                 obs_index,
+                 out_values,
+                 untriggered_value: float,
+                 barrier: float,
+                 knock_in_price: float,
+                 option_type: int,
+                 knock_in_type: int,
+                 knock_in_coef: float,
+                 initial_spot: float,
+                 sk1: float = None,
+                 sk2: float = None):
+
+        if option_type not in (SNOWBALL_CALL, SNOWBALL_PUT):
+            raise TuringError("Unknown snowball option type")
+        if knock_in_type not in (KNOCK_IN_RETURN, KNOCK_IN_VANILLA, KNOCK_IN_SPREADS):
+            raise TuringError("Unknown knock in type")
+        if len(obs_index) != len(out_values):
+            raise TuringError("obs_index and out_values must have the same length")
+
+        self.num_time_steps = int(num_time_steps)
+        # 交易日索引 -> 敲出观察日序号，非观察日为-1
+        self.obs_pos = np.full(self.num_time_steps + 1, -1, dtype=np.int64)
+        for j, i in enumerate(obs_index):
+            self.obs_pos[i] = j
+        self.out_values = np.asarray(out_values, dtype=np.float64)
+        self.untriggered_value = float(untriggered_value)
+        self.barrier = float(barrier)
+        self.knock_in_price = float(knock_in_price)
+        self.option_type = option_type
+        self.knock_in_type = knock_in_type
+        self.knock_in_coef = float(knock_in_coef)
+        self.initial_spot = float(initial_spot)
+        self.sk1 = np.nan if sk1 is None else float(sk1)
+        self.sk2 = np.nan if sk2 is None else float(sk2)
+
+    def value_paths(self, sall):
+        """ 对给定的路径矩阵（路径数 × 交易日数）计算各路径的折现收益 """
+        sall = np.ascontiguousarray(sall, dtype=np.float64)
+        if sall.shape[1] != self.num_time_steps + 1:
+            raise TuringError("Number of path steps does not match the schedule")
+        return _score_paths(sall, self.obs_pos, self.out_values, self.untriggered_value,
+                            self.barrier, self.knock_in_price, self.option_type,
+                            self.knock_in_type, self.knock_in_coef, self.initial_spot,
+                            self.sk1, self.sk2)
+
+    def value_gbm(self,
+                  s0: float,
+                  mu: float,
+                  sigma: float,
+                  num_ann_obs: int,
+                  num_paths: int,
+                  seed: int,
+                  chunk_size: int = PARALLEL_BLOCK_SIZE):
+        """ 按块模拟2 × num_paths条对偶GBM路径，返回(价格, 标准误差)
+
+        结果只取决于seed和chunk_size，与线程数无关 """
+        scenario = TuringSnowballMCScenario(s0, mu, sigma, self.out_values,
+                                            self.untriggered_value, self.knock_in_coef)
+        values, std_errors, _, _ = self.value_scenarios([scenario], np.zeros((0, 1)),
+                                                        num_ann_obs, num_paths,
+                                                        seed, chunk_size)
+        return float(values[0]), float(std_errors[0])
+
+    def value_gbm_lr(self,
+                     s0: float,
+                     mu: float,
+                     sigma: float,
+                     num_ann_obs: int,
+                     num_paths: int,
+                     seed: int,
+                     chunk_size: int = PARALLEL_BLOCK_SIZE):
+        """ 与value_gbm使用同一组路径，同时给出delta、gamma、vega的似然比估计，
+        返回(价格, 价格标准误差, [delta, gamma, vega], 对应的标准误差) """
+        if num_paths < 1:
+            raise TuringError("Number of paths must be positive")
+        if chunk_size < 1:
+            raise TuringError("Chunk size must be positive")
+        seeds = blockSeeds(seed, num_paths, int(chunk_size))
+        value, std_error, estimates, std_errors = _value_lr_chunked(
+            int(num_paths), int(chunk_size), seeds, self.num_time_steps, 1.0 / num_ann_obs,
+            float(mu), float(s0), float(sigma), self.obs_pos, self.out_values,
+            self.untriggered_value, self.barrier, self.knock_in_price, self.option_type,
+            self.knock_in_type, self.knock_in_coef, self.initial_spot, self.sk1, self.sk2)
+        return float(value), float(std_error), estimates, std_errors
+
+    def _knock_in_payoff(self, spots):
+        """ 敲入后到期时的折现收益 """
+        ratio = spots / self.initial_spot
+        if self.option_type == SNOWBALL_CALL:
+            if self.knock_in_type == KNOCK_IN_RETURN:
+                payoff = 1.0 - ratio
+            elif self.knock_in_type == KNOCK_IN_VANILLA:
+                payoff = np.maximum(self.sk1 - ratio, 0.0)
+            else:
+                payoff = np.maximum(self.sk1 - np.maximum(ratio, self.sk2), 0.0)
+        else:
+            if self.knock_in_type == KNOCK_IN_RETURN:
+                payoff = ratio - 1.0
+            elif self.knock_in_type == KNOCK_IN_VANILLA:
+                payoff = np.maximum(ratio - self.sk1, 0.0)
+            else:
+                payoff = np.maximum(np.minimum(ratio, self.sk2) - self.sk1, 0.0)
+        return self.knock_in_coef * payoff
+
+    def value_pde(self,
+                  s0: float,
+                  mu: float,
+                  sigma: float,
+                  num_ann_obs: int,
+                  num_space_steps: int = 1000,
+                  sub_steps: int = 2):
+        """ 对同一收益描述用一维PDE定价，返回(价格, delta, gamma)
+
+        网格分为未敲入和已敲入两层，每个交易日检查敲入，敲出观察日把敲出区域替换为
+        对应的票息。收益已折现到估值日，因此PDE中不再折现。 """
+        num_time_steps = self.num_time_steps
+        if num_time_steps < 1:
+            raise TuringError("Expiry must be after the value date")
+        dt = 1.0 / num_ann_obs
+        times = dt * np.arange(num_time_steps + 1)
+        engine = TuringPDE1DEngine(s0, sigma, mu, times[-1],
+                                   num_space_steps=num_space_steps,
+                                   extra_spots=(self.barrier, self.knock_in_price))
+        spots = engine.spots
+        is_call = self.option_type == SNOWBALL_CALL
+        out_weight = engine.region_fraction(self.barrier, above=is_call)
+        in_weight = engine.region_fraction(self.knock_in_price, above=not is_call)
+
+        layers = np.empty((2, spots.shape[0]))
+        layers[0] = self.untriggered_value
+        layers[1] = self._knock_in_payoff(spots)
+        obs_pos = self.obs_pos
+        out_values = self.out_values
+
+        def on_event(i, v):
+            # 先判断敲入，敲出优先于敲入；每日的敲入判断都会使网格值不连续
+            v[0] += in_weight * (v[1] - v[0])
+            j = obs_pos[i]
+            if j >= 0:
+                v += out_weight * (out_values[j] - v)
+            return True
+
+        layers = engine.solve(layers, times, on_event, sub_steps=sub_steps)
+        return engine.greeks(layers[0])
+
+    def value_scenarios(self,
+                        scenarios: list,
+                        weights: np.ndarray,
+                        num_ann_obs: int,
+                        num_paths: int,
+                        seed: int,
+                        chunk_size: int = PARALLEL_BLOCK_SIZE):
+        """ 用同一组随机数对多个情景定价（公共随机数），weights为统计量个数 × 情景个数的矩阵，
+        返回(情景价值, 情景价值标准误差, 统计量, 统计量标准误差) """
+        if num_paths < 1:
+            raise TuringError("Number of paths must be positive")
+        if chunk_size < 1:
+            raise TuringError("Chunk size must be positive")
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.ndim != 2 or weights.shape[1] != len(scenarios):
+            raise TuringError("Weights must be a matrix with one column per scenario")
+
+        num_obs = len(self.out_values)
+        sc_out_values = np.empty((len(scenarios), num_obs))
+        for k, scenario in enumerate(scenarios):
+            if not 0 <= scenario.offset < self.num_time_steps + 1:
+                raise TuringError("Scenario offset is outside the schedule")
+            if len(scenario.out_values) != num_obs:
+                raise TuringError("Scenario out_values must match the observation dates")
+            sc_out_values[k] = scenario.out_values
+
+        seeds = blockSeeds(seed, num_paths, int(chunk_size))
+        return _value_chunked(int(num_paths), int(chunk_size), seeds, self.num_time_steps,
+                              1.0 / num_ann_obs,
+                              np.array([float(sc.s0) for sc in scenarios]),
+                              np.array([float(sc.mu) for sc in scenarios]),
+                              np.array([float(sc.sigma) for sc in scenarios]),
+                              np.array([int(sc.offset) for sc in scenarios], dtype=np.int64),
+                              sc_out_values,
+                              np.array([float(sc.untriggered_value) for sc in scenarios]),
+                              np.array([float(sc.knock_in_coef) for sc in scenarios]),
+                              weights, self.obs_pos, self.barrier, self.knock_in_price,
+                              self.option_type, self.knock_in_type, self.initial_spot,
+                              self.sk1, self.sk2)
+
+###############################################################################
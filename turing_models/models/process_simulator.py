@@ -1,7 +1,7 @@
 from math import sqrt, exp, log
 from enum import Enum
 
-from numba import njit, float64, int64
+from numba import njit, float64, int64, prange
 import numpy as np
 
 from turing_models.utilities.error import TuringError
@@ -20,6 +20,23 @@ class TuringProcessTypes(Enum):
     JUMP_DIFFUSION = 6
 
 ###############################################################################
+# 并行路径生成
+# 路径按固定大小分块，每块在开始时用由主种子派生的独立种子重新设定随机数状态，
+# 同一块始终由一个线程完成，因此结果与线程数和调度方式无关。
+###############################################################################
+
+PARALLEL_BLOCK_SIZE = 10_000
+
+
+def blockSeeds(seed, numPaths, blockSize=PARALLEL_BLOCK_SIZE):
+    """ 由主种子派生每个路径块的独立种子 """
+
+    if blockSize < 1:
+        raise TuringError("Block size must be positive")
+    numBlocks = max((int(numPaths) + blockSize - 1) // blockSize, 1)
+    return np.random.SeedSequence(seed).generate_state(numBlocks).astype(np.int64)
+
+###############################################################################
 
 
 class TuringProcessSimulator():
@@ -35,7 +52,15 @@ class TuringProcessSimulator():
             numAnnSteps,
             numPaths,
             seed,
-            numTimeSteps=None):
+            numTimeSteps=None,
+            parallel=False,
+            blockSize=PARALLEL_BLOCK_SIZE):
+        """ parallel为True时路径按blockSize分块、每块使用独立的随机数流并行生成，
+        结果只取决于seed和blockSize，与线程数无关 """
+
+        if parallel:
+            return self._getProcessParallel(processType, t, modelParams, numAnnSteps,
+                                            numPaths, seed, numTimeSteps, blockSize)
 
         if processType == TuringProcessTypes.GBM:
             (stockPrice, drift, volatility, scheme) = modelParams
@@ -82,6 +107,45 @@ class TuringProcessSimulator():
         else:
             raise TuringError("Unknown process" + str(processType))
 
+    def _getProcessParallel(
+            self,
+            processType,
+            t,
+            modelParams,
+            numAnnSteps,
+            numPaths,
+            seed,
+            numTimeSteps,
+            blockSize):
+
+        seeds = blockSeeds(seed, numPaths, blockSize)
+
+        if processType == TuringProcessTypes.GBM:
+            (stockPrice, drift, volatility, scheme) = modelParams
+            if not numTimeSteps:
+                numTimeSteps = int(t * numAnnSteps + 0.50)
+            return _getGBMPathsBlocks(numPaths, numAnnSteps, drift, stockPrice, volatility,
+                                      scheme.value, seeds, blockSize, numTimeSteps)
+
+        elif processType == TuringProcessTypes.HESTON:
+            (stockPrice, drift, v0, kappa, theta, sigma, rho, scheme) = modelParams
+            return _getHestonPathsBlocks(numPaths, numAnnSteps, t, drift, stockPrice,
+                                         v0, kappa, theta, sigma, rho, scheme.value,
+                                         seeds, blockSize)
+
+        elif processType == TuringProcessTypes.VASICEK:
+            (r0, kappa, theta, sigma, scheme) = modelParams
+            return _getVasicekPathsBlocks(numPaths, numAnnSteps, t, r0, kappa, theta,
+                                          sigma, scheme.value, seeds, blockSize)
+
+        elif processType == TuringProcessTypes.CIR:
+            (r0, kappa, theta, sigma, scheme) = modelParams
+            return _getCIRPathsBlocks(numPaths, numAnnSteps, t, r0, kappa, theta,
+                                      sigma, scheme.value, seeds, blockSize)
+
+        else:
+            raise TuringError("Unknown process" + str(processType))
+
 ###############################################################################
 
 
@@ -93,63 +157,54 @@ class TuringHestonNumericalScheme(Enum):
 ###############################################################################
 
 
-@njit(float64[:, :](int64, int64, float64, float64, float64, float64, float64,
-                    float64, float64, float64, int64, int64),
-      cache=True, fastmath=True)
-def getHestonPaths(numPaths,
-                   numAnnSteps,
-                   t,
-                   drift,
-                   s0,
-                   v0,
-                   kappa,
-                   theta,
-                   sigma,
-                   rho,
-                   scheme,
-                   seed):
+@njit(cache=True, fastmath=True)
+def _hestonPath(sPath,
+                numSteps,
+                dt,
+                drift,
+                s0,
+                v0,
+                kappa,
+                theta,
+                sigma,
+                rho,
+                scheme):
+    """ 模拟单条Heston路径，写入sPath[1:]，随机数取自当前线程的随机数状态 """
 
-    np.random.seed(seed)
-    dt = 1.0 / numAnnSteps
-    numSteps = int(t / dt)
-    sPaths = np.empty(shape=(numPaths, numSteps + 1))
-    sPaths[:, 0] = s0
     sdt = sqrt(dt)
     rhohat = sqrt(1.0 - rho * rho)
     sigma2 = sigma * sigma
 
     if scheme == TuringHestonNumericalScheme.EULER.value:
         # Basic scheme to first order with truncation on variance
-        for iPath in range(0, numPaths):
-            s = s0
-            v = v0
-            for iStep in range(1, numSteps + 1):
-                z1 = np.random.normal(0.0, 1.0) * sdt
-                z2 = np.random.normal(0.0, 1.0) * sdt
-                zV = z1
-                zS = rho * z1 + rhohat * z2
-                vplus = max(v, 0.0)
-                rtvplus = sqrt(vplus)
-                v += kappa * (theta - vplus) * dt + sigma * \
-                    rtvplus * zV + 0.25 * sigma2 * (zV * zV - dt)
-                s += drift * s * dt + rtvplus * s * \
-                    zS + 0.5 * s * vplus * (zV * zV - dt)
-                sPaths[iPath, iStep] = s
+        s = s0
+        v = v0
+        for iStep in range(1, numSteps + 1):
+            z1 = np.random.normal(0.0, 1.0) * sdt
+            z2 = np.random.normal(0.0, 1.0) * sdt
+            zV = z1
+            zS = rho * z1 + rhohat * z2
+            vplus = max(v, 0.0)
+            rtvplus = sqrt(vplus)
+            v += kappa * (theta - vplus) * dt + sigma * \
+                rtvplus * zV + 0.25 * sigma2 * (zV * zV - dt)
+            s += drift * s * dt + rtvplus * s * \
+                zS + 0.5 * s * vplus * (zV * zV - dt)
+            sPath[iStep] = s
 
     elif scheme == TuringHestonNumericalScheme.EULERLOG.value:
         # Basic scheme to first order with truncation on variance
-        for iPath in range(0, numPaths):
-            x = log(s0)
-            v = v0
-            for iStep in range(1, numSteps + 1):
-                zV = np.random.normal(0.0, 1.0) * sdt
-                zS = rho * zV + rhohat * np.random.normal(0.0, 1.0) * sdt
-                vplus = max(v, 0.0)
-                rtvplus = sqrt(vplus)
-                x += (drift - 0.5 * vplus) * dt + rtvplus * zS
-                v += kappa * (theta - vplus) * dt + sigma * \
-                    rtvplus * zV + sigma2 * (zV * zV - dt) / 4.0
-                sPaths[iPath, iStep] = exp(x)
+        x = log(s0)
+        v = v0
+        for iStep in range(1, numSteps + 1):
+            zV = np.random.normal(0.0, 1.0) * sdt
+            zS = rho * zV + rhohat * np.random.normal(0.0, 1.0) * sdt
+            vplus = max(v, 0.0)
+            rtvplus = sqrt(vplus)
+            x += (drift - 0.5 * vplus) * dt + rtvplus * zS
+            v += kappa * (theta - vplus) * dt + sigma * \
+                rtvplus * zV + sigma2 * (zV * zV - dt) / 4.0
+            sPath[iStep] = exp(x)
 
     elif scheme == TuringHestonNumericalScheme.QUADEXP.value:
         # Due to Leif Andersen(2006)
@@ -167,47 +222,116 @@ def getHestonPaths(numPaths,
         c1 = sigma2 * Q * (1.0 - Q) / kappa
         c2 = theta * sigma2 * ((1.0 - Q)**2) / 2.0 / kappa
 
-        for iPath in range(0, numPaths):
-            x = log(s0)
-            vn = v0
-            for iStep in range(1, numSteps + 1):
-                zV = np.random.normal(0, 1)
-                zS = rho * zV + rhohat * np.random.normal(0, 1)
-                m = theta + (vn - theta) * Q
-                m2 = m * m
-                s2 = c1 * vn + c2
-                psi = s2 / m2
-                u = np.random.uniform(0.0, 1.0)
-
-                if psi <= psic:
-                    b2 = 2.0 / psi - 1.0 + \
-                        sqrt((2.0 / psi) * (2.0 / psi - 1.0))
-                    a = m / (1.0 + b2)
-                    b = sqrt(b2)
-                    zV = norminvcdf(u)
-                    vnp = a * ((b + zV)**2)
-                    d = (1.0 - 2.0 * A * a)
-                    M = exp((A * b2 * a) / d) / sqrt(d)
-                    K0 = -log(M) - (K1 + 0.5 * K3) * vn
+        x = log(s0)
+        vn = v0
+        for iStep in range(1, numSteps + 1):
+            zV = np.random.normal(0, 1)
+            zS = rho * zV + rhohat * np.random.normal(0, 1)
+            m = theta + (vn - theta) * Q
+            m2 = m * m
+            s2 = c1 * vn + c2
+            psi = s2 / m2
+            u = np.random.uniform(0.0, 1.0)
+
+            if psi <= psic:
+                b2 = 2.0 / psi - 1.0 + \
+                    sqrt((2.0 / psi) * (2.0 / psi - 1.0))
+                a = m / (1.0 + b2)
+                b = sqrt(b2)
+                zV = norminvcdf(u)
+                vnp = a * ((b + zV)**2)
+                d = (1.0 - 2.0 * A * a)
+                M = exp((A * b2 * a) / d) / sqrt(d)
+                K0 = -log(M) - (K1 + 0.5 * K3) * vn
+            else:
+                p = (psi - 1.0) / (psi + 1.0)
+                beta = (1.0 - p) / m
+
+                if u <= p:
+                    vnp = 0.0
                 else:
-                    p = (psi - 1.0) / (psi + 1.0)
-                    beta = (1.0 - p) / m
+                    vnp = log((1.0 - p) / (1.0 - u)) / beta
 
-                    if u <= p:
-                        vnp = 0.0
-                    else:
-                        vnp = log((1.0 - p) / (1.0 - u)) / beta
+                M = p + beta * (1.0 - p) / (beta - A)
+                K0 = -log(M) - (K1 + 0.5 * K3) * vn
 
-                    M = p + beta * (1.0 - p) / (beta - A)
-                    K0 = -log(M) - (K1 + 0.5 * K3) * vn
+            x += mu * dt + K0 + (K1 * vn + K2 * vnp) + \
+                sqrt(K3 * vn + K4 * vnp) * zS
+            sPath[iStep] = exp(x)
+            vn = vnp
 
-                x += mu * dt + K0 + (K1 * vn + K2 * vnp) + \
-                    sqrt(K3 * vn + K4 * vnp) * zS
-                sPaths[iPath, iStep] = exp(x)
-                vn = vnp
-    else:
+###############################################################################
+
+
+@njit(float64[:, :](int64, int64, float64, float64, float64, float64, float64,
+                    float64, float64, float64, int64, int64),
+      cache=True, fastmath=True)
+def getHestonPaths(numPaths,
+                   numAnnSteps,
+                   t,
+                   drift,
+                   s0,
+                   v0,
+                   kappa,
+                   theta,
+                   sigma,
+                   rho,
+                   scheme,
+                   seed):
+
+    if scheme != TuringHestonNumericalScheme.EULER.value and \
+       scheme != TuringHestonNumericalScheme.EULERLOG.value and \
+       scheme != TuringHestonNumericalScheme.QUADEXP.value:
         raise TuringError("Unknown FinHestonNumericalSchme")
 
+    np.random.seed(seed)
+    dt = 1.0 / numAnnSteps
+    numSteps = int(t / dt)
+    sPaths = np.empty(shape=(numPaths, numSteps + 1))
+    sPaths[:, 0] = s0
+
+    for iPath in range(0, numPaths):
+        _hestonPath(sPaths[iPath], numSteps, dt, drift, s0, v0,
+                    kappa, theta, sigma, rho, scheme)
+
+    return sPaths
+
+###############################################################################
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def _getHestonPathsBlocks(numPaths,
+                          numAnnSteps,
+                          t,
+                          drift,
+                          s0,
+                          v0,
+                          kappa,
+                          theta,
+                          sigma,
+                          rho,
+                          scheme,
+                          seeds,
+                          blockSize):
+
+    if scheme != TuringHestonNumericalScheme.EULER.value and \
+       scheme != TuringHestonNumericalScheme.EULERLOG.value and \
+       scheme != TuringHestonNumericalScheme.QUADEXP.value:
+        raise TuringError("Unknown FinHestonNumericalSchme")
+
+    dt = 1.0 / numAnnSteps
+    numSteps = int(t / dt)
+    sPaths = np.empty(shape=(numPaths, numSteps + 1))
+    sPaths[:, 0] = s0
+
+    for iBlock in prange(seeds.shape[0]):
+        np.random.seed(seeds[iBlock])
+        start = iBlock * blockSize
+        end = min(start + blockSize, numPaths)
+        for iPath in range(start, end):
+            _hestonPath(sPaths[iPath], numSteps, dt, drift, s0, v0,
+                        kappa, theta, sigma, rho, scheme)
+
     return sPaths
 
 ###############################################################################
@@ -265,6 +389,42 @@ def getGBMPaths(numPaths, numAnnSteps, t, mu, stockPrice, sigma, scheme, seed, n
 ###############################################################################
 
 
+@njit(cache=True, fastmath=True, parallel=True)
+def _getGBMPathsBlocks(numPaths, numAnnSteps, mu, stockPrice, sigma, scheme, seeds,
+                       blockSize, numTimeSteps):
+
+    if scheme != TuringGBMNumericalScheme.NORMAL.value and \
+       scheme != TuringGBMNumericalScheme.ANTITHETIC.value:
+        raise TuringError("Unknown TuringGBMNumericalScheme")
+
+    dt = 1.0 / numAnnSteps
+    vsqrtdt = sigma * sqrt(dt)
+    m = exp((mu - sigma * sigma / 2.0) * dt)
+    antithetic = scheme == TuringGBMNumericalScheme.ANTITHETIC.value
+
+    if antithetic:
+        Sall = np.empty((2 * numPaths, numTimeSteps + 1))
+    else:
+        Sall = np.empty((numPaths, numTimeSteps + 1))
+    Sall[:, 0] = stockPrice
+
+    for iBlock in prange(seeds.shape[0]):
+        np.random.seed(seeds[iBlock])
+        start = iBlock * blockSize
+        end = min(start + blockSize, numPaths)
+        for ip in range(start, end):
+            g1D = np.random.standard_normal(numTimeSteps)
+            for it in range(1, numTimeSteps + 1):
+                w = np.exp(g1D[it - 1] * vsqrtdt)
+                Sall[ip, it] = Sall[ip, it - 1] * m * w
+                if antithetic:
+                    Sall[ip + numPaths, it] = Sall[ip + numPaths, it - 1] * m / w
+
+    return Sall
+
+###############################################################################
+
+
 class TuringVasicekNumericalScheme(Enum):
     NORMAL = 1
     ANTITHETIC = 2
@@ -316,6 +476,50 @@ def getVasicekPaths(numPaths,
 ###############################################################################
 
 
+@njit(cache=True, fastmath=True, parallel=True)
+def _getVasicekPathsBlocks(numPaths,
+                           numAnnSteps,
+                           t,
+                           r0,
+                           kappa,
+                           theta,
+                           sigma,
+                           scheme,
+                           seeds,
+                           blockSize):
+
+    dt = 1.0 / numAnnSteps
+    numSteps = int(t / dt)
+    sigmasqrtdt = sigma * sqrt(dt)
+    antithetic = scheme == TuringVasicekNumericalScheme.ANTITHETIC.value
+
+    if antithetic:
+        ratePath = np.empty((2 * numPaths, numSteps + 1))
+    else:
+        ratePath = np.empty((numPaths, numSteps + 1))
+    ratePath[:, 0] = r0
+
+    for iBlock in prange(seeds.shape[0]):
+        np.random.seed(seeds[iBlock])
+        start = iBlock * blockSize
+        end = min(start + blockSize, numPaths)
+        for iPath in range(start, end):
+            r1 = r0
+            r2 = r0
+            z = np.random.normal(0.0, 1.0, size=(numSteps))
+            for iStep in range(1, numSteps + 1):
+                r1 = r1 + kappa * (theta - r1) * dt + \
+                    z[iStep - 1] * sigmasqrtdt
+                ratePath[iPath, iStep] = r1
+                if antithetic:
+                    r2 = r2 + kappa * (theta - r2) * dt - \
+                        z[iStep - 1] * sigmasqrtdt
+                    ratePath[iPath + numPaths, iStep] = r2
+    return ratePath
+
+###############################################################################
+
+
 class TuringCIRNumericalScheme(Enum):
     EULER = 1
     LOGNORMAL = 2
@@ -325,6 +529,57 @@ class TuringCIRNumericalScheme(Enum):
 
 ###############################################################################
 
+@njit(cache=True, fastmath=True)
+def _cirPath(ratePath, numSteps, dt, r0, kappa, theta, sigma, scheme):
+    """ 模拟单条CIR路径，写入ratePath[1:]，随机数取自当前线程的随机数状态 """
+
+    r = r0
+    z = np.random.normal(0.0, 1.0, size=(numSteps))
+
+    if scheme == TuringCIRNumericalScheme.EULER.value:
+        sigmasqrtdt = sigma * sqrt(dt)
+        for iStep in range(1, numSteps + 1):
+            rplus = max(r, 0.0)
+            sqrtrplus = sqrt(rplus)
+            r = r + kappa * (theta - rplus) * dt + \
+                sigmasqrtdt * z[iStep - 1] * sqrtrplus
+            ratePath[iStep] = r
+
+    elif scheme == TuringCIRNumericalScheme.LOGNORMAL.value:
+        x = exp(-kappa * dt)
+        y = 1.0 - x
+        for iStep in range(1, numSteps + 1):
+            mean = x * r + theta * y
+            var = sigma * sigma * y * (x * r + 0.50 * theta * y) / kappa
+            sig = sqrt(log(1.0 + var / (mean * mean)))
+            r = mean * exp(-0.5 * sig * sig + sig * z[iStep - 1])
+            ratePath[iStep] = r
+
+    elif scheme == TuringCIRNumericalScheme.MILSTEIN.value:
+        sigmasqrtdt = sigma * sqrt(dt)
+        sigma2dt = sigma * sigma * dt / 4.0
+        for iStep in range(1, numSteps + 1):
+            sqrtrplus = sqrt(max(r, 0.0))
+            r = r + kappa * (theta - r) * dt + \
+                z[iStep - 1] * sigmasqrtdt * sqrtrplus
+            r = r + sigma2dt * (z[iStep - 1]**2 - 1.0)
+            ratePath[iStep] = r
+
+    elif scheme == TuringCIRNumericalScheme.KAHLJACKEL.value:
+        bhat = theta - sigma * sigma / 4.0 / kappa
+        sqrtdt = sqrt(dt)
+        for iStep in range(1, numSteps + 1):
+            beta = z[iStep - 1] / sqrtdt
+            sqrtrplus = sqrt(max(r, 0.0))
+            c = 1.0 + (sigma * beta - 2.0 * kappa *
+                       sqrtrplus) * dt / 4.0 / sqrtrplus
+            r = r + (kappa * (bhat - r) + sigma *
+                     beta * sqrtrplus) * c * dt
+            ratePath[iStep] = r
+
+###############################################################################
+
+
 @njit(float64[:, :](int64, int64, float64, float64, float64,
                     float64, float64, int64, int64), cache=True, fastmath=True)
 def getCIRPaths(numPaths,
@@ -343,58 +598,45 @@ def getCIRPaths(numPaths,
     ratePath = np.empty(shape=(numPaths, numSteps + 1))
     ratePath[:, 0] = r0
 
-    if scheme == TuringCIRNumericalScheme.EULER.value:
-        sigmasqrtdt = sigma * sqrt(dt)
+    if scheme == TuringCIRNumericalScheme.EULER.value or \
+       scheme == TuringCIRNumericalScheme.LOGNORMAL.value or \
+       scheme == TuringCIRNumericalScheme.MILSTEIN.value or \
+       scheme == TuringCIRNumericalScheme.KAHLJACKEL.value:
         for iPath in range(0, numPaths):
-            r = r0
-            z = np.random.normal(0.0, 1.0, size=(numSteps))
-            for iStep in range(1, numSteps + 1):
-                rplus = max(r, 0.0)
-                sqrtrplus = sqrt(rplus)
-                r = r + kappa * (theta - rplus) * dt + \
-                    sigmasqrtdt * z[iStep - 1] * sqrtrplus
-                ratePath[iPath, iStep] = r
+            _cirPath(ratePath[iPath], numSteps, dt, r0, kappa, theta, sigma, scheme)
 
-    elif scheme == TuringCIRNumericalScheme.LOGNORMAL.value:
-        x = exp(-kappa * dt)
-        y = 1.0 - x
-        for iPath in range(0, numPaths):
-            r = r0
-            z = np.random.normal(0.0, 1.0, size=(numSteps))
-            for iStep in range(1, numSteps + 1):
-                mean = x * r + theta * y
-                var = sigma * sigma * y * (x * r + 0.50 * theta * y) / kappa
-                sig = sqrt(log(1.0 + var / (mean * mean)))
-                r = mean * exp(-0.5 * sig * sig + sig * z[iStep - 1])
-                ratePath[iPath, iStep] = r
+    return ratePath
 
-    elif scheme == TuringCIRNumericalScheme.MILSTEIN.value:
-        sigmasqrtdt = sigma * sqrt(dt)
-        sigma2dt = sigma * sigma * dt / 4.0
-        for iPath in range(0, numPaths):
-            r = r0
-            z = np.random.normal(0.0, 1.0, size=(numSteps))
-            for iStep in range(1, numSteps + 1):
-                sqrtrplus = sqrt(max(r, 0.0))
-                r = r + kappa * (theta - r) * dt + \
-                    z[iStep - 1] * sigmasqrtdt * sqrtrplus
-                r = r + sigma2dt * (z[iStep - 1]**2 - 1.0)
-                ratePath[iPath, iStep] = r
+###############################################################################
 
-    elif scheme == TuringCIRNumericalScheme.KAHLJACKEL.value:
-        bhat = theta - sigma * sigma / 4.0 / kappa
-        sqrtdt = sqrt(dt)
-        for iPath in range(0, numPaths):
-            r = r0
-            z = np.random.normal(0.0, 1.0, size=(numSteps))
-            for iStep in range(1, numSteps + 1):
-                beta = z[iStep - 1] / sqrtdt
-                sqrtrplus = sqrt(max(r, 0.0))
-                c = 1.0 + (sigma * beta - 2.0 * kappa *
-                           sqrtrplus) * dt / 4.0 / sqrtrplus
-                r = r + (kappa * (bhat - r) + sigma *
-                         beta * sqrtrplus) * c * dt
-                ratePath[iPath, iStep] = r
+
+@njit(cache=True, fastmath=True, parallel=True)
+def _getCIRPathsBlocks(numPaths,
+                       numAnnSteps,
+                       t,
+                       r0,
+                       kappa,
+                       theta,
+                       sigma,
+                       scheme,
+                       seeds,
+                       blockSize):
+
+    dt = 1.0 / numAnnSteps
+    numSteps = int(t / dt)
+    ratePath = np.empty(shape=(numPaths, numSteps + 1))
+    ratePath[:, 0] = r0
+
+    if scheme == TuringCIRNumericalScheme.EULER.value or \
+       scheme == TuringCIRNumericalScheme.LOGNORMAL.value or \
+       scheme == TuringCIRNumericalScheme.MILSTEIN.value or \
+       scheme == TuringCIRNumericalScheme.KAHLJACKEL.value:
+        for iBlock in prange(seeds.shape[0]):
+            np.random.seed(seeds[iBlock])
+            start = iBlock * blockSize
+            end = min(start + blockSize, numPaths)
+            for iPath in range(start, end):
+                _cirPath(ratePath[iPath], numSteps, dt, r0, kappa, theta, sigma, scheme)
 
     return ratePath
 
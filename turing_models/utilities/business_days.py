@@ -0,0 +1,157 @@
+import numpy as np
+
+from turing_models.utilities.calendar import TuringCalendar, TuringCalendarTypes, \
+    TuringBusDayAdjustTypes, businessDayIndex
+from turing_models.utilities.error import TuringError
+from turing_models.utilities.frequency import FrequencyType
+from turing_models.utilities.global_variables import gNumObsInYear
+from turing_models.utilities.schedule import TuringSchedule
+from turing_models.utilities.shared_cache import SharedCache
+from turing_models.utilities.turing_date import TuringDate
+from turing_models.utilities.turing_date_array import TuringDateArray
+
+
+class _BusinessDaySpan:
+    """ 起始日到结束日的逐日交易日时间表的紧凑表示
+
+    时间表为起始日、区间内的全部交易日，以及首尾非交易日调整后落在区间外的日期（extras）。
+    区间内的交易日由日历工作日位图的累计计数直接给出，不保存逐日日期。
+    没有位图的日历保存整个时间表（schedule）。 """
+
+    def __init__(self, index, e0, e1, extras=None, schedule=None):
+        self.index = index
+        self.e0 = e0
+        self.e1 = e1
+        self.extras = extras
+        self.schedule = schedule
+        if index is not None:
+            self.k0 = int(index._cumCount[e0 - index._start])
+            self.k1 = int(index._cumCount[e1 - 1 - index._start])
+
+    def __len__(self):
+        if self.index is None:
+            return len(self.schedule)
+        return 1 + self.k1 - self.k0 + len(self.extras)
+
+    def excel_dates(self):
+        if self.index is None:
+            return self.schedule
+        interior = self.index._businessDays[self.k0:self.k1]
+        return np.union1d(np.concatenate(([self.e0], interior)), self.extras)
+
+    def offsets(self, excel_dates):
+        """ 时间表中早于各日期的日期数，以及各日期是否在时间表中 """
+        excel_dates = np.asarray(excel_dates, dtype=np.int64)
+        if self.index is None:
+            schedule = self.schedule
+            offsets = np.searchsorted(schedule, excel_dates)
+            found = schedule[np.minimum(offsets, len(schedule) - 1)] == excel_dates
+            return offsets, found
+
+        index = self.index
+        e0, e1 = self.e0, self.e1
+        last = np.clip(excel_dates - 1, e0, e1 - 1)
+        interior = index._cumCount[last - index._start] - self.k0
+        offsets = (excel_dates > e0) + np.searchsorted(self.extras, excel_dates) + interior
+        inside = (excel_dates > e0) & (excel_dates < e1)
+        bus_day = index._businessDay[np.clip(excel_dates, e0, e1) - index._start]
+        found = (excel_dates == e0) | (inside & bus_day) | np.isin(excel_dates, self.extras)
+        return offsets, found
+
+
+class BusinessDayCache(SharedCache):
+    """ 进程级交易日服务
+
+    从起始日到结束日的逐日交易日时间表（包含首尾日，与按FrequencyType.DAILY生成的
+    TuringSchedule一致）由日历工作日位图的累计计数直接得到：交易日天数、按交易日计算的
+    年化期限和日期在时间表中的位置都是O(1)的计算，不生成逐日时间表。
+    以 (日历, 起始日, 结束日, 工作日调整规则) 为键缓存首尾调整后的结果，缓存项数超过
+    max_size时淘汰最久未使用的一项。没有位图的日历退回到TuringSchedule。 """
+
+    def __init__(self, max_size: int = 1000):
+        super().__init__(max_size)
+
+    @staticmethod
+    def make_key(start_date: TuringDate,
+                 end_date: TuringDate,
+                 calendar_type: TuringCalendarTypes,
+                 bus_day_adjust_type: TuringBusDayAdjustTypes):
+        # TuringDate的哈希值都相同，用excel日期作为键
+        return (calendar_type, start_date._excelDate, end_date._excelDate, bus_day_adjust_type)
+
+    def _span(self, start_date, end_date, calendar_type, bus_day_adjust_type) -> _BusinessDaySpan:
+        def build():
+            return self._generate(start_date, end_date, calendar_type, bus_day_adjust_type)
+
+        if not self.enabled:
+            return build()
+        return self._get_or_build(self.make_key(start_date, end_date, calendar_type, bus_day_adjust_type), build)
+
+    def bus_days(self,
+                 start_date: TuringDate,
+                 end_date: TuringDate,
+                 calendar_type: TuringCalendarTypes = TuringCalendarTypes.CHINA_SSE,
+                 bus_day_adjust_type: TuringBusDayAdjustTypes = TuringBusDayAdjustTypes.FOLLOWING) -> TuringDateArray:
+        """ 从起始日到结束日的交易日时间表（包含首尾日） """
+        span = self._span(start_date, end_date, calendar_type, bus_day_adjust_type)
+        return TuringDateArray.fromExcelDates(span.excel_dates())
+
+    def num_bus_days(self,
+                     start_date: TuringDate,
+                     end_date: TuringDate,
+                     calendar_type: TuringCalendarTypes = TuringCalendarTypes.CHINA_SSE,
+                     bus_day_adjust_type: TuringBusDayAdjustTypes = TuringBusDayAdjustTypes.FOLLOWING) -> int:
+        """ 起始日到结束日之间的交易日天数（一开一闭区间） """
+        return len(self._span(start_date, end_date, calendar_type, bus_day_adjust_type)) - 1
+
+    def bus_day_offsets(self,
+                        start_date: TuringDate,
+                        end_date: TuringDate,
+                        dates: TuringDateArray,
+                        calendar_type: TuringCalendarTypes = TuringCalendarTypes.CHINA_SSE,
+                        bus_day_adjust_type: TuringBusDayAdjustTypes = TuringBusDayAdjustTypes.FOLLOWING):
+        """ 交易日时间表中早于各日期的日期数（即日期在时间表中的索引值），以及各日期是否在时间表中 """
+        span = self._span(start_date, end_date, calendar_type, bus_day_adjust_type)
+        return span.offsets(dates.excelDates())
+
+    def trading_year_frac(self,
+                          start_date: TuringDate,
+                          end_date: TuringDate,
+                          calendar_type: TuringCalendarTypes = TuringCalendarTypes.CHINA_SSE,
+                          bus_day_adjust_type: TuringBusDayAdjustTypes = TuringBusDayAdjustTypes.FOLLOWING,
+                          num_obs_in_year: int = gNumObsInYear) -> float:
+        """ 按交易日计算的年化期限 """
+        return self.num_bus_days(start_date, end_date, calendar_type, bus_day_adjust_type) / num_obs_in_year
+
+    @staticmethod
+    def _generate(start_date, end_date, calendar_type, bus_day_adjust_type) -> _BusinessDaySpan:
+        e0 = int(start_date._excelDate)
+        e1 = int(end_date._excelDate)
+        index = businessDayIndex(calendar_type)
+        # 首尾调整最多跨过一个月，位图需要覆盖前后一个月
+        if index is None or e0 >= e1 or bus_day_adjust_type == TuringBusDayAdjustTypes.NONE \
+           or e0 - 31 < index._start or e1 + 31 > index._end:
+            schedule = TuringSchedule(start_date,
+                                      end_date,
+                                      freqType=FrequencyType.DAILY,
+                                      calendarType=calendar_type,
+                                      busDayAdjustType=bus_day_adjust_type)._adjustedDates
+            return _BusinessDaySpan(None, e0, e1,
+                                    schedule=np.array([dt._excelDate for dt in schedule], dtype=np.int64))
+
+        # 区间内的非交易日调整后可能落在区间外，只需调整首尾两段连续的非交易日和结束日
+        span = _BusinessDaySpan(index, e0, e1)
+        if span.k1 > span.k0:
+            first = int(index._businessDays[span.k0])
+            last = int(index._businessDays[span.k1 - 1])
+        else:
+            first, last = e1, e0
+        edges = np.concatenate((np.arange(e0 + 1, first), np.arange(last + 1, e1), [e1]))
+        adjusted = TuringCalendar(calendar_type).adjustExcelDates(edges, bus_day_adjust_type)
+        span.extras = np.unique(adjusted[(adjusted < e0) | (adjusted >= e1)])
+        if len(span) < 2:
+            raise TuringError("Schedule has two dates only.")
+        return span
+
+
+business_day_cache = BusinessDayCache()
@@ -4,7 +4,10 @@
 
 import datetime
 from enum import Enum
-from turing_models.utilities.turing_date import TuringDate
+
+import numpy as np
+
+from turing_models.utilities.turing_date import TuringDate, ordinalFromExcel
 from turing_models.utilities.error import TuringError
 
 # from numba import njit, jit, int64, boolean
@@ -536,6 +539,149 @@ class TuringDateGenRuleTypes(Enum):
     BACKWARD = 2
 
 ###############################################################################
+# BUSINESS DAY BITMAP
+# Calendars defined by precomputed holiday lists (and the trivial NONE and
+# WEEKEND calendars) keep their business days over
+# the supported date range as a bitmap indexed by excel date, together with the
+# cumulative business-day count and the sorted business days. Holiday tests,
+# adjustments and business-day arithmetic are then O(1) and can be applied to
+# whole arrays of excel dates.
+###############################################################################
+
+gBitmapStartYear = 1901
+gBitmapEndYear = 2100
+
+
+def dateFromExcel(excelDate: int):
+    ''' Convert an excel date back to a TuringDate. '''
+    return TuringDate.fromOrdinal(ordinalFromExcel(int(excelDate)))
+
+###############################################################################
+
+
+class TuringBusinessDayIndex(object):
+    ''' Precomputed business-day bitmap of a calendar. All methods take excel
+    dates (integers or integer arrays) inside [start, end] and are vectorised
+    over numpy arrays. '''
+
+    def __init__(self,
+                 calendarType: TuringCalendarTypes):
+
+        self._start = int(TuringDate(gBitmapStartYear, 1, 1)._excelDate)
+        self._end = int(TuringDate(gBitmapEndYear, 12, 31)._excelDate)
+
+        excelDates = np.arange(self._start, self._end + 1, dtype=np.int64)
+        workday = (excelDates + 5) % 7 < TuringDate.SAT
+
+        holiday = np.zeros(len(excelDates), dtype=bool)
+        if calendarType == TuringCalendarTypes.WEEKEND:
+            holiday = ~workday
+        elif calendarType in (TuringCalendarTypes.CHINA_SSE,
+                              TuringCalendarTypes.CHINA_IB):
+            for dt in precomputedChinaHolidays:
+                holiday[int(dt._excelDate) - self._start] = True
+
+        if calendarType == TuringCalendarTypes.CHINA_IB:
+            for dt in precomputedChinaAdjustedWorkdays:
+                workday[int(dt._excelDate) - self._start] = True
+
+        self._holiday = holiday
+        self._businessDay = workday & ~holiday
+        # number of business days on or before each date
+        self._cumCount = np.cumsum(self._businessDay)
+        self._businessDays = excelDates[self._businessDay]
+
+    def contains(self, excelDate):
+        ''' True if all the excel dates lie inside the bitmap range. '''
+        excelDate = np.asarray(excelDate)
+        return bool(np.all((excelDate >= self._start) &
+                           (excelDate <= self._end)))
+
+    def _offset(self, excelDate):
+        return np.asarray(excelDate, dtype=np.int64) - self._start
+
+    def isHoliday(self, excelDate):
+        return self._holiday[self._offset(excelDate)]
+
+    def isBusinessDay(self, excelDate):
+        return self._businessDay[self._offset(excelDate)]
+
+    def following(self, excelDate):
+        ''' First business day on or after the date. '''
+        i = self._offset(excelDate)
+        k = self._cumCount[i] - self._businessDay[i]
+        return self._businessDays[np.minimum(k, len(self._businessDays) - 1)]
+
+    def preceding(self, excelDate):
+        ''' Last business day on or before the date. '''
+        i = self._offset(excelDate)
+        return self._businessDays[np.maximum(self._cumCount[i] - 1, 0)]
+
+    def modifiedFollowing(self, excelDate, months):
+        ''' Following business day unless it falls in another month (months
+        holds the month of each date), in which case the preceding one. '''
+        following = self.following(excelDate)
+        preceding = self.preceding(excelDate)
+        followingMonths = self.months(following)
+        return np.where(followingMonths == months, following, preceding)
+
+    def modifiedPreceding(self, excelDate, months):
+        ''' Preceding business day unless it falls in another month, in which
+        case the following one. '''
+        following = self.following(excelDate)
+        preceding = self.preceding(excelDate)
+        precedingMonths = self.months(preceding)
+        return np.where(precedingMonths == months, preceding, following)
+
+    def months(self, excelDate):
+        ''' Calendar month of each excel date. '''
+        dates = np.asarray(excelDate, dtype=np.int64) - 25569
+        dates = dates.astype('datetime64[D]')
+        return dates.astype('datetime64[M]').astype(np.int64) % 12 + 1
+
+    def addBusinessDays(self, excelDate, numDays):
+        ''' Date numDays business days after (before if negative) the date,
+        which need not itself be a business day. '''
+        i = self._offset(excelDate)
+        numDays = np.asarray(numDays, dtype=np.int64)
+        countBefore = self._cumCount[i] - self._businessDay[i]
+        k = np.where(numDays > 0, self._cumCount[i] - 1 + numDays,
+                     countBefore + numDays)
+        if np.any((k < 0) | (k >= len(self._businessDays))):
+            raise TuringError("Business day outside the calendar range")
+        return np.where(numDays == 0,
+                        np.asarray(excelDate, dtype=np.int64),
+                        self._businessDays[k])
+
+    def businessDaysBetween(self, startExcelDate, endExcelDate):
+        ''' Number of business days after the start date up to and including
+        the end date, negative if the end date is before the start date. '''
+        return self._cumCount[self._offset(endExcelDate)] - \
+            self._cumCount[self._offset(startExcelDate)]
+
+###############################################################################
+
+
+gBusinessDayIndices = {}
+
+
+def businessDayIndex(calendarType: TuringCalendarTypes):
+    ''' Returns the cached business-day bitmap of the calendar, or None for
+    calendars whose holidays are computed by rule. '''
+
+    if calendarType not in (TuringCalendarTypes.NONE,
+                            TuringCalendarTypes.WEEKEND,
+                            TuringCalendarTypes.CHINA_SSE,
+                            TuringCalendarTypes.CHINA_IB):
+        return None
+
+    index = gBusinessDayIndices.get(calendarType)
+    if index is None:
+        index = TuringBusinessDayIndex(calendarType)
+        gBusinessDayIndices[calendarType] = index
+    return index
+
+###############################################################################
 
 
 class TuringCalendar(object):
@@ -555,6 +701,18 @@ class TuringCalendar(object):
                 str(calendarType))
 
         self._type = calendarType
+        self._index = businessDayIndex(calendarType)
+
+    ###########################################################################
+
+    def _indexFor(self, dt: TuringDate):
+        ''' Returns the business-day bitmap if the calendar has one covering
+        the date, otherwise None. '''
+
+        index = self._index
+        if index is not None and index._start <= dt._excelDate <= index._end:
+            return index
+        return None
 
     ###########################################################################
 
@@ -570,7 +728,21 @@ class TuringCalendar(object):
         if busDayConventionType == TuringBusDayAdjustTypes.NONE:
             return dt
 
-        elif busDayConventionType == TuringBusDayAdjustTypes.FOLLOWING:
+        index = self._indexFor(dt)
+        if index is not None:
+            excelDate = int(dt._excelDate)
+            if index.isBusinessDay(excelDate):
+                return dt
+            if busDayConventionType == TuringBusDayAdjustTypes.FOLLOWING:
+                return dateFromExcel(index.following(excelDate))
+            elif busDayConventionType == TuringBusDayAdjustTypes.MODIFIED_FOLLOWING:
+                return dateFromExcel(index.modifiedFollowing(excelDate, dt._m))
+            elif busDayConventionType == TuringBusDayAdjustTypes.PRECEDING:
+                return dateFromExcel(index.preceding(excelDate))
+            elif busDayConventionType == TuringBusDayAdjustTypes.MODIFIED_PRECEDING:
+                return dateFromExcel(index.modifiedPreceding(excelDate, dt._m))
+
+        if busDayConventionType == TuringBusDayAdjustTypes.FOLLOWING:
 
             # step forward until we find a business day
             while self.isBusinessDay(dt) is False:
@@ -646,6 +818,14 @@ class TuringCalendar(object):
         if isinstance(numDays, int) is False:
             raise TuringError("Num days must be an integer")
 
+        index = self._indexFor(startDate)
+        if index is not None and numDays != 0:
+            try:
+                return dateFromExcel(
+                    index.addBusinessDays(int(startDate._excelDate), numDays))
+            except TuringError:
+                pass  # the result leaves the bitmap range so step day by day
+
         dt = datetime.date(startDate._y, startDate._m, startDate._d)
         d = dt.day
         m = dt.month
@@ -676,6 +856,10 @@ class TuringCalendar(object):
         ''' Determines if a date is a business day according to the specified
         calendar. If it is it returns True, otherwise False. '''
 
+        index = self._indexFor(dt)
+        if index is not None:
+            return bool(index.isBusinessDay(int(dt._excelDate)))
+
         # For all calendars so far, SAT and SUN are not business days
         # If this ever changes I will need to add a filter here.
         if self._type == TuringCalendarTypes.CHINA_IB:
@@ -698,6 +882,10 @@ class TuringCalendar(object):
         calendar. Weekends are not holidays unless the holiday falls on a
         weekend date. '''
 
+        index = self._indexFor(dt)
+        if index is not None:
+            return bool(index.isHoliday(int(dt._excelDate)))
+
         startDate = TuringDate(dt._y, 1, 1)
         dayInYear = dt._excelDate - startDate._excelDate + 1
         weekday = dt._weekday
@@ -1518,6 +1706,77 @@ class TuringCalendar(object):
         ''' No day is a holiday. '''
         return False
 
+###############################################################################
+
+    def businessDaysBetween(self,
+                            startDate: TuringDate,
+                            endDate: TuringDate):
+        ''' Number of business days after startDate up to and including
+        endDate. Negative if endDate is before startDate. '''
+
+        index = self._indexFor(startDate)
+        if index is not None and self._indexFor(endDate) is not None:
+            return int(index.businessDaysBetween(int(startDate._excelDate),
+                                                 int(endDate._excelDate)))
+
+        sign = 1
+        if endDate < startDate:
+            startDate, endDate = endDate, startDate
+            sign = -1
+
+        numDays = 0
+        dt = startDate.addDays(1)
+        while dt <= endDate:
+            if self.isBusinessDay(dt) is True:
+                numDays += 1
+            dt = dt.addDays(1)
+
+        return sign * numDays
+
+###############################################################################
+
+    def isBusinessDays(self,
+                       excelDates: np.ndarray):
+        ''' Vectorised isBusinessDay over an array of excel dates. '''
+
+        excelDates = np.asarray(excelDates)
+        if self._index is not None and self._index.contains(excelDates):
+            return self._index.isBusinessDay(excelDates)
+
+        return np.array([self.isBusinessDay(dateFromExcel(d))
+                         for d in excelDates.ravel()],
+                        dtype=bool).reshape(excelDates.shape)
+
+###############################################################################
+
+    def adjustExcelDates(self,
+                         excelDates: np.ndarray,
+                         busDayConventionType: TuringBusDayAdjustTypes):
+        ''' Vectorised adjust over an array of excel dates. Returns the
+        adjusted excel dates. '''
+
+        excelDates = np.asarray(excelDates, dtype=np.int64)
+        index = self._index
+        if index is None or not index.contains(excelDates):
+            return np.array([self.adjust(dateFromExcel(d),
+                                         busDayConventionType)._excelDate
+                             for d in excelDates.ravel()],
+                            dtype=np.int64).reshape(excelDates.shape)
+
+        if busDayConventionType == TuringBusDayAdjustTypes.NONE:
+            return excelDates.copy()
+        elif busDayConventionType == TuringBusDayAdjustTypes.FOLLOWING:
+            return index.following(excelDates)
+        elif busDayConventionType == TuringBusDayAdjustTypes.MODIFIED_FOLLOWING:
+            return index.modifiedFollowing(excelDates, index.months(excelDates))
+        elif busDayConventionType == TuringBusDayAdjustTypes.PRECEDING:
+            return index.preceding(excelDates)
+        elif busDayConventionType == TuringBusDayAdjustTypes.MODIFIED_PRECEDING:
+            return index.modifiedPreceding(excelDates, index.months(excelDates))
+        else:
+            raise TuringError("Unknown adjustment convention" +
+                              str(busDayConventionType))
+
 ###############################################################################
 
     def getHolidayList(self,
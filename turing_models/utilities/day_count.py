@@ -1,10 +1,15 @@
-from turing_models.utilities.turing_date import TuringDate, datediff, isLeapYear
+from turing_models.utilities.turing_date import TuringDate, datediff, isLeapYear, \
+    daysFromCivil, excelFromOrdinal
+from turing_models.utilities.turing_date_array import TuringDateArray, dateFields, \
+    daysInMonthArray, isLeapYearArray
 from turing_models.utilities.error import TuringError
 from turing_models.utilities.frequency import FrequencyType, TuringFrequency
 from turing_models.utilities.global_variables import gDaysInYear
 
 from enum import Enum
 
+import numpy as np
+
 # A useful source for these definitions can be found at
 # https://developers.opengamma.com/quantitative-research/Interest-Rate-Instruments-and-Market-Conventions.pdf
 # and https://en.wikipedia.org/wiki/Day_count_convention
@@ -281,6 +286,124 @@ class TuringDayCount(object):
             raise TuringError(str(self._type) +
                            " is not one of TuringDayCountTypes")
 
+###############################################################################
+
+    def yearFracs(self,
+                  dt1: (TuringDate, TuringDateArray),
+                  dt2: (TuringDate, TuringDateArray),
+                  dt3: (TuringDate, TuringDateArray) = None,
+                  freqType: FrequencyType = FrequencyType.ANNUAL,
+                  isTerminationDate: bool = False):
+        ''' Vectorised version of yearFrac. Each of the dates can be a
+        TuringDate or a TuringDateArray and they are broadcast against each
+        other. Returns a numpy array with the year fractions only. '''
+
+        y1, m1, d1, e1 = dateFields(dt1)
+        y2, m2, d2, e2 = dateFields(dt2)
+
+        y1 = np.asarray(y1)
+        y2 = np.asarray(y2)
+        m1 = np.asarray(m1)
+        m2 = np.asarray(m2)
+        d1 = np.asarray(d1)
+        d2 = np.asarray(d2)
+
+        if self._type == DayCountType.THIRTY_360_BOND:
+
+            d1 = np.where(d1 == 31, 30, d1)
+            d2 = np.where((d2 == 31) & (d1 == 30), 30, d2)
+            num = 360 * (y2 - y1) + 30 * (m2 - m1) + (d2 - d1)
+            accFactor = num / 360
+
+        elif self._type == DayCountType.THIRTY_E_360:
+
+            d1 = np.where(d1 == 31, 30, d1)
+            d2 = np.where(d2 == 31, 30, d2)
+            num = 360 * (y2 - y1) + 30 * (m2 - m1) + (d2 - d1)
+            accFactor = num / 360
+
+        elif self._type == DayCountType.THIRTY_E_360_ISDA:
+
+            lastDayOfFeb1 = (m1 == 2) & (d1 == daysInMonthArray(y1, 2))
+            d1 = np.where((d1 == 31) | lastDayOfFeb1, 30, d1)
+            lastDayOfFeb2 = (m2 == 2) & (d2 == daysInMonthArray(y2, 2))
+            if isTerminationDate is True:
+                lastDayOfFeb2 = False
+            d2 = np.where((d2 == 31) | lastDayOfFeb2, 30, d2)
+            num = 360 * (y2 - y1) + 30 * (m2 - m1) + (d2 - d1)
+            accFactor = num / 360
+
+        elif self._type == DayCountType.THIRTY_E_PLUS_360:
+
+            d1 = np.where(d1 == 31, 30, d1)
+            m2 = np.where(d2 == 31, m2 + 1, m2)
+            d2 = np.where(d2 == 31, 1, d2)
+            num = 360 * (y2 - y1) + 30 * (m2 - m1) + (d2 - d1)
+            accFactor = num / 360
+
+        elif self._type == DayCountType.ACT_ACT_ISDA:
+
+            denom1 = np.where(isLeapYearArray(y1), 366, 365)
+            denom2 = np.where(isLeapYearArray(y2), 366, 365)
+            daysYear1 = np.trunc(excelFromOrdinal(daysFromCivil(y1 + 1, 1, 1)) - e1)
+            daysYear2 = np.trunc(e2 - excelFromOrdinal(daysFromCivil(y2, 1, 1)))
+            accFactor = np.where(y1 == y2,
+                                 (e2 - e1) / denom1,
+                                 daysYear1 / denom1 + daysYear2 / denom2
+                                 + (y2 - y1 - 1.0))
+
+        elif self._type == DayCountType.ACT_ACT_ICMA:
+
+            freq = TuringFrequency(freqType)
+
+            if dt3 is None or freq is None:
+                raise TuringError("ACT_ACT_ICMA requires three dates and a freq")
+
+            e3 = dateFields(dt3)[3]
+            accFactor = (e2 - e1) / (freq * (e3 - e1))
+
+        elif self._type == DayCountType.ACT_365F:
+
+            accFactor = (e2 - e1) / 365
+
+        elif self._type == DayCountType.ACT_360:
+
+            accFactor = (e2 - e1) / 360
+
+        elif self._type == DayCountType.ACT_365L:
+
+            freq = TuringFrequency(freqType)
+
+            if dt3 is None:
+                y3, e3 = y2, e2
+            else:
+                y3, _, _, e3 = dateFields(dt3)
+                y3 = np.asarray(y3)
+
+            leap1 = isLeapYearArray(y1)
+            leap3 = isLeapYearArray(y3)
+            feb29 = np.where(leap1, excelFromOrdinal(daysFromCivil(y1, 2, 29)),
+                             np.where(leap3,
+                                      excelFromOrdinal(daysFromCivil(y3, 2, 29)),
+                                      1))
+            if freq == 1:
+                den = np.where((feb29 > e1) & (feb29 <= e3), 366, 365)
+            else:
+                den = np.where(leap3, 366, 365)
+
+            accFactor = (e2 - e1) / den
+
+        elif self._type == DayCountType.SIMPLE:
+
+            accFactor = (e2 - e1) / gDaysInYear
+
+        else:
+
+            raise TuringError(str(self._type) +
+                              " is not one of TuringDayCountTypes")
+
+        return np.asarray(accFactor, dtype=np.float64)
+
 ###############################################################################
 
     def __repr__(self):
@@ -0,0 +1,77 @@
+from turing_models.utilities.error import TuringError
+
+
+def _same(a, b):
+    """ 比较两个节点键或节点值是否相同，无法直接比较的对象（DataFrame、数组等）退化为比较引用 """
+    if a is b:
+        return True
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+
+class _Node:
+    __slots__ = ('compute', 'key', 'has_value', 'value', 'node_key', 'deps', 'version')
+
+    def __init__(self, compute, key):
+        self.compute = compute
+        self.key = key
+        self.has_value = False
+        self.value = None
+        self.node_key = None
+        self.deps = ()
+        self.version = 0
+
+
+class DependencyGraph:
+    """ 惰性求值的依赖图
+
+    每个节点由compute函数和可选的key函数组成：
+    1、key函数返回节点自身的外部输入（如ctx中的what-if值、估值日期），键变化时节点需要重算；
+    2、compute函数中通过value()读取的其它节点会被自动记录为依赖，依赖的版本变化时节点需要重算。
+    节点重算后若结果与旧值相同，则版本号不变，下游节点不会被连带重算。 """
+
+    def __init__(self):
+        self._nodes = {}
+        self._stack = []
+
+    def add(self, name: str, compute, key=None):
+        """ 注册节点，同名节点会被覆盖 """
+        self._nodes[name] = _Node(compute, key)
+
+    def value(self, name: str):
+        """ 读取节点的值，必要时重算；在其它节点的compute中调用时记录依赖关系 """
+        node = self._refresh(name)
+        if self._stack:
+            self._stack[-1].append((name, node.version))
+        return node.value
+
+    def invalidate(self, name: str = None):
+        """ 清除指定节点的缓存值（不传则清除全部），下游节点在下次读取时会随之重算 """
+        nodes = self._nodes.values() if name is None else [self._nodes[name]]
+        for node in nodes:
+            node.has_value = False
+            node.value = None
+            node.version += 1
+
+    def _refresh(self, name):
+        node = self._nodes.get(name)
+        if node is None:
+            raise TuringError(f"Unknown node: {name}")
+        key = node.key() if node.key is not None else None
+        if node.has_value and _same(key, node.node_key) and \
+           all(self._refresh(dep).version == version for dep, version in node.deps):
+            return node
+        self._stack.append([])
+        try:
+            value = node.compute()
+        finally:
+            deps = self._stack.pop()
+        if not (node.has_value and _same(value, node.value)):
+            node.version += 1
+        node.value = value
+        node.node_key = key
+        node.deps = tuple(deps)
+        node.has_value = True
+        return node
@@ -12,6 +12,7 @@ from turing_models.utilities.day_count import DayCountType, TuringDayCount
 from turing_models.utilities.error import TuringError
 from turing_models.utilities.global_variables import gDaysInYear, gSmall
 from turing_models.utilities.turing_date import TuringDate
+from turing_models.utilities.turing_date_array import TuringDateArray
 from turing_models.models.model_black_scholes_analytical import bs_value, bs_delta
 
 
@@ -117,6 +118,12 @@ def timesFromDates(dt: TuringDate,
 
         return np.array(times)
 
+    elif isinstance(dt, TuringDateArray):
+        if dcCounter is None:
+            return (dt - valuationDate) / gDaysInYear
+        else:
+            return dcCounter.yearFracs(valuationDate, dt)
+
     elif isinstance(dt, np.ndarray):
         raise TuringError("You passed an ndarray instead of dates.")
     else:
@@ -670,11 +677,14 @@ def calculate_greek(obj, price, attr, bump=1e-4, order=1, cus_inc=None):
     price: 用于做差分计算的方法
     attr: 需要修改的属性名，str格式
     如果要传cus_inc，格式须为(函数名, 函数参数值)
+    obj带有_revaluation_memo时（InstrumentBase批量计算风险指标），相同属性、相同bump的重估结果
+    从中取用，基准价格和上下bump在各风险指标间只计算一次
     """
     cus_func = args = None
     attr_value = getattr(obj, attr)  # 先保留属性的原始值
     if cus_inc:
         cus_func, args = cus_inc
+    memo = getattr(obj, '_revaluation_memo', None)
 
     def increment(_attr_value, count=1):
         if cus_func:
@@ -693,25 +703,34 @@ def calculate_greek(obj, price, attr, bump=1e-4, order=1, cus_inc=None):
     def recover():
         setattr(obj, attr, attr_value)
 
+    def value(count=0):
+        """ 属性bump了count个步长时的价格 """
+        if memo is None:
+            return price()
+        key = (price.__name__, attr, count * (args if cus_func else bump)) if count else (price.__name__,)
+        if key not in memo:
+            memo[key] = price()
+        return memo[key]
+
     if order == 1:
         if isinstance(attr_value, TuringDate):
-            p0 = price()
+            p0 = value()
             increment(attr_value)
-            p_up = price()
+            p_up = value(1)
             recover()
             return (p_up - p0) / bump
         increment(attr_value)
-        p_up = price()
+        p_up = value(1)
         decrement(attr_value)
-        p_down = price()
+        p_down = value(-1)
         recover()
         return (p_up - p_down) / (bump * 2)
     elif order == 2:
-        p0 = price()
+        p0 = value()
         decrement(attr_value)
-        p_down = price()
+        p_down = value(-1)
         increment(attr_value)
-        p_up = price()
+        p_up = value(1)
         recover()
         return (p_up - 2.0 * p0 + p_down) / bump / bump
 
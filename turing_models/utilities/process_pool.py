@@ -0,0 +1,28 @@
+import multiprocessing
+
+import numba
+
+
+def pool_context(preload: list = None):
+    """ 进程池的启动方式，作为ProcessPoolExecutor的mp_context
+
+    本进程调用过parallel=True的numba函数、启动了TBB或OpenMP线程层后，fork出子进程会使本进程
+    在退出时挂起。此时改用forkserver（平台不支持时用spawn）启动子进程，子进程重新导入模块，
+    持仓和行情快照经pickle传入，preload为forkserver预先导入的模块名；
+    尚未启动线程层、使用workqueue线程层或已设置了非fork的启动方式时返回None，沿用默认方式 """
+    method = multiprocessing.get_start_method(allow_none=True)
+    if method is not None and method != 'fork':
+        return None
+    try:
+        layer = numba.threading_layer()
+    except ValueError:
+        # 尚未调用过并行的numba函数
+        return None
+    if layer == 'workqueue':
+        return None
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        if preload:
+            context.set_forkserver_preload(preload)
+        return context
+    return multiprocessing.get_context('spawn')
@@ -1,5 +1,8 @@
+import numpy as np
+
 from turing_models.utilities.error import TuringError
 from turing_models.utilities.turing_date import TuringDate
+from turing_models.utilities.turing_date_array import TuringDateArray
 from turing_models.utilities.calendar import TuringCalendar, TuringCalendarTypes, \
      TuringBusDayAdjustTypes, TuringDateGenRuleTypes
 from turing_models.utilities.frequency import TuringFrequency, FrequencyType
@@ -117,98 +120,95 @@ class TuringSchedule(object):
 
 ###############################################################################
 
-    def _generate(self):
-        ''' Generate schedule of dates according to specified date generation
-        rules and also adjust these dates for holidays according to the
-        specified business day convention and the specified calendar. '''
+    def scheduleDateArray(self):
+        ''' Returns the schedule as a TuringDateArray. '''
 
-        calendar = TuringCalendar(self._calendarType)
-        frequency = TuringFrequency(self._freqType)
-        if frequency > 52:
-            numDays = int(365 / frequency)
-        elif frequency > 12:
-            numWeeks = int(52 / frequency)
-        else:
-            numMonths = int(12 / frequency)
+        return TuringDateArray(self.scheduleDates())
 
-        unadjustedScheduleDates = []
-        self._adjustedDates = []
-
-        if self._dateGenRuleType == TuringDateGenRuleTypes.BACKWARD:
-
-            nextDate = self._terminationDate
-            flowNum = 0
+###############################################################################
 
-            ordinal = 1
-            while nextDate > self._effectiveDate:
+    def _rollDates(self,
+                   anchorDate: TuringDate,
+                   sign: int,
+                   numDates: int):
+        ''' Unadjusted dates anchorDate + sign * i periods for i = 0, ...,
+        numDates - 1, each computed directly from the anchor date. '''
 
-                unadjustedScheduleDates.append(nextDate)
+        return _rollDates(anchorDate, self._freqType, sign, numDates)
 
-                if frequency > 52:
-                    nextDate = self._terminationDate.addDays(-numDays * ordinal)
-                elif frequency > 12:
-                    nextDate = self._terminationDate.addWeeks(-numWeeks * ordinal)
-                else:
-                    nextDate = self._terminationDate.addMonths(-numMonths * ordinal)
+###############################################################################
 
-                ordinal += 1
+    def _numRollDates(self):
+        ''' Upper bound on the number of periods needed to roll from one end
+        of the schedule past the other. '''
 
-                if self._endOfMonthFlag is True:
-                    nextDate = nextDate.EOM()
+        return _numRollDates(self._effectiveDate, self._terminationDate,
+                             self._freqType)
 
-                flowNum += 1
+###############################################################################
 
-            # Add on the Previous Coupon Date
-            unadjustedScheduleDates.append(nextDate)
-            flowNum += 1
+    def _generate(self):
+        ''' Generate schedule of dates according to specified date generation
+        rules and also adjust these dates for holidays according to the
+        specified business day convention and the specified calendar. The
+        unadjusted dates are generated and holiday adjusted as date arrays. '''
 
-            # reverse order and holiday adjust dates
-            # the first date is not adjusted as this was provided
-            dt = unadjustedScheduleDates[flowNum - 1]
-            self._adjustedDates.append(dt)
+        calendar = TuringCalendar(self._calendarType)
+        numDates = self._numRollDates()
 
-            # We adjust all flows after the effective date and before the
-            # termination date to fall on business days according to their cal
-            for i in range(1, flowNum-1):
+        if self._dateGenRuleType == TuringDateGenRuleTypes.BACKWARD:
 
-                dt = calendar.adjust(unadjustedScheduleDates[flowNum - i - 1],
-                                     self._busDayAdjustType)
+            unadjustedDates = self._rollDates(self._terminationDate, -1, numDates)
 
-                if dt not in self._adjustedDates:
-                    self._adjustedDates.append(dt)
+            if self._endOfMonthFlag is True:
+                eomOrdinals = unadjustedDates.EOM().ordinals().copy()
+                eomOrdinals[0] = unadjustedDates.ordinals()[0]
+                unadjustedDates = TuringDateArray.fromOrdinals(eomOrdinals)
 
-            self._adjustedDates.append(self._terminationDate)
+            # the first date on or before the effective date is the Previous
+            # Coupon Date and is not adjusted
+            beforeStart = unadjustedDates.excelDates() <= self._effectiveDate._excelDate
+            beforeStart[0] = False
+            if not beforeStart.any():
+                raise TuringError("Schedule does not reach the effective date")
+            flowNum = int(np.argmax(beforeStart)) + 1
 
+            firstDate = unadjustedDates[flowNum - 1]
+            # We adjust all flows after the effective date and before the
+            # termination date to fall on business days according to their cal
+            flowDates = unadjustedDates[flowNum - 2:0:-1]
+            lastDate = self._terminationDate
 
         elif self._dateGenRuleType == TuringDateGenRuleTypes.FORWARD:
 
-            # This needs checking
-            nextDate = self._effectiveDate
+            unadjustedDates = self._rollDates(self._effectiveDate, +1, numDates)
 
-            ordinal = 1
-            while nextDate < self._terminationDate:
-                unadjustedScheduleDates.append(nextDate)
-                if frequency > 52:
-                    nextDate = self._effectiveDate.addDays(numDays * ordinal)
-                elif frequency > 12:
-                    nextDate = self._effectiveDate.addWeeks(numWeeks * ordinal)
-                else:
-                    nextDate = self._effectiveDate.addMonths(numMonths * ordinal)
-                ordinal += 1
-
-            unadjustedScheduleDates.append(nextDate)
-            self._adjustedDates.append(unadjustedScheduleDates[0])
+            afterEnd = unadjustedDates.excelDates() >= self._terminationDate._excelDate
+            afterEnd[0] = False
+            if not afterEnd.any():
+                raise TuringError("Schedule does not reach the termination date")
+            flowNum = int(np.argmax(afterEnd)) + 1
 
             # The effective date is not adjusted as it is given
-            for i in range(1, ordinal):
+            firstDate = self._effectiveDate
+            flowDates = unadjustedDates[1:flowNum]
+            lastDate = None
+
+        adjustedExcelDates = calendar.adjustExcelDates(flowDates.excelDates(),
+                                                       self._busDayAdjustType)
 
-                dt = calendar.adjust(unadjustedScheduleDates[i],
-                                     self._busDayAdjustType)
+        # drop repeated dates keeping the first occurrence of each
+        adjustedExcelDates = np.concatenate(([firstDate._excelDate],
+                                             adjustedExcelDates))
+        _, firstIndex = np.unique(adjustedExcelDates, return_index=True)
+        firstIndex = np.sort(firstIndex)[1:]
 
-                if dt not in self._adjustedDates:
-                    self._adjustedDates.append(dt)
+        self._adjustedDates = [firstDate]
+        self._adjustedDates += TuringDateArray.fromExcelDates(
+            adjustedExcelDates[firstIndex]).toList()
 
-            # self._adjustedDates.append(self._terminationDate)
+        if lastDate is not None:
+            self._adjustedDates.append(lastDate)
 
         if self._adjustedDates[0] < self._effectiveDate:
             self._adjustedDates[0] = self._effectiveDate
@@ -223,8 +223,11 @@ class TuringSchedule(object):
 
             self._adjustedDates[-1] = self._terminationDate
 
-        self._adjustedDates = sorted(list(set(self._adjustedDates)))
-            # self._adjustedDates[-1] = self._terminationDate
+        # sort and remove any dates made equal by the adjustments above
+        uniqueDates = {}
+        for dt in self._adjustedDates:
+            uniqueDates.setdefault(dt._excelDate, dt)
+        self._adjustedDates = [uniqueDates[k] for k in sorted(uniqueDates)]
         #######################################################################
         # Check the resulting schedule to ensure that no two dates are the
         # same and that they are monotonic - this should never happen but ...
@@ -274,3 +277,122 @@ class TuringSchedule(object):
         print(self)
 
 ###############################################################################
+
+
+def _rollDates(anchorDate: TuringDate,
+               freqType: FrequencyType,
+               sign: int,
+               numDates: int):
+    ''' Unadjusted dates anchorDate + sign * i periods for i = 0, ...,
+    numDates - 1, each computed directly from the anchor date. '''
+
+    frequency = TuringFrequency(freqType)
+    periods = sign * np.arange(numDates, dtype=np.int64)
+    dates = TuringDateArray.fromDate(anchorDate, numDates)
+
+    if frequency > 52:
+        numDays = int(365 / frequency)
+        return dates.addDays(numDays * periods)
+    elif frequency > 12:
+        numWeeks = int(52 / frequency)
+        return dates.addWeeks(numWeeks * periods)
+    else:
+        numMonths = int(12 / frequency)
+        return dates.addMonths(numMonths * periods)
+
+###############################################################################
+
+
+def _numRollDates(effectiveDate: TuringDate,
+                  terminationDate: TuringDate,
+                  freqType: FrequencyType):
+    ''' Upper bound on the number of periods needed to roll from one end
+    of a schedule past the other. '''
+
+    frequency = TuringFrequency(freqType)
+    if frequency > 52:
+        minDays = int(365 / frequency)
+    elif frequency > 12:
+        minDays = 7 * int(52 / frequency)
+    else:
+        minDays = 28 * int(12 / frequency)
+
+    # moving dates to the end of the month can add up to a month
+    numDays = terminationDate - effectiveDate + 31
+    return int(numDays / minDays) + 2
+
+###############################################################################
+
+
+def scheduleDateArrays(effectiveDate: TuringDate,
+                       terminationDates: list,
+                       freqType: FrequencyType,
+                       calendarType: TuringCalendarTypes,
+                       busDayAdjustType: TuringBusDayAdjustTypes,
+                       dateGenRuleType: TuringDateGenRuleTypes):
+    ''' Adjusted dates of several schedules which share an effective date and
+    differ only in their termination dates, returned as one TuringDateArray
+    per termination date. The dates are those of the TuringSchedule with the
+    default termination date adjustment and no EOM flag. With the FORWARD
+    rule the unadjusted dates are rolled from the effective date so they are
+    common to all of the schedules and are rolled and holiday adjusted once
+    out to the last termination date. '''
+
+    if dateGenRuleType != TuringDateGenRuleTypes.FORWARD:
+        return [TuringSchedule(effectiveDate,
+                               terminationDate,
+                               freqType,
+                               calendarType,
+                               busDayAdjustType,
+                               dateGenRuleType).scheduleDateArray()
+                for terminationDate in terminationDates]
+
+    terminationExcel = np.array([dt._excelDate for dt in terminationDates])
+
+    if np.any(terminationExcel <= effectiveDate._excelDate):
+        raise TuringError("Effective date must be before termination date.")
+
+    lastDate = terminationDates[int(np.argmax(terminationExcel))]
+    numDates = _numRollDates(effectiveDate, lastDate, freqType)
+    unadjustedExcel = _rollDates(effectiveDate, freqType, +1,
+                                 numDates).excelDates()
+
+    calendar = TuringCalendar(calendarType)
+    adjustedExcel = calendar.adjustExcelDates(unadjustedExcel,
+                                              busDayAdjustType)
+    adjustedTermination = calendar.adjustExcelDates(terminationExcel,
+                                                    busDayAdjustType)
+
+    # index of the first rolled date on or after each termination date
+    lastIndices = np.searchsorted(unadjustedExcel[1:], terminationExcel) + 1
+
+    # usually the adjustment keeps the dates distinct and in order so there
+    # is nothing to remove
+    increasing = adjustedExcel[1] > effectiveDate._excelDate and \
+        np.all(np.diff(adjustedExcel[1:]) > 0)
+
+    dateArrays = []
+    for i in range(len(terminationDates)):
+
+        excelDates = np.concatenate(([effectiveDate._excelDate],
+                                     adjustedExcel[1:lastIndices[i] + 1]))
+
+        # drop repeated dates keeping the first occurrence of each and put the
+        # adjusted termination date in place of the last rolled date
+        if not increasing:
+            _, firstIndex = np.unique(excelDates, return_index=True)
+            excelDates = excelDates[np.sort(firstIndex)]
+
+        excelDates[-1] = adjustedTermination[i]
+
+        if not increasing or excelDates[-1] <= excelDates[-2]:
+            excelDates = np.unique(excelDates)
+
+        if len(excelDates) < 2:
+            raise TuringError("Schedule has two dates only.")
+
+        dateArrays.append(TuringDateArray.fromExcelDates(excelDates))
+
+    return dateArrays
+
+###############################################################################
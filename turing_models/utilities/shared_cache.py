@@ -0,0 +1,74 @@
+import threading
+from collections import OrderedDict
+
+
+class SharedCache:
+    """ 进程级共享缓存的基类
+
+    缓存项数超过max_size时淘汰最久未使用的一项；同一个键的并发请求由该键自己的锁串行化，
+    只构建一次，不同键的构建互不阻塞。enabled为False时不读写缓存。
+    子类负责生成键，并可重写_cacheable决定哪些结果写入缓存。 """
+
+    def __init__(self, max_size: int):
+        self.enabled = True
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _cacheable(value) -> bool:
+        """ 返回None的结果不缓存 """
+        return value is not None
+
+    def _store(self, key, value):
+        """ 写入一项并按最近使用淘汰超出max_size的项，调用方持有self._lock """
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def _lookup(self, key):
+        """ 命中时返回(True, 值)并标记为最近使用，调用方持有self._lock """
+        if key in self._data:
+            self.hits += 1
+            self._data.move_to_end(key)
+            return True, self._data[key]
+        return False, None
+
+    def _get_or_build(self, key, builder):
+        """ 命中缓存则直接返回，否则调用builder()并写入缓存 """
+        with self._lock:
+            hit, value = self._lookup(key)
+            if hit:
+                return value
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                hit, value = self._lookup(key)
+                if hit:
+                    return value
+            try:
+                value = builder()
+            except BaseException:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+                raise
+            with self._lock:
+                self.misses += 1
+                if self._cacheable(value):
+                    self._store(key, value)
+                self._key_locks.pop(key, None)
+        return value
+
+    def clear(self):
+        """ 清空缓存及命中统计 """
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
@@ -567,6 +567,81 @@ def bisection(func, x1, x2, args, xtol=1e-6, maxIter=100):
     return None
 
 ###############################################################################
+
+
+vector_results = namedtuple('vector_results',
+                            'root residual iterations converged bracketed')
+
+
+def newton_vector(func, x0, lower, upper, args=(), tol=1.48e-8, maxiter=50):
+    ''' Safeguarded Newton-Raphson applied elementwise to a vector of
+    independent root finding problems. The function func(x, *args) takes an
+    array x and returns the tuple (f(x), f'(x)) of arrays of the same shape.
+
+    Each element keeps the bracket [lower, upper]. If f changes sign on the
+    bracket it is narrowed at every iteration and any Newton step which leaves
+    the bracket, or has a zero or non-finite derivative, is replaced by a
+    bisection step. Elements without a sign change on the bracket take plain
+    Newton steps. An element has converged when its step is below tol or f is
+    exactly zero and it is then no longer moved. The arrays x0, lower and upper
+    are broadcast together and give the shape of the problem.
+
+    Returns a vector_results namedtuple of arrays holding for each element the
+    root, the residual f(root), the number of iterations, whether it converged
+    and whether the root was bracketed. '''
+
+    if tol <= 0.0:
+        raise TuringError("Tolerance should be positive.")
+
+    if maxiter < 1:
+        raise TuringError("maxiter must be greater than 0")
+
+    shape = np.broadcast(np.asarray(x0), np.asarray(lower),
+                         np.asarray(upper)).shape
+    x = np.array(np.broadcast_to(x0, shape), dtype=np.float64)
+    a = np.array(np.broadcast_to(lower, shape), dtype=np.float64)
+    b = np.array(np.broadcast_to(upper, shape), dtype=np.float64)
+
+    fa, _ = func(a, *args)
+    fb, _ = func(b, *args)
+    bracketed = np.sign(fa) * np.sign(fb) <= 0.0
+
+    f, fprime = func(x, *args)
+    iterations = np.zeros(shape, dtype=np.int64)
+    converged = f == 0.0
+
+    for _ in range(0, maxiter):
+
+        active = ~converged
+        if not np.any(active):
+            break
+
+        # narrow the brackets keeping the sign change inside
+        left = bracketed & (np.sign(f) == np.sign(fa))
+        right = bracketed & ~left
+        a = np.where(left, x, a)
+        fa = np.where(left, f, fa)
+        b = np.where(right, x, b)
+        fb = np.where(right, f, fb)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            xNew = x - f / fprime
+
+        # comparisons with nan are False so non-finite steps also bisect
+        inside = (xNew > np.minimum(a, b)) & (xNew < np.maximum(a, b))
+        xNew = np.where(bracketed & ~inside, 0.5 * (a + b), xNew)
+        xNew = np.where(active, xNew, x)
+
+        step = np.abs(xNew - x)
+        x = xNew
+        f, fprime = func(x, *args)
+
+        iterations += active
+        converged = converged | (active & ((step <= tol) | (f == 0.0)))
+
+    return vector_results(x, f, iterations, converged, bracketed)
+
+###############################################################################
 # https://github.com/linesd/minimize/blob/master/optimizer/minimize.py
 
 # The function uses conjugate gradients and approximate linesearches based
@@ -94,87 +94,66 @@ def parse_date(dateStr, dateFormat):
     return dt_obj.year, dt_obj.month, dt_obj.day
 
 ###############################################################################
-# CREATE DATE COUNTER
+# DAY ORDINALS
+# Dates are stored as an integer day ordinal (days since 1 Jan 1970) computed
+# with the proleptic Gregorian calendar, so construction touches no global
+# state, the year range is unbounded and adding days is O(1). The functions
+# below only use integer arithmetic so they also work elementwise on numpy
+# integer arrays.
 ###############################################################################
 
 
-gDateCounterList = None
-gStartYear = 1900
-gEndYear = 2100
+def daysFromCivil(y, m, d):
+    ''' Number of days from 1 Jan 1970 to the date y-m-d. '''
+    y = y - (m <= 2)
+    era = y // 400
+    yoe = y - era * 400
+    mp = (m + 9) % 12
+    doy = (153 * mp + 2) // 5 + d - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
 
-def calculateList():
-    ''' Calculate list of dates so that we can do quick lookup to get the
-    number of dates since 1 Jan 1900 (inclusive) BUT TAKING INTO ACCOUNT THE
-    FACT THAT EXCEL MISTAKENLY CALLS 1900 A LEAP YEAR. For us, agreement with
-    Excel is more important than this leap year error and in any case, we will
-    not usually be calculating day differences with start dates before 28 Feb
-    1900. Note that Excel inherited this "BUG" from LOTUS 1-2-3. '''
-
-    dayCounter = 0
-    maxDays = 0
-
-    global gDateCounterList
-    global gStartYear
-    global gEndYear
-
-#    print("Calculating list between", gStartYear, "and", gEndYear)
-
-    gDateCounterList = []
-
-    idx = -1  # the first element will be idx=0
+###############################################################################
 
-    for yy in range(1900, gEndYear+1):
 
-        # DO NOT CHANGE THIS FOR AGREEMENT WITH EXCEL WHICH ASSUMES THAT 1900
-        # WAS A LEAP YEAR AND THAT 29 FEB 1900 ACTUALLY HAPPENED. A LOTUS BUG.
-        if yy == 1900:
-            leapYear = True
-        else:
-            leapYear = isLeapYear(yy)
+def civilFromDays(ordinal):
+    ''' Inverse of daysFromCivil. Returns the tuple (y, m, d). '''
+    z = ordinal + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    d = doy - (153 * mp + 2) // 5 + 1
+    m = mp + 3 - 12 * (mp >= 10)
+    y = yoe + era * 400 + (m <= 2)
+    return (y, m, d)
 
-        for mm in range(1, 13):
+###############################################################################
+# Excel counts days from 1 Jan 1900 (inclusive) BUT MISTAKENLY CALLS 1900 A
+# LEAP YEAR. For us, agreement with Excel is more important than this leap
+# year error so excel dates from 1 Mar 1900 onwards are one day further from
+# the ordinal than earlier ones. Note that Excel inherited this "BUG" from
+# LOTUS 1-2-3.
+###############################################################################
 
-            if leapYear is True:
-                maxDays = monthDaysLeapYear[mm-1]
-            else:
-                maxDays = monthDaysNotLeapYear[mm-1]
+gExcelOrdinalOffset = 25569  # excel date of 1 Jan 1970
+gExcelBugOrdinal = daysFromCivil(1900, 3, 1)
+gExcelBugDate = gExcelBugOrdinal + gExcelOrdinalOffset
 
-            for _ in range(1, maxDays+1):
-                idx += 1
-                dayCounter += 1
-                if yy >= gStartYear:
-                    gDateCounterList.append(dayCounter)
 
-            for _ in range(maxDays, 31):
-                idx += 1
-                if yy >= gStartYear:
-                    gDateCounterList.append(-999)
+def excelFromOrdinal(ordinal):
+    ''' Excel date of a day ordinal. '''
+    return ordinal + gExcelOrdinalOffset - 1 + (ordinal >= gExcelBugOrdinal)
 
 ###############################################################################
-# The index in these functions is not the excel date index used as the
-# internal representation of the date but the index of that date in the
-# padded date object used to store the dates in a way that allows for a
-# quick lookup. Do not confuse them as you will find they are out by months
-###############################################################################
 
-@njit(fastmath=True, cache=True)
-def dateIndex(y, m, d):
-    # the first element(1900.1.1) will be idx=0
-    idx = (y-gStartYear) * 12 * 31 + (m-1) * 31 + (d-1)
-    return idx
-
-###############################################################################
 
-@njit(fastmath=True, cache=True)
-def dateFromIndex(idx):
-    ''' Reverse mapping from index to date. Take care with numba as it can do
-    weird rounding on the integer. Seems OK now. '''
-    y = int(gStartYear + idx/12/31)
-    m = 1 + int((idx - (y-gStartYear) * 12 * 31) / 31)
-    d = 1 + idx - (y-gStartYear) * 12 * 31 - (m-1) * 31
-    return (y, m, d)
+def ordinalFromExcel(excelDate):
+    ''' Day ordinal of an (integer) excel date. The fictitious 29 Feb 1900
+    maps to 1 Mar 1900. '''
+    return excelDate - gExcelOrdinalOffset + 1 - (excelDate >= gExcelBugDate)
 
-###############################################################################
 
 @njit(fastmath=True, cache=True)
 def weekDay(dayCount):
@@ -208,32 +187,15 @@ class TuringDate():
         start_date = TuringDate(2018, 1, 1)
         '''
 
-        global gStartYear
-        global gEndYear
-
         # If the date has been entered as y, m, d we flip it to d, m, y
-        if d >= gStartYear and d < gEndYear and y > 0 and y <= 31:
+        if d >= 1900 and d < 2100 and y > 0 and y <= 31:
             raise TuringError("Dates must be in the format TuringDate(yyyy, mm, dd)")
 
-        if gDateCounterList is None:
-            calculateList()
-
         if y < 1900:
             raise TuringError("Year cannot be before 1900")
 
-        # Resize date list dynamically if required
-        if y < gStartYear:
-            gStartYear = y
-            calculateList()
-
-        if y > gEndYear:
-            gEndYear = y
-            calculateList()
-
-        if y < gStartYear or y > gEndYear:
-            raise TuringError(
-                "Date: year " + str(y) + " should be " + str(gStartYear) +
-                " to " + str(gEndYear))
+        if m < 1 or m > 12:
+            raise TuringError("Date: Month not valid.")
 
         if d < 1:
             raise TuringError("Date: Day not valid.")
@@ -266,8 +228,6 @@ class TuringDate():
         self._mm = mm
         self._ss = ss
 
-        self._excelDate = 0 # This is a float as it includes intraday time
-
         # update the excel date used for doing lots of financial calculations
         self._refresh()
 
@@ -290,15 +250,28 @@ class TuringDate():
 
     ###########################################################################
 
+    @classmethod
+    def fromOrdinal(cls, ordinal: int):
+        ''' Create a TuringDate from a day ordinal (days since 1 Jan 1970)
+        without validating the fields again. '''
+
+        dt = cls.__new__(cls)
+        dt._y, dt._m, dt._d = civilFromDays(int(ordinal))
+        dt._hh = 0
+        dt._mm = 0
+        dt._ss = 0
+        dt._refresh()
+        return dt
+
+    ###########################################################################
+
     def _refresh(self):
         ''' Update internal representation of date as number of days since the
         1st Jan 1900. This is same as Excel convention. '''
 
-        idx = dateIndex(self._y, self._m, self._d)
-        daysSinceFirstJan1900 = gDateCounterList[idx]
-        wd = weekDay(daysSinceFirstJan1900)
-        self._excelDate = daysSinceFirstJan1900
-        self._weekday = wd
+        self._ordinal = daysFromCivil(self._y, self._m, self._d)
+        self._excelDate = float(excelFromOrdinal(self._ordinal))
+        self._weekday = (self._ordinal + 3) % 7  # 1 Jan 1970 was a Thursday
 
     ###########################################################################
 
@@ -404,20 +377,7 @@ class TuringDate():
         ''' Returns a new date that is numDays after the TuringDate. I also make
         it possible to go backwards a number of days. '''
 
-        idx = dateIndex(self._y, self._m, self._d)
-
-        step = +1
-        if numDays < 0:
-            step = -1
-
-        while numDays != 0:
-            idx += step
-            if gDateCounterList[idx] > 0:
-                numDays -= step
-
-        (y, m, d) = dateFromIndex(idx)
-        newDt = TuringDate(y, m, d)
-        return newDt
+        return TuringDate.fromOrdinal(self._ordinal + int(numDays))
 
     ###########################################################################
 
@@ -492,16 +452,9 @@ class TuringDate():
             mmi = int(mmi)
 
             d = self._d
-            m = self._m + mmi
-            y = self._y
-
-            while m > 12:
-                m = m - 12
-                y += 1
-
-            while m < 1:
-                m = m + 12
-                y -= 1
+            y, m = divmod(self._m - 1 + mmi, 12)
+            y += self._y
+            m += 1
 
             leapYear = isLeapYear(y)
 
@@ -719,17 +672,18 @@ class TuringDate():
             newDate = TuringDate(self._y, self._m, self._d)
 
             if periodType == DAYS:
-                for _ in range(0, numPeriods):
-                    newDate = newDate.addDays(1)
+                newDate = newDate.addDays(numPeriods)
             elif periodType == WEEKS:
-                for _ in range(0, numPeriods):
-                    newDate = newDate.addDays(7)
+                newDate = newDate.addDays(7 * numPeriods)
             elif periodType == MONTHS:
-                for _ in range(0, numPeriods):
-                    newDate = newDate.addMonths(1)
+                # step one month at a time in the direction of the tenor
+                step = 1 if numPeriods > 0 else -1
+                for _ in range(0, abs(numPeriods)):
+                    newDate = newDate.addMonths(step)
             elif periodType == YEARS:
-                for _ in range(0, numPeriods):
-                    newDate = newDate.addMonths(12)
+                step = 12 if numPeriods > 0 else -12
+                for _ in range(0, abs(numPeriods)):
+                    newDate = newDate.addMonths(step)
 
             newDates.append(newDate)
 
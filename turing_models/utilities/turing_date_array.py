@@ -0,0 +1,311 @@
+import numpy as np
+
+from turing_models.utilities.error import TuringError
+from turing_models.utilities.turing_date import TuringDate, daysFromCivil, \
+    civilFromDays, excelFromOrdinal, ordinalFromExcel, monthDaysNotLeapYear
+from turing_models.utilities.calendar import TuringCalendar, \
+    TuringCalendarTypes, TuringBusDayAdjustTypes
+
+###############################################################################
+# A numpy backed array of dates. Dates are held as integer day ordinals (see
+# turing_date.py) so that tenor arithmetic, business day adjustment, year
+# fractions and discount factor lookups can be done as array operations
+# rather than one TuringDate at a time.
+###############################################################################
+
+gMonthDays = np.array(monthDaysNotLeapYear, dtype=np.int64)
+
+
+def isLeapYearArray(y):
+    ''' Vectorised isLeapYear. '''
+    y = np.asarray(y)
+    return ((y % 4 == 0) & (y % 100 != 0)) | (y % 400 == 0)
+
+###############################################################################
+
+
+def daysInMonthArray(y, m):
+    ''' Vectorised number of days in month m (1-12) of year y. '''
+    m = np.asarray(m, dtype=np.int64)
+    return gMonthDays[m - 1] + ((m == 2) & isLeapYearArray(y))
+
+###############################################################################
+
+
+def dateFields(dates):
+    ''' Returns the (y, m, d, excelDate) fields of a TuringDate or of a
+    TuringDateArray. For a TuringDate the excel date keeps any intraday
+    fraction. '''
+
+    if isinstance(dates, TuringDate):
+        return dates._y, dates._m, dates._d, dates._excelDate
+    elif isinstance(dates, TuringDateArray):
+        y, m, d = dates.fields()
+        return y, m, d, dates.excelDates()
+    else:
+        raise TuringError("Dates must be a TuringDate or a TuringDateArray")
+
+###############################################################################
+
+
+class TuringDateArray():
+    ''' An immutable array of dates stored as int64 day ordinals. It can be
+    built from a list of TuringDates, and indexing with an integer returns a
+    TuringDate so that it can be used where a list of dates is expected. '''
+
+    def __init__(self,
+                 dates: (list, tuple)):
+        ''' Create the array from a list of TuringDates. '''
+
+        ordinals = np.empty(len(dates), dtype=np.int64)
+        for i, dt in enumerate(dates):
+            if isinstance(dt, TuringDate) is False:
+                raise TuringError("All elements must be TuringDates")
+            ordinals[i] = dt._ordinal
+
+        self._setOrdinals(ordinals)
+
+    ###########################################################################
+
+    @classmethod
+    def fromOrdinals(cls, ordinals: np.ndarray):
+        ''' Create the array from day ordinals (days since 1 Jan 1970). '''
+        dates = cls.__new__(cls)
+        dates._setOrdinals(np.array(ordinals, dtype=np.int64, ndmin=1))
+        return dates
+
+    ###########################################################################
+
+    @classmethod
+    def fromExcelDates(cls, excelDates: np.ndarray):
+        ''' Create the array from (integer) excel dates. '''
+        excelDates = np.floor(np.asarray(excelDates)).astype(np.int64)
+        return cls.fromOrdinals(ordinalFromExcel(excelDates))
+
+    ###########################################################################
+
+    @classmethod
+    def fromDate(cls, dt: TuringDate, numDates: int = 1):
+        ''' Array holding the same date numDates times. '''
+        return cls.fromOrdinals(np.full(numDates, dt._ordinal, dtype=np.int64))
+
+    ###########################################################################
+
+    def _setOrdinals(self, ordinals):
+        if ordinals.ndim != 1:
+            raise TuringError("Date arrays must be one dimensional")
+        self._ordinals = ordinals
+        self._ordinals.flags.writeable = False
+        self._fields = None
+
+    ###########################################################################
+
+    def ordinals(self):
+        ''' Day ordinals of the dates. '''
+        return self._ordinals
+
+    ###########################################################################
+
+    def excelDates(self):
+        ''' Excel dates (days since 1 Jan 1900 in the Excel convention). '''
+        return excelFromOrdinal(self._ordinals)
+
+    ###########################################################################
+
+    def fields(self):
+        ''' Year, month and day arrays of the dates. '''
+        if self._fields is None:
+            self._fields = civilFromDays(self._ordinals)
+        return self._fields
+
+    ###########################################################################
+
+    def weekdays(self):
+        ''' Day of the week with MON = 0, ..., SUN = 6. '''
+        return (self._ordinals + 3) % 7
+
+    ###########################################################################
+
+    def toDatetime64(self):
+        ''' Returns the dates as a numpy datetime64[D] array. '''
+        return self._ordinals.astype('datetime64[D]')
+
+    ###########################################################################
+
+    def toList(self):
+        ''' Returns the dates as a list of TuringDates. '''
+        return [TuringDate.fromOrdinal(o) for o in self._ordinals]
+
+    ###########################################################################
+
+    def __len__(self):
+        return self._ordinals.shape[0]
+
+    ###########################################################################
+
+    def __iter__(self):
+        for o in self._ordinals:
+            yield TuringDate.fromOrdinal(o)
+
+    ###########################################################################
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return TuringDate.fromOrdinal(self._ordinals[key])
+        return TuringDateArray.fromOrdinals(self._ordinals[key])
+
+    ###########################################################################
+
+    def __sub__(self, other):
+        ''' Day differences in the Excel convention, like TuringDate. '''
+        if isinstance(other, TuringDate):
+            return self.excelDates() - other._excelDate
+        elif isinstance(other, TuringDateArray):
+            return self.excelDates() - other.excelDates()
+        raise TuringError("Can only subtract a TuringDate or TuringDateArray")
+
+    ###########################################################################
+
+    def __eq__(self, other):
+        if isinstance(other, TuringDateArray):
+            return self._ordinals == other._ordinals
+        elif isinstance(other, TuringDate):
+            return self.excelDates() == other._excelDate
+        return NotImplemented
+
+    ###########################################################################
+
+    def __lt__(self, other):
+        return (self - other) < 0
+
+    def __le__(self, other):
+        return (self - other) <= 0
+
+    def __gt__(self, other):
+        return (self - other) > 0
+
+    def __ge__(self, other):
+        return (self - other) >= 0
+
+    ###########################################################################
+
+    def addDays(self,
+                numDays: (int, np.ndarray)):
+        ''' Add a number of days (scalar or one per date). '''
+        return TuringDateArray.fromOrdinals(
+            self._ordinals + np.asarray(numDays, dtype=np.int64))
+
+    ###########################################################################
+
+    def addWeeks(self,
+                 numWeeks: (int, np.ndarray)):
+        return self.addDays(7 * np.asarray(numWeeks, dtype=np.int64))
+
+    ###########################################################################
+
+    def addMonths(self,
+                  numMonths: (int, np.ndarray)):
+        ''' Add a number of months (scalar or one per date). As in
+        TuringDate.addMonths the day is capped at the end of the new month. '''
+
+        y, m, d = self.fields()
+        months = m - 1 + np.asarray(numMonths, dtype=np.int64)
+        y = y + months // 12
+        m = months % 12 + 1
+        d = np.minimum(d, daysInMonthArray(y, m))
+        return TuringDateArray.fromOrdinals(daysFromCivil(y, m, d))
+
+    ###########################################################################
+
+    def addYears(self,
+                 numYears: (int, np.ndarray)):
+        ''' Add a whole number of years (scalar or one per date). '''
+        return self.addMonths(12 * np.asarray(numYears, dtype=np.int64))
+
+    ###########################################################################
+
+    def addTenor(self,
+                 tenor: str):
+        ''' Add a tenor such as '3M' or '10Y' to every date with the same
+        conventions as TuringDate.addTenor. Months and years are added one
+        period at a time so that end-of-month capping matches. '''
+
+        periodType, numPeriods = parseTenor(tenor)
+
+        if periodType == "D":
+            return self.addDays(numPeriods)
+        elif periodType == "W":
+            return self.addDays(7 * numPeriods)
+
+        numMonths = 12 if periodType == "Y" else 1
+        if numPeriods < 0:
+            numMonths = -numMonths
+
+        dates = self
+        for _ in range(0, abs(numPeriods)):
+            dates = dates.addMonths(numMonths)
+        return dates
+
+    ###########################################################################
+
+    def EOM(self):
+        ''' Last date of the month of each date. '''
+        y, m, _ = self.fields()
+        return TuringDateArray.fromOrdinals(
+            daysFromCivil(y, m, daysInMonthArray(y, m)))
+
+    ###########################################################################
+
+    def isEOM(self):
+        y, m, d = self.fields()
+        return d == daysInMonthArray(y, m)
+
+    ###########################################################################
+
+    def isWeekend(self):
+        return self.weekdays() >= TuringDate.SAT
+
+    ###########################################################################
+
+    def adjust(self,
+               calendarType: TuringCalendarTypes,
+               busDayAdjustType: TuringBusDayAdjustTypes):
+        ''' Business day adjust every date according to the calendar. '''
+
+        calendar = TuringCalendar(calendarType)
+        excelDates = calendar.adjustExcelDates(self.excelDates(),
+                                               busDayAdjustType)
+        return TuringDateArray.fromExcelDates(excelDates)
+
+    ###########################################################################
+
+    def isBusinessDay(self,
+                      calendarType: TuringCalendarTypes):
+        calendar = TuringCalendar(calendarType)
+        return calendar.isBusinessDays(self.excelDates())
+
+    ###########################################################################
+
+    def __repr__(self):
+        return "TuringDateArray(" + str(self.toDatetime64()) + ")"
+
+###############################################################################
+
+
+def parseTenor(tenor: str):
+    ''' Split a tenor string into its period type (D, W, M or Y) and the
+    number of periods. ON and TN are one day. '''
+
+    if isinstance(tenor, str) is False:
+        raise TuringError("Tenor must be a string e.g. '5Y'")
+
+    tenStr = tenor.upper()
+
+    if tenStr == "ON" or tenStr == "TN":
+        return "D", 1
+    elif tenStr[-1] in ("D", "W", "M", "Y"):
+        return tenStr[-1], int(tenStr[0:-1])
+    else:
+        raise TuringError("Unknown tenor type in " + tenor)
+
+###############################################################################
@@ -5,6 +5,11 @@ from fundamental.pricing_context import PricingContext
 from fundamental.portfolio.portfolio import Portfolio
 
 from turing_models.instruments.common import (RiskMeasure)
+from turing_models.instruments.rates.bond_fixed_rate import BondFixedRate
+from turing_models.var.historical_simulation import HistoricalSimulationRunner
+from turing_models.var.key_rate_var import KeyRateVaR
+from turing_models.var.value_store import HistoricalValueStore
+from turing_models.utilities.error import TuringError
 from turing_models.utilities.schedule import TuringSchedule
 from turing_models.utilities.turing_date import TuringDate
 from turing_models.utilities.frequency import FrequencyType
@@ -21,7 +26,12 @@ class FIPortfolioVaR():
     confidence_interval: float = 0.95
     freq_type: FrequencyType = FrequencyType.DAILY
     calendar_type: TuringCalendarTypes = TuringCalendarTypes.CHINA_IB
-    
+    processes: int = None  # 历史重估的进程数，默认为CPU核数
+    key_tenors: list = None  # 关键期限利率因子（年），用于Delta Normal、Delta Gamma和Monte Carlo
+    num_paths: int = 10000  # Delta Gamma和Monte Carlo的模拟次数
+    seed: int = None
+    value_store: HistoricalValueStore = None  # 持仓历史重估值存储，设置后每次只重估新日期和变化的持仓
+
     def __post_init__(self):
         if self.effective_date is None:
             self.effective_date = self.value_date.addDays(-self.period_interval-1)
@@ -30,9 +40,27 @@ class FIPortfolioVaR():
                                   self.termination_date,
                                   self.freq_type,
                                   self.calendar_type)
+    @staticmethod
+    def _bond_positions(portfolio):
+        """ 组合全部为固定利率债券时返回债券和持仓数量，否则返回None """
+        positions = portfolio._position_sets.positions
+        if positions and all(isinstance(position.tradable, BondFixedRate) for position in positions):
+            quantities = [getattr(position, 'quantity', None) for position in positions]
+            # 未给出持仓数量时按1计，数量为0的持仓保留为0
+            return ([position.tradable for position in positions],
+                    [1.0 if quantity is None else quantity for quantity in quantities])
+        return None
+
     def portfolio_returns(self):
-        portfolio_value = []
         portfolio = Portfolio(portfolio_name=self.target_portfolio, pricing_date=self.value_date)
+        bond_positions = self._bond_positions(portfolio)
+        if bond_positions is not None:
+            # 固定利率债券组合：批量预取行情，多进程按日期重估
+            runner = HistoricalSimulationRunner(*bond_positions, processes=self.processes,
+                                                value_store=self.value_store)
+            return list(runner.portfolio_returns(self.schedule.scheduleDates()))
+
+        portfolio_value = []
         for date in self.schedule.scheduleDates():
             scenario_extreme = PricingContext(pricing_date=date)
             # curves = TuringDB.bond_yield_curve(curve_code=curve_lists, date=date)
@@ -44,12 +72,52 @@ class FIPortfolioVaR():
         returns = [(portfolio_value[i] - portfolio_value[i - 1])/portfolio_value[i - 1] for i in range(1, len(portfolio_value))]
         return returns
 
+    def key_rate_var(self):
+        """ 关键期限利率因子模型，因子协方差由回看期的曲线估计 """
+        portfolio = Portfolio(portfolio_name=self.target_portfolio, pricing_date=self.value_date)
+        bond_positions = self._bond_positions(portfolio)
+        if bond_positions is None:
+            raise TuringError(f"{self.formula} VaR only supports fixed rate bond portfolios")
+        return KeyRateVaR.from_history(*bond_positions,
+                                       dates=self.schedule.scheduleDates(),
+                                       key_tenors=self.key_tenors,
+                                       processes=self.processes,
+                                       confidence_interval=self.confidence_interval)
+
+    def _key_rate_results(self):
+        model = self.key_rate_var()
+        if self.formula == 'Delta Normal':
+            return model.delta_normal()
+        elif self.formula == 'Delta Gamma':
+            return model.delta_gamma(self.num_paths, self.seed)
+        return model.monte_carlo(self.num_paths, self.seed)
+
     def VaR(self):
+        if self.formula in ('Delta Normal', 'Delta Gamma', 'Monte Carlo'):
+            return self._key_rate_results().var
+        elif self.formula != 'Historical Simulation':
+            raise TuringError(f"Unknown VaR formula: {self.formula}")
+
+        returns, v0 = self._historical_returns()
+        Value_at_Risk = -np.quantile(returns, 1-self.confidence_interval) * v0
+
+        return(Value_at_Risk)
+
+    def _historical_returns(self):
+        """ 回看期的组合收益率和估值日的组合价值 """
         p0 = Portfolio(portfolio_name=self.target_portfolio, pricing_date=self.value_date)
         scenario_extreme = PricingContext(pricing_date=self.value_date)
         with scenario_extreme:
             v0 = p0.calc(RiskMeasure.FullPrice)
-        if self.formula == 'Historical Simulation':    
-            Value_at_Risk = -np.percentile(self.portfolio_returns(), 1-self.confidence_interval) * v0
+        return np.asarray(self.portfolio_returns()), v0
+
+    def ES(self):
+        """ 预期损失，历史模拟法取不高于VaR分位数的收益率的均值 """
+        if self.formula in ('Delta Normal', 'Delta Gamma', 'Monte Carlo'):
+            return self._key_rate_results().es
+        elif self.formula != 'Historical Simulation':
+            raise TuringError(f"Unknown VaR formula: {self.formula}")
 
-        return(Value_at_Risk)
\ No newline at end of file
+        returns, v0 = self._historical_returns()
+        threshold = np.quantile(returns, 1-self.confidence_interval)
+        return -returns[returns <= threshold].mean() * v0
@@ -0,0 +1,207 @@
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+
+import numpy as np
+
+from turing_models.instruments.common import YieldCurve, YieldCurveCode
+from turing_models.instruments.rates.bond_book import BondBook
+from turing_models.instruments.rates.bond_fixed_rate import BondFixedRate
+from turing_models.utilities.error import TuringError
+from turing_models.utilities.helper_functions import to_datetime, to_turing_date
+from turing_models.utilities.process_pool import pool_context
+from turing_models.utilities.turing_date import TuringDate
+
+
+def bond_curve_key(bond):
+    """ 债券所用曲线的键：(曲线编码, 曲线类型, 远期期限)，没有曲线编码（曲线数据由外部传入）时返回None """
+    curve_code = bond.curve_code
+    if curve_code is None:
+        return None
+    if isinstance(curve_code, YieldCurveCode):
+        curve_code = curve_code.name
+    return curve_code, bond.cv.curve_type, bond.cv.forward_term
+
+
+def _normalise_term(value):
+    """ 持仓条款转换成可比较、可序列化的值 """
+    if isinstance(value, TuringDate):
+        return value._excelDate
+    elif isinstance(value, Enum):
+        return value.name
+    return value
+
+
+def bond_position_key(bond):
+    """ 持仓在重估值存储中的键：债券代码及影响历史重估值的全部条款，条款变化后视为新的持仓。
+    没有曲线编码时各历史日期都用外部传入的曲线数据重估，以曲线的期限和利率作为曲线的键 """
+    terms = (bond.asset_id, bond.issue_date, bond.due_date, bond.par, bond.coupon_rate,
+             bond.pay_interest_cycle, bond.interest_rules, bond.pay_interest_mode,
+             bond.settlement_terms, bond._spread_adjustment)
+    curve_key = bond_curve_key(bond)
+    if curve_key is None:
+        curve_data = getattr(bond.cv, 'curve_data', None)
+        if curve_data is None:
+            raise TuringError(f"Bond {bond.asset_id} has neither a curve_code nor curve data to store")
+        curve_key = (tuple(curve_data['tenor'].tolist()), tuple(curve_data['rate'].tolist()))
+    return tuple(_normalise_term(value) for value in terms) + (curve_key,)
+
+
+def _bond_on_date(bond, date, curve_data):
+    """ 债券在历史日期上的浅拷贝：只替换估值日、结算日和曲线数据，现金流日期和金额等静态数据直接复用 """
+    b = copy.copy(bond)
+    b.value_date = to_datetime(date)
+    b.transformed_value_date = date
+    b.settlement_date = max(date, bond.issue_date).addDays(bond.settlement_terms)
+    if curve_data is not None:
+        b.cv = copy.copy(bond.cv)
+        b.cv.value_date = date
+        b.cv.curve_data = curve_data
+    return b
+
+
+def _value_dates(bonds, tasks):
+    """ 逐个日期用BondBook一次重估指定的债券，tasks为[(日期, {曲线键: 曲线数据}, 债券下标)]，
+    返回每个日期这些债券的全价；结算日已过到期日的债券价值记为0 """
+    results = []
+    for date, curves, index in tasks:
+        values = np.zeros(len(index))
+        priced = []
+        live = []
+        for k, i in enumerate(index):
+            b = _bond_on_date(bonds[i], date, curves.get(bond_curve_key(bonds[i])))
+            if b.settlement_date > b.due_date:
+                continue
+            priced.append(b)
+            live.append(k)
+        if priced:
+            values[live] = BondBook(priced).full_price()
+        results.append(values)
+    return results
+
+
+_worker_state = {}
+
+
+def _init_worker(bonds):
+    """ 子进程初始化：债券静态数据每个进程只传一次 """
+    _worker_state['bonds'] = bonds
+
+
+def _worker_value_dates(tasks):
+    return _value_dates(_worker_state['bonds'], tasks)
+
+
+class HistoricalSimulationRunner:
+    """ 历史模拟法VaR的组合重估引擎
+
+    按日期批量预取行情：每个历史日期只调用一次接口取回组合用到的全部收益率曲线，写入行情快照缓存。
+    债券的现金流日期、金额等静态数据只生成一次，各日期只替换估值日、结算日和曲线数据后用BondBook向量化重估，
+    不再经过PricingContext和逐只债券的ctx解析。日期按连续的区间分给多个进程，回看期越长越能利用多核。
+    组合价值为各债券全价按持仓数量加权之和。
+    传入HistoricalValueStore时各(持仓, 日期)的全价只计算一次，窗口每天前移一个日期时只需重估新日期。
+    进程池的启动方式由pool_context决定，本进程调用过并行的numba函数后改用forkserver启动。 """
+
+    def __init__(self, bonds: list, quantities=None, processes: int = None, value_store=None):
+        if len(bonds) == 0:
+            raise TuringError("Portfolio is empty")
+        for bond in bonds:
+            if not isinstance(bond, BondFixedRate):
+                raise TuringError(f"Historical simulation runner does not support {type(bond).__name__}")
+
+        self.bonds = []
+        for bond in bonds:
+            b = copy.copy(bond)
+            # 上下文对象不传给子进程
+            b.__dict__.pop('ctx', None)
+            self.bonds.append(b)
+
+        if quantities is None:
+            self.quantities = np.ones(len(bonds))
+        else:
+            self.quantities = np.asarray(quantities, dtype=np.float64)
+            if self.quantities.shape != (len(bonds),):
+                raise TuringError("Quantities must have one value per bond")
+        self.processes = processes or os.cpu_count() or 1
+        self.value_store = value_store
+
+    def prefetch(self, dates: list):
+        """ 批量取回各日期的曲线数据，返回{excel日期: {曲线键: 曲线数据}} """
+        dates = [to_turing_date(date) for date in dates]
+        keys = {bond_curve_key(bond) for bond in self.bonds} - {None}
+        curve_codes = {}
+        for curve_code, curve_type, forward_term in keys:
+            curve_codes.setdefault(forward_term, set()).add(curve_code)
+
+        curve_data = {}
+        for date in dates:
+            for forward_term, codes in curve_codes.items():
+                YieldCurve.prefetch(sorted(codes), date, forward_term)
+            curves = {}
+            for key in keys:
+                curve_code, curve_type, forward_term = key
+                cv = YieldCurve(value_date=date, curve_code=curve_code, curve_type=curve_type,
+                                forward_term=forward_term)
+                cv.resolve()
+                if cv.curve_data is None:
+                    raise TuringError(f"Cannot find yield curve {curve_code} on {date}")
+                curves[key] = cv.curve_data
+            curve_data[date._excelDate] = curves
+        return curve_data
+
+    def position_values(self, dates: list):
+        """ 各历史日期每只债券的全价，形状为(日期数, 债券数)
+
+        设置了value_store时只重估存储中没有的(持仓, 日期)，即新进入窗口的日期和条款有变化的持仓，
+        重估结果写回存储 """
+        dates = [to_turing_date(date) for date in dates]
+        values = np.zeros((len(dates), len(self.bonds)))
+        store = self.value_store
+        if store is None:
+            pending = [(d, list(range(len(self.bonds)))) for d in range(len(dates))]
+        else:
+            keys = [bond_position_key(bond) for bond in self.bonds]
+            pending = []
+            for d, date in enumerate(dates):
+                index = []
+                for i, key in enumerate(keys):
+                    value = store.get(key, date)
+                    if value is None:
+                        index.append(i)
+                    else:
+                        values[d, i] = value
+                if index:
+                    pending.append((d, index))
+
+        if not pending:
+            return values
+
+        curve_data = self.prefetch([dates[d] for d, _ in pending])
+        tasks = [(dates[d], curve_data[dates[d]._excelDate], index) for d, index in pending]
+
+        num_workers = min(self.processes, len(tasks))
+        if num_workers <= 1:
+            results = _value_dates(self.bonds, tasks)
+        else:
+            chunks = [[tasks[i] for i in index] for index in np.array_split(np.arange(len(tasks)), num_workers)]
+            with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker, initargs=(self.bonds,),
+                                     mp_context=pool_context([__name__])) as pool:
+                results = [values for chunk in pool.map(_worker_value_dates, chunks) for values in chunk]
+
+        for (d, index), result in zip(pending, results):
+            values[d, index] = result
+            if store is not None:
+                store.update({(keys[i], dates[d]._excelDate): value for i, value in zip(index, result)})
+        if store is not None:
+            store.save()
+        return values
+
+    def portfolio_values(self, dates: list):
+        """ 各历史日期的组合价值 """
+        return self.position_values(dates) @ self.quantities
+
+    def portfolio_returns(self, dates: list):
+        """ 相邻日期组合价值的收益率 """
+        values = self.portfolio_values(dates)
+        return (values[1:] - values[:-1]) / values[:-1]
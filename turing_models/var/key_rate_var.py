@@ -0,0 +1,151 @@
+from collections import namedtuple
+
+import numpy as np
+from scipy.stats import norm
+
+from turing_models.instruments.rates.bond_book import BondBook
+from turing_models.instruments.rates.bond_fixed_rate import BondFixedRate
+from turing_models.utilities.error import TuringError
+from turing_models.var.historical_simulation import HistoricalSimulationRunner, bond_curve_key
+
+var_results = namedtuple('var_results', ['var', 'es'])
+
+DEFAULT_KEY_TENORS = [0.25, 0.5, 1, 2, 3, 5, 7, 10, 20, 30]
+
+
+class KeyRateVaR:
+    """ 关键期限利率因子模型下固定收益组合的VaR和ES
+
+    风险因子为组合所用每条收益率曲线在各关键期限上的利率变动（bp），因子协方差按日给出，持有期为horizon天。
+    各债券对自身曲线关键期限利率的一阶、二阶导数由BondBook.key_rate_risk一次算出并缓存，之后
+    delta_normal和delta_gamma只做矩阵运算；monte_carlo对模拟的因子冲击用曲线情景块批量完整重估。
+    VaR和ES都以正数表示损失，单位与组合价值（全价按持仓数量加权之和）相同。 """
+
+    def __init__(self, bonds: list, quantities=None, covariance=None, key_tenors: list = None,
+                 confidence_interval: float = 0.95, horizon: int = 1):
+        if len(bonds) == 0:
+            raise TuringError("Portfolio is empty")
+        for bond in bonds:
+            if not isinstance(bond, BondFixedRate):
+                raise TuringError(f"Key-rate VaR does not support {type(bond).__name__}")
+        if not 0.0 < confidence_interval < 1.0:
+            raise TuringError("Confidence interval must be between 0 and 1")
+
+        self.key_tenors = list(DEFAULT_KEY_TENORS if key_tenors is None else key_tenors)
+        self.confidence_interval = confidence_interval
+        self.horizon = horizon
+
+        if quantities is None:
+            quantities = np.ones(len(bonds))
+        quantities = np.asarray(quantities, dtype=np.float64)
+        if quantities.shape != (len(bonds),):
+            raise TuringError("Quantities must have one value per bond")
+
+        # 按曲线分组，每组的因子为该曲线的各关键期限
+        groups = {}
+        for bond, quantity in zip(bonds, quantities):
+            group_bonds, group_quantities = groups.setdefault(bond_curve_key(bond), ([], []))
+            group_bonds.append(bond)
+            group_quantities.append(quantity)
+
+        m = len(self.key_tenors)
+        self.bonds = list(bonds)
+        self.quantities = quantities
+        self.curve_keys = list(groups)
+        self.factors = [(key, tenor) for key in self.curve_keys for tenor in self.key_tenors]
+        self._books = [(BondBook(group_bonds), np.array(group_quantities), np.arange(g * m, (g + 1) * m))
+                       for g, (group_bonds, group_quantities) in enumerate(groups.values())]
+        self._sensitivities = None
+        self.covariance = None
+        if covariance is not None:
+            self.set_covariance(covariance)
+
+    @classmethod
+    def from_history(cls, bonds: list, dates: list, quantities=None, key_tenors: list = None,
+                     processes: int = None, **kwargs):
+        """ 用回看期各日期的曲线估计因子协方差，曲线数据按日期批量预取 """
+        var = cls(bonds, quantities, key_tenors=key_tenors, **kwargs)
+        if None in var.curve_keys:
+            raise TuringError("Bonds need a curve_code to estimate the key-rate covariance")
+        curve_data = HistoricalSimulationRunner(bonds, quantities, processes).prefetch(dates)
+        var.set_covariance(var.covariance_from_curves(list(curve_data.values())))
+        return var
+
+    def key_rates(self, curves: dict):
+        """ 一个日期上各因子的利率水平（bp），curves为{曲线键: 曲线数据}，关键期限处按期限线性插值 """
+        levels = []
+        for key in self.curve_keys:
+            curve_data = curves[key]
+            levels.append(np.interp(self.key_tenors, curve_data['tenor'], curve_data['rate']) * 10000)
+        return np.concatenate(levels)
+
+    def covariance_from_curves(self, curve_history: list):
+        """ 由按日期排列的曲线数据估计因子日变动的协方差（bp^2） """
+        if len(curve_history) < 3:
+            raise TuringError("Need at least three dates to estimate the covariance")
+        levels = np.array([self.key_rates(curves) for curves in curve_history])
+        return np.atleast_2d(np.cov(np.diff(levels, axis=0), rowvar=False))
+
+    def set_covariance(self, covariance):
+        covariance = np.asarray(covariance, dtype=np.float64)
+        if covariance.shape != (len(self.factors), len(self.factors)):
+            raise TuringError("Covariance must have one row and column per factor")
+        self.covariance = covariance
+
+    def sensitivities(self):
+        """ 组合价值及其对各因子的一阶导数向量和二阶导数矩阵，首次使用时计算 """
+        if self._sensitivities is None:
+            n = len(self.factors)
+            value = 0.0
+            delta = np.zeros(n)
+            gamma = np.zeros((n, n))
+            for book, quantities, factors in self._books:
+                risk = book.key_rate_risk(self.key_tenors)
+                value += quantities @ risk['full_price']
+                delta[factors] = quantities @ risk['delta']
+                gamma[np.ix_(factors, factors)] = np.tensordot(quantities, risk['gamma'], axes=1)
+            self._sensitivities = (value, delta, gamma)
+        return self._sensitivities
+
+    def _horizon_covariance(self):
+        if self.covariance is None:
+            raise TuringError("Key-rate covariance has not been set")
+        return self.covariance * self.horizon
+
+    def _factor_shocks(self, num_paths: int, seed: int = None):
+        """ 服从N(0, 协方差)的因子冲击，用特征分解开方以允许半正定的协方差 """
+        eigenvalues, eigenvectors = np.linalg.eigh(self._horizon_covariance())
+        root = eigenvectors * np.sqrt(np.maximum(eigenvalues, 0.0))
+        rng = np.random.default_rng(seed)
+        return rng.standard_normal((num_paths, len(self.factors))) @ root.T
+
+    def _tail(self, pnl):
+        """ 模拟损益分布的VaR和ES """
+        var = -np.quantile(pnl, 1.0 - self.confidence_interval)
+        return var_results(var, -pnl[pnl <= -var].mean())
+
+    def delta_normal(self):
+        """ 损益为因子变动的线性函数且因子服从正态分布时的解析VaR和ES """
+        _, delta, _ = self.sensitivities()
+        sigma = np.sqrt(delta @ self._horizon_covariance() @ delta)
+        z = norm.ppf(self.confidence_interval)
+        return var_results(z * sigma, sigma * norm.pdf(z) / (1.0 - self.confidence_interval))
+
+    def delta_gamma(self, num_paths: int = 100000, seed: int = None):
+        """ 用一阶和二阶导数的二次近似计算模拟因子冲击下的损益 """
+        _, delta, gamma = self.sensitivities()
+        shocks = self._factor_shocks(num_paths, seed)
+        pnl = shocks @ delta + 0.5 * np.einsum('ij,jk,ik->i', shocks, gamma, shocks)
+        return self._tail(pnl)
+
+    def monte_carlo(self, num_paths: int = 10000, seed: int = None, batch_size: int = 2000):
+        """ 对模拟的因子冲击按曲线情景块完整重估组合，情景分批计算以控制内存 """
+        shocks = self._factor_shocks(num_paths, seed)
+        m = len(self.key_tenors)
+        pnl = np.zeros(num_paths)
+        for book, quantities, factors in self._books:
+            base = quantities @ book.key_rate_full_price(self.key_tenors, np.zeros((1, m)))[0]
+            for start in range(0, num_paths, batch_size):
+                batch = shocks[start:start + batch_size, factors]
+                pnl[start:start + batch_size] += book.key_rate_full_price(self.key_tenors, batch) @ quantities - base
+        return self._tail(pnl)
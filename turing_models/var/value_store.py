@@ -0,0 +1,58 @@
+import os
+import pickle
+import threading
+
+from turing_models.utilities.helper_functions import to_turing_date
+
+
+class HistoricalValueStore:
+    """ 历史模拟法的持仓重估值存储
+
+    以 (持仓键, 情景日期的excel日期) 为键保存单位持仓在该历史日期上的全价。历史日期的曲线和持仓条款
+    都不变时重估值不变，回看窗口每天前移一个日期，之后的计算只需重估新进入窗口的日期和条款有变化的持仓，
+    组合各日期的损益向量和分位数、ES统计量由存储的重估值按当前持仓数量重新汇总得到。
+    给出path时从文件加载，save()写回文件；path为None时只保存在内存中。 """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._data = {}
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as f:
+                self._data = pickle.load(f)
+
+    def get(self, position_key, date):
+        """ 持仓在历史日期上的重估值，没有存储时返回None """
+        return self._data.get((position_key, to_turing_date(date)._excelDate))
+
+    def update(self, values: dict):
+        """ 写入{(持仓键, excel日期): 重估值} """
+        with self._lock:
+            self._data.update(values)
+
+    def discard_before(self, date):
+        """ 删除早于date的情景日期，回看窗口前移后用于控制存储大小，返回删除的条数 """
+        excel_date = to_turing_date(date)._excelDate
+        with self._lock:
+            keys = [key for key in self._data if key[1] < excel_date]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def save(self):
+        """ 写回文件，先写临时文件再替换，避免中断时损坏已有的存储 """
+        if self.path is None:
+            return
+        with self._lock:
+            data = dict(self._data)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)